@@ -2,9 +2,12 @@ import logging
 from multiprocessing import Manager, Queue, Value
 from queue import Empty
 from time import time
+from typing import Iterable, Iterator, List, Optional
 
+from helperFunctions.fair_share_queue import FairShareQueue
 from helperFunctions.process import (
-    ExceptionSafeProcess, check_worker_exceptions, start_single_worker, terminate_process_and_children
+    ExceptionSafeProcess, PersistentWorkerProcess, WorkerTaskException, check_worker_exceptions, start_single_worker,
+    terminate_process_and_children
 )
 from helperFunctions.tag import TagColor
 from objects.file import FileObject
@@ -21,9 +24,18 @@ class AnalysisBasePlugin(BasePlugin):  # pylint: disable=too-many-instance-attri
     '''
     This is the base plugin. All plugins should be subclass of this.
     recursive flag: If True (default) recursively analyze included files
+    persistent_workers (config option or PERSISTENT_WORKERS): If True, each worker keeps a long-lived analysis process
+    instead of starting a new process for every file. The process is only replaced if an analysis times out. Plugins
+    that keep state between analyses (e.g. an in-memory index) need persistent workers, since changes made in the
+    per-file processes are lost.
+    batch_size (config option or BATCH_SIZE): If greater than 1, workers collect up to this many queued files and
+    pass them to ``process_objects`` at once. The timeout still applies to each file.
+    The in-queue serves the files of different firmware submissions round-robin (see `helperFunctions.fair_share_queue`).
     '''
     VERSION = 'not set'
     SYSTEM_VERSION = None
+    BATCH_SIZE = 1
+    PERSISTENT_WORKERS = False
 
     timeout = None
 
@@ -31,11 +43,13 @@ class AnalysisBasePlugin(BasePlugin):  # pylint: disable=too-many-instance-attri
         super().__init__(plugin_administrator, config=config, plugin_path=plugin_path)
         self.check_config(no_multithread)
         self.recursive = recursive
-        self.in_queue = Queue()
+        self.in_queue = FairShareQueue()
         self.out_queue = Queue()
         self.stop_condition = Value('i', 0)
         self.workers = []
         self.thread_count = int(self.config[self.NAME]['threads'])
+        self.persistent_workers = self.config[self.NAME].getboolean('persistent_workers', fallback=self.PERSISTENT_WORKERS)
+        self.batch_size = self.config[self.NAME].getint('batch_size', fallback=self.BATCH_SIZE)
         self.active = [Value('i', 0) for _ in range(self.thread_count)]
         if self.timeout is None:
             self.timeout = timeout
@@ -65,11 +79,24 @@ class AnalysisBasePlugin(BasePlugin):  # pylint: disable=too-many-instance-attri
         '''
         return file_object
 
+    def process_objects(self, file_objects: List[FileObject]) -> Iterable[FileObject]:
+        '''
+        This function may be overwritten by plugins that can process multiple files more efficiently at once
+        (e.g. by loading signatures only once). It is only called if the batch size is greater than 1.
+        The processed files must be yielded one after another in the given order, so that the timeout can be
+        enforced for each file.
+        '''
+        return (self.process_object(file_object) for file_object in file_objects)
+
     def analyze_file(self, file_object):
         fo = self.process_object(file_object)
         fo = self._add_plugin_version_and_timestamp_to_analysis_result(fo)
         return fo
 
+    def analyze_files(self, file_objects: List[FileObject]) -> Iterator[FileObject]:
+        for fo in self.process_objects(file_objects):
+            yield self._add_plugin_version_and_timestamp_to_analysis_result(fo)
+
     def _add_plugin_version_and_timestamp_to_analysis_result(self, fo):  # pylint: disable=invalid-name
         fo.processed_analysis[self.NAME].update(self.init_dict())
         return fo
@@ -141,13 +168,88 @@ class AnalysisBasePlugin(BasePlugin):  # pylint: disable=too-many-instance-attri
             self.out_queue.put(result.pop())
             logging.debug('Worker {}: Finished {} analysis on {}'.format(worker_id, self.NAME, next_task.uid))
 
+    def process_next_batch(self, tasks: List[FileObject]) -> Iterator[FileObject]:
+        for task in tasks:
+            task.processed_analysis.update({self.NAME: {}})
+        yield from self.analyze_files(tasks)
+
+    def _process_next_object_in_persistent_worker(self, task):
+        if isinstance(task, list):
+            return self.process_next_batch(task)
+        result = []
+        self.process_next_object(task, result)
+        return result.pop()
+
+    def worker_processing_in_persistent_process(self, worker_id, next_task, persistent_worker: PersistentWorkerProcess):
+        try:
+            self.out_queue.put(persistent_worker.run_task(next_task, timeout=self.timeout))
+            logging.debug('Worker {}: Finished {} analysis on {}'.format(worker_id, self.NAME, next_task.uid))
+        except TimeoutError:
+            self._handle_failed_analysis(next_task, None, worker_id, 'Timeout')
+        except WorkerTaskException as exception:
+            logging.debug('Worker {}: exception during {} analysis:\n{}'.format(worker_id, self.NAME, exception.stack_trace))
+            self._handle_failed_analysis(next_task, None, worker_id, 'Exception')
+
+    def worker_processing_batch(self, worker_id, tasks, persistent_worker: Optional[PersistentWorkerProcess] = None):
+        '''
+        Analyze a batch of files in the persistent worker (or in a new process if there is none). The results are
+        received file by file, so the timeout applies to each file: If it is exceeded, only the current file fails and
+        the remaining files of the batch are analyzed in a fresh process. If the batch raises an exception, the
+        remaining files are analyzed separately.
+        '''
+        batch_worker = persistent_worker or PersistentWorkerProcess(
+            self._process_next_object_in_persistent_worker, name='{}-Batch-Process-{}'.format(self.NAME, worker_id)
+        )
+        remaining_tasks = list(tasks)
+        try:
+            while remaining_tasks:
+                try:
+                    for finished_task in batch_worker.iterate_results(remaining_tasks, timeout=self.timeout):
+                        self.out_queue.put(finished_task)
+                        remaining_tasks.pop(0)
+                except TimeoutError:
+                    self._handle_failed_analysis(remaining_tasks.pop(0), None, worker_id, 'Timeout')
+                except WorkerTaskException as error:
+                    logging.warning('Worker {}: {} analysis of batch failed ({}). Analyzing files separately.'.format(worker_id, self.NAME, error))
+                    for task in remaining_tasks:
+                        self._process_single_task(worker_id, task, persistent_worker)
+                    return
+            logging.debug('Worker {}: Finished {} analysis on {} files'.format(worker_id, self.NAME, len(tasks)))
+        finally:
+            if persistent_worker is None:
+                batch_worker.shutdown()
+
+    def _process_single_task(self, worker_id, task, persistent_worker: Optional[PersistentWorkerProcess]):
+        if persistent_worker is not None:
+            self.worker_processing_in_persistent_process(worker_id, task, persistent_worker)
+        else:
+            self.worker_processing_with_timeout(worker_id, task)
+
+    def _get_additional_tasks_for_batch(self) -> List[FileObject]:
+        tasks = []
+        deadline = time() + float(self.config['ExpertSettings']['block_delay'])
+        while len(tasks) < self.batch_size - 1:
+            try:
+                next_task = self.in_queue.get(timeout=max(deadline - time(), 0))
+            except Empty:
+                break
+            next_task.processed_analysis.update({self.NAME: {}})
+            tasks.append(next_task)
+        return tasks
+
     def _handle_failed_analysis(self, fw_object, process, worker_id, cause: str):
-        terminate_process_and_children(process)
+        if process is not None:
+            terminate_process_and_children(process)
         fw_object.analysis_exception = (self.NAME, '{} occurred during analysis'.format(cause))
         logging.error('Worker {}: {} during analysis {} on {}'.format(worker_id, cause, self.NAME, fw_object.uid))
         self.out_queue.put(fw_object)
 
     def worker(self, worker_id):
+        persistent_worker = None
+        if self.persistent_workers:
+            persistent_worker = PersistentWorkerProcess(
+                self._process_next_object_in_persistent_worker, name='{}-Analysis-Process-{}'.format(self.NAME, worker_id)
+            )
         while self.stop_condition.value == 0:
             try:
                 next_task = self.in_queue.get(timeout=float(self.config['ExpertSettings']['block_delay']))
@@ -157,8 +259,14 @@ class AnalysisBasePlugin(BasePlugin):  # pylint: disable=too-many-instance-attri
             else:
                 self.active[worker_id].value = 1
                 next_task.processed_analysis.update({self.NAME: {}})
-                self.worker_processing_with_timeout(worker_id, next_task)
+                additional_tasks = self._get_additional_tasks_for_batch() if self.batch_size > 1 else []
+                if additional_tasks:
+                    self.worker_processing_batch(worker_id, [next_task, *additional_tasks], persistent_worker)
+                else:
+                    self._process_single_task(worker_id, next_task, persistent_worker)
 
+        if persistent_worker is not None:
+            persistent_worker.shutdown()
         logging.debug('worker {} stopped'.format(worker_id))
 
     def check_exceptions(self):
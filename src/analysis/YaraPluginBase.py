@@ -1,20 +1,29 @@
-import json
 import logging
 import re
-import subprocess
+import string
 from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import yara
 
 from analysis.PluginBase import AnalysisBasePlugin, PluginInitException
 from helperFunctions.fileSystem import get_src_dir
 
+HEX_STRING_REGEX = re.compile(r'(\$\w*)\s*=\s*\{')
+RULE_REGEX = re.compile(r'^\s*(?:(?:private|global)\s+)*rule\s+(\w+)', re.MULTILINE)
+
 
 class YaraBasePlugin(AnalysisBasePlugin):
     '''
     This should be the base for all YARA based analysis plugins
+
+    The compiled rules are kept by the (persistent) worker processes, so that they are only loaded once per worker.
     '''
     NAME = 'Yara_Base_Plugin'
     DESCRIPTION = 'this is a Yara plugin'
     VERSION = '0.0'
+    BATCH_SIZE = 16
+    PERSISTENT_WORKERS = True
 
     def __init__(self, plugin_administrator, config=None, recursive=True, plugin_path=None):
         '''
@@ -27,26 +36,42 @@ class YaraBasePlugin(AnalysisBasePlugin):
             logging.error(f'Signature file {self.signature_path} not found. Did you run "compile_yara_signatures.py"?')
             raise PluginInitException(plugin=self)
         self.SYSTEM_VERSION = self.get_yara_system_version()  # pylint: disable=invalid-name
+        self.hex_strings = _get_hex_strings(Path(plugin_path).parent.parent / 'signatures') if plugin_path else set()
+        self._rules = None
+        self._rules_mtime = None
         super().__init__(plugin_administrator, config=config, recursive=recursive, plugin_path=plugin_path)
 
     def get_yara_system_version(self):
-        with subprocess.Popen(['yara', '--version'], stdout=subprocess.PIPE) as process:
-            yara_version = process.stdout.readline().decode().strip()
-
         access_time = int(Path(self.signature_path).stat().st_mtime)
-        return f'{yara_version}_{access_time}'
+        return f'{yara.__version__}_{access_time}'
+
+    def _get_rules(self) -> yara.Rules:
+        '''
+        The compiled rules are loaded once per worker process and only reloaded if the signature file changed.
+        '''
+        modification_time = Path(self.signature_path).stat().st_mtime
+        if self._rules is None or modification_time != self._rules_mtime:
+            self._rules = self._load_rules()
+            self._rules_mtime = modification_time
+        return self._rules
+
+    def _load_rules(self) -> yara.Rules:
+        if self._signature_file_is_compiled():
+            return yara.load(self.signature_path)
+        return yara.compile(filepath=self.signature_path)
+
+    def _signature_file_is_compiled(self) -> bool:
+        with open(self.signature_path, 'rb') as signature_file:
+            return signature_file.read(4) == b'YARA'
 
     def process_object(self, file_object):
         if self.signature_path is not None:
-            compiled_flag = '-C' if Path(self.signature_path).read_bytes().startswith(b'YARA') else ''
-            command = f'yara {compiled_flag} --print-meta --print-strings {self.signature_path} {file_object.file_path}'
-            with subprocess.Popen(command, shell=True, stdout=subprocess.PIPE) as process:
-                output = process.stdout.read().decode()
             try:
-                result = self._parse_yara_output(output)
+                result = _convert_yara_matches(self._get_rules().match(filepath=file_object.file_path), self.hex_strings)
                 file_object.processed_analysis[self.NAME] = result
                 file_object.processed_analysis[self.NAME]['summary'] = list(result.keys())
-            except (ValueError, TypeError):
+            except yara.Error as error:
+                logging.warning(f'{self.NAME}: yara scan of {file_object.uid} failed: {error}')
                 file_object.processed_analysis[self.NAME] = {'failed': 'Processing corrupted. Likely bad call to yara.'}
         else:
             file_object.processed_analysis[self.NAME] = {'failed': 'Signature path not set'}
@@ -60,56 +85,61 @@ class YaraBasePlugin(AnalysisBasePlugin):
         sig_file_name = self._get_signature_file_name(plugin_path)
         return str(Path(get_src_dir()) / 'analysis/signatures' / sig_file_name)
 
-    @staticmethod
-    def _parse_yara_output(output):
-        resulting_matches = dict()
-
-        match_blocks, rules = _split_output_in_rules_and_matches(output)
 
-        matches_regex = re.compile(r'((0x[a-f0-9]*):(\$[a-zA-Z0-9_]+):\s(.+))+')
-        for index, rule in enumerate(rules):
-            for match in matches_regex.findall(match_blocks[index]):
-                _append_match_to_result(match, resulting_matches, rule)
-
-        return resulting_matches
-
-
-def _split_output_in_rules_and_matches(output):
-    split_regex = re.compile(r'\n*.*\[.*\]\s/.+\n*')
-    match_blocks = split_regex.split(output)
-    while '' in match_blocks:
-        match_blocks.remove('')
+def _get_hex_strings(signature_dir: Path) -> Set[Tuple[str, str]]:
+    '''
+    yara-python does not tell if a matched string is a hex string (the yara CLI tool prints the matched data of hex
+    strings differently), so the hex strings are taken from the signature sources.
 
-    rule_regex = re.compile(r'(\w*)\s\[(.*)\]\s([.]{0,2}/)(.+)')
-    rules = rule_regex.findall(output)
+    :return: The hex strings as tuples of rule name and string identifier.
+    '''
+    hex_strings = set()
+    for signature_file in sorted(signature_dir.glob('*.yar*')) if signature_dir.is_dir() else []:
+        source = signature_file.read_text(errors='replace')
+        rules = list(RULE_REGEX.finditer(source))
+        for rule, next_rule in zip(rules, [*rules[1:], None]):
+            rule_source = source[rule.end():next_rule.start() if next_rule else len(source)]
+            hex_strings.update((rule.group(1), identifier) for identifier in HEX_STRING_REGEX.findall(rule_source))
+    return hex_strings
 
-    if not len(match_blocks) == len(rules):
-        raise ValueError()
-    return match_blocks, rules
 
+def _convert_yara_matches(matches: List[yara.Match], hex_strings: Optional[Set[Tuple[str, str]]] = None) -> Dict[str, dict]:
+    '''
+    Convert the matches of yara-python into the structure that was previously parsed from the output of the yara CLI tool.
+    '''
+    return {
+        match.rule: {
+            'rule': match.rule,
+            'matches': True,
+            'strings': _convert_string_matches(match.strings, match.rule, hex_strings or set()),
+            'meta': {key: value if isinstance(value, bool) else str(value) for key, value in match.meta.items()},
+        }
+        for match in matches
+    }
+
+
+def _convert_string_matches(string_matches, rule: str, hex_strings: Set[Tuple[str, str]]) -> List[tuple]:
+    result = []
+    for string_match in string_matches:
+        if isinstance(string_match, tuple):  # yara-python < 4.3
+            offset, identifier, data = string_match
+            instances = [(offset, data)]
+        else:
+            identifier = string_match.identifier
+            instances = [(instance.offset, instance.matched_data) for instance in string_match.instances]
+        convert = _format_hex_data if (rule, identifier) in hex_strings else _escape_matched_data
+        result.extend((offset, identifier, convert(data)) for offset, data in instances)
+    return result
 
-def _append_match_to_result(match, resulting_matches, rule):
-    rule_name, meta_string, _, _ = rule
-    _, offset, matched_tag, matched_string = match
 
-    meta_dict = _parse_meta_data(meta_string)
+PRINTABLE_BYTES = set(string.printable.encode()) - set(b'\t\n\r\x0b\x0c')
 
-    this_match = resulting_matches[rule_name] if rule_name in resulting_matches else dict(rule=rule_name, matches=True, strings=list(), meta=meta_dict)
 
-    this_match['strings'].append((int(offset, 16), matched_tag, matched_string.encode()))
-    resulting_matches[rule_name] = this_match
+def _escape_matched_data(data: bytes) -> bytes:
+    # non-printable bytes are escaped in the same way as in the output of the yara CLI tool
+    return b''.join(bytes([byte]) if byte in PRINTABLE_BYTES else f'\\x{byte:02X}'.encode() for byte in data)
 
 
-def _parse_meta_data(meta_data_string):
-    '''
-    Will be of form 'item0=lowercaseboolean0,item1="value1",item2=value2,..'
-    '''
-    meta_data = dict()
-    for item in meta_data_string.split(','):
-        if '=' in item:
-            key, value = item.split('=', maxsplit=1)
-            value = json.loads(value) if value in ['true', 'false'] else value.strip('"')
-            meta_data[key] = value
-        else:
-            logging.warning(f'Malformed meta string \'{meta_data_string}\'')
-    return meta_data
+def _format_hex_data(data: bytes) -> bytes:
+    # the yara CLI tool prints the matched data of hex strings as hex bytes separated by spaces
+    return ' '.join(f'{byte:02X}' for byte in data).encode()
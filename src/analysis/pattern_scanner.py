@@ -0,0 +1,127 @@
+'''
+Scanning of (large) binaries for multiple regular expressions.
+
+A `PatternScanner` walks over a binary (usually the memory map of a file, see `FileObject.mapped_binary`) only once,
+in chunks of `chunk_size` bytes, and runs all of its patterns on a chunk before moving on to the next one. Patterns
+that start with the same prefix (e.g. a user name followed by a colon) form a group: the positions where the prefix
+matches are searched only once per group and the patterns of the group are only tried at these positions.
+
+The results are the same as those of ``re.finditer`` for each pattern. Patterns of a group are first tried on the
+chunk and the following `overlap` bytes; only if this fails or if the match reaches the end of this window, the pattern
+is tried again without limit, so matches that are longer than `overlap` are found as well. Patterns without prefix are
+searched with ``re.finditer`` on the whole binary, the matches are consumed chunk by chunk.
+'''
+import re
+from mmap import mmap
+from typing import Dict, Iterator, List, Optional, Pattern, Tuple, Union
+
+CHUNK_SIZE = 1024 ** 2
+OVERLAP = 4096
+
+Source = Union[bytes, mmap]
+
+
+class _PatternGroup:
+    def __init__(self, prefix: Optional[bytes]):
+        self.candidate_regex = re.compile(b'(?=' + prefix + b')') if prefix is not None else None
+        self.patterns = []  # type: List[Tuple[str, Pattern[bytes]]]
+
+    def scan(self, source: Source, window: Tuple[int, int, int], state: '_ScanState', results: Dict[str, list]):
+        positions = state.positions
+        if self.candidate_regex is None:
+            for name, regex in self.patterns:
+                if name not in state.pending_matches:
+                    state.pending_matches[name] = _PendingMatches(regex, source)
+                for match in state.pending_matches[name].pop_until(window[1]):
+                    results[name].append((match.start(), match.group()))
+            return
+
+        start = max(min(positions[name] for name, _ in self.patterns), window[0])
+        for candidate in _find_matches(self.candidate_regex, source, start, window):
+            for name, regex in self.patterns:
+                if candidate.start() < positions[name]:  # matches of a pattern do not overlap (as in `re.finditer`)
+                    continue
+                match = _match(regex, source, candidate.start(), window)
+                if match is not None:
+                    results[name].append((match.start(), match.group()))
+                    positions[name] = match.end()
+
+
+class _ScanState:
+    def __init__(self, names: List[str]):
+        self.positions = {name: 0 for name in names}  # the end of the last match of each pattern (with prefix)
+        self.pending_matches = {}  # type: Dict[str, _PendingMatches]  # the next matches of each pattern without prefix
+
+
+class _PendingMatches:
+    '''
+    The matches of a pattern without prefix (as found by ``re.finditer`` on the whole binary), consumed chunk by chunk.
+    '''
+    def __init__(self, regex: Pattern[bytes], source: Source):
+        self._matches = regex.finditer(source)
+        self._next_match = next(self._matches, None)
+
+    def pop_until(self, end: int) -> Iterator[re.Match]:
+        while self._next_match is not None and self._next_match.start() < end:
+            yield self._next_match
+            self._next_match = next(self._matches, None)
+
+
+def _find_matches(regex: Pattern[bytes], source: Source, start: int, window: Tuple[int, int, int]) -> Iterator[re.Match]:
+    _, chunk_end, window_end = window
+    for match in regex.finditer(source, start, window_end):
+        if match.start() >= chunk_end:
+            break
+        yield match
+
+
+def _match(regex: Pattern[bytes], source: Source, position: int, window: Tuple[int, int, int]) -> Optional[re.Match]:
+    match = regex.match(source, position, window[2])
+    if window[2] < len(source) and (match is None or match.end() == window[2]):  # the match may need more bytes
+        match = regex.match(source, position)
+    return match
+
+
+class PatternScanner:
+    '''
+    Scanner for multiple patterns (see module documentation).
+
+    :param chunk_size: The number of bytes scanned by all patterns at once.
+    :param overlap: The number of bytes after a chunk that are visible to matches starting in the chunk.
+    '''
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._groups = {}  # type: Dict[Optional[bytes], _PatternGroup]
+        self._names = []  # type: List[str]
+
+    def add_pattern(self, name: str, pattern: Union[bytes, Pattern[bytes]], prefix: Optional[bytes] = None):
+        '''
+        Add a pattern to the scanner.
+
+        :param name: The name of the pattern (key of its matches in the result of `scan`).
+        :param pattern: The regular expression.
+        :param prefix: A regular expression that matches at the start of every match of `pattern`. Patterns with the
+            same prefix are scanned together.
+        '''
+        if name in self._names:
+            raise ValueError(f'pattern {name} already exists')
+        self._names.append(name)
+        self._groups.setdefault(prefix, _PatternGroup(prefix)).patterns.append((name, re.compile(pattern)))
+
+    def scan(self, source: Source) -> Dict[str, List[Tuple[int, bytes]]]:
+        '''
+        Scan a binary for all patterns.
+
+        :param source: The binary (bytes or memory map).
+        :return: The offsets and contents of the matches of each pattern (in the order of their offsets).
+        '''
+        results = {name: [] for name in self._names}
+        state = _ScanState(self._names)
+        for chunk_start in range(0, len(source), self.chunk_size):
+            chunk_end = min(chunk_start + self.chunk_size, len(source))
+            window = (chunk_start, chunk_end, min(chunk_end + self.overlap, len(source)))
+            for group in self._groups.values():
+                group.scan(source, window, state, results)
+        return results
@@ -19,11 +19,10 @@
 
 import os
 import sys
-from subprocess import CalledProcessError
 from tempfile import NamedTemporaryFile
 
+import yara
 from common_helper_files import get_dirs_in_dir, get_files_in_dir
-from common_helper_process import execute_shell_command
 
 from helperFunctions.fileSystem import get_src_dir
 
@@ -44,12 +43,19 @@ def _get_plugin_name(plugin_path):
     return plugin_path.split('/')[-2]
 
 
+def compile_signature_file(source_path, target_path):
+    '''
+    Signatures are compiled with yara-python (instead of yarac) so that the compiled rules are always compatible
+    with the yara version used by the analysis plugins to load them.
+    '''
+    yara.compile(filepath=source_path, externals={'test_flag': False}).save(target_path)
+
+
 def _create_compiled_signature_file(directory, tmp_file):
     target_path = os.path.join(SIGNATURE_DIR, '{}.yc'.format(_get_plugin_name(directory)))
     try:
-        command = 'yarac -d test_flag=false {} {}'.format(tmp_file.name, target_path)
-        execute_shell_command(command, check=True)
-    except CalledProcessError:
+        compile_signature_file(tmp_file.name, target_path)
+    except yara.Error:
         print('[ERROR] Creation of {} failed !!'.format(os.path.split(target_path)[0]))
 
 
@@ -0,0 +1,323 @@
+'''
+Pools of running ("warm") docker containers.
+
+`run_docker_container` starts a new container for every job, which takes from hundreds of milliseconds up to seconds
+and is paid for every analyzed file (even for tiny scripts). A `ContainerPool` instead keeps up to `size` containers of
+an image running (with an entrypoint that does nothing) and runs each job with ``docker exec`` (the entrypoint of the
+image followed by the arguments of the job) in a fresh working directory. The working directories are subdirectories
+of a host directory that is mounted into all containers of the pool and the input files of a job are copied to its
+working directory. A container is replaced after `max_jobs` jobs and whenever a job fails or times out.
+
+The bookkeeping of idle and used containers lives in a manager process, so that a pool created before the analysis
+processes are started is shared by all of them. Containers used by processes that died in the middle of a job (e.g.
+when they were terminated after an analysis timeout) are stopped and replaced.
+'''
+import logging
+import os
+import shlex
+import shutil
+from multiprocessing.managers import BaseManager
+from pathlib import Path, PurePosixPath
+from subprocess import CompletedProcess
+from tempfile import gettempdir, mkdtemp
+from threading import Condition, Lock, Thread
+from typing import Dict, List, Optional, Tuple, Union
+from uuid import uuid4
+
+import docker
+import psutil
+from docker.errors import APIError, DockerException, ImageNotFound
+from docker.types import Mount
+from requests.exceptions import ReadTimeout
+
+KEEP_ALIVE_COMMAND = ['tail', '-f', '/dev/null']
+CONTAINER_JOB_DIR = '/fact-jobs'
+DEFAULT_MAX_JOBS = 100
+OWNER_CHECK_INTERVAL = 1  # seconds; how often waiting processes check for containers of dead processes
+POOL_LABEL = 'fact-container-pool'
+
+
+class DockerBackend:
+    '''
+    Runs the containers of a pool with the local docker daemon.
+    '''
+
+    def __init__(self):
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def client(self) -> docker.DockerClient:
+        if self._client_pid != os.getpid():  # connections must not be shared with forked processes
+            # no client side timeout: the timeout of a job is handled by the pool
+            self._client = docker.client.from_env(timeout=None)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def start(self, image: str, **kwargs) -> str:
+        container = self.client.containers.run(image, entrypoint=KEEP_ALIVE_COMMAND, detach=True, auto_remove=True, **kwargs)
+        return container.id
+
+    def get_entrypoint(self, image: str) -> List[str]:
+        entrypoint = self.client.images.get(image).attrs['Config'].get('Entrypoint')
+        return shlex.split(entrypoint) if isinstance(entrypoint, str) else list(entrypoint or [])
+
+    def exec(self, container_id: str, command: List[str], workdir: str, combine_stderr_stdout: bool) -> Tuple[int, str, Optional[str]]:
+        exec_id = self.client.api.exec_create(container_id, command, workdir=workdir)['Id']
+        output = self.client.api.exec_start(exec_id, demux=not combine_stderr_stdout)
+        exit_code = self.client.api.exec_inspect(exec_id)['ExitCode']
+        if combine_stderr_stdout:
+            return exit_code, output.decode(), None
+        stdout, stderr = output
+        return exit_code, (stdout or b'').decode(), (stderr or b'').decode()
+
+    def stop(self, container_id: str):
+        try:
+            self.client.api.remove_container(container_id, force=True)
+        except DockerException as error:  # e.g. already removed because the keep-alive command exited
+            logging.debug(f'could not remove container {container_id}: {error}')
+
+
+class _ContainerPoolState:
+    def __init__(self, size: int):
+        self._condition = Condition()
+        self._size = size
+        self._idle = []  # type: List[Tuple[str, int]]  # container ID and number of finished jobs
+        self._leases = {}  # type: Dict[int, Tuple[int, Optional[str]]]  # PID of the user and container ID
+        self._next_lease = 0
+
+    def acquire(self, owner: int) -> Tuple[int, Optional[str], int, List[str]]:
+        '''
+        Wait for an idle container or a free slot for a new container.
+
+        :param owner: The PID of the process that uses the container.
+        :return: The lease, the container ID (`None` if the caller has to start a new container), the number of jobs
+            that were run in the container and the IDs of containers of dead processes (to be stopped by the caller).
+        '''
+        with self._condition:
+            orphans = self._reclaim_leases_of_dead_owners()
+            while not self._idle and len(self._leases) >= self._size:
+                self._condition.wait(OWNER_CHECK_INTERVAL)
+                orphans.extend(self._reclaim_leases_of_dead_owners())
+            container_id, job_count = self._idle.pop() if self._idle else (None, 0)
+            lease = self._next_lease
+            self._next_lease += 1
+            self._leases[lease] = (owner, container_id)
+            return lease, container_id, job_count, orphans
+
+    def set_container(self, lease: int, container_id: str):
+        with self._condition:
+            if lease in self._leases:
+                self._leases[lease] = (self._leases[lease][0], container_id)
+
+    def release(self, lease: int, job_count: Optional[int]):
+        '''
+        :param job_count: The number of jobs that were run in the container or `None` if it was stopped.
+        '''
+        with self._condition:
+            _, container_id = self._leases.pop(lease, (None, None))
+            if container_id is not None and job_count is not None:
+                self._idle.append((container_id, job_count))
+            self._condition.notify()
+
+    def drain(self) -> List[str]:
+        with self._condition:
+            containers = [container_id for container_id, _ in self._idle]
+            containers.extend(container_id for _, container_id in self._leases.values() if container_id is not None)
+            self._idle.clear()
+            self._leases.clear()
+            self._condition.notify_all()
+            return containers
+
+    def _reclaim_leases_of_dead_owners(self) -> List[str]:
+        dead_leases = [lease for lease, (owner, _) in self._leases.items() if not psutil.pid_exists(owner)]
+        containers = [self._leases.pop(lease)[1] for lease in dead_leases]
+        return [container_id for container_id in containers if container_id is not None]
+
+
+class _PoolManager(BaseManager):
+    pass
+
+
+_PoolManager.register('ContainerPoolState', _ContainerPoolState)
+
+_MANAGER = None
+_MANAGER_LOCK = Lock()
+
+
+def _get_manager() -> _PoolManager:
+    global _MANAGER  # pylint: disable=global-statement
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            _MANAGER = _PoolManager()
+            _MANAGER.start()  # pylint: disable=consider-using-with
+        return _MANAGER
+
+
+class ContainerPool:
+    '''
+    Pool of up to `size` running containers of a docker image (see module documentation). Like
+    ``multiprocessing.Queue``, it must be created before the processes using it are started.
+
+    :param image: The name of the docker image.
+    :param size: The maximum number of containers (and of jobs running at the same time).
+    :param max_jobs: The number of jobs after which a container is replaced.
+    :param base_dir: The host directory in which the working directories of the jobs are created (must be accessible
+        by the docker daemon, e.g. docker-mount-base-dir).
+    :param backend: The backend that runs the containers (`DockerBackend` by default).
+    :param container_kwargs: Additional keyword arguments that are passed to `docker.containers.run` when a container
+        is started (e.g. mounts that are needed by all jobs).
+    '''
+
+    def __init__(self, image: str, size: int = 1, max_jobs: int = DEFAULT_MAX_JOBS, base_dir: Optional[str] = None,  # pylint: disable=too-many-arguments
+                 backend: Optional[DockerBackend] = None, **container_kwargs):
+        self.image = image
+        self.max_jobs = max_jobs
+        self.host_dir = Path(base_dir or gettempdir()) / f'fact-container-pool-{uuid4().hex}'
+        self._backend = backend if backend is not None else DockerBackend()
+        self._container_kwargs = container_kwargs
+        self._container_kwargs['mounts'] = [*container_kwargs.get('mounts', []), Mount(CONTAINER_JOB_DIR, str(self.host_dir), type='bind')]
+        self._container_kwargs.setdefault('labels', {POOL_LABEL: image})
+        self._entrypoint = None  # type: Optional[List[str]]
+        self._state = _get_manager().ContainerPoolState(size)  # pylint: disable=no-member
+
+    def run(self, command: Union[str, List[str]], input_files: Optional[Dict[str, str]] = None, timeout: int = 300,  # pylint: disable=too-many-arguments
+            combine_stderr_stdout: bool = False, logging_label: str = 'Docker') -> CompletedProcess:
+        '''
+        Run a job in a container of the pool. Opposed to `run_docker_container`, the command is executed in a running
+        container with a fresh working directory as current directory.
+
+        :param command: The arguments that are passed to the entrypoint of the image.
+        :param input_files: The files that are copied to the working directory (relative path in the working
+            directory and path of the file on the host).
+        :param timeout: Timeout after which the execution is canceled
+        :param combine_stderr_stdout: Whether to combine stderr and stdout or not
+        :param logging_label: Label used for logging
+
+        :return: A subprocess.CompletedProcess instance for the command ran in the container.
+
+        :raises ValueError: If a path in `input_files` is not inside the working directory
+        :raises docker.errors.ImageNotFound: If the docker image was not found
+        :raises requests.exceptions.ReadTimeout: If the timeout was reached
+        :raises docker.errors.APIError: If the communication with docker fails
+        '''
+        if isinstance(command, str):
+            command = shlex.split(command)
+        job_dir = self._create_job_dir(input_files or {})
+        try:
+            return self._run_job(command, job_dir, timeout, combine_stderr_stdout, logging_label)
+        finally:
+            shutil.rmtree(str(job_dir), ignore_errors=True)
+
+    def shutdown(self):
+        '''
+        Stop all containers of the pool and remove the working directories.
+        '''
+        for container_id in self._state.drain():
+            self._backend.stop(container_id)
+        shutil.rmtree(str(self.host_dir), ignore_errors=True)
+
+    def _create_job_dir(self, input_files: Dict[str, str]) -> Path:
+        for path in input_files:
+            if PurePosixPath(path).is_absolute() or '..' in PurePosixPath(path).parts:
+                raise ValueError(f'input file {path} is not inside the working directory')
+        self.host_dir.mkdir(parents=True, exist_ok=True)
+        self.host_dir.chmod(0o755)
+        job_dir = Path(mkdtemp(dir=str(self.host_dir)))
+        job_dir.chmod(0o755)
+        for path, host_path in input_files.items():
+            (job_dir / path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(str(host_path), str(job_dir / path))
+        return job_dir
+
+    def _run_job(self, command: List[str], job_dir: Path, timeout: int, combine_stderr_stdout: bool, logging_label: str) -> CompletedProcess:
+        lease, container_id, job_count = self._acquire_container(logging_label)
+        command = self._entrypoint + command
+        job_count += 1
+        try:
+            exit_code, stdout, stderr = self._exec(container_id, command, f'{CONTAINER_JOB_DIR}/{job_dir.name}', timeout, combine_stderr_stdout)
+        except ReadTimeout:
+            logging.warning(f'[{logging_label}]: timeout while processing')
+            self._discard_container(lease, container_id)
+            raise
+        except APIError:
+            logging.warning(f'[{logging_label}]: encountered docker error while processing')
+            self._discard_container(lease, container_id)
+            raise
+        except Exception:
+            self._discard_container(lease, container_id)
+            raise
+
+        if job_count >= self.max_jobs:
+            self._discard_container(lease, container_id)
+        else:
+            self._state.release(lease, job_count)
+        return CompletedProcess(args=command, returncode=exit_code, stdout=stdout, stderr=stderr)
+
+    def _acquire_container(self, logging_label: str) -> Tuple[int, str, int]:
+        lease, container_id, job_count, orphans = self._state.acquire(os.getpid())
+        for orphan in orphans:
+            self._backend.stop(orphan)
+        try:
+            if container_id is None:
+                container_id = self._backend.start(self.image, **self._container_kwargs)
+                self._state.set_container(lease, container_id)
+            if self._entrypoint is None:
+                self._entrypoint = self._backend.get_entrypoint(self.image)
+        except (ImageNotFound, APIError):
+            logging.warning(f'[{logging_label}]: encountered docker error while processing')
+            self._discard_container(lease, container_id)
+            raise
+        except Exception:
+            self._discard_container(lease, container_id)
+            raise
+        return lease, container_id, job_count
+
+    def _exec(self, container_id: str, command: List[str], workdir: str, timeout: int, combine_stderr_stdout: bool) -> Tuple[int, str, Optional[str]]:
+        result = {}
+
+        def _exec_in_thread():
+            try:
+                result['output'] = self._backend.exec(container_id, command, workdir, combine_stderr_stdout)
+            except Exception as error:  # pylint: disable=broad-except
+                result['error'] = error
+
+        # the exec is canceled by stopping the container, which also ends the thread
+        thread = Thread(target=_exec_in_thread, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            raise ReadTimeout(f'job in container {container_id} timed out after {timeout} seconds')
+        if 'error' in result:
+            raise result['error']
+        return result['output']
+
+    def _discard_container(self, lease: int, container_id: Optional[str]):
+        if container_id is not None:
+            self._backend.stop(container_id)
+        self._state.release(lease, None)
+
+
+_POOLS = {}  # type: Dict[str, ContainerPool]
+_POOLS_LOCK = Lock()
+
+
+def get_container_pool(image: str, **kwargs) -> ContainerPool:
+    '''
+    Get the container pool of a docker image or create it. To be shared by the analysis processes of a plugin, the
+    pool must be created before they are started (e.g. in the constructor of the plugin).
+
+    :param image: The name of the docker image.
+    :param kwargs: Keyword arguments of `ContainerPool` (only used if the pool is created).
+    '''
+    with _POOLS_LOCK:
+        if image not in _POOLS:
+            _POOLS[image] = ContainerPool(image, **kwargs)
+        return _POOLS[image]
+
+
+def shutdown_container_pool(image: str):
+    with _POOLS_LOCK:
+        pool = _POOLS.pop(image, None)
+    if pool is not None:
+        pool.shutdown()
@@ -8,6 +8,7 @@ DatabaseInterface = TypeVar('DatabaseInterface')
 class ConnectTo(Generic[DatabaseInterface]):
     '''
     Open a database connection using the interface passed to the constructor. Intended to be used as a context manager.
+    Mongo interfaces use a shared client (see `storage.mongo_interface.MongoClientPool`), so this is cheap.
 
     :param connected_interface: A database interface from the `storage` module (e.g. `FrontEndDbInterface`)
     :param config: A FACT configuration.
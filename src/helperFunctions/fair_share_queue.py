@@ -0,0 +1,202 @@
+'''
+A multiprocessing queue that is fair between firmware submissions.
+
+Items are kept in one sub-queue per root firmware and the sub-queues are served round-robin, so the files of a small
+firmware do not have to wait until all files of a large firmware submitted earlier were processed. Items flagged as
+high priority (``temporary_data['high_priority']``, e.g. single file updates requested by a user) are put into a
+separate lane which is always served first.
+
+Like with ``multiprocessing.Queue``, items are pickled once by the producer and read from a pipe by the consumers.
+The sub-queues live in the process that created the queue: items put by other processes are sent there first and a
+dispatcher thread passes the next item into the pipe whenever a consumer asks for one, so apart from the item that is
+currently being read, the order is not fixed before the item is taken. Only the item count is shared between the
+processes. See ``test/benchmark/benchmark_fair_share_queue.py`` for a comparison with ``multiprocessing.Queue``.
+'''
+import os
+import pickle
+import weakref
+from collections import OrderedDict, deque
+from multiprocessing import Lock, Pipe, Semaphore, Value
+from queue import Empty
+from threading import Condition, Thread
+from time import time
+from typing import Any, Dict, Optional
+
+HIGH_PRIORITY = 'high_priority'
+DEFAULT_KEY = None  # sub-queue of items without a root firmware
+NOWAIT_TIMEOUT = 0.1  # time a non-blocking get waits for the dispatcher if the queue is not empty
+
+
+def get_queue_key(item: Any) -> Optional[str]:
+    get_root_uid = getattr(item, 'get_root_uid', None)
+    return get_root_uid() if get_root_uid is not None else DEFAULT_KEY
+
+
+def is_high_priority(item: Any) -> bool:
+    return bool(getattr(item, 'temporary_data', {}).get(HIGH_PRIORITY, False))
+
+
+class _FairShareQueueState:
+    def __init__(self):
+        self._condition = Condition()
+        self._high_priority = deque()
+        self._queues = OrderedDict()  # the sub-queue which is served next is the first one
+        self._closed = False
+
+    def put(self, item: bytes, key: Optional[str], high_priority: bool):
+        with self._condition:
+            if high_priority:
+                self._high_priority.append(item)
+            else:
+                self._queues.setdefault(key, deque()).append(item)
+            self._condition.notify()
+
+    def wait_for_item(self) -> bool:
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or self._high_priority or self._queues)
+            return not self._closed
+
+    def pop(self) -> Optional[bytes]:
+        with self._condition:
+            if self._closed:
+                return None
+            if self._high_priority:
+                return self._high_priority.popleft()
+            key, queue = next(iter(self._queues.items()))
+            item = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def get_depth_per_key(self) -> Dict[Optional[str], int]:
+        with self._condition:
+            return {key: len(queue) for key, queue in self._queues.items()}
+
+    def get_high_priority_depth(self) -> int:
+        with self._condition:
+            return len(self._high_priority)
+
+
+def _receive_items(connection, state: _FairShareQueueState):
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        state.put(*message)
+
+
+def _dispatch_items(state: _FairShareQueueState, requests: Semaphore, connection):
+    while state.wait_for_item():
+        requests.acquire()  # wait until a consumer asks for an item
+        item = state.pop()
+        if item is None:
+            return
+        connection.send_bytes(item)
+
+
+def _close_queue(owner_pid: int, state: _FairShareQueueState, requests: Semaphore, input_lock: Lock, connection):
+    if os.getpid() != owner_pid:
+        return
+    state.close()
+    requests.release()  # wake up the dispatcher if it is waiting for a consumer
+    with input_lock:
+        connection.send(None)
+
+
+class FairShareQueue:
+    '''
+    Drop-in replacement for ``multiprocessing.Queue`` (as far as it is used by the schedulers) that serves the items of
+    different firmware submissions round-robin and items flagged as high priority first.
+    Like ``multiprocessing.Queue``, it must be created before the processes using it are started.
+    '''
+
+    def __init__(self):
+        self._owner_pid = os.getpid()
+        self._size = Value('i', 0)
+        self._requests = Semaphore(0)
+        self._reader, self._writer = Pipe(duplex=False)
+        self._read_lock = Lock()
+        self._input_reader, self._input_writer = Pipe(duplex=False)
+        self._input_lock = Lock()
+        self._state = _FairShareQueueState()
+        Thread(target=_receive_items, args=(self._input_reader, self._state), daemon=True).start()
+        Thread(target=_dispatch_items, args=(self._state, self._requests, self._writer), daemon=True).start()
+        self._close = weakref.finalize(
+            self, _close_queue, self._owner_pid, self._state, self._requests, self._input_lock, self._input_writer
+        )
+
+    def __getstate__(self):
+        # the sub-queues only exist in the process that created the queue
+        return {**self.__dict__, '_state': None, '_close': None}
+
+    def put(self, item: Any):
+        message = (pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL), get_queue_key(item), is_high_priority(item))
+        with self._size.get_lock():
+            self._size.value += 1
+        if self._is_owner():
+            self._state.put(*message)
+        else:
+            with self._input_lock:
+                self._input_writer.send(message)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        if not block:
+            if self.empty():
+                raise Empty
+            timeout = NOWAIT_TIMEOUT
+        deadline = None if timeout is None else time() + timeout
+        if not self._read_lock.acquire(timeout=timeout):
+            raise Empty
+        try:
+            self._requests.release()
+            if not self._reader.poll(None if deadline is None else max(deadline - time(), 0)) and self._requests.acquire(block=False):
+                raise Empty  # the request was withdrawn before the dispatcher took it
+            item = self._reader.recv_bytes()
+        finally:
+            self._read_lock.release()
+        with self._size.get_lock():
+            self._size.value -= 1
+        return pickle.loads(item)
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return self._size.value
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def get_depth_per_firmware(self) -> Dict[Optional[str], int]:
+        '''
+        Get the number of queued items of each firmware (not including the items in the high priority lane).
+        Only available in the process that created the queue.
+
+        :return: A dictionary of root UIDs and the number of queued items.
+        '''
+        return self._get_state().get_depth_per_key()
+
+    def get_high_priority_depth(self) -> int:
+        return self._get_state().get_high_priority_depth()
+
+    def close(self):
+        if self._is_owner():
+            self._close()
+
+    def _is_owner(self) -> bool:
+        return os.getpid() == self._owner_pid
+
+    def _get_state(self) -> _FairShareQueueState:
+        if not self._is_owner():
+            raise RuntimeError('the queue depth is only available in the process that created the queue')
+        return self._state
@@ -1,6 +1,16 @@
 import logging
+import os
+import shutil
 from contextlib import suppress
 from pathlib import Path
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:  # not available on all platforms
+    fcntl = None
+
+FICLONE = 0x40049409  # see linux/fs.h
 
 
 def get_src_dir() -> str:
@@ -52,3 +62,50 @@ def file_is_empty(file_path: Path) -> bool:
         return False
     except Exception as exception:
         logging.error('Unexpected Exception: {} {}'.format(type(exception), str(exception)))
+
+
+def link_or_copy_file(source: Union[str, Path], destination: Union[str, Path], move: bool = False, hardlink: bool = True) -> None:
+    '''
+    Create a file at `destination` with the content of `source` without copying the content if possible: if both paths
+    are on the same filesystem, `source` is moved (if `move` is set), reflinked (a copy-on-write clone, if supported by
+    the filesystem) or hardlinked (if `hardlink` is set). Otherwise, the content is copied. Symlinks are resolved and
+    never moved. Existing files at `destination` are not overwritten.
+
+    :param source: The path of the source file.
+    :param destination: The path of the new file.
+    :param move: Whether the source file may be moved.
+    :param hardlink: Whether `destination` may be a hardlink (i.e. changes of `destination` would change `source`).
+    '''
+    source, destination = Path(source), Path(destination)
+    if destination.exists():
+        return
+    if source.is_symlink():
+        source, move = source.resolve(), False
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if move:
+        with suppress(OSError):
+            os.rename(source, destination)
+            return
+    else:
+        try:
+            if _reflink(source, destination):
+                return
+            if hardlink:
+                os.link(source, destination)
+                return
+        except FileExistsError:  # stored concurrently
+            return
+        except OSError:  # e.g. different filesystems
+            pass
+    shutil.copyfile(source, destination)
+
+
+def _reflink(source: Path, destination: Path) -> bool:
+    if fcntl is None:
+        return False
+    with source.open('rb') as source_fp, destination.open('xb') as destination_fp:
+        with suppress(OSError):  # not supported by the filesystem
+            fcntl.ioctl(destination_fp.fileno(), FICLONE, source_fp.fileno())
+            return True
+    destination.unlink()
+    return False
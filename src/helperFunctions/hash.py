@@ -2,6 +2,7 @@ import contextlib
 import logging
 import sys
 from hashlib import md5, new
+from mmap import mmap
 
 import lief
 import ssdeep
@@ -10,6 +11,7 @@ import tlsh
 from helperFunctions.data_conversion import make_bytes
 
 ELF_MIME_TYPES = ['application/x-executable', 'application/x-object', 'application/x-sharedlib']
+CHUNK_SIZE = 1024 ** 2
 
 
 def get_hash(hash_function, binary):
@@ -17,16 +19,31 @@ def get_hash(hash_function, binary):
     Hashes binary with hash_function.
 
     :param hash_function: The hash function to use. See hashlib for more
-    :param binary: The data to hash, either as string or array of Integers
+    :param binary: The data to hash, either as string, array of Integers or memory map (which is not copied)
     :return: The hash as hexstring
     '''
-    binary = make_bytes(binary)
     raw_hash = new(hash_function)
-    raw_hash.update(binary)
+    raw_hash.update(binary if isinstance(binary, mmap) else make_bytes(binary))
     string_hash = raw_hash.hexdigest()
     return string_hash
 
 
+def get_hash_of_file(hash_function: str, file_path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    '''
+    Hashes the content of a file with hash_function without reading the whole file into memory.
+
+    :param hash_function: The hash function to use. See hashlib for more
+    :param file_path: The path of the file
+    :param chunk_size: The number of bytes that are read at once
+    :return: The hash as hexstring
+    '''
+    raw_hash = new(hash_function)
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            raw_hash.update(chunk)
+    return raw_hash.hexdigest()
+
+
 def get_sha256(code):
     return get_hash('sha256', code)
 
@@ -36,9 +53,9 @@ def get_md5(code):
 
 
 def get_ssdeep(code):
-    binary = make_bytes(code)
     raw_hash = ssdeep.Hash()
-    raw_hash.update(binary)
+    for chunk in _iterate_chunks(code):
+        raw_hash.update(chunk)
     return raw_hash.digest()
 
 
@@ -47,8 +64,28 @@ def get_ssdeep_comparison(first, second):
 
 
 def get_tlsh(code):
-    tlsh_hash = tlsh.hash(make_bytes(code))  # pylint: disable=c-extension-no-member
-    return tlsh_hash if tlsh_hash != 'TNULL' else ''
+    if not isinstance(code, mmap):
+        tlsh_hash = tlsh.hash(make_bytes(code))  # pylint: disable=c-extension-no-member
+        return tlsh_hash if tlsh_hash != 'TNULL' else ''
+    tlsh_hash = tlsh.Tlsh()  # pylint: disable=c-extension-no-member
+    for chunk in _iterate_chunks(code):
+        tlsh_hash.update(chunk)
+    try:
+        tlsh_hash.final()
+    except ValueError:  # not enough data or variance
+        return ''
+    return tlsh_hash.hexdigest()
+
+
+def _iterate_chunks(code, chunk_size: int = CHUNK_SIZE):
+    '''
+    Iterate over a memory map in chunks (to avoid copying it as a whole). Other data is converted to bytes at once.
+    '''
+    if not isinstance(code, mmap):
+        yield make_bytes(code)
+        return
+    for offset in range(0, len(code), chunk_size):
+        yield code[offset:offset + chunk_size]
 
 
 def get_tlsh_comparison(first, second):
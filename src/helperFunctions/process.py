@@ -5,7 +5,7 @@ from configparser import ConfigParser
 from contextlib import suppress
 from multiprocessing import Pipe, Process
 from signal import SIGKILL, SIGTERM
-from typing import Callable, List, Optional, Tuple
+from typing import Any, Callable, Iterator, List, Optional, Tuple
 
 import psutil
 
@@ -69,6 +69,136 @@ class ExceptionSafeProcess(Process):
         return self._exception
 
 
+class WorkerTaskException(Exception):
+    '''
+    Raised by :class:`PersistentWorkerProcess` if the executed function raised an exception. The stack trace of the
+    original exception is stored in ``stack_trace``.
+    '''
+    def __init__(self, *args, stack_trace: str = ''):
+        self.stack_trace = stack_trace
+        super().__init__(*args)
+
+
+class PersistentWorkerProcess:
+    '''
+    A long-lived (pre-forked) process that executes ``function`` for every task it receives over a pipe. Opposed to
+    starting a new process per task, the process is only replaced if a task exceeds its timeout. Results are sent
+    back over the same pipe, so no ``multiprocessing.Manager`` is needed.
+
+    :param function: The function that is executed for each task. It gets the task as only argument.
+    :param name: The name of the process (used for logging).
+    '''
+    def __init__(self, function: Callable[[Any], Any], name: str = 'Persistent-Worker'):
+        self.function = function
+        self.name = name
+        self.process = None
+        self._connection = None
+        self.start()
+
+    def start(self) -> None:
+        '''
+        Start the worker process (a running process is not stopped, use :func:`restart` for that).
+        '''
+        self._connection, child_connection = Pipe()
+        self.process = Process(target=self._task_loop, args=(child_connection,), name=self.name)
+        self.process.start()
+        child_connection.close()
+
+    def restart(self) -> None:
+        '''
+        Terminate the worker process (and all of its children) and start a new one.
+        '''
+        self._kill()
+        self.start()
+
+    def run_task(self, task: Any, timeout: Optional[float] = None) -> Any:
+        '''
+        Execute ``function`` on ``task`` inside the worker process and return the result. If the task does not finish
+        in time, the worker is terminated and a fresh worker is started for subsequent tasks.
+
+        :param task: The task that is passed to the function (must be picklable).
+        :param timeout: The timeout in seconds (``None`` means no timeout).
+        :return: The return value of the function.
+        :raises TimeoutError: If the task did not finish in time.
+        :raises WorkerTaskException: If the function raised an exception.
+        '''
+        self._send_task(task, iterate=False)
+        return self._receive_result(timeout)[1]
+
+    def iterate_results(self, task: Any, timeout: Optional[float] = None) -> Iterator[Any]:
+        '''
+        Like :func:`run_task`, but ``function`` returns an iterable whose items are sent back as soon as they are
+        produced. The timeout applies to each item separately. The results must be consumed completely, unless an
+        exception is raised.
+
+        :param task: The task that is passed to the function (must be picklable).
+        :param timeout: The timeout in seconds for each item (``None`` means no timeout).
+        :return: An iterator of the items of the return value of the function.
+        :raises TimeoutError: If an item was not produced in time.
+        :raises WorkerTaskException: If the function raised an exception.
+        '''
+        self._send_task(task, iterate=True)
+        while True:
+            successful, payload = self._receive_result(timeout)
+            if successful is None:  # all items were sent
+                return
+            yield payload
+
+    def _send_task(self, task: Any, iterate: bool):
+        if not self.process.is_alive():
+            self.restart()
+        self._connection.send((iterate, task))
+
+    def _receive_result(self, timeout: Optional[float]) -> Tuple[Optional[bool], Any]:
+        if not self._connection.poll(timeout):
+            self.restart()
+            raise TimeoutError('{}: task timed out after {} seconds'.format(self.name, timeout))
+        try:
+            successful, payload = self._connection.recv()
+        except EOFError as error:  # worker died during execution (e.g. killed by the OOM killer)
+            self.restart()
+            raise WorkerTaskException('{}: worker process died unexpectedly'.format(self.name)) from error
+        if successful is False:
+            raise WorkerTaskException(payload[0], stack_trace=payload[1])
+        return successful, payload
+
+    def shutdown(self, timeout: float = 5) -> None:
+        '''
+        Stop the worker process. The process is terminated if it does not stop within ``timeout`` seconds.
+
+        :param timeout: The time in seconds the process has to stop gracefully.
+        '''
+        with suppress(OSError, BrokenPipeError):
+            self._connection.send(None)
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self._kill()
+        self._connection.close()
+
+    def _kill(self):
+        terminate_process_and_children(self.process)
+        self._connection.close()
+
+    def _task_loop(self, connection):
+        while True:
+            try:
+                task = connection.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            iterate, task = task
+            try:
+                if iterate:
+                    for item in self.function(task):
+                        connection.send((True, item))
+                    connection.send((None, None))
+                else:
+                    connection.send((True, self.function(task)))
+            except Exception as exception:  # pylint: disable=broad-except
+                connection.send((False, (str(exception), traceback.format_exc())))
+
+
 def terminate_process_and_children(process: Process) -> None:
     '''
     Terminate a process and all of its child processes.
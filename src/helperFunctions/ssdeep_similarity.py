@@ -0,0 +1,58 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+import ssdeep
+
+ROLLING_WINDOW = 7  # ssdeep scores hashes without a common substring of this length as 0
+
+
+def find_similar_hashes(hashes_one: Dict[str, str], hashes_two: Dict[str, str], threshold: int) -> List[Tuple[str, str, int]]:
+    '''
+    Compare the ssdeep hashes of `hashes_one` with those of `hashes_two` and return all pairs (uid one, uid two,
+    similarity) with a similarity greater than `threshold`.
+
+    ssdeep only compares hashes with the same or a doubled block size and scores them 0 if the compared chunks do not
+    have a common substring of length 7. Therefore, only pairs that share such a substring (for the same effective
+    block size) or that are identical are compared.
+    '''
+    if threshold < 0:  # all pairs match, pruning would be incorrect
+        return [(uid_one, uid_two, ssdeep.compare(hash_one, hash_two)) for uid_one, hash_one in hashes_one.items() for uid_two, hash_two in hashes_two.items()]
+    n_gram_index = defaultdict(set)
+    identical_hashes = defaultdict(set)
+    for uid, ssdeep_hash in hashes_two.items():
+        identical_hashes[ssdeep_hash].add(uid)
+        for key in _get_n_grams(ssdeep_hash):
+            n_gram_index[key].add(uid)
+
+    result = []
+    for uid_one, hash_one in hashes_one.items():
+        candidates = set(identical_hashes.get(hash_one, ()))
+        candidates.update(*(n_gram_index.get(key, ()) for key in _get_n_grams(hash_one)))
+        for uid_two in candidates:
+            similarity = ssdeep.compare(hash_one, hashes_two[uid_two])
+            if similarity > threshold:
+                result.append((uid_one, uid_two, similarity))
+    return result
+
+
+def _get_n_grams(ssdeep_hash: str) -> Set[Tuple[int, str]]:
+    '''
+    Get the substrings of length `ROLLING_WINDOW` of both chunks of an ssdeep hash together with the block size of the
+    chunk (which is doubled for the second chunk). Like ssdeep, sequences of more than three identical characters are
+    shortened to three characters first.
+    '''
+    try:
+        block_size, chunk_one, chunk_two = ssdeep_hash.split(':', 2)
+        block_size = int(block_size)
+    except ValueError:
+        return set()
+    n_grams = set()
+    for effective_block_size, chunk in [(block_size, chunk_one), (block_size * 2, chunk_two.split(',')[0])]:
+        chunk = _eliminate_sequences(chunk)
+        n_grams.update((effective_block_size, chunk[index:index + ROLLING_WINDOW]) for index in range(len(chunk) - ROLLING_WINDOW + 1))
+    return n_grams
+
+
+def _eliminate_sequences(chunk: str) -> str:
+    return re.sub(r'(.)\1{3,}', r'\1\1\1', chunk)
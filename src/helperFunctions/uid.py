@@ -1,8 +1,9 @@
 import re
+from pathlib import Path
 from typing import AnyStr, List, Set, Union
 
 from helperFunctions.data_conversion import make_bytes
-from helperFunctions.hash import get_sha256
+from helperFunctions.hash import get_hash_of_file, get_sha256
 
 
 def create_uid(input_data: bytes) -> str:
@@ -17,6 +18,16 @@ def create_uid(input_data: bytes) -> str:
     return '{}_{}'.format(hash_value, size)
 
 
+def create_uid_from_file(file_path: str) -> str:
+    '''
+    generate a UID (unique identifier) SHA256_SIZE for the content of a file without reading it into memory at once
+
+    :param file_path: the path of the file
+    :return: a string containing the UID
+    '''
+    return '{}_{}'.format(get_hash_of_file('sha256', file_path), Path(file_path).stat().st_size)
+
+
 def is_uid(input_string: AnyStr) -> bool:
     '''
     Check if a string is a valid UID
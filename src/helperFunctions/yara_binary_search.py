@@ -1,17 +1,28 @@
+import logging
+import os
+from collections import OrderedDict
 from configparser import ConfigParser
+from hashlib import sha256
+from multiprocessing import get_context
 from os.path import basename
-from pathlib import Path
-from subprocess import CalledProcessError
-from tempfile import NamedTemporaryFile
-from typing import Dict, List, Optional, Tuple, Union
+from time import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import yara
-from common_helper_process import execute_shell_command
 
 from helperFunctions.database import ConnectTo
 from storage.db_interface_common import MongoInterfaceCommon
 from storage.fsorganizer import FSOrganizer
 
+BinarySearchResult = Dict[str, List[str]]
+ProgressCallback = Callable[[BinarySearchResult, int, int], None]
+
+CACHE_SIZE = 128
+PROGRESS_INTERVAL = 5  # seconds
+RESULT_CACHE = OrderedDict()  # (rule hash, firmware UID, MIME types) -> (hash of the list of scanned files, result)
+
+_worker_rules = None  # compiled rules of a scan worker process
+
 
 class YaraBinarySearchScanner:
     '''
@@ -19,6 +30,9 @@ class YaraBinarySearchScanner:
     either match a given set of patterns on all files in the database or focus only on files included in a single
     firmware.
 
+    The files are scanned in parallel with yara-python. Results are cached by rule and firmware: as long as the set
+    of files that would be scanned does not change, repeating a search returns the cached result.
+
     :param config: The FACT configuration.
     '''
 
@@ -26,76 +40,111 @@ class YaraBinarySearchScanner:
         self.matches = []
         self.config = config
         self.db_path = self.config['data_storage']['firmware_file_storage_directory']
+        self.processes = self.config.getint('ExpertSettings', 'binary_search_processes', fallback=os.cpu_count())
+        self.max_file_size = self.config.getint('ExpertSettings', 'binary_search_max_file_size', fallback=0)
 
-    def _execute_yara_search(self, rule_file_path: str, target_path: Optional[str] = None) -> str:
+    def get_binary_search_result(
+            self, task: Tuple[bytes, ...], progress_callback: Optional[ProgressCallback] = None
+    ) -> Union[BinarySearchResult, str]:
         '''
-        Scans the (whole) db directory with the provided rule file and returns the (raw) results.
-        Yara-python cannot be used, because it (currently) supports single-file scanning only.
+        Perform a yara search on the files in the database.
 
-        :param rule_file_path: The file path to the yara rule file.
-        :return: The output from the yara scan.
+        :param task: A tuple containing the yara_rules (byte string with the contents of the yara rule file),
+            optionally a firmware uid if only the contents of a single firmware are to be scanned and optionally a
+            list of MIME types to restrict the search to files of these types.
+        :param progress_callback: Is called with the partial result, the number of scanned files and the total number
+            of files periodically while the scan is running.
+        :return: dict of matching rules with lists of (unique) matched UIDs as values or an error message.
         '''
-        compiled_flag = '-C' if Path(rule_file_path).read_bytes().startswith(b'YARA') else ''
-        command = f'yara -r {compiled_flag} {rule_file_path} {target_path or self.db_path}'
-        return execute_shell_command(command)
-
-    def _execute_yara_search_for_single_firmware(self, rule_file_path: str, firmware_uid: str) -> str:
-        with ConnectTo(YaraBinarySearchScannerDbInterface, self.config) as connection:
-            file_paths = connection.get_file_paths_of_files_included_in_fo(firmware_uid)
-        result = (self._execute_yara_search(rule_file_path, path) for path in file_paths)
-        return '\n'.join(result)
+        yara_rules, firmware_uid, mime_types = (tuple(task) + (None, None))[:3]
+        try:
+            yara.compile(source=yara_rules.decode())
+        except yara.SyntaxError as yara_error:
+            return f'There seems to be an error in the rule file:\n{yara_error}'
+        file_paths = self._get_file_paths(firmware_uid, mime_types)
+        cache_key = (sha256(yara_rules).hexdigest(), firmware_uid, tuple(sorted(mime_types or [])))
+        file_paths_digest = _get_file_paths_digest(file_paths)
+        cached_entry = RESULT_CACHE.get(cache_key)
+        if cached_entry is not None and cached_entry[0] == file_paths_digest:
+            RESULT_CACHE.move_to_end(cache_key)
+            logging.debug('returning cached binary search result')
+            return cached_entry[1]
+        try:
+            results = self._scan_files(yara_rules, file_paths, progress_callback)
+        except yara.Error as yara_error:
+            return f'Error when calling YARA:\n{yara_error}'
+        self._eliminate_duplicates(results)
+        self._add_to_cache(cache_key, file_paths_digest, results)
+        return results
 
-    @staticmethod
-    def _parse_raw_result(raw_result: str) -> Dict[str, List[str]]:
-        '''
-        :param raw_result: raw yara scan result
-        :return: dict of matching rules with lists of matched UIDs as values
-        '''
+    def _get_file_paths(self, firmware_uid: Optional[str], mime_types: Optional[List[str]]) -> List[str]:
+        if firmware_uid is None and not mime_types:
+            file_paths = self._get_all_file_paths()
+        else:
+            with ConnectTo(YaraBinarySearchScannerDbInterface, self.config) as connection:
+                file_paths = connection.get_file_paths_of_files_included_in_fo(firmware_uid, mime_types)
+        return sorted(path for path in file_paths if self._is_scan_candidate(path))
+
+    def _get_all_file_paths(self) -> Iterable[str]:
+        for directory, _, files in os.walk(self.db_path):
+            for file_name in files:
+                yield os.path.join(directory, file_name)
+
+    def _is_scan_candidate(self, file_path: str) -> bool:
+        try:
+            size = os.stat(file_path).st_size
+        except OSError:
+            return False
+        return self.max_file_size <= 0 or size <= self.max_file_size
+
+    def _scan_files(self, yara_rules: bytes, file_paths: List[str], progress_callback: Optional[ProgressCallback]) -> BinarySearchResult:
         results = {}
-        for line in raw_result.split('\n'):
-            if line and 'warning' not in line:
-                rule, match = line.split(' ')
-                results.setdefault(rule, []).append(basename(match))
+        if not file_paths:
+            return results
+        processes = max(1, min(self.processes, len(file_paths)))
+        last_progress_update = time()
+        # the binary search runs in a multi-threaded process: use spawn instead of fork to start the workers
+        with get_context('spawn').Pool(processes, initializer=_initialize_scan_worker, initargs=(yara_rules,)) as pool:
+            scan_results = pool.imap_unordered(_scan_file, file_paths, chunksize=max(1, min(64, len(file_paths) // (processes * 4))))
+            for index, (file_path, matching_rules) in enumerate(scan_results, start=1):
+                for rule in matching_rules:
+                    results.setdefault(rule, []).append(basename(file_path))
+                if progress_callback is not None and time() - last_progress_update > PROGRESS_INTERVAL:
+                    last_progress_update = time()
+                    progress_callback(results, index, len(file_paths))
         return results
 
+    @staticmethod
+    def _add_to_cache(cache_key: tuple, file_paths_digest: str, results: BinarySearchResult):
+        RESULT_CACHE[cache_key] = (file_paths_digest, results)
+        while len(RESULT_CACHE) > CACHE_SIZE:
+            RESULT_CACHE.popitem(last=False)
+
     @staticmethod
     def _eliminate_duplicates(result_dict: Dict[str, List[str]]):
         for key in result_dict:
             result_dict[key] = sorted(set(result_dict[key]))
 
-    def get_binary_search_result(self, task: Tuple[bytes, Optional[str]]) -> Union[Dict[str, List[str]], str]:
-        '''
-        Perform a yara search on the files in the database.
 
-        :param task: A tuple containing the yara_rules (byte string with the contents of the yara rule file) and
-            optionally a firmware uid if only the contents of a single firmware are to be scanned.
-        :return: dict of matching rules with lists of (unique) matched UIDs as values or an error message.
-        '''
-        with NamedTemporaryFile() as temp_rule_file:
-            yara_rules, firmware_uid = task
-            try:
-                self._prepare_temp_rule_file(temp_rule_file, yara_rules)
-                raw_result = self._get_raw_result(firmware_uid, temp_rule_file)
-                results = self._parse_raw_result(raw_result)
-                self._eliminate_duplicates(results)
-                return results
-            except yara.SyntaxError as yara_error:
-                return f'There seems to be an error in the rule file:\n{yara_error}'
-            except CalledProcessError as process_error:
-                return f'Error when calling YARA:\n{process_error.output.decode()}'
-
-    def _get_raw_result(self, firmware_uid: Optional[str], temp_rule_file: NamedTemporaryFile) -> str:
-        if firmware_uid is None:
-            raw_result = self._execute_yara_search(temp_rule_file.name)
-        else:
-            raw_result = self._execute_yara_search_for_single_firmware(temp_rule_file.name, firmware_uid)
-        return raw_result
+def _get_file_paths_digest(file_paths: List[str]) -> str:
+    # the files are stored by UID (i.e. content hash), so the scanned contents only change if the paths change
+    digest = sha256()
+    for path in file_paths:
+        digest.update(path.encode(errors='surrogateescape') + b'\0')
+    return digest.hexdigest()
 
-    @staticmethod
-    def _prepare_temp_rule_file(temp_rule_file: NamedTemporaryFile, yara_rules: bytes):
-        compiled_rules = yara.compile(source=yara_rules.decode())
-        compiled_rules.save(file=temp_rule_file)
-        temp_rule_file.flush()
+
+def _initialize_scan_worker(yara_rules: bytes):
+    global _worker_rules  # pylint: disable=global-statement
+    _worker_rules = yara.compile(source=yara_rules.decode())
+
+
+def _scan_file(file_path: str) -> Tuple[str, List[str]]:
+    try:
+        return file_path, [match.rule for match in _worker_rules.match(file_path)]
+    except yara.Error as error:
+        logging.warning(f'binary search: could not scan {file_path}: {error}')
+        return file_path, []
 
 
 def is_valid_yara_rule_file(yara_rules: Union[str, bytes]) -> bool:
@@ -128,9 +177,23 @@ class YaraBinarySearchScannerDbInterface(MongoInterfaceCommon):
 
     READ_ONLY = True
 
-    def get_file_paths_of_files_included_in_fo(self, fo_uid: str) -> List[str]:
+    def get_file_paths_of_files_included_in_fo(self, fo_uid: Optional[str], mime_types: Optional[List[str]] = None) -> List[str]:
+        '''
+        Get the file paths of all files included in a firmware (or all files in the database if `fo_uid` is `None`),
+        optionally restricted to files with the given MIME types.
+        '''
         fs_organizer = FSOrganizer(self.config)
+        uids = self.get_uids_of_all_included_files(fo_uid) if fo_uid is not None else None
+        if mime_types:
+            uids = self.get_uids_with_mime_types(mime_types, uids)
+        return [fs_organizer.generate_path_from_uid(uid) for uid in uids]
+
+    def get_uids_with_mime_types(self, mime_types: List[str], uids: Optional[Iterable[str]] = None) -> List[str]:
+        query = {'processed_analysis.file_type.mime': {'$in': mime_types}}
+        if uids is not None:
+            query['_id'] = {'$in': list(uids)}
         return [
-            fs_organizer.generate_path_from_uid(uid)
-            for uid in self.get_uids_of_all_included_files(fo_uid)
+            entry['_id']
+            for collection in [self.firmwares, self.file_objects]
+            for entry in collection.find(query, {'_id': 1})
         ]
@@ -6,8 +6,10 @@ from contextlib import suppress
 from pathlib import Path
 
 import requests
+import yara
 from common_helper_process import execute_shell_command_get_return_code
 
+from compile_yara_signatures import compile_signature_file
 from compile_yara_signatures import main as compile_signatures
 from helperFunctions.fileSystem import get_src_dir
 from helperFunctions.install import (
@@ -52,9 +54,10 @@ def main(skip_docker, distribution):
 
     # compiling yara signatures
     compile_signatures()
-    _, yarac_return = execute_shell_command_get_return_code('yarac -d test_flag=false ../test/unit/analysis/test.yara ../analysis/signatures/Yara_Base_Plugin.yc')
-    if yarac_return != 0:
-        raise InstallationError('Failed to compile yara test signatures')
+    try:
+        compile_signature_file('../test/unit/analysis/test.yara', '../analysis/signatures/Yara_Base_Plugin.yc')
+    except yara.Error as error:
+        raise InstallationError('Failed to compile yara test signatures') from error
 
     with OperateInDirectory('../../'):
         with suppress(FileNotFoundError):
@@ -1,16 +1,21 @@
 import logging
 import pickle
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Process, Value
 from pathlib import Path
-from time import sleep
-from typing import Callable, Optional, Tuple, Type
+from threading import BoundedSemaphore, Event, Thread
+from time import sleep, time
+from typing import Callable, Dict, List, Optional, Tuple, Type
 
 from common_helper_mongo.gridfs import overwrite_file
+from pymongo.errors import PyMongoError
 
 from helperFunctions.database import ConnectTo
 from helperFunctions.program_setup import get_log_file_for_component
 from helperFunctions.yara_binary_search import YaraBinarySearchScanner
-from intercom.common_mongo_binding import InterComListener, InterComListenerAndResponder, InterComMongoInterface
+from intercom.common_mongo_binding import (
+    PARTIAL_RESULT_SUFFIX, InterComListener, InterComListenerAndResponder, InterComMongoInterface
+)
 from storage.binary_service import BinaryService
 from storage.db_interface_common import MongoInterfaceCommon
 from storage.fsorganizer import FSOrganizer
@@ -19,8 +24,21 @@ from storage.fsorganizer import FSOrganizer
 class InterComBackEndBinding:
     '''
     Internal Communication Backend Binding
+
+    All listeners run in a single process with one thread per listener type. Instead of polling each task type at a
+    fixed interval, the listener threads are woken up when the frontend announces a new task (see
+    `InterComMongoInterface.put_task`). As a safeguard against lost notifications, all listeners also check for tasks
+    every `FALLBACK_POLL_INTERVAL` seconds. If the notifications are not available, the listeners are woken up every
+    `intercom_poll_delay` seconds until the notifications could be tailed again.
+    The functions that are called for received tasks run in a thread pool of `TASK_WORKERS` threads per listener. At
+    most `MAX_PENDING_TASKS` tasks are handed over per listener at once; further tasks stay in the database until then.
     '''
 
+    FALLBACK_POLL_INTERVAL = 30
+    MAX_NOTIFICATION_RETRY_DELAY = 60
+    TASK_WORKERS = 4
+    MAX_PENDING_TASKS = 16
+
     def __init__(self, config=None, analysis_service=None, compare_service=None, unpacking_service=None, testing=False):
         self.config = config
         self.analysis_service = analysis_service
@@ -30,23 +48,26 @@ class InterComBackEndBinding:
 
         self.stop_condition = Value('i', 0)
         self.process_list = []
+        self.task_statistics = {}
         if not testing:
             self.start_listeners()
         logging.info('InterCom started')
 
     def start_listeners(self):
         InterComBackEndAnalysisPlugInsPublisher(config=self.config, analysis_service=self.analysis_service)
-        self._start_listener(InterComBackEndAnalysisTask, self.unpacking_service.add_task)
-        self._start_listener(InterComBackEndReAnalyzeTask, self.unpacking_service.add_task)
-        self._start_listener(InterComBackEndCompareTask, self.compare_service.add_task)
-        self._start_listener(InterComBackEndRawDownloadTask)
-        self._start_listener(InterComBackEndTarRepackTask)
-        self._start_listener(InterComBackEndBinarySearchTask)
-        self._start_listener(InterComBackEndUpdateTask, self.analysis_service.update_analysis_of_object_and_children)
-        self._start_listener(InterComBackEndDeleteFile)
-        self._start_listener(InterComBackEndSingleFileTask, self.analysis_service.update_analysis_of_single_object)
-        self._start_listener(InterComBackEndPeekBinaryTask)
-        self._start_listener(InterComBackEndLogsTask)
+        self._start_listener_process([
+            (InterComBackEndAnalysisTask, self.unpacking_service.add_task),
+            (InterComBackEndReAnalyzeTask, self.unpacking_service.add_task),
+            (InterComBackEndCompareTask, self.compare_service.add_task),
+            (InterComBackEndRawDownloadTask, None),
+            (InterComBackEndTarRepackTask, None),
+            (InterComBackEndBinarySearchTask, None),
+            (InterComBackEndUpdateTask, self.analysis_service.update_analysis_of_object_and_children),
+            (InterComBackEndDeleteFile, self.analysis_service.drop_cached_analysis_versions),
+            (InterComBackEndSingleFileTask, self.analysis_service.update_analysis_of_single_object),
+            (InterComBackEndPeekBinaryTask, None),
+            (InterComBackEndLogsTask, None),
+        ])
 
     def shutdown(self):
         self.stop_condition.value = 1
@@ -54,22 +75,113 @@ class InterComBackEndBinding:
             item.join()
         logging.info('InterCom down')
 
-    def _start_listener(self, listener: Type[InterComListener], do_after_function: Optional[Callable] = None):
-        process = Process(target=self._backend_worker, args=(listener, do_after_function))
+    def get_task_latency_statistics(self) -> Dict[str, dict]:
+        '''
+        Get the number of received tasks and the time tasks spent in the queue (in seconds) for each task type.
+        '''
+        return {
+            connection_type: {
+                'tasks': statistics['tasks'].value,
+                'average_latency': round(statistics['average_latency'].value, 3),
+                'last_latency': round(statistics['last_latency'].value, 3),
+            }
+            for connection_type, statistics in self.task_statistics.items()
+        }
+
+    def _start_listener_process(self, listeners: List[Tuple[Type[InterComListener], Optional[Callable]]]):
+        for listener, _ in listeners:
+            self.task_statistics[listener.CONNECTION_TYPE] = {
+                'tasks': Value('i', 0), 'average_latency': Value('d', 0.0), 'last_latency': Value('d', 0.0)
+            }
+        process = Process(target=self._backend_worker, args=(listeners,))
         process.start()
         self.process_list.append(process)
 
-    def _backend_worker(self, listener: Type[InterComListener], do_after_function: Optional[Callable]):
+    def _backend_worker(self, listeners: List[Tuple[Type[InterComListener], Optional[Callable]]]):
+        wake_up_events = {listener.CONNECTION_TYPE: Event() for listener, _ in listeners}
+        threads = [
+            Thread(target=self._listener_thread, args=(listener, do_after_function, wake_up_events[listener.CONNECTION_TYPE]))
+            for listener, do_after_function in listeners
+        ]
+        for thread in threads:
+            thread.start()
+        self._dispatch_notifications(wake_up_events)
+        for thread in threads:
+            thread.join()
+
+    def _dispatch_notifications(self, wake_up_events: Dict[str, Event]):
+        interface = InterComMongoInterface(config=self.config)
+        retry_delay = self.poll_delay
+        try:
+            while self.stop_condition.value == 0:
+                try:
+                    self._tail_notifications(interface, wake_up_events)
+                    retry_delay = self.poll_delay
+                except PyMongoError as error:
+                    logging.error(f'InterCom notifications not available, polling for {retry_delay} s before retrying: {error}')
+                    self._poll_listeners(wake_up_events, retry_delay)
+                    retry_delay = min(2 * retry_delay, self.MAX_NOTIFICATION_RETRY_DELAY)
+        finally:
+            interface.shutdown()
+
+    def _tail_notifications(self, interface: InterComMongoInterface, wake_up_events: Dict[str, Event]):
+        interface.create_notification_collection()
+        for notification in interface.tail_notifications():
+            if self.stop_condition.value != 0:
+                break
+            if notification is not None and notification['connection_type'] in wake_up_events:
+                wake_up_events[notification['connection_type']].set()
+
+    def _poll_listeners(self, wake_up_events: Dict[str, Event], duration: float):
+        end_time = time() + duration
+        while self.stop_condition.value == 0 and time() < end_time:
+            for event in wake_up_events.values():
+                event.set()
+            sleep(min(self.poll_delay, max(end_time - time(), 0)))
+
+    def _listener_thread(self, listener: Type[InterComListener], do_after_function: Optional[Callable], wake_up_event: Event):
         interface = listener(config=self.config)
         logging.debug(f'{listener.__name__} listener started')
+        pending_tasks = BoundedSemaphore(self.MAX_PENDING_TASKS)
+        last_poll = 0
+        with ThreadPoolExecutor(max_workers=self.TASK_WORKERS, thread_name_prefix=listener.__name__) as executor:
+            while self.stop_condition.value == 0:
+                if wake_up_event.wait(timeout=1) or time() - last_poll > self.FALLBACK_POLL_INTERVAL:
+                    wake_up_event.clear()
+                    last_poll = time()
+                    self._process_all_tasks(interface, do_after_function, executor, pending_tasks)
+        interface.shutdown()
+        logging.debug(f'{listener.__name__} listener stopped')
+
+    def _process_all_tasks(self, interface: InterComListener, do_after_function: Optional[Callable], executor: ThreadPoolExecutor, pending_tasks: BoundedSemaphore):
         while self.stop_condition.value == 0:
+            if not pending_tasks.acquire(timeout=1):  # all task workers are busy: leave the tasks in the database
+                continue
             task = interface.get_next_task()
             if task is None:
-                sleep(self.poll_delay)
-            elif do_after_function is not None:
-                do_after_function(task)
-        interface.shutdown()
-        logging.debug(f'{listener.__name__} listener stopped')
+                pending_tasks.release()
+                break
+            self._update_task_statistics(interface.CONNECTION_TYPE, interface.last_task_latency)
+            if do_after_function is None:
+                pending_tasks.release()
+            else:
+                executor.submit(_run_task_function, do_after_function, task).add_done_callback(lambda _: pending_tasks.release())
+
+    def _update_task_statistics(self, connection_type: str, latency: Optional[float]):
+        if latency is None:
+            return
+        statistics = self.task_statistics[connection_type]
+        with statistics['tasks'].get_lock():
+            statistics['tasks'].value += 1
+            statistics['average_latency'].value += (latency - statistics['average_latency'].value) / statistics['tasks'].value
+            statistics['last_latency'].value = latency
+
+
+def _run_task_function(function: Callable, task):
+    try:
+        function(task)
+    except Exception:  # pylint: disable=broad-except
+        logging.error('InterCom: processing of task failed', exc_info=True)
 
 
 class InterComBackEndAnalysisPlugInsPublisher(InterComMongoInterface):
@@ -77,7 +189,7 @@ class InterComBackEndAnalysisPlugInsPublisher(InterComMongoInterface):
     def __init__(self, config=None, analysis_service=None):
         super().__init__(config=config)
         self.publish_available_analysis_plugins(analysis_service)
-        self.client.close()
+        self.shutdown()
 
     def publish_available_analysis_plugins(self, analysis_service):
         available_plugin_dictionary = analysis_service.get_plugin_dict()
@@ -106,8 +218,7 @@ class InterComBackEndReAnalyzeTask(InterComListener):
         self.fs_organizer = FSOrganizer(config=config)
 
     def post_processing(self, task, task_id):
-        task.file_path = self.fs_organizer.generate_path(task)
-        task.create_binary_from_path()
+        task.set_binary_path(self.fs_organizer.generate_path(task))
         return task
 
 
@@ -135,8 +246,19 @@ class InterComBackEndRawDownloadTask(InterComListenerAndResponder):
         super().__init__(config)
         self.binary_service = BinaryService(config=self.config)
 
-    def get_response(self, task):
-        return self.binary_service.get_binary_and_file_name(task)
+    def post_processing(self, task, task_id):
+        '''
+        The binary is not pickled but streamed from the file into the response (the file name is stored as metadata).
+        '''
+        logging.debug(f'request received: {self.CONNECTION_TYPE} -> {task_id}')
+        binary_path, file_name = self.binary_service.get_binary_path_and_file_name(task)
+        if binary_path is None or not binary_path.is_file():
+            self.put_task(self.OUTGOING_CONNECTION_TYPE, b'', task_id=task_id, metadata={'file_name': None})
+        else:
+            with binary_path.open('rb') as binary_file:
+                self.put_task(self.OUTGOING_CONNECTION_TYPE, binary_file, task_id=task_id, metadata={'file_name': file_name})
+        logging.debug(f'response send: {self.OUTGOING_CONNECTION_TYPE} -> {task_id}')
+        return task
 
 
 class InterComBackEndPeekBinaryTask(InterComListenerAndResponder):
@@ -170,11 +292,33 @@ class InterComBackEndBinarySearchTask(InterComListenerAndResponder):
     CONNECTION_TYPE = 'binary_search_task'
     OUTGOING_CONNECTION_TYPE = 'binary_search_task_resp'
 
+    def post_processing(self, task, task_id):
+        self._current_task_id = task_id  # pylint: disable=attribute-defined-outside-init
+        try:
+            return super().post_processing(task, task_id)
+        finally:
+            self._delete_partial_result(task_id)
+
     def get_response(self, task):
         yara_binary_searcher = YaraBinarySearchScanner(config=self.config)
-        uid_list = yara_binary_searcher.get_binary_search_result(task)
+        uid_list = yara_binary_searcher.get_binary_search_result(task, progress_callback=self._store_partial_result)
         return uid_list, task
 
+    def _store_partial_result(self, partial_result: dict, scanned_files: int, total_files: int):
+        '''
+        Partial results are stored next to the final result (with suffix `PARTIAL_RESULT_SUFFIX`) while the search is
+        running, so that the frontend can show them before the search is finished.
+        '''
+        file_name = f'{self._current_task_id}{PARTIAL_RESULT_SUFFIX}'
+        progress = {'scanned_files': scanned_files, 'total_files': total_files}
+        self._delete_partial_result(self._current_task_id)
+        self.connections[self.OUTGOING_CONNECTION_TYPE]['fs'].put(pickle.dumps((partial_result, progress)), filename=file_name)
+
+    def _delete_partial_result(self, task_id: str):
+        fs = self.connections[self.OUTGOING_CONNECTION_TYPE]['fs']
+        for partial_result in fs.find({'filename': f'{task_id}{PARTIAL_RESULT_SUFFIX}'}):
+            fs.delete(partial_result._id)  # pylint: disable=protected-access
+
 
 class InterComBackEndDeleteFile(InterComListener):
 
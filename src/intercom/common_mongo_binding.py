@@ -1,14 +1,23 @@
 import logging
 import pickle
-from time import time
-from typing import Any
+from contextlib import suppress
+from datetime import datetime
+from time import sleep, time
+from typing import Any, BinaryIO, Iterator, Optional, Union
 
 import gridfs
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure
 
 from helperFunctions.hash import get_sha256
 from storage.mongo_interface import MongoInterface
 
 
+NOTIFICATION_COLLECTION_SIZE = 256 * 1024
+NOTIFICATION_AWAIT_MS = 1000
+PARTIAL_RESULT_SUFFIX = '_partial'
+
+
 def generate_task_id(input_data: Any) -> str:
     serialized_data = pickle.dumps(input_data)
     task_id = f'{get_sha256(serialized_data)}_{time()}'
@@ -43,11 +52,66 @@ class InterComMongoInterface(MongoInterface):
 
     def _setup_database_mapping(self):
         self.connections = {}
+        prefix = self.config['data_storage']['intercom_database_prefix']
         for item in self.INTERCOM_CONNECTION_TYPES:
-            prefix = self.config['data_storage']['intercom_database_prefix']
             self.connections[item] = {'name': f'{prefix}_{item}'}
             self.connections[item]['collection'] = self.client[self.connections[item]['name']]
             self.connections[item]['fs'] = gridfs.GridFS(self.connections[item]['collection'])
+        self.notifications = self.client[f'{prefix}_notifications'].notifications
+
+    def put_task(self, connection_type: str, serialized_task: Union[bytes, BinaryIO], task_id: Optional[str] = None, metadata: Optional[dict] = None):
+        '''
+        Store a task (or response) and notify listeners waiting for tasks of this type. If `serialized_task` is a file
+        object, it is read and stored chunk by chunk.
+        '''
+        file_name = {} if task_id is None else {'filename': task_id}
+        self.connections[connection_type]['fs'].put(serialized_task, metadata=metadata, **file_name)
+        self.notifications.insert_one({'connection_type': connection_type, 'task_id': task_id, 'time': time()})
+
+    def create_notification_collection(self):
+        '''
+        Notifications are stored in a capped collection so that they can be awaited with a tailable cursor. If the
+        collection was created as normal collection (i.e. a task was added before the backend started), it is converted.
+        '''
+        database = self.notifications.database
+        with suppress(CollectionInvalid):
+            database.create_collection(self.notifications.name, capped=True, size=NOTIFICATION_COLLECTION_SIZE)
+        if not self.notifications.options().get('capped'):
+            database.command('convertToCapped', self.notifications.name, size=NOTIFICATION_COLLECTION_SIZE)
+        # a tailable cursor on an empty collection is dead right away
+        self.notifications.insert_one({'connection_type': None, 'task_id': None, 'time': time()})
+
+    def tail_notifications(self, stop_time: Optional[float] = None) -> Iterator[Optional[dict]]:
+        '''
+        Iterate over the notifications as they are added. `None` is yielded each time no notification arrived within
+        one second, so that the caller can check for stop conditions. Notifications that were added before the call
+        may be included as well.
+
+        :param stop_time: Stop iterating at this point in time (stop never if `None`).
+        :raise OperationFailure: If the notification collection does not exist as capped collection.
+        '''
+        while stop_time is None or time() < stop_time:
+            cursor = self.notifications.find({}, cursor_type=CursorType.TAILABLE_AWAIT).max_await_time_ms(NOTIFICATION_AWAIT_MS)
+            while cursor.alive and (stop_time is None or time() < stop_time):
+                try:
+                    yield cursor.next()
+                except StopIteration:
+                    yield None
+            if not cursor.alive:
+                sleep(NOTIFICATION_AWAIT_MS / 1000)  # the collection is empty: try again later
+
+    def wait_for_notification(self, connection_type: str, task_id: str, timeout: float) -> bool:
+        '''
+        Block until a task (or response) with `task_id` is announced or until the point in time `timeout` is reached.
+        The caller must check whether the task is already present before waiting.
+        '''
+        try:
+            for notification in self.tail_notifications(stop_time=timeout):
+                if notification and notification['connection_type'] == connection_type and notification['task_id'] == task_id:
+                    return True
+        except OperationFailure:  # notification collection is not capped yet (backend was never started)
+            sleep(max(0.0, min(1.0, timeout - time())))
+        return False
 
 
 class InterComListener(InterComMongoInterface):
@@ -57,6 +121,10 @@ class InterComListener(InterComMongoInterface):
 
     CONNECTION_TYPE = 'test'  # unique for each listener
 
+    def __init__(self, config=None):
+        super().__init__(config=config)
+        self.last_task_latency = None
+
     def get_next_task(self):
         try:
             task_obj = self.connections[self.CONNECTION_TYPE]['fs'].find_one()
@@ -66,6 +134,7 @@ class InterComListener(InterComMongoInterface):
         if task_obj is not None:
             task = pickle.loads(task_obj.read())
             task_id = task_obj.filename
+            self.last_task_latency = (datetime.utcnow() - task_obj.upload_date).total_seconds()
             self.connections[self.CONNECTION_TYPE]['fs'].delete(task_obj._id)  # pylint: disable=protected-access
             task = self.post_processing(task, task_id)
             logging.debug(f'{self.CONNECTION_TYPE}: New task received: {task}')
@@ -90,7 +159,7 @@ class InterComListenerAndResponder(InterComListener):
     def post_processing(self, task, task_id):
         logging.debug(f'request received: {self.CONNECTION_TYPE} -> {task_id}')
         response = self.get_response(task)
-        self.connections[self.OUTGOING_CONNECTION_TYPE]['fs'].put(pickle.dumps(response), filename='{}'.format(task_id))
+        self.put_task(self.OUTGOING_CONNECTION_TYPE, pickle.dumps(response), task_id=task_id)
         logging.debug(f'response send: {self.OUTGOING_CONNECTION_TYPE} -> {task_id}')
         return task
 
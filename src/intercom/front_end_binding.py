@@ -1,9 +1,11 @@
 import logging
 import pickle
-from time import sleep, time
-from typing import Optional
+from time import time
+from typing import List, Optional, Tuple
 
-from intercom.common_mongo_binding import InterComMongoInterface, generate_task_id
+from gridfs.grid_file import GridOut
+
+from intercom.common_mongo_binding import PARTIAL_RESULT_SUFFIX, InterComMongoInterface, generate_task_id
 
 
 class InterComFrontEndBinding(InterComMongoInterface):
@@ -12,22 +14,22 @@ class InterComFrontEndBinding(InterComMongoInterface):
     '''
 
     def add_analysis_task(self, fw):
-        self.connections['analysis_task']['fs'].put(pickle.dumps(fw), filename=fw.uid)
+        self.put_task('analysis_task', pickle.dumps(fw), task_id=fw.uid)
 
     def add_re_analyze_task(self, fw, unpack=True):
         if unpack:
-            self.connections['re_analyze_task']['fs'].put(pickle.dumps(fw), filename=fw.uid)
+            self.put_task('re_analyze_task', pickle.dumps(fw), task_id=fw.uid)
         else:
-            self.connections['update_task']['fs'].put(pickle.dumps(fw), filename=fw.uid)
+            self.put_task('update_task', pickle.dumps(fw), task_id=fw.uid)
 
     def add_single_file_task(self, fw):
-        self.connections['single_file_task']['fs'].put(pickle.dumps(fw), filename=fw.uid)
+        self.put_task('single_file_task', pickle.dumps(fw), task_id=fw.uid)
 
     def add_compare_task(self, compare_id, force=False):
-        self.connections['compare_task']['fs'].put(pickle.dumps((compare_id, force)), filename=compare_id)
+        self.put_task('compare_task', pickle.dumps((compare_id, force)), task_id=compare_id)
 
     def delete_file(self, fw):
-        self.connections['file_delete_task']['fs'].put(pickle.dumps(fw))
+        self.put_task('file_delete_task', pickle.dumps(fw))
 
     def get_available_analysis_plugins(self):
         plugin_file = self.connections['analysis_plugins']['fs'].find_one({'filename': 'plugin_dictionary'})
@@ -37,7 +39,31 @@ class InterComFrontEndBinding(InterComMongoInterface):
         raise Exception('No available plug-ins found. FACT backend might be down!')
 
     def get_binary_and_filename(self, uid):
-        return self._request_response_listener(uid, 'raw_download_task', 'raw_download_task_resp')
+        stream = self.open_binary_stream(uid)
+        if stream is None:
+            return None
+        try:
+            file_name = stream.metadata['file_name']
+            return (stream.read(), file_name) if file_name is not None else (None, None)
+        finally:
+            self.delete_binary_stream(stream)
+
+    def open_binary_stream(self, uid: str) -> Optional[GridOut]:
+        '''
+        Request a binary from the backend without loading it into memory. The returned (seekable) file object contains
+        the file name in `metadata['file_name']` (`None` if the file was not found) and must be removed with
+        `delete_binary_stream` after reading.
+
+        :param uid: The UID of the file.
+        :return: The binary as file object or `None` if the backend did not respond in time.
+        '''
+        request_id = generate_task_id(uid)
+        self.put_task('raw_download_task', pickle.dumps(uid), task_id=request_id)
+        logging.debug(f'Request sent: raw_download_task -> {request_id}')
+        return self._wait_for_response('raw_download_task_resp', request_id)
+
+    def delete_binary_stream(self, stream: GridOut):
+        self.connections['raw_download_task_resp']['fs'].delete(stream._id)  # pylint: disable=protected-access
 
     def peek_in_binary(self, uid: str, offset: int, length: int) -> bytes:
         return self._request_response_listener((uid, offset, length), 'binary_peek_task', 'binary_peek_task_resp')
@@ -45,39 +71,55 @@ class InterComFrontEndBinding(InterComMongoInterface):
     def get_repacked_binary_and_file_name(self, uid):
         return self._request_response_listener(uid, 'tar_repack_task', 'tar_repack_task_resp')
 
-    def add_binary_search_request(self, yara_rule_binary: bytes, firmware_uid: Optional[str] = None):
-        serialized_request = pickle.dumps((yara_rule_binary, firmware_uid))
+    def add_binary_search_request(self, yara_rule_binary: bytes, firmware_uid: Optional[str] = None, mime_types: Optional[List[str]] = None):
+        search_task = (yara_rule_binary, firmware_uid) if not mime_types else (yara_rule_binary, firmware_uid, mime_types)
+        serialized_request = pickle.dumps(search_task)
         request_id = generate_task_id(yara_rule_binary)
-        self.connections['binary_search_task']['fs'].put(serialized_request, filename=request_id)
+        self.put_task('binary_search_task', serialized_request, task_id=request_id)
         return request_id
 
     def get_binary_search_result(self, request_id):
         result = self._response_listener('binary_search_task_resp', request_id, timeout=time() + 10, delete=False)
         return result if result is not None else (None, None)
 
+    def get_partial_binary_search_result(self, request_id: str) -> Tuple[Optional[dict], Optional[dict]]:
+        '''
+        Get the intermediate result of a running binary search (does not wait).
+
+        :return: A tuple of the partial result and the progress (number of scanned and total files) or `(None, None)`.
+        '''
+        partial_result = self.connections['binary_search_task_resp']['fs'].find_one({'filename': f'{request_id}{PARTIAL_RESULT_SUFFIX}'})
+        if partial_result is None:
+            return None, None
+        return pickle.loads(partial_result.read())
+
     def _request_response_listener(self, input_data, request_connection, response_connection):
         serialized_request = pickle.dumps(input_data)
         request_id = generate_task_id(input_data)
-        self.connections[request_connection]['fs'].put(serialized_request, filename=request_id)
+        self.put_task(request_connection, serialized_request, task_id=request_id)
         logging.debug(f'Request sent: {request_connection} -> {request_id}')
-        sleep(1)
         return self._response_listener(response_connection, request_id)
 
     def _response_listener(self, response_connection, request_id, timeout=None, delete=True):
         output_data = None
+        resp = self._wait_for_response(response_connection, request_id, timeout)
+        if resp:
+            output_data = pickle.loads(resp.read())
+            if delete:
+                self.connections[response_connection]['fs'].delete(resp._id)  # pylint: disable=protected-access
+        return output_data
+
+    def _wait_for_response(self, response_connection: str, request_id: str, timeout: Optional[float] = None) -> Optional[GridOut]:
         if timeout is None:
             timeout = time() + int(self.config['ExpertSettings'].get('communication_timeout', '60'))
         while timeout > time():
             resp = self.connections[response_connection]['fs'].find_one({'filename': request_id})
             if resp:
-                output_data = pickle.loads(resp.read())
-                if delete:
-                    self.connections[response_connection]['fs'].delete(resp._id)  # pylint: disable=protected-access
                 logging.debug(f'Response received: {response_connection} -> {request_id}')
-                break
+                return resp
             logging.debug(f'No response yet: {response_connection} -> {request_id}')
-            sleep(1)
-        return output_data
+            self.wait_for_notification(response_connection, request_id, timeout)
+        return None
 
     def get_backend_logs(self):
         return self._request_response_listener(None, 'logs_task', 'logs_task_resp')
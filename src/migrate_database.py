@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 
 import argparse
+import logging
 import sqlite3
 import uuid
+from time import time
+
+from gridfs.errors import NoFile
 
 from helperFunctions.config import load_config
+from storage.db_interface_common import CONTENT_ADDRESSED_PREFIX, MongoInterfaceCommon
+from storage.sanitize_codec import CODECS, MAGIC_LENGTH, get_codec_for_content
 
 
 def upgrade(cur):
@@ -57,29 +63,105 @@ def downgrade(cur):
     print('Successfully downgraded the database')
 
 
+def convert_sanitized_results(config, codec_name):
+    '''
+    Re-encode all results in the sanitize database with the codec `codec_name`. Results that were stored before
+    sanitized results were stored content-addressed are converted as well.
+    '''
+    config.set('data_storage', 'sanitize_codec', codec_name)
+    db = MongoInterfaceCommon(config=config)
+    converted = 0
+    try:
+        for collection in [db.firmwares, db.file_objects]:
+            for entry in collection.find({}, {'processed_analysis': 1}):
+                converted += _convert_sanitized_entry(db, collection, entry)
+    finally:
+        db.shutdown()
+    print(f'Successfully converted {converted} sanitized analysis results to {codec_name}')
+
+
+def _convert_sanitized_entry(db: MongoInterfaceCommon, collection, entry: dict) -> int:
+    converted = 0
+    for plugin, analysis in entry['processed_analysis'].items():
+        if not analysis.get('file_system_flag') or _is_up_to_date(db, analysis):
+            continue
+        retrieved_analysis = db.retrieve_analysis({plugin: analysis})
+        sanitized_analysis = db._extract_binaries(retrieved_analysis, plugin, entry['_id'])  # pylint: disable=protected-access
+        sanitized_analysis['file_system_flag'] = True
+        collection.update_one({'_id': entry['_id']}, {'$set': {f'processed_analysis.{plugin}': sanitized_analysis}})
+        converted += 1
+    return converted
+
+
+def _is_up_to_date(db: MongoInterfaceCommon, analysis: dict) -> bool:
+    for key, file_name in analysis.items():
+        if key in ['file_system_flag', 'summary', 'tags'] or not isinstance(file_name, str):
+            continue
+        if not file_name.startswith(CONTENT_ADDRESSED_PREFIX):
+            return False
+        try:
+            header = db.sanitize_fs.get_last_version(file_name).read(MAGIC_LENGTH)
+        except NoFile:
+            logging.warning(f'sanitized file not found: {file_name}')
+            continue
+        if get_codec_for_content(header).NAME != db.sanitize_codec.NAME:
+            return False
+    return True
+
+
+def build_tlsh_index(config):
+    '''
+    Add the TLSH hashes of all files that were analyzed before the TLSH index was introduced to the index.
+    '''
+    db = MongoInterfaceCommon(config=config)
+    added = 0
+    try:
+        for collection in [db.firmwares, db.file_objects]:
+            for entry in collection.find({'processed_analysis.file_hashes.tlsh': {'$exists': True}}, {'processed_analysis.file_hashes.tlsh': 1}):
+                tlsh_hash = entry['processed_analysis']['file_hashes']['tlsh']
+                if tlsh_hash and db.tlsh_index.count_documents({'_id': entry['_id']}) == 0:
+                    db.tlsh_index.insert_one({'_id': entry['_id'], 'tlsh': tlsh_hash, 'last_update': time()})
+                    added += 1
+        db.tlsh_index.create_index('last_update')
+    finally:
+        db.shutdown()
+    print(f'Successfully added {added} files to the TLSH index')
+
+
+def migrate_user_database(config, migration):
+    db_path = config['data_storage']['user_database'][len('sqlite:///'):]
+
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+
+    migration(cur)
+
+    conn.commit()
+    conn.close()
+
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.set_defaults(func=lambda _: parser.print_usage())
+    parser.set_defaults(func=lambda *_: parser.print_usage())
     subparsers = parser.add_subparsers()
 
     upgrade_p = subparsers.add_parser('upgrade', help='Upgrade the user database', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    upgrade_p.set_defaults(func=upgrade)
+    upgrade_p.set_defaults(func=lambda config, _: migrate_user_database(config, upgrade))
 
     downgrade_p = subparsers.add_parser('downgrade', help='Downgrade the user database', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    downgrade_p.set_defaults(func=downgrade)
-    args = parser.parse_args()
-
-    config = load_config('main.cfg')
-
-    db_path = config['data_storage']['user_database'][len('sqlite:///'):]
+    downgrade_p.set_defaults(func=lambda config, _: migrate_user_database(config, downgrade))
 
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+    sanitize_p = subparsers.add_parser(
+        'sanitize', help='Convert the results in the sanitize database to another codec', formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    sanitize_p.add_argument('--codec', choices=list(CODECS), default=None, help='target codec (default: sanitize_codec from main.cfg)')
+    sanitize_p.set_defaults(func=lambda config, args: convert_sanitized_results(config, args.codec or config['data_storage'].get('sanitize_codec', 'pickle')))
 
-    args.func(cur)
+    tlsh_p = subparsers.add_parser('tlsh-index', help='Add the TLSH hashes of existing files to the TLSH index')
+    tlsh_p.set_defaults(func=lambda config, _: build_tlsh_index(config))
+    args = parser.parse_args()
 
-    conn.commit()
-    conn.close()
+    args.func(load_config('main.cfg'), args)
 
 
 if __name__ == '__main__':
@@ -1,12 +1,13 @@
 import logging
+from mmap import ACCESS_READ, mmap
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 from common_helper_files import get_binary_from_file
 
 from helperFunctions.data_conversion import get_value_of_first_key, make_bytes, make_unicode_string
 from helperFunctions.hash import get_sha256
-from helperFunctions.uid import create_uid
+from helperFunctions.uid import create_uid, create_uid_from_file
 from helperFunctions.virtual_file_path import get_base_of_virtual_path, get_top_of_virtual_path
 
 
@@ -64,6 +65,10 @@ class FileObject:  # pylint: disable=too-many-instance-attributes
         #: * summary - list holding a summary of each file's result, that can be aggregated.
         self.processed_analysis = {}
 
+        #: Analysis dates of the results (by plugin name) that were last written to the database.
+        #: It is used to write only new or changed analysis results when the object is written to the database again.
+        self.stored_analysis_dates = {}
+
         #: List of plugins that are scheduled to be run on this file.
         self.scheduled_analysis = scheduled_analysis
 
@@ -93,10 +98,13 @@ class FileObject:  # pylint: disable=too-many-instance-attributes
         #: for debugging purposes and as placeholder in UI.
         self.analysis_exception = None
 
+        #: Whether the binary is loaded from ``file_path`` on first access (see :attr:`binary`).
+        self._load_binary_from_path = False
+        self._binary_map = None
+
         if binary is not None:
             self.set_binary(binary)
         else:
-            #: Binary representation of this file in bytes.
             self.binary = None
 
             #: SHA256 hash of this file.
@@ -119,6 +127,53 @@ class FileObject:  # pylint: disable=too-many-instance-attributes
         #: For files such as symlinks, there can be multiple paths inside a single firmware for one unique file.
         self.virtual_file_path = {}
 
+    @property
+    def binary(self) -> Optional[bytes]:
+        '''
+        Binary representation of this file in bytes.
+        If the object was created from a local file, the binary is only read from ``file_path`` on first access.
+
+        :return: The binary or ``None`` if it is not set.
+        '''
+        if self._binary is None and self._load_binary_from_path:
+            self._binary = get_binary_from_file(self.file_path)
+        return self._binary
+
+    @binary.setter
+    def binary(self, binary: Optional[bytes]):
+        self._binary = binary
+        self._load_binary_from_path = False
+
+    @property
+    def binary_is_loaded(self) -> bool:
+        return self._binary is not None
+
+    @property
+    def mapped_binary(self) -> Optional[Union[bytes, mmap]]:
+        '''
+        The binary without reading it into memory: If the binary was not loaded yet, this is a read-only memory map of
+        the local file (opened on first access). Otherwise, it is the binary itself. Like bytes, memory maps support
+        slicing, ``find``, regular expressions and hashing with ``hashlib``.
+
+        :return: The memory map or the binary.
+        '''
+        if self._binary is not None or not self._load_binary_from_path:
+            return self._binary
+        if self._binary_map is None:
+            if self.size == 0:  # empty files cannot be mapped
+                return b''
+            with open(self.file_path, 'rb') as fp:
+                self._binary_map = mmap(fp.fileno(), 0, access=ACCESS_READ)
+        return self._binary_map
+
+    def __getstate__(self):
+        # if the binary can be loaded from the local file, only the path is pickled (e.g. when sending the object to
+        # an analysis worker)
+        state = {**self.__dict__, '_binary_map': None}
+        if self._load_binary_from_path:
+            state['_binary'] = None
+        return state
+
     def set_binary(self, binary: bytes) -> None:
         '''
         Store the binary representation of the file as byte string.
@@ -132,12 +187,31 @@ class FileObject:  # pylint: disable=too-many-instance-attributes
         self._uid = create_uid(binary)
 
     def create_binary_from_path(self) -> None:
+        '''
+        Set the binary related meta data (size, hash and uid) from the local file at ``file_path`` (if it was not set
+        already). The file is hashed in chunks and the binary itself is only read on first access.
+        '''
         if self.file_path is not None:
-            if self.binary is None:
+            if self._binary is None and not self._load_binary_from_path:
                 self._create_from_file(self.file_path)
             if self.file_name is None:
                 self.file_name = make_unicode_string(Path(self.file_path).name)
 
+    def set_binary_path(self, file_path: str) -> None:
+        '''
+        Use the local file at ``file_path`` as (lazily loaded) binary of an object whose uid is already known (e.g. an
+        object from the database). The file is neither read nor hashed.
+
+        :param file_path: The path of the (stored) file.
+        '''
+        self.binary = None
+        self.file_path = file_path
+        self.sha256 = self.uid.split('_')[0]
+        self._load_binary_from_path = True
+        self._binary_map = None
+        if self.file_name is None:
+            self.file_name = make_unicode_string(Path(file_path).name)
+
     @property
     def uid(self) -> str:
         '''
@@ -171,7 +245,15 @@ class FileObject:  # pylint: disable=too-many-instance-attributes
         return get_top_of_virtual_path(virtual_path)
 
     def _create_from_file(self, file_path: str):
-        self.set_binary(get_binary_from_file(file_path))
+        try:
+            self._uid = create_uid_from_file(file_path)
+        except OSError as error:
+            logging.error(f'Could not read file: {error}')
+            self.set_binary(b'')
+        else:
+            self.sha256, size = self._uid.split('_')
+            self.size = int(size)
+            self._load_binary_from_path = True
         self.create_binary_from_path()
 
     def add_included_file(self, file_object) -> None:
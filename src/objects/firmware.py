@@ -1,7 +1,7 @@
 from contextlib import suppress
 from typing import Dict, Optional
 
-from helperFunctions.hash import get_md5
+from helperFunctions.hash import get_hash_of_file, get_md5
 from helperFunctions.tag import TagColor
 from objects.file import FileObject
 
@@ -50,6 +50,9 @@ class Firmware(FileObject):  # pylint: disable=too-many-instance-attributes
     '''
 
     def __init__(self, **kwargs):
+        #: MD5 hash of the firmware image (set with the binary).
+        self.md5: Optional[str] = None
+
         super().__init__(**kwargs)
 
         #: Device name string identifier.
@@ -118,6 +121,12 @@ class Firmware(FileObject):  # pylint: disable=too-many-instance-attributes
         self._update_root_id_and_virtual_path()
         self.md5 = get_md5(binary)
 
+    def _create_from_file(self, file_path: str):
+        super()._create_from_file(file_path)
+        if not self.binary_is_loaded:
+            self._update_root_id_and_virtual_path()
+            self.md5 = get_hash_of_file('md5', file_path)
+
     def _update_root_id_and_virtual_path(self):
         self.root_uid = self.uid
         self.virtual_file_path = {self.uid: [self.uid]}
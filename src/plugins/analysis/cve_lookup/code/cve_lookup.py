@@ -1,8 +1,10 @@
 import logging
 import operator
+import os
 import sys
 from collections import namedtuple
 from distutils.version import LooseVersion, StrictVersion
+from functools import lru_cache
 from itertools import combinations
 from pathlib import Path
 from re import match
@@ -17,11 +19,11 @@ from objects.file import FileObject
 from plugins.mime_blacklists import MIME_BLACKLIST_NON_EXECUTABLE
 
 try:
-    from ..internal.database_interface import QUERIES, DatabaseInterface
+    from ..internal.database_interface import DB_PATH, QUERIES, DatabaseInterface
     from ..internal.helper_functions import replace_characters_and_wildcards, unescape
 except ImportError:
     sys.path.append(str(Path(__file__).parent.parent / 'internal'))
-    from database_interface import QUERIES, DatabaseInterface
+    from database_interface import DB_PATH, QUERIES, DatabaseInterface
     from helper_functions import replace_characters_and_wildcards, unescape
 
 MAX_TERM_SPREAD = 3  # a range in which the product term is allowed to come after the vendor term for it not to be a false positive
@@ -34,19 +36,24 @@ CveDbEntry = NamedTuple(
     ]
 )
 MATCH_FOUND = 2
+LOOKUP_CACHE_SIZE = 4096  # (product, version) combinations
+VERSION_KEY_CACHE_SIZE = 2 ** 16
 
 
 class AnalysisPlugin(AnalysisBasePlugin):
     '''
     lookup vulnerabilities from CVE feeds using ID from CPE dictionary
+    The CPE index and the lookup cache are kept in the persistent analysis process of each worker.
     '''
     NAME = 'cve_lookup'
     DESCRIPTION = 'lookup CVE vulnerabilities'
     MIME_BLACKLIST = MIME_BLACKLIST_NON_EXECUTABLE
     DEPENDENCIES = ['software_components']
     VERSION = '0.0.4'
+    PERSISTENT_WORKERS = True
 
     def __init__(self, plugin_administrator, config=None, recursive=True, offline_testing=False):
+        self.vulnerability_lookup = VulnerabilityLookup()
         super().__init__(plugin_administrator, config=config, recursive=recursive, plugin_path=__file__, offline_testing=offline_testing)
 
     def process_object(self, file_object):
@@ -54,7 +61,7 @@ class AnalysisPlugin(AnalysisBasePlugin):
         for component in file_object.processed_analysis['software_components']['summary']:
             product, version = self._split_component(component)
             if product and version:
-                vulnerabilities = look_up_vulnerabilities(product_name=product, requested_version=version)
+                vulnerabilities = self.vulnerability_lookup.look_up(product_name=product, requested_version=version)
                 if vulnerabilities:
                     cves['cve_results'][component] = vulnerabilities
 
@@ -96,11 +103,97 @@ class AnalysisPlugin(AnalysisBasePlugin):
         return ' '.join(component_parts[:-1]), component_parts[-1]
 
 
-def look_up_vulnerabilities(product_name: str, requested_version: str) -> Optional[dict]:
-    with DatabaseInterface() as db:
+class CpeIndex:
+    '''
+    In-memory index of the CPE table: product name → vendor name → versions (sorted).
+    '''
+
+    def __init__(self, db: DatabaseInterface):
+        index = {}
+        for vendor, product, version in db.fetch_multiple(QUERIES['cpe_lookup']):
+            index.setdefault(product, {}).setdefault(vendor, []).append(version)
+        for vendors in index.values():
+            for versions in vendors.values():
+                versions.sort(key=lambda version: LegacyVersion(parse(version)))
+        self._index = index  # type: Dict[str, Dict[str, List[str]]]
+
+    def __len__(self):
+        return sum(len(versions) for vendors in self._index.values() for versions in vendors.values())
+
+    def match(self, product_search_terms: List[str]) -> List[Product]:
+        '''
+        Same result as `match_cpe`, but without querying the database.
+        '''
+        if MAX_LEVENSHTEIN_DISTANCE > 0:
+            products = [product for product in self._index if any(terms_match(term, product) for term in product_search_terms)]
+        else:
+            products = [product for product in set(product_search_terms) if product in self._index]
+        return [
+            Product(vendor, product, version)
+            for product in products
+            for vendor, versions in self._index[product].items()
+            for version in versions
+        ]
+
+
+class VulnerabilityLookup:
+    '''
+    Vulnerability lookup with an in-memory CPE index and an LRU cache of the results of `look_up`. Index and cache are
+    built on demand in the process that uses the lookup and are dropped when the database file changes (e.g. because it
+    was updated by `setup_repository.py`). They are only reused if the process analyzes more than one file (i.e. with
+    persistent workers).
+
+    :param db_path: The path of the CVE database.
+    :param cache_size: The maximum number of cached results.
+    '''
+
+    def __init__(self, db_path: str = DB_PATH, cache_size: int = LOOKUP_CACHE_SIZE):
+        self.db_path = db_path
+        self._db_state = None
+        self._cpe_index = None  # type: Optional[CpeIndex]
+        self._cached_look_up = lru_cache(maxsize=cache_size)(self._look_up)
+
+    def look_up(self, product_name: str, requested_version: str) -> Optional[dict]:
+        '''
+        Look up the vulnerabilities of a product.
+
+        :param product_name: The name of the product (e.g. "OpenSSL").
+        :param requested_version: The version of the product (or "ANY").
+        :return: The matching CVEs with scores (by CVE ID) or `None` if there is no matching CPE.
+        '''
+        self._check_database()
+        result = self._cached_look_up(product_name, requested_version)
+        if result is None:
+            return None
+        return {cve_id: dict(entry) for cve_id, entry in result.items()}  # cached results must not be modified
+
+    def get_cache_info(self):
+        return self._cached_look_up.cache_info()
+
+    def _check_database(self):
+        try:
+            stat = os.stat(self.db_path)
+            db_state = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            db_state = None
+        if db_state != self._db_state:
+            self._db_state = db_state
+            self._cpe_index = None
+            self._cached_look_up.cache_clear()
+
+    def _look_up(self, product_name: str, requested_version: str) -> Optional[dict]:
+        if self._cpe_index is None:
+            with DatabaseInterface(self.db_path) as db:
+                self._cpe_index = CpeIndex(db)
+        return look_up_vulnerabilities(product_name, requested_version, cpe_index=self._cpe_index, db_path=self.db_path)
+
+
+def look_up_vulnerabilities(product_name: str, requested_version: str, cpe_index: Optional[CpeIndex] = None,
+                            db_path: str = DB_PATH) -> Optional[dict]:
+    with DatabaseInterface(db_path) as db:
         product_terms, version = replace_characters_and_wildcards(generate_search_terms(product_name)), replace_characters_and_wildcards([requested_version])[0]
 
-        matched_cpe = match_cpe(db, product_terms)
+        matched_cpe = cpe_index.match(product_terms) if cpe_index is not None else match_cpe(db, product_terms)
         if len(matched_cpe) == 0:
             logging.debug(f'No CPEs were found for product {product_name}')
             return None
@@ -126,7 +219,7 @@ def find_matching_cpe_product(cpe_matches: List[Product], requested_version: str
         if requested_version in version_numbers:
             return find_cpe_product_with_version(cpe_matches, requested_version)
         version_numbers.append(requested_version)
-        version_numbers.sort(key=lambda v: LegacyVersion(parse(v)))
+        version_numbers.sort(key=get_version_key)
         next_closest_version = find_next_closest_version(version_numbers, requested_version)
         return find_cpe_product_with_version(cpe_matches, next_closest_version)
     if requested_version == 'ANY':
@@ -135,6 +228,11 @@ def find_matching_cpe_product(cpe_matches: List[Product], requested_version: str
     return cpe_matches[0]
 
 
+@lru_cache(maxsize=VERSION_KEY_CACHE_SIZE)
+def get_version_key(version: str) -> LegacyVersion:
+    return LegacyVersion(parse(version))
+
+
 def is_valid_dotted_version(version: str) -> bool:
     return bool(match(r'^[a-zA-Z0-9\-]+(\\\.[a-zA-Z0-9\-]+)+$', version))
 
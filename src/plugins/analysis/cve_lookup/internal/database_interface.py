@@ -36,19 +36,23 @@ QUERIES = {
     'cpe_lookup': 'SELECT DISTINCT vendor, product, version FROM cpe_table',
     'create_cpe_table': TABLE_CREATION_COMMAND.format(get_field_string(CPE_DB_FIELDS)),
     'create_cve_table': TABLE_CREATION_COMMAND.format(get_field_string(CVE_DB_FIELDS)),
+    'create_feed_table': 'CREATE TABLE IF NOT EXISTS feed_table (feed TEXT PRIMARY KEY, sha256 TEXT NOT NULL)',
     'create_summary_table': TABLE_CREATION_COMMAND.format(get_field_string(CVE_SUMMARY_DB_FIELDS)),
+    'create_year_index': 'CREATE INDEX IF NOT EXISTS {0}_year ON {0} (year)',
     'cve_lookup': 'SELECT cve_id, vendor, product, version, cvss_v2_score, cvss_v3_score, version_start_including, '
                   'version_start_excluding, version_end_including, version_end_excluding FROM cve_table',
-    'delete_outdated': 'DELETE FROM {} WHERE cve_id IN (SELECT cve_id FROM {})',
+    'delete_year': 'DELETE FROM {} WHERE year = ?',
     'drop': 'DROP TABLE IF EXISTS {}',
+    'drop_year_index': 'DROP INDEX IF EXISTS {}_year',
     'exist': 'SELECT name FROM sqlite_master WHERE type=\'table\' AND name=\'{}\'',
-    'extract_relevant': 'SELECT * FROM {} AS new WHERE new.year IN (SELECT distinct(year) FROM {})',
+    'get_feed_hashes': 'SELECT feed, sha256 FROM feed_table',
     'get_years_from_cve': 'SELECT DISTINCT year FROM cve_table',
     'insert_cpe': TABLE_INSERT_COMMAND.format(get_field_names(CPE_DB_FIELDS), ', '.join(['?'] * len(CPE_DB_FIELDS))),
     'insert_cve': TABLE_INSERT_COMMAND.format(get_field_names(CVE_DB_FIELDS), ', '.join(['?'] * len(CVE_DB_FIELDS))),
     'insert_summary': TABLE_INSERT_COMMAND.format(
         get_field_names(CVE_SUMMARY_DB_FIELDS), ', '.join(['?'] * len(CVE_SUMMARY_DB_FIELDS))),
     'select_all': 'SELECT * FROM {}',
+    'store_feed_hash': 'INSERT OR REPLACE INTO feed_table (feed, sha256) VALUES (?, ?)',
     'summary_lookup': 'SELECT cve_id, summary, cvss_v2_score, cvss_v3_score FROM summary_table',
 }
 
@@ -6,9 +6,13 @@ from collections import namedtuple
 from datetime import datetime
 from enum import Enum
 from glob import glob
+from hashlib import sha256
+from itertools import chain, islice
+from multiprocessing import Pool
+from os import cpu_count
 from pathlib import Path
 from shutil import rmtree
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 try:
     from ..internal import data_parsing as dp
@@ -25,6 +29,9 @@ except (ImportError, ValueError, SystemError):
 CURRENT_YEAR = datetime.now().year
 DATABASE = DatabaseInterface()
 CPE_SPLIT_REGEX = r'(?<![\\:]):(?!:)|(?<=\\:):'  # don't split on '::' or '\:' but split on '\::'
+BATCH_SIZE = 100000  # rows per executemany call
+HASH_CHUNK_SIZE = 1024 ** 2
+CVE_TABLES = ['cve_table', 'summary_table']
 
 Years = namedtuple('Years', 'start_year end_year')
 
@@ -42,14 +49,6 @@ def drop_table(table_name: str):
     DATABASE.execute_query(QUERIES['drop'].format(table_name))
 
 
-def delete_outdated_feeds(delete_outdated_from: str, use_for_selection: str):
-    DATABASE.execute_query(QUERIES['delete_outdated'].format(delete_outdated_from, use_for_selection))
-
-
-def extract_relevant_feeds(from_table: str, where_table: str) -> list:
-    return list(DATABASE.fetch_multiple(QUERIES['extract_relevant'].format(from_table, where_table)))
-
-
 def insert_into(query: str, table_name: str, input_data: list):
     DATABASE.insert_rows(QUERIES[query].format(table_name), input_data)
 
@@ -80,91 +79,100 @@ def get_cpe_content(path: str) -> list:
     return dp.extract_cpe(glob(path + '*.xml')[0])
 
 
-def init_cve_feeds_table(cve_list: List[CveEntry], table_name: str):
-    create(query='create_cve_table', table_name=table_name)
-    insert_into(query='insert_cve', table_name=table_name, input_data=setup_cve_feeds_table(cve_list=cve_list))
-
-
-def init_cve_summaries_table(summary_list: list, table_name: str):
-    create(query='create_summary_table', table_name=table_name)
-    insert_into(query='insert_summary', table_name=table_name, input_data=setup_cve_summary_table(summary_list=summary_list))
-
-
-def get_cve_import_content(cve_extraction_path: str, year_selection: list) -> Tuple[list, list]:
-    cve_list, summary_list = list(), list()
-    dp.download_cve(cve_extraction_path, years=year_selection)
-    for file in get_cve_json_files(cve_extraction_path):
-        cve_data, summary_data = dp.extract_cve(file)
-        cve_list.extend(cve_data)
-        summary_list.extend(summary_data)
-
-    return cve_list, summary_list
-
-
-def get_cve_update_content(cve_extraction_path: str) -> Tuple[list, list]:
-    dp.download_cve(cve_extraction_path, update=True)
-    cve_json_files = get_cve_json_files(cve_extraction_path)
-    if not cve_json_files:
-        raise CveLookupException('Glob has found none of the specified files!')
-    return dp.extract_cve(cve_json_files[0])
-
-
 def get_cve_json_files(cve_extraction_path: str) -> List[str]:
     return glob(cve_extraction_path + 'nvdcve*.json')
 
 
-def cve_summaries_can_be_imported(extracted_summaries: list) -> bool:
-    return bool(extracted_summaries)
-
-
-def update_cve_repository(cve_extract_path: str):
+def update_cve_repository(cve_extract_path: str, workers: Optional[int] = None):
     if not table_exists(table_name='cve_table'):
         raise CveLookupException('CVE tables do not exist! Did you mean import CVE?')
-    dp.download_cve(cve_extract_path, update=True)
-    cve_list, summary_list = get_cve_update_content(cve_extraction_path=cve_extract_path)
-
-    init_cve_feeds_table(cve_list=cve_list, table_name='temp_feeds')
-    update_cve_feeds()
-
-    if summary_list:
-        init_cve_summaries_table(summary_list=summary_list, table_name='temp_sum')
-        update_cve_summaries()
-        drop_table(table_name='temp_sum')
-
-    drop_table(table_name='temp_feeds')
-
-
-def update_cve_feeds():
-    feeds_to_be_updated = extract_relevant_feeds(from_table='temp_feeds', where_table='cve_table')
-    delete_outdated_feeds(delete_outdated_from='cve_table', use_for_selection='temp_feeds')
-    insert_into(query='insert_cve', table_name='cve_table', input_data=feeds_to_be_updated)
-
-
-def update_cve_summaries():
-    summaries_to_be_updated = extract_relevant_feeds(from_table='temp_sum', where_table='cve_table')
-
-    if table_exists(table_name='summary_table'):
-        delete_outdated_feeds(delete_outdated_from='summary_table', use_for_selection='temp_sum')
-        delete_outdated_feeds(delete_outdated_from='summary_table', use_for_selection='temp_feeds')
-    else:
-        create(query='create_summary_table', table_name='summary_table')
-
-    delete_outdated_feeds(delete_outdated_from='cve_table', use_for_selection='temp_sum')
-    insert_into(query='insert_summary', table_name='summary_table', input_data=summaries_to_be_updated)
+    dp.download_cve(cve_extract_path, years=get_years_to_update())
+    import_cve_feeds(get_cve_json_files(cve_extract_path), workers=workers)
 
 
 def get_years_from_database():
     return [year for (year,) in DATABASE.fetch_multiple(QUERIES['get_years_from_cve'])]
 
 
-def import_cve(cve_extract_path: str, years: namedtuple):
+def get_years_to_update() -> List[int]:
+    # all years since the oldest imported one, so that the feeds of new years are imported as well
+    return list(range(min(get_years_from_database(), default=CURRENT_YEAR), CURRENT_YEAR + 1))
+
+
+def import_cve(cve_extract_path: str, years: namedtuple, workers: Optional[int] = None):
     filtered_years = overlap(years, get_years_from_database()) if table_exists(table_name='cve_table') else None
     year_selection = filtered_years or list(range(years.start_year, years.end_year + 1))
 
-    cve_list, summary_list = get_cve_import_content(cve_extract_path, year_selection)
-    init_cve_feeds_table(cve_list=cve_list, table_name='cve_table')
-    if summary_list:
-        init_cve_summaries_table(summary_list=summary_list, table_name='summary_table')
+    dp.download_cve(cve_extract_path, years=year_selection)
+    import_cve_feeds(get_cve_json_files(cve_extract_path), workers=workers)
+
+
+def import_cve_feeds(cve_json_files: List[str], workers: Optional[int] = None) -> List[str]:
+    '''
+    Import CVE feeds whose content changed since they were last imported (or which were never imported). The feeds are
+    parsed in parallel and the rows of the years contained in a feed are replaced by the content of the feed (in one
+    transaction per feed), so every feed must contain all CVEs of its years (as the yearly NVD feeds do).
+
+    :param cve_json_files: The paths of the (extracted) feeds.
+    :param workers: The number of worker processes parsing the feeds (default: number of CPUs).
+    :return: The names of the imported feeds.
+    '''
+    create(query='create_cve_table', table_name='cve_table')
+    create(query='create_summary_table', table_name='summary_table')
+    DATABASE.execute_query(QUERIES['create_feed_table'])
+    feed_hashes = get_outdated_feed_hashes(cve_json_files)
+    if not feed_hashes:
+        logging.info('CVE feeds are up to date')
+        return []
+
+    for table in CVE_TABLES:  # index creation is deferred until all rows are inserted
+        DATABASE.execute_query(QUERIES['drop_year_index'].format(table))
+    with Pool(processes=min(workers or cpu_count(), len(feed_hashes))) as pool:
+        for path, cve_rows, summary_rows in pool.imap_unordered(parse_cve_feed, feed_hashes):
+            replace_feed(Path(path).name, feed_hashes[path], cve_rows, summary_rows)
+            logging.info(f'imported CVE feed {Path(path).name} ({len(cve_rows)} CPE matches, {len(summary_rows)} summaries)')
+    for table in CVE_TABLES:
+        DATABASE.execute_query(QUERIES['create_year_index'].format(table))
+    return sorted(Path(path).name for path in feed_hashes)
+
+
+def get_outdated_feed_hashes(cve_json_files: List[str]) -> Dict[str, str]:
+    stored_hashes = dict(DATABASE.fetch_multiple(QUERIES['get_feed_hashes']))
+    feed_hashes = {path: get_file_hash(path) for path in cve_json_files}
+    return {path: sha256_hash for path, sha256_hash in feed_hashes.items() if stored_hashes.get(Path(path).name) != sha256_hash}
+
+
+def get_file_hash(path: str) -> str:
+    file_hash = sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def parse_cve_feed(path: str) -> Tuple[str, List[tuple], List[tuple]]:
+    cve_list, summary_list = dp.extract_cve(path)
+    return path, setup_cve_feeds_table(cve_list), setup_cve_summary_table(summary_list)
+
+
+def replace_feed(feed: str, feed_hash: str, cve_rows: List[tuple], summary_rows: List[tuple]):
+    years = sorted({int(row[1]) for row in chain(cve_rows, summary_rows)})
+    connection = DATABASE.connection
+    with connection:  # one transaction: commits or rolls back all changes of the feed
+        for table in CVE_TABLES:
+            connection.executemany(QUERIES['delete_year'].format(table), [(year,) for year in years])
+        insert_in_batches(QUERIES['insert_cve'].format('cve_table'), set(cve_rows))
+        insert_in_batches(QUERIES['insert_summary'].format('summary_table'), set(summary_rows))
+        connection.execute(QUERIES['store_feed_hash'], (feed, feed_hash))
+
+
+def insert_in_batches(query: str, rows: Iterable[tuple], batch_size: int = BATCH_SIZE):
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        DATABASE.connection.executemany(query, batch)
 
 
 def setup_cve_summary_table(summary_list: List[CveSummaryEntry]) -> List[Tuple[str, ...]]:
@@ -217,18 +225,18 @@ class Choice(Enum):
         return str(self.value)
 
 
-def update_repository(extraction_path: str, choice: Choice):
+def update_repository(extraction_path: str, choice: Choice, workers: Optional[int] = None):
     if choice.cpe_was_chosen():
         update_cpe(extraction_path)
     if choice.cve_was_chosen():
-        update_cve_repository(extraction_path)
+        update_cve_repository(extraction_path, workers=workers)
 
 
-def init_repository(extraction_path: str, choice: Choice, years: namedtuple):
+def init_repository(extraction_path: str, choice: Choice, years: namedtuple, workers: Optional[int] = None):
     if choice.cpe_was_chosen():
         import_cpe(cpe_extract_path=extraction_path)
     if choice.cve_was_chosen():
-        import_cve(cve_extract_path=extraction_path, years=years)
+        import_cve(cve_extract_path=extraction_path, years=years, workers=workers)
 
 
 def setup_argparser():
@@ -259,6 +267,12 @@ def setup_argparser():
         type=str,
         default='./data_source/'
     )
+    parser.add_argument(
+        '--workers', '-w',
+        help='Number of processes parsing the CVE feeds. Default: number of CPUs',
+        type=int,
+        default=None
+    )
     return parser.parse_args()
 
 
@@ -282,9 +296,9 @@ def main():
 
     try:
         if args.update:
-            update_repository(extraction_path, args.target)
+            update_repository(extraction_path, args.target, workers=args.workers)
         else:
-            init_repository(extraction_path, args.target, years=years)
+            init_repository(extraction_path, args.target, years=years, workers=args.workers)
     except CveLookupException as exception:
         logging.error(exception.message)
         if not args.update and Path(DB_PATH).is_file():
@@ -1,10 +1,12 @@
+import os
 import sys
+from multiprocessing import Manager
 from os import remove
 from pathlib import Path
 
 import pytest
 
-from test.common_helper import TEST_FW, get_config_for_testing
+from test.common_helper import TEST_FW, create_test_file_object, get_config_for_testing
 
 try:
     from ..code import cve_lookup as lookup
@@ -317,3 +319,76 @@ def test_build_version_string(version: str, version_start_including: str, versio
 ])
 def test_create_summary(cve_results_dict, expected_output, stub_plugin):
     assert stub_plugin._create_summary(cve_results_dict) == expected_output  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize('max_distance', [0, 3])
+def test_cpe_index_match(monkeypatch, max_distance):
+    with monkeypatch.context() as monkey:
+        monkey.setattr(DatabaseInterface, 'fetch_multiple', lambda *_, **__: CPE_DATABASE_OUTPUT)
+        monkey.setattr(lookup, 'MAX_LEVENSHTEIN_DISTANCE', max_distance)
+        index = lookup.CpeIndex(DatabaseInterface)
+        assert len(index) == len(CPE_DATABASE_OUTPUT)
+        assert sorted(index.match(PRODUCT_SEARCH_TERMS)) == sorted(lookup.match_cpe(DatabaseInterface, PRODUCT_SEARCH_TERMS))
+
+
+def test_vulnerability_lookup_cache(monkeypatch, tmp_path):
+    db_path = tmp_path / 'test.db'
+    db_path.write_bytes(b'')
+    calls = []
+
+    def look_up_vulnerabilities(product_name, requested_version, **_):
+        calls.append((product_name, requested_version))
+        return {'CVE-1234-0001': {'score2': '5.0', 'score3': '7.0'}}
+
+    monkeypatch.setattr(lookup, 'CpeIndex', lambda _: None)
+    monkeypatch.setattr(lookup, 'look_up_vulnerabilities', look_up_vulnerabilities)
+    vulnerability_lookup = lookup.VulnerabilityLookup(db_path=str(db_path))
+
+    result = vulnerability_lookup.look_up('OpenSSL', '1.0.2k')
+    result['CVE-1234-0001']['score2'] = 'N/A'
+    assert vulnerability_lookup.look_up('OpenSSL', '1.0.2k') == {'CVE-1234-0001': {'score2': '5.0', 'score3': '7.0'}}
+    vulnerability_lookup.look_up('BusyBox', '1.24.1')
+    assert calls == [('OpenSSL', '1.0.2k'), ('BusyBox', '1.24.1')]
+    assert vulnerability_lookup.get_cache_info().hits == 1
+
+    db_path.write_bytes(b'updated')  # the cache is invalidated when the database changes
+    vulnerability_lookup.look_up('OpenSSL', '1.0.2k')
+    assert len(calls) == 3
+
+
+def test_index_and_cache_are_kept_between_files(test_config, monkeypatch):
+    class DatabaseInterfaceStub:
+        def __init__(self, *_):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_):
+            pass
+
+    manager = Manager()
+    index_builds, look_ups = manager.list(), manager.list()  # PIDs of the analysis processes
+
+    def look_up_vulnerabilities(*_, **__):
+        look_ups.append(os.getpid())
+        return {'CVE-1234-0001': {'score2': '5.0', 'score3': '7.0'}}
+
+    monkeypatch.setattr('plugins.base.BasePlugin._sync_view', lambda self, plugin_path: None)
+    monkeypatch.setattr(lookup, 'DatabaseInterface', DatabaseInterfaceStub)
+    monkeypatch.setattr(lookup, 'CpeIndex', lambda _: index_builds.append(os.getpid()))
+    monkeypatch.setattr(lookup, 'look_up_vulnerabilities', look_up_vulnerabilities)
+    plugin = lookup.AnalysisPlugin(MockAdmin(), test_config)
+    try:
+        for _ in range(2):
+            file_object = create_test_file_object()
+            file_object.processed_analysis['software_components'] = {'summary': ['OpenSSL 1.0.2k']}
+            plugin.in_queue.put(file_object)
+            assert 'OpenSSL 1.0.2k' in plugin.out_queue.get(timeout=10).processed_analysis[plugin.NAME]['cve_results']
+    finally:
+        plugin.shutdown()
+        index_builds, look_ups = list(index_builds), list(look_ups)
+        manager.shutdown()
+
+    assert len(index_builds) == 1, 'the CPE index should only be built once'
+    assert len(look_ups) == 1, 'the second lookup should be answered by the cache'
@@ -10,9 +10,7 @@ import pytest
 TEST_DB_PATH = 'test.db'
 TEST_QUERIES = {
     'test_create': 'CREATE TABLE IF NOT EXISTS {} (x INTEGER)',
-    'test_create_update': 'CREATE TABLE IF NOT EXISTS {} (cve_id TEXT NOT NULL, year INTEGER NOT NULL)',
     'test_insert': 'INSERT INTO {} (x) VALUES (?)',
-    'test_insert_cve_id': 'INSERT INTO {} (cve_id, year) VALUES (?, ?)'
 }
 
 try:
@@ -1,3 +1,4 @@
+import json
 import sys
 from collections import namedtuple
 from contextlib import suppress
@@ -144,53 +145,6 @@ EXPECTED_UPDATED_SUMMARY_TABLE = [
      'N/A', 'N/A')
 ]
 
-EXPECTED_GET_CVE_FEEDS_UPDATE_CONTENT = [
-    CveEntry(
-        cve_id='CVE-2012-0001',
-        impact={'cvssV2': 9.3},
-        cpe_list=[
-            ('cpe:2.3:o:microsoft:windows_xp:*:sp2:professional_x64:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:r2:*:itanium:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:r2:*:x64:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2003:*:sp2:*:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:-:sp2:itanium:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_7:-:*:*:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_7:-:sp1:x64:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:r2:sp1:itanium:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_vista:*:sp2:x64:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_7:-:sp1:x86:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:r2:sp1:x64:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_vista:*:sp2:*:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:*:sp2:x64:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:o:microsoft:windows_server_2008:*:sp2:x32:*:*:*:*:*', '', '', '', '')
-        ]
-    ),
-    CveEntry(
-        cve_id='CVE-2018-0010',
-        impact={'cvssV2': 4.3},
-        cpe_list=[
-            ('cpe:2.3:a:microsoft:ie:6:*:*:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:a:microsoft:ie:8:*:*:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:a:microsoft:ie:9:*:*:*:*:*:*:*', '', '', '', ''),
-            ('cpe:2.3:a:microsoft:ie:7:*:*:*:*:*:*:*', '', '', '', '')
-        ]
-    )
-]
-
-EXPECTED_GET_CVE_SUMMARY_UPDATE_CONTENT = [
-    CveSummaryEntry(
-        'CVE-2018-20229',
-        'GitLab Community and Enterprise Edition before 11.3.14, 11.4.x before 11.4.12, and 11.5.x before 11.5.5 '
-        'allows Directory Traversal.',
-        {}
-    ),
-    CveSummaryEntry(
-        'CVE-2018-8825',
-        'Google TensorFlow 1.7 and below is affected by: Buffer Overflow. The impact is: execute arbitrary code (local).',
-        {}
-    )
-]
-
 # contain input and expected results of the setup_cve_format function
 CVE_LIST = [
     CveEntry('CVE-2012-0001', {}, [
@@ -259,11 +213,6 @@ def setup():
         db.insert_rows(query=QUERIES['insert_cve'].format('cve_table'), input_data=cve_base)
         db.insert_rows(query=QUERIES['insert_summary'].format('summary_table'), input_data=summary_base)
 
-        db.execute_query(query=TEST_QUERIES['test_create_update'].format('outdated'))
-        db.execute_query(query=TEST_QUERIES['test_create_update'].format('new'))
-        db.insert_rows(query=TEST_QUERIES['test_insert_cve_id'].format('outdated'), input_data=[('CVE-2018-0001', 2018), ('CVE-2018-0002', 2018)])
-        db.insert_rows(query=TEST_QUERIES['test_insert_cve_id'].format('new'), input_data=[('CVE-2018-0002', 2018), ('CVE-2018-0003', 2018)])
-
     yield
 
     with suppress(OSError):
@@ -293,16 +242,6 @@ def test_exists(monkeypatch):
         assert EXISTS_OUTPUT[1] == sr.table_exists(table_name='')
 
 
-def test_extract_relevant_feeds():
-    sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_update.db')
-    assert [('CVE-2018-0002', 2018), ('CVE-2018-0003', 2018)] == sorted(sr.extract_relevant_feeds(from_table='new', where_table='outdated'))
-
-
-def test_delete_outdated_feeds():
-    sr.delete_outdated_feeds(delete_outdated_from='outdated', use_for_selection='new')
-    assert sr.DATABASE.fetch_one(query=QUERIES['select_all'].format('outdated'))[0] == 'CVE-2018-0001'
-
-
 def test_create():
     sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_import.db')
     sr.create(query='test_create', table_name='test')
@@ -358,105 +297,81 @@ def test_get_cpe_content(monkeypatch):
         sr.get_cpe_content('.')
 
 
-def test_init_cve_feeds_table():
-    sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_import.db')
-    expected = [
-        ('CVE-2012-0001', 2012, 'cpe:2.3:a:1000guess:1000_guess:-:*:*:*:*:*:*:*', 'N/A', 'N/A', 'a', '1000guess',
-         '1000_guess', 'N/A', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', '', '', '', ''),
-        ('CVE-2012-0001', 2012, 'cpe:2.3:a:1024cms:1024_cms:0.7:*:*:*:*:*:*:*', 'N/A', 'N/A', 'a', '1024cms',
-         '1024_cms', '0\\.7', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', '', '', '', ''),
-        ('CVE-2012-0001', 2012, 'cpe:2.3:a:1024cms:1024_cms:1.2.5:*:*:*:*:*:*:*', 'N/A', 'N/A', 'a', '1024cms',
-         '1024_cms', '1\\.2\\.5', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', '', '', '', ''),
-        ('CVE-2012-0001', 2012, 'cpe:2.3:a:\\$0.99_kindle_bo\\:oks_project:\\$0.99_kindle_books:6:*:*:*:*:android:*:*',
-         'N/A', 'N/A', 'a', '\\$0\\.99_kindle_bo\\:oks_project', '\\$0\\.99_kindle_books', '6', 'ANY', 'ANY',
-         'ANY', 'ANY', 'android', 'ANY', 'ANY', '', '', '', ''),
-        ('CVE-2012-0002', 2012, 'cpe:2.3:a:1024cms:1024_cms:1.3.1:*:*:*:*:*:*:*', '5.3', 'N/A', 'a', '1024cms',
-         '1024_cms', '1\\.3\\.1', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', 'ANY', '', '', '', '')
-    ]
-    sr.init_cve_feeds_table(CVE_LIST, 'test_cve')
-    assert sr.DATABASE.fetch_one(QUERIES['exist'].format('test_cve'))[0] == 'test_cve'
-    db_cve = sorted(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('test_cve')))
-    assert len(db_cve) == 5
-    assert db_cve == expected
-
-
-def test_init_summaries_table():
-    sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_import.db')
-    sr.init_cve_summaries_table(EXPECTED_GET_CVE_SUMMARY_UPDATE_CONTENT, 'test_summary')
-    assert sr.DATABASE.fetch_one(QUERIES['exist'].format('test_summary'))[0] == 'test_summary'
-    db_summary = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('test_summary')))
-    db_summary.sort()
-    EXPECTED_SUM_OUTPUT.sort()
-    assert db_summary == EXPECTED_SUM_OUTPUT
+def test_get_years_from_database():
+    sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_update.db')
+    assert sorted(sr.get_years_from_database()) == [2012, 2018]
 
 
-def test_get_cve_import_content(monkeypatch):
+def test_import_cve(monkeypatch):
     with monkeypatch.context() as monkey:
+        sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_import.db')
         monkey.setattr(sr, 'glob', lambda *_, **__: [PATH_TO_TEST + EXTRACT_CVE_JSON])
-        feeds, summary = sr.get_cve_import_content('', [2003])
-        assert len(feeds) == len(EXPECTED_GET_CVE_FEEDS_UPDATE_CONTENT)
-        for item, expected in zip(feeds, EXPECTED_GET_CVE_FEEDS_UPDATE_CONTENT):
-            assert item.cve_id == expected.cve_id
-            assert item.impact == expected.impact
-            assert sorted(item.cpe_list) == sorted(expected.cpe_list)
-        assert summary == EXPECTED_GET_CVE_SUMMARY_UPDATE_CONTENT
+        sr.import_cve(cve_extract_path='', years=YEARS)
+        actual_cve_output = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('cve_table')))
+        actual_summary_output = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('summary_table')))
+        assert sorted(actual_cve_output) == sorted(EXPECTED_CVE_OUTPUT)
+        assert sorted(actual_summary_output) == sorted(EXPECTED_SUM_OUTPUT)
 
 
-def test_get_cve_update_content(monkeypatch):
-    with monkeypatch.context() as monkey:
-        monkey.setattr(sr, 'glob', lambda *_, **__: [PATH_TO_TEST + EXTRACT_CVE_JSON])
-        feeds, summary = sr.get_cve_update_content('')
-        for item, expected in zip(feeds, EXPECTED_GET_CVE_FEEDS_UPDATE_CONTENT):
-            assert item.cve_id == expected.cve_id
-            assert item.impact == expected.impact
-            assert sorted(item.cpe_list) == sorted(expected.cpe_list)
-        assert EXPECTED_GET_CVE_SUMMARY_UPDATE_CONTENT == summary
+def _write_yearly_feeds(source: str, target_dir: Path, years: list):
+    feed = json.loads(Path(PATH_TO_TEST, source).read_text())
+    for year in years:
+        items = [item for item in feed['CVE_Items'] if item['cve']['CVE_data_meta']['ID'].split('-')[1] == str(year)]
+        (target_dir / f'nvdcve-1.1-{year}.json').write_text(json.dumps({**feed, 'CVE_Items': items}))
 
-    with pytest.raises(Exception):
-        sr.get_cve_update_content('.')
 
+@pytest.fixture(scope='function')
+def feed_dir(tmp_path):
+    feed_path = tmp_path / 'feeds'
+    feed_path.mkdir()
+    _write_yearly_feeds(EXTRACT_CVE_JSON, feed_path, [2012, 2018])
+    return feed_path
 
-def test_update_cve_repository(monkeypatch):
-    with monkeypatch.context() as monkey:
-        sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_update.db')
-        monkey.setattr(sr, 'glob', lambda *_, **__: [PATH_TO_TEST + UPDATE_CVE_JSON])
-        sr.update_cve_repository(cve_extract_path='')
-        actual_cve_update = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('cve_table')))
-        actual_summary_update = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('summary_table')))
-        assert sorted(actual_cve_update) == sorted(EXPECTED_UPDATED_CVE_TABLE)
-        assert sorted(actual_summary_update) == sorted(EXPECTED_UPDATED_SUMMARY_TABLE)
-        sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_output.db')
 
-        with pytest.raises(CveLookupException) as exception:
-            sr.update_cve_repository('.')
-            assert 'CVE tables do not exist!' in exception.message
-        sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_update.db')
+@pytest.fixture(scope='function')
+def feed_db(tmp_path, monkeypatch):
+    database = DatabaseInterface(str(tmp_path / 'feeds.db'))
+    monkeypatch.setattr(sr, 'DATABASE', database)
+    yield database
+    database.connection.close()
 
 
-def test_update_cve_feeds():
-    db_cve = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('cve_table')))
-    assert sorted(db_cve) == sorted(EXPECTED_UPDATED_CVE_TABLE)
+def _get_table(database: DatabaseInterface, table_name: str) -> list:
+    return sorted(database.fetch_multiple(QUERIES['select_all'].format(table_name)))
 
 
-def test_update_cve_summaries():
-    db_summary = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('summary_table')))
-    assert sorted(db_summary) == sorted(EXPECTED_UPDATED_SUMMARY_TABLE)
+def test_import_cve_feeds(feed_dir, feed_db):
+    assert sr.import_cve_feeds(sr.get_cve_json_files(f'{feed_dir}/'), workers=2) == ['nvdcve-1.1-2012.json', 'nvdcve-1.1-2018.json']
+    assert _get_table(feed_db, 'cve_table') == sorted(EXPECTED_CVE_OUTPUT)
+    assert _get_table(feed_db, 'summary_table') == sorted(EXPECTED_SUM_OUTPUT)
+    indexes = {name for (name,) in feed_db.fetch_multiple('SELECT name FROM sqlite_master WHERE type = \'index\'')}
+    assert {'cve_table_year', 'summary_table_year'}.issubset(indexes)
 
 
-def test_get_years_from_database():
-    sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_update.db')
-    assert sr.get_years_from_database() == [2018]
+def test_import_cve_feeds_only_changed_feeds(feed_dir, feed_db):
+    feed_files = sr.get_cve_json_files(f'{feed_dir}/')
+    sr.import_cve_feeds(feed_files, workers=1)
+    assert sr.import_cve_feeds(feed_files) == []
 
+    _write_yearly_feeds(UPDATE_CVE_JSON, feed_dir, [2018])
+    assert sr.import_cve_feeds(feed_files) == ['nvdcve-1.1-2018.json']
+    unchanged_rows = [row for row in EXPECTED_CVE_OUTPUT if row[1] == 2012]
+    assert _get_table(feed_db, 'cve_table') == sorted(unchanged_rows + EXPECTED_UPDATED_CVE_TABLE)
+    assert _get_table(feed_db, 'summary_table') == sorted(row for row in EXPECTED_UPDATED_SUMMARY_TABLE if row[1] == 2018)
 
-def test_import_cve(monkeypatch):
-    with monkeypatch.context() as monkey:
-        sr.DATABASE = sr.DatabaseInterface(PATH_TO_TEST + 'test_import.db')
-        monkey.setattr(sr, 'glob', lambda *_, **__: [PATH_TO_TEST + EXTRACT_CVE_JSON])
-        sr.import_cve(cve_extract_path='', years=YEARS)
-        actual_cve_output = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('cve_table')))
-        actual_summary_output = list(sr.DATABASE.fetch_multiple(QUERIES['select_all'].format('summary_table')))
-        assert sorted(actual_cve_output) == sorted(EXPECTED_CVE_OUTPUT)
-        assert sorted(actual_summary_output) == sorted(EXPECTED_SUM_OUTPUT)
+
+def test_update_cve_repository(feed_dir, feed_db, monkeypatch):
+    with pytest.raises(CveLookupException, match='CVE tables do not exist'):
+        sr.update_cve_repository(f'{feed_dir}/')
+
+    sr.import_cve_feeds(sr.get_cve_json_files(f'{feed_dir}/'))
+    downloaded_years = []
+    monkeypatch.setattr(sr.dp, 'download_cve', lambda _, years: downloaded_years.extend(years))
+    _write_yearly_feeds(UPDATE_CVE_JSON, feed_dir, [2018, 2019])
+    sr.update_cve_repository(f'{feed_dir}/')
+    assert sorted(downloaded_years) == list(range(2012, sr.CURRENT_YEAR + 1))
+    assert [row for row in _get_table(feed_db, 'cve_table') if row[1] == 2018] == sorted(EXPECTED_UPDATED_CVE_TABLE)
+    assert 2019 in sr.get_years_from_database(), 'feed of a new year should be imported'
 
 
 @pytest.mark.parametrize('path, choice, years, expected', [
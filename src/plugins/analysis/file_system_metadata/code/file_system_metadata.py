@@ -31,6 +31,7 @@ class AnalysisPlugin(AnalysisBasePlugin):
     DEPENDENCIES = ['file_type']
     DESCRIPTION = 'extract file system metadata (e.g. owner, group, etc.) from file system images contained in firmware'
     VERSION = '0.2.1'
+    PERSISTENT_WORKERS = True  # the database client is only created once per worker (see `MongoClientPool`)
     timeout = 600
 
     ARCHIVE_MIME_TYPES = [
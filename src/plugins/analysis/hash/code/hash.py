@@ -34,17 +34,18 @@ class AnalysisPlugin(AnalysisBasePlugin):
         If you want to propagate results to parent objects store a list of strings 'summary' entry of your result dict
         '''
         file_object.processed_analysis[self.NAME] = {}
+        binary = file_object.mapped_binary  # the file is hashed without reading it into memory
         for hash_ in self.hashes_to_create:
             if hash_ in algorithms_available:
-                file_object.processed_analysis[self.NAME][hash_] = get_hash(hash_, file_object.binary)
+                file_object.processed_analysis[self.NAME][hash_] = get_hash(hash_, binary)
             else:
                 logging.debug(f'algorithm {hash_} not available')
-        file_object.processed_analysis[self.NAME]['ssdeep'] = get_ssdeep(file_object.binary)
+        file_object.processed_analysis[self.NAME]['ssdeep'] = get_ssdeep(binary)
         file_object.processed_analysis[self.NAME]['imphash'] = get_imphash(file_object)
 
-        tlsh_hash = get_tlsh(file_object.binary)
+        tlsh_hash = get_tlsh(binary)
         if tlsh_hash:
-            file_object.processed_analysis[self.NAME]['tlsh'] = get_tlsh(file_object.binary)
+            file_object.processed_analysis[self.NAME]['tlsh'] = tlsh_hash
 
         return file_object
 
@@ -3,10 +3,8 @@ import logging
 import sys
 from pathlib import Path
 
-from docker.types import Mount
-
 from analysis.PluginBase import AnalysisBasePlugin
-from helperFunctions.docker import run_docker_container
+from helperFunctions.container_pool import get_container_pool, shutdown_container_pool
 from storage.fsorganizer import FSOrganizer
 
 try:
@@ -15,6 +13,8 @@ except ImportError:
     sys.path.append(str(Path(__file__).parent.parent))
     from internal import linters
 
+LINGUIST_IMAGE = 'crazymax/linguist'
+
 
 class AnalysisPlugin(AnalysisBasePlugin):
     '''
@@ -31,6 +31,7 @@ class AnalysisPlugin(AnalysisBasePlugin):
     DEPENDENCIES = ['file_type']
     VERSION = '0.6'
     MIME_WHITELIST = ['text/']
+    CONTAINER_IMAGES = [LINGUIST_IMAGE, linters.ESLINT_IMAGE, linters.PHPSTAN_IMAGE]
     # All linter methods must return an array of dicts.
     # These dicts must at least contain a value for the 'symbol' key.
     linter_impls = {
@@ -45,8 +46,20 @@ class AnalysisPlugin(AnalysisBasePlugin):
     def __init__(self, plugin_administrator, config=None, recursive=True, offline_testing=False):
         self.config = config
         self._fs_organizer = FSOrganizer(config)
+        # the container pools are shared by the analysis processes and must be created before they are started
+        for image in self.CONTAINER_IMAGES:
+            get_container_pool(
+                image,
+                size=config.getint(self.NAME, 'threads', fallback=1),
+                base_dir=config.get('data_storage', 'docker-mount-base-dir', fallback=None),
+            )
         super().__init__(plugin_administrator, config=config, plugin_path=__file__, recursive=recursive, offline_testing=offline_testing)
 
+    def shutdown(self):
+        super().shutdown()
+        for image in self.CONTAINER_IMAGES:
+            shutdown_container_pool(image)
+
     def process_object(self, file_object):
         '''
         After only receiving text files thanks to the whitelist, we try to detect the correct scripting language
@@ -75,23 +88,20 @@ class AnalysisPlugin(AnalysisBasePlugin):
 
     def _get_script_type(self, file_object):
         host_path = self._fs_organizer.generate_path_from_uid(file_object.uid)
-        container_path = f'/repo/{file_object.file_name}'
-        result = run_docker_container(
-            'crazymax/linguist',
+        file_name = Path(file_object.file_name).name  # linguist also uses the file name to detect the language
+        result = get_container_pool(LINGUIST_IMAGE).run(
+            ['--json', file_name],
+            input_files={file_name: host_path},
             combine_stderr_stdout=True,
             timeout=60,
-            command=f'--json {container_path}',
-            mounts=[
-                Mount(container_path, host_path, type='bind'),
-            ],
             logging_label=self.NAME,
         )
         output_json = json.loads(result.stdout)
 
         # FIXME plugins should not set the output for other plugins
         # But due to performance reasons we don't want the filetype plugin to run linguist
-        file_object.processed_analysis['file_type']['linguist'] = ''.join([f'{k:<10} {str(v):<10}\n' for k, v in output_json[container_path].items()])
+        file_object.processed_analysis['file_type']['linguist'] = ''.join([f'{k:<10} {str(v):<10}\n' for k, v in output_json[file_name].items()])
 
-        script_type = output_json[container_path].get('language')
+        script_type = output_json[file_name].get('language')
 
         return script_type
@@ -6,22 +6,20 @@ from pathlib import Path
 from subprocess import DEVNULL, PIPE
 
 from common_helper_process import execute_shell_command, execute_shell_command_get_return_code
-from docker.types import Mount
 
-from helperFunctions.docker import run_docker_container
+from helperFunctions.container_pool import get_container_pool
+
+ESLINT_IMAGE = 'cytopia/eslint'
+PHPSTAN_IMAGE = 'ghcr.io/phpstan/phpstan'
 
 
 def run_eslint(file_path):
     eslintrc_path = Path(__file__).parent / 'config/eslintrc.js'
 
-    result = run_docker_container(
-        'cytopia/eslint',
+    result = get_container_pool(ESLINT_IMAGE).run(
+        ['-c', 'eslintrc.js', '--format', 'json', 'input.js'],
+        input_files={'eslintrc.js': str(eslintrc_path), 'input.js': str(file_path)},
         combine_stderr_stdout=False,
-        mounts=[
-            Mount('/eslintrc.js', str(eslintrc_path), type='bind', read_only=True),
-            Mount('/input.js', str(file_path), type='bind', read_only=True),
-        ],
-        command='-c /eslintrc.js --format json /input.js',
     )
 
     output_json = json.loads(result.stdout)
@@ -153,20 +151,18 @@ def run_rubocop(file_path):
 
 
 def run_phpstan(file_path):
-    container_path = '/app/input.php'
-    phpstan_p = run_docker_container(
-        'ghcr.io/phpstan/phpstan',
+    phpstan_p = get_container_pool(PHPSTAN_IMAGE).run(
+        ['analyse', '--error-format=json', '--', 'input.php'],
+        input_files={'input.php': str(file_path)},
         combine_stderr_stdout=False,
-        mounts=[
-            Mount(container_path, file_path, type='bind', read_only=True),
-        ],
-        command='analyse --error-format=json -- input.php',
     )
 
     linter_output = json.loads(phpstan_p.stdout)
 
     issues = []
-    for message in linter_output['files'][container_path]['messages']:
+    # the result contains only input.php, whose path depends on the working directory of the job
+    messages = [message for file_result in (linter_output['files'] or {}).values() for message in file_result['messages']]
+    for message in messages:
         issues.append(
             {
                 'symbol': 'error',  # phpstan errors do not have codes or names
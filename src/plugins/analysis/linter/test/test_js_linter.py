@@ -1,10 +1,11 @@
 from pathlib import Path
 from subprocess import CompletedProcess
+from types import SimpleNamespace
 
 from ..internal.linters import run_eslint
 
 
-def run_docker_container_stub(*_, **__):
+def run_in_container_stub(*_, **__):
     stdout = r'''[
     {
         "filePath": "test_file_path.js",
@@ -34,7 +35,7 @@ def run_docker_container_stub(*_, **__):
 
 
 def test_do_analysis(monkeypatch):
-    monkeypatch.setattr('plugins.analysis.linter.internal.linters.run_docker_container', run_docker_container_stub)
+    monkeypatch.setattr('plugins.analysis.linter.internal.linters.get_container_pool', lambda _: SimpleNamespace(run=run_in_container_stub))
     result = run_eslint('test_file_path.js')
     assert result
     assert len(result) == 1
@@ -1,5 +1,6 @@
 from pathlib import Path
 from subprocess import CompletedProcess
+from types import SimpleNamespace
 
 from ..internal.linters import run_phpstan
 
@@ -9,7 +10,7 @@ MOCK_RESPONSE = '''{
     "file_errors": 1
   },
   "files": {
-    "/app/input.php": {
+    "/fact-jobs/tmpnl2ad5p8/input.php": {
       "errors": 1,
       "messages": [
         {
@@ -26,12 +27,20 @@ MOCK_RESPONSE = '''{
 
 
 def test_do_analysis(monkeypatch):
-    monkeypatch.setattr('plugins.analysis.linter.internal.linters.run_docker_container', lambda *_, **__: CompletedProcess('args', 0, stdout=MOCK_RESPONSE))
+    container_pool_stub = SimpleNamespace(run=lambda *_, **__: CompletedProcess('args', 0, stdout=MOCK_RESPONSE))
+    monkeypatch.setattr('plugins.analysis.linter.internal.linters.get_container_pool', lambda _: container_pool_stub)
     result = run_phpstan('any/path')
 
     assert len(result) == 1
 
 
+def test_do_analysis_no_errors(monkeypatch):
+    container_pool_stub = SimpleNamespace(run=lambda *_, **__: CompletedProcess('args', 0, stdout='{"totals": {"errors": 0, "file_errors": 0}, "files": [], "errors": []}'))
+    monkeypatch.setattr('plugins.analysis.linter.internal.linters.get_container_pool', lambda _: container_pool_stub)
+
+    assert run_phpstan('any/path') == []
+
+
 def test_do_analysis_unmocked():
     hello_world_php = Path(__file__).parent / 'data/hello_world.php'
     result = run_phpstan(str(hello_world_php))
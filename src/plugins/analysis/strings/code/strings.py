@@ -1,6 +1,8 @@
 import re
-from typing import List, Pattern, Tuple
+from mmap import mmap
+from typing import List, Pattern, Tuple, Union
 
+from analysis.pattern_scanner import PatternScanner
 from analysis.PluginBase import AnalysisBasePlugin
 from plugins.mime_blacklists import MIME_BLACKLIST_COMPRESSED
 
@@ -28,6 +30,9 @@ class AnalysisPlugin(AnalysisBasePlugin):
         '''
         self.config = config
         self.regexes = self._compile_regexes()
+        self.scanner = PatternScanner()
+        for regex, encoding in self.regexes:
+            self.scanner.add_pattern(encoding, regex)
         super().__init__(plugin_administrator, config=config, recursive=recursive, plugin_path=plugin_path)
 
     def _compile_regexes(self) -> List[Tuple[Pattern[bytes], str]]:
@@ -45,26 +50,20 @@ class AnalysisPlugin(AnalysisBasePlugin):
         return min_length
 
     def process_object(self, file_object):
-        strings, offsets = self._find_all_strings_and_offsets(file_object.binary)
+        strings, offsets = self._find_all_strings_and_offsets(file_object.mapped_binary)
         file_object.processed_analysis[self.NAME] = {
             'strings': strings,
             'offsets': offsets
         }
         return file_object
 
-    def _find_all_strings_and_offsets(self, source: bytes) -> Tuple[List[str], List[Tuple[int, str]]]:
+    def _find_all_strings_and_offsets(self, source: Union[bytes, mmap]) -> Tuple[List[str], List[Tuple[int, str]]]:
         strings_with_offset = []
-        for regex, encoding in self.regexes:
-            strings_with_offset.extend(self._match_with_offset(regex, source, encoding))
+        matches = self.scanner.scan(source)
+        for _, encoding in self.regexes:
+            strings_with_offset.extend((offset, string.decode(encoding)) for offset, string in matches[encoding])
         return self._get_list_of_unique_strings(strings_with_offset), strings_with_offset
 
-    @staticmethod
-    def _match_with_offset(regex: Pattern[bytes], source: bytes, encoding: str = 'utf-8') -> List[Tuple[int, str]]:
-        return [
-            (match.start(), match.group().decode(encoding))
-            for match in regex.finditer(source)
-        ]
-
     @staticmethod
     def _get_list_of_unique_strings(strings_with_offset: List[Tuple[int, str]]) -> List[str]:
         return sorted(list(set(tuple(zip(*strings_with_offset))[1]))) if strings_with_offset else []
@@ -1,43 +1,58 @@
-from itertools import chain
+import logging
 
 from analysis.PluginBase import AnalysisBasePlugin
 from helperFunctions.database import ConnectTo
-from helperFunctions.hash import get_tlsh_comparison
 from storage.db_interface_common import MongoInterfaceCommon
+from storage.tlsh_index import TlshIndex
+
+MAX_DISTANCE = 150
+UPDATE_OVERLAP = 10  # seconds; entries written concurrently may have a slightly older timestamp than the newest one
 
 
 class AnalysisPlugin(AnalysisBasePlugin):
     '''
     TLSH Plug-in
+
+    The hashes of all analyzed files are kept in an in-memory index (see `storage.tlsh_index`) which is updated with
+    the entries added to the TLSH index collection by the backend since the last analysis. The index lives in the
+    persistent analysis process of each worker (it would be rebuilt for every file otherwise).
     '''
     NAME = 'tlsh'
     DESCRIPTION = 'find files with similar tlsh and calculate similarity value'
     DEPENDENCIES = ['file_hashes']
     VERSION = '0.2'
+    PERSISTENT_WORKERS = True
 
     def __init__(self, plugin_administrator, config=None, recursive=True, offline_testing=False):
+        self.index = TlshIndex()
+        self.last_index_update = 0
         super().__init__(plugin_administrator, config=config, recursive=recursive, plugin_path=__file__, offline_testing=offline_testing)
 
     def process_object(self, file_object):
         comparisons_dict = {}
         if 'tlsh' in file_object.processed_analysis['file_hashes'].keys():
             with ConnectTo(TLSHInterface, self.config) as interface:
-                for file in interface.tlsh_query_all_objects():
-                    value = get_tlsh_comparison(file_object.processed_analysis['file_hashes']['tlsh'], file['processed_analysis']['file_hashes']['tlsh'])
-                    if value <= 150 and not file['_id'] == file_object.uid:
-                        comparisons_dict[file['_id']] = value
+                self._update_index(interface)
+            comparisons_dict = self.index.query(file_object.processed_analysis['file_hashes']['tlsh'], MAX_DISTANCE)
+            comparisons_dict.pop(file_object.uid, None)
 
         file_object.processed_analysis[self.NAME] = comparisons_dict
         return file_object
 
+    def _update_index(self, interface):
+        for entry in interface.get_tlsh_index_updates(since=self.last_index_update - UPDATE_OVERLAP):
+            self.last_index_update = max(self.last_index_update, entry['last_update'])
+            if not entry['tlsh']:  # file was deleted
+                self.index.remove(entry['_id'])
+                continue
+            try:
+                self.index.add(entry['_id'], entry['tlsh'])
+            except ValueError:
+                logging.warning(f'invalid TLSH hash of {entry["_id"]}: {entry["tlsh"]}')
+
 
 class TLSHInterface(MongoInterfaceCommon):
     READ_ONLY = True
 
-    def tlsh_query_all_objects(self):
-        fields = {'processed_analysis.file_hashes.tlsh': 1}
-
-        return chain(
-            self.file_objects.find({'processed_analysis.file_hashes.tlsh': {'$exists': True}}, fields),
-            self.firmwares.find({'processed_analysis.file_hashes.tlsh': {'$exists': True}}, fields)
-        )
+    def get_tlsh_index_updates(self, since: float):
+        return self.tlsh_index.find({'last_update': {'$gte': since}})
@@ -1,6 +1,9 @@
+import os
+from multiprocessing import Manager
+
 import pytest
 
-from plugins.analysis.tlsh.code.tlsh import AnalysisPlugin
+from plugins.analysis.tlsh.code.tlsh import UPDATE_OVERLAP, AnalysisPlugin
 from test.common_helper import create_test_file_object, get_config_for_testing
 
 HASH_0 = '9A355C07B5A614FDC5A2847046EF92B7693174A642327DBF3C88D6303F42E746B1ABE1'
@@ -20,8 +23,8 @@ class MockContext:
 
     def __enter__(self):
         class ControlledInterface:
-            def tlsh_query_all_objects(self):  # pylint: disable=no-self-use
-                return [{'processed_analysis': {'file_hashes': {'tlsh': HASH_1}}, '_id': '5'}, ]
+            def get_tlsh_index_updates(self, since):  # pylint: disable=no-self-use,unused-argument
+                return [{'_id': '5', 'tlsh': HASH_1, 'last_update': 1.0}, ]
 
         return ControlledInterface()
 
@@ -32,7 +35,7 @@ class MockContext:
 class EmptyContext(MockContext):
     def __enter__(self):
         class EmptyInterface:
-            def tlsh_query_all_objects(self):  # pylint: disable=no-self-use
+            def get_tlsh_index_updates(self, since):  # pylint: disable=no-self-use,unused-argument
                 return []
 
         return EmptyInterface()
@@ -95,7 +98,66 @@ def test_no_files_in_database(test_object, stub_plugin, monkeypatch):
     assert result.processed_analysis[stub_plugin.NAME] == {}
 
 
+def test_index_update(test_object, stub_plugin):
+    class UpdatingInterface:
+        def __init__(self):
+            self.updates = [
+                {'_id': '5', 'tlsh': HASH_1, 'last_update': 1.0},
+                {'_id': '6', 'tlsh': HASH_0, 'last_update': 2.0},
+                {'_id': '7', 'tlsh': 'invalid', 'last_update': 2.0},
+            ]
+            self.requested_since = []
+
+        def get_tlsh_index_updates(self, since):
+            self.requested_since.append(since)
+            return self.updates
+
+    interface = UpdatingInterface()
+    stub_plugin._update_index(interface)  # pylint: disable=protected-access
+    assert len(stub_plugin.index) == 2
+    assert stub_plugin.last_index_update == 2.0
+
+    interface.updates = [{'_id': '5', 'tlsh': None, 'last_update': 3.0}]  # file was deleted
+    stub_plugin._update_index(interface)  # pylint: disable=protected-access
+    assert '5' not in stub_plugin.index
+    assert interface.requested_since[1] == 2.0 - UPDATE_OVERLAP
+
+
 def test_file_hashes_not_run(test_object, stub_plugin):
     with pytest.raises(KeyError):
         test_object.processed_analysis.pop('file_hashes')
         stub_plugin.process_object(test_object)
+
+
+def test_index_is_kept_between_files(test_config, monkeypatch):
+    monkeypatch.setattr('plugins.base.BasePlugin._sync_view', lambda self, plugin_path: None)
+    manager = Manager()
+    requests = manager.list()  # PID of the analysis process and `since` of each index update
+
+    class RecordingContext(MockContext):
+        def __enter__(self):
+            class RecordingInterface:
+                def get_tlsh_index_updates(self, since):  # pylint: disable=no-self-use
+                    requests.append((os.getpid(), since))
+                    return [{'_id': '5', 'tlsh': HASH_1, 'last_update': 100.0}]
+
+            return RecordingInterface()
+
+    monkeypatch.setattr('plugins.analysis.tlsh.code.tlsh.ConnectTo', RecordingContext)
+    plugin = AnalysisPlugin(MockAdmin(), test_config)
+    try:
+        for _ in range(2):
+            file_object = create_test_file_object()
+            file_object.processed_analysis['file_hashes'] = {'tlsh': HASH_1}
+            plugin.in_queue.put(file_object)
+            assert plugin.out_queue.get(timeout=10).processed_analysis[plugin.NAME]['5'] == 0
+    finally:
+        plugin.shutdown()
+        recorded_requests = list(requests)
+        manager.shutdown()
+
+    assert len(recorded_requests) == 2
+    (first_pid, first_since), (second_pid, second_since) = recorded_requests
+    assert first_pid == second_pid, 'both files should be analyzed in the same (persistent) process'
+    assert first_since == -UPDATE_OVERLAP
+    assert second_since == 100.0 - UPDATE_OVERLAP, 'only updates since the first analysis should be requested'
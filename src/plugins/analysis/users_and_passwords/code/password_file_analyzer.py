@@ -1,19 +1,26 @@
 import logging
 import re
+import sys
 from base64 import b64decode
-from contextlib import suppress
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Callable, List
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List, Optional
 
-from common_helper_process import execute_shell_command
+from common_helper_process import execute_shell_command_get_return_code
 
+from analysis.pattern_scanner import PatternScanner
 from analysis.PluginBase import AnalysisBasePlugin
 from helperFunctions.fileSystem import get_src_dir
 from helperFunctions.tag import TagColor
 from objects.file import FileObject
 from plugins.mime_blacklists import MIME_BLACKLIST_NON_EXECUTABLE
 
+try:
+    from ..internal.cracking_cache import CrackingCache, CrackingResult
+except ImportError:
+    sys.path.append(str(Path(__file__).parent.parent / 'internal'))
+    from cracking_cache import CrackingCache, CrackingResult
+
 JOHN_PATH = Path(__file__).parent.parent / 'bin' / 'john'
 WORDLIST_PATH = Path(get_src_dir()) / 'bin' / 'passwords.txt'
 USER_NAME_REGEX = br'[a-zA-Z][a-zA-Z0-9_-]{2,15}'
@@ -26,7 +33,10 @@ HTPASSWD_REGEXES = [
     USER_NAME_REGEX + br':\$apr1\$[a-zA-Z0-9\./+=]+\$[a-zA-Z0-9\./+]{22}',  # MD5 apr1
     USER_NAME_REGEX + br':\{SHA\}[a-zA-Z0-9\./+]{27}=',  # SHA-1
 ]
+JOHN_SUMMARY_REGEX = re.compile(r'^(\d+) password hash(?:es)? cracked, (\d+) left$')
+JOHN_FAILED_ERROR = 'password cracking failed'
 MOSQUITTO_REGEXES = [br'[a-zA-Z][a-zA-Z0-9_-]{2,15}\:\$6\$[a-zA-Z0-9+/=]+\$[a-zA-Z0-9+/]{86}==']
+ENTRY_PREFIX_REGEX = USER_NAME_REGEX + b':'  # all entries start with a user name
 
 
 class AnalysisPlugin(AnalysisBasePlugin):
@@ -41,22 +51,27 @@ class AnalysisPlugin(AnalysisBasePlugin):
 
     def __init__(self, plugin_administrator, config=None, recursive=True):
         self.config = config
-        super().__init__(plugin_administrator, config=config, recursive=recursive, no_multithread=True, plugin_path=__file__)
+        self.scanner = PatternScanner()
+        for regex in UNIX_REGEXES + HTPASSWD_REGEXES + MOSQUITTO_REGEXES:
+            self.scanner.add_pattern(regex.decode(), regex, prefix=ENTRY_PREFIX_REGEX)
+        self.cracking_cache = CrackingCache(WORDLIST_PATH)  # the database is only opened when the cache is used
+        self.cracking_cache.get_wordlist_version()  # hash the wordlist once before the analysis processes are forked
+        super().__init__(plugin_administrator, config=config, recursive=recursive, plugin_path=__file__)
 
     def process_object(self, file_object: FileObject) -> FileObject:
         if self.NAME not in file_object.processed_analysis:
             file_object.processed_analysis[self.NAME] = {}
         file_object.processed_analysis[self.NAME]['summary'] = []
-        self.find_password_entries(file_object, UNIX_REGEXES, generate_unix_entry)
-        self.find_password_entries(file_object, HTPASSWD_REGEXES, generate_htpasswd_entry)
-        self.find_password_entries(file_object, MOSQUITTO_REGEXES, generate_mosquitto_entry)
+        matches = self.scanner.scan(file_object.mapped_binary)
+        self.find_password_entries(file_object, matches, UNIX_REGEXES, generate_unix_entry)
+        self.find_password_entries(file_object, matches, HTPASSWD_REGEXES, generate_htpasswd_entry)
+        self.find_password_entries(file_object, matches, MOSQUITTO_REGEXES, generate_mosquitto_entry)
         return file_object
 
-    def find_password_entries(self, file_object: FileObject, regex_list: List[bytes], entry_gen_function: Callable):
+    def find_password_entries(self, file_object: FileObject, matches: Dict[str, list], regex_list: List[bytes], entry_gen_function: Callable):
         for passwd_regex in regex_list:
-            passwd_entries = re.findall(passwd_regex, file_object.binary)
-            for entry in passwd_entries:
-                self.update_file_object(file_object, entry_gen_function(entry))
+            for _, entry in matches[passwd_regex.decode()]:
+                self.update_file_object(file_object, entry_gen_function(entry, cache=self.cracking_cache))
 
     def _add_found_password_tag(self, file_object: FileObject, result: dict):
         for password_entry in result:
@@ -77,30 +92,30 @@ class AnalysisPlugin(AnalysisBasePlugin):
         self._add_found_password_tag(file_object, result_entry)
 
 
-def generate_unix_entry(entry: bytes) -> dict:
+def generate_unix_entry(entry: bytes, cache: Optional[CrackingCache] = None) -> dict:
     user_name, pw_hash, *_ = entry.split(b':')
     result_entry = {'type': 'unix', 'entry': entry}
     try:
         if pw_hash.startswith(b'$') or _is_des_hash(pw_hash):
             result_entry['password-hash'] = pw_hash
-            result_entry['cracked'] = crack_hash(b':'.join((user_name, pw_hash)), result_entry)
+            result_entry['cracked'] = crack_hash(b':'.join((user_name, pw_hash)), result_entry, cache=cache)
     except (IndexError, AttributeError, TypeError):
         logging.warning(f'Unsupported password format: {entry}', exc_info=True)
     return {f'{user_name.decode(errors="replace")}:unix': result_entry}
 
 
-def generate_htpasswd_entry(entry: bytes) -> dict:
+def generate_htpasswd_entry(entry: bytes, cache: Optional[CrackingCache] = None) -> dict:
     user_name, pw_hash = entry.split(b':')
     result_entry = {'type': 'htpasswd', 'entry': entry, 'password-hash': pw_hash}
-    result_entry['cracked'] = crack_hash(b':'.join((user_name, pw_hash)), result_entry)
+    result_entry['cracked'] = crack_hash(b':'.join((user_name, pw_hash)), result_entry, cache=cache)
     return {f'{user_name.decode(errors="replace")}:htpasswd': result_entry}
 
 
-def generate_mosquitto_entry(entry: bytes) -> dict:
+def generate_mosquitto_entry(entry: bytes, cache: Optional[CrackingCache] = None) -> dict:
     user, _, _, salt_hash, passwd_hash, *_ = re.split(r'[:$]', entry.decode(errors='replace'))
     passwd_entry = f'{user}:$dynamic_82${b64decode(passwd_hash).hex()}$HEX${b64decode(salt_hash).hex()}'
     result_entry = {'type': 'mosquitto', 'entry': entry, 'password-hash': passwd_hash}
-    result_entry['cracked'] = crack_hash(passwd_entry.encode(), result_entry, '--format=dynamic_82')
+    result_entry['cracked'] = crack_hash(passwd_entry.encode(), result_entry, '--format=dynamic_82', cache=cache)
     return {f'{user}:mosquitto': result_entry}
 
 
@@ -108,18 +123,43 @@ def _is_des_hash(pw_hash: str) -> bool:
     return len(pw_hash) == 13
 
 
-def crack_hash(passwd_entry: bytes, result_entry: dict, format_term: str = '') -> bool:
-    with NamedTemporaryFile() as fp:
-        fp.write(passwd_entry)
-        fp.seek(0)
-        command = f'{JOHN_PATH} --wordlist={WORDLIST_PATH} {fp.name} {format_term}'
-        result_entry['log'] = execute_shell_command(command)
-        output = execute_shell_command(f'{JOHN_PATH} {fp.name} --show {format_term}').split('\n')
-    if len(output) > 1:
-        with suppress(KeyError):
-            if '0 password hashes cracked' in output[-2]:
-                result_entry['ERROR'] = 'hash type is not supported'
-                return False
-            result_entry['password'] = output[0].split(':')[1]
-            return True
-    return False
+def crack_hash(passwd_entry: bytes, result_entry: dict, format_term: str = '', cache: Optional[CrackingCache] = None) -> bool:
+    password_hash = passwd_entry.split(b':', 1)[1]
+    result = cache.get(password_hash, format_term) if cache is not None else None
+    if result is None:
+        result = _run_john(passwd_entry, format_term)
+        if cache is not None and result.error != JOHN_FAILED_ERROR:
+            cache.store(password_hash, format_term, result)
+    result_entry['log'] = result.log
+    if result.error is not None:
+        result_entry['ERROR'] = result.error
+    if result.password is not None:
+        result_entry['password'] = result.password
+    return result.cracked
+
+
+def _run_john(passwd_entry: bytes, format_term: str) -> CrackingResult:
+    # every call gets its own session so that multiple workers can run john at the same time
+    with TemporaryDirectory(prefix='fact_john_') as tmp_dir:
+        passwd_file = Path(tmp_dir) / 'passwd'
+        passwd_file.write_bytes(passwd_entry)
+        session = f'--session={Path(tmp_dir) / "session"}'
+        command = f'{JOHN_PATH} --wordlist={WORDLIST_PATH} {session} {passwd_file} {format_term}'
+        log, return_code = execute_shell_command_get_return_code(command)
+        output, show_return_code = execute_shell_command_get_return_code(f'{JOHN_PATH} {passwd_file} --show {format_term}')
+    return _parse_john_output(output.strip().split('\n'), log, return_code == 0 and show_return_code == 0)
+
+
+def _parse_john_output(output: List[str], log: str, john_succeeded: bool) -> CrackingResult:
+    summary = JOHN_SUMMARY_REGEX.match(output[-1])
+    if summary is None:
+        logging.warning(f'unexpected output of john: {output}')
+        return CrackingResult(False, None, JOHN_FAILED_ERROR, log)
+    cracked, left = (int(count) for count in summary.groups())
+    if cracked > 0 and len(output) > 1 and ':' in output[0]:
+        return CrackingResult(True, output[0].split(':')[1], None, log)
+    if cracked == 0 and left == 0:  # the hash was not loaded
+        return CrackingResult(False, None, 'hash type is not supported', log)
+    if not john_succeeded:  # "not cracked" is only a result if john tried all passwords of the wordlist
+        return CrackingResult(False, None, JOHN_FAILED_ERROR, log)
+    return CrackingResult(False, None, None, log)
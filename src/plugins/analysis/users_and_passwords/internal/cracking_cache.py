@@ -0,0 +1,108 @@
+'''
+Persistent cache of the results of John the Ripper, so that the same password hashes (which appear in many firmware
+images of the same vendor) are only cracked once.
+
+Cracked passwords stay valid. Hashes that could not be cracked are only considered to be uncrackable with the version
+of the wordlist they were tested with (i.e. they are cracked again once the wordlist changes). The cache is an SQLite
+database that may be used by multiple processes at once.
+'''
+import logging
+from contextlib import closing, contextmanager
+from hashlib import sha256
+from pathlib import Path
+from sqlite3 import Connection
+from sqlite3 import Error as SqliteException
+from sqlite3 import connect
+from typing import NamedTuple, Optional, Tuple
+
+DB_PATH = Path(__file__).parent / 'cracking_cache.db'
+DB_TIMEOUT = 60  # seconds; waiting time for locks held by other processes
+
+QUERIES = {
+    'create_table': (
+        'CREATE TABLE IF NOT EXISTS cracking_results (hash BLOB, format TEXT, wordlist TEXT, cracked INTEGER, '
+        'password TEXT, error TEXT, log TEXT, PRIMARY KEY (hash, format))'
+    ),
+    'get_result': 'SELECT wordlist, cracked, password, error, log FROM cracking_results WHERE hash = ? AND format = ?',
+    'store_result': 'INSERT OR REPLACE INTO cracking_results VALUES (?, ?, ?, ?, ?, ?, ?)',
+    'delete_outdated': 'DELETE FROM cracking_results WHERE cracked = 0 AND wordlist != ?',
+}
+
+
+class CrackingResult(NamedTuple):
+    cracked: bool
+    password: Optional[str]
+    error: Optional[str]
+    log: str
+
+
+class CrackingCache:
+    '''
+    Cache of `CrackingResult`s by password hash and hash format.
+
+    :param wordlist_path: The path of the wordlist used for cracking.
+    :param db_path: The path of the SQLite database.
+    '''
+
+    def __init__(self, wordlist_path: Path, db_path: Path = DB_PATH):
+        self.wordlist_path = wordlist_path
+        self.db_path = db_path
+        self._wordlist_stat = None  # type: Optional[Tuple[int, int]]
+        self._wordlist_version = None  # type: Optional[str]
+        self._initialized = False  # the database is created (and outdated entries are removed) on first use
+
+    def get(self, password_hash: bytes, format_term: str) -> Optional[CrackingResult]:
+        '''
+        Get the cached cracking result of a password hash.
+
+        :param password_hash: The password hash (without user name).
+        :param format_term: The format argument passed to John the Ripper.
+        :return: The result or `None` if the hash was not cracked yet (or not with the current wordlist).
+        '''
+        try:
+            with self._connect() as connection:
+                row = connection.execute(QUERIES['get_result'], (password_hash, format_term)).fetchone()
+        except SqliteException as error:
+            logging.warning(f'could not read from cracking cache: {error}')
+            return None
+        if row is None:
+            return None
+        wordlist, cracked, password, error, log = row
+        if not cracked and wordlist != self.get_wordlist_version():
+            return None
+        return CrackingResult(bool(cracked), password, error, log)
+
+    def store(self, password_hash: bytes, format_term: str, result: CrackingResult):
+        try:
+            with self._connect() as connection:
+                connection.execute(QUERIES['store_result'], (
+                    password_hash, format_term, self.get_wordlist_version(), int(result.cracked), result.password,
+                    result.error, result.log
+                ))
+        except SqliteException as error:
+            logging.warning(f'could not write to cracking cache: {error}')
+
+    def get_wordlist_version(self) -> str:
+        '''
+        Get the version of the wordlist (the SHA-256 hash of its contents, which is only computed again if size or
+        modification time of the file changed).
+        '''
+        try:
+            stat = self.wordlist_path.stat()
+        except FileNotFoundError:
+            return ''
+        if (stat.st_mtime_ns, stat.st_size) != self._wordlist_stat:
+            self._wordlist_version = sha256(self.wordlist_path.read_bytes()).hexdigest()
+            self._wordlist_stat = (stat.st_mtime_ns, stat.st_size)
+        return self._wordlist_version
+
+    @contextmanager
+    def _connect(self) -> Connection:
+        # connections are not shared, since the cache is used by (forked) worker processes
+        with closing(connect(str(self.db_path), timeout=DB_TIMEOUT)) as connection:
+            with connection:  # commits the transaction
+                if not self._initialized:
+                    connection.execute(QUERIES['create_table'])
+                    connection.execute(QUERIES['delete_outdated'], (self.get_wordlist_version(),))
+                    self._initialized = True
+                yield connection
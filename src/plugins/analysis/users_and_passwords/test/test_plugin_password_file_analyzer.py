@@ -1,9 +1,15 @@
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import pytest
 
 from objects.file import FileObject
 from test.unit.analysis.analysis_plugin_test_class import AnalysisPluginTest
 
-from ..code.password_file_analyzer import AnalysisPlugin, crack_hash
+from ..code import password_file_analyzer
+from ..code.password_file_analyzer import JOHN_FAILED_ERROR, WORDLIST_PATH, AnalysisPlugin, _parse_john_output, crack_hash
+from ..internal.cracking_cache import CrackingCache, CrackingResult
 
 TEST_DATA_DIR = Path(__file__).parent / 'data'
 
@@ -16,6 +22,12 @@ class TestAnalysisPluginPasswordFileAnalyzer(AnalysisPluginTest):
         super().setUp()
         config = self.init_basic_config()
         self.analysis_plugin = AnalysisPlugin(self, config=config)
+        self.tmp_dir = TemporaryDirectory()
+        self.analysis_plugin.cracking_cache = CrackingCache(WORDLIST_PATH, db_path=Path(self.tmp_dir.name) / 'cache.db')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        super().tearDown()
 
     def test_process_object_shadow_file(self):
         test_file = FileObject(file_path=str(TEST_DATA_DIR / 'passwd_test'))
@@ -80,3 +92,85 @@ def test_crack_hash_success():
     assert crack_hash(passwd_entry.encode(), result_entry, '--format=dynamic_82') is True
     assert 'password' in result_entry
     assert result_entry['password'] == '123456'
+
+
+@pytest.fixture
+def wordlist(tmp_path):
+    wordlist_path = tmp_path / 'passwords.txt'
+    wordlist_path.write_text('123456\npassword\n')
+    return wordlist_path
+
+
+@pytest.fixture
+def cache(tmp_path, wordlist):
+    return CrackingCache(wordlist, db_path=tmp_path / 'cache.db')
+
+
+def test_cracking_cache_store_and_get(cache):
+    assert cache.get(b'$1$hash', '') is None
+    cache.store(b'$1$hash', '', CrackingResult(True, '123456', None, 'log'))
+    assert cache.get(b'$1$hash', '') == CrackingResult(True, '123456', None, 'log')
+    assert cache.get(b'$1$hash', '--format=dynamic_82') is None
+
+
+def test_cracking_cache_wordlist_change(tmp_path, cache, wordlist):
+    cache.store(b'cracked', '', CrackingResult(True, '123456', None, 'log'))
+    cache.store(b'not_cracked', '', CrackingResult(False, None, None, 'log'))
+    cache.store(b'unsupported', '', CrackingResult(False, None, 'hash type is not supported', 'log'))
+    assert cache.get(b'not_cracked', '') is not None
+
+    wordlist.write_text('123456\npassword\nsecret\n')
+    assert cache.get(b'cracked', '') is not None
+    assert cache.get(b'not_cracked', '') is None
+    assert cache.get(b'unsupported', '') is None
+
+    new_cache = CrackingCache(wordlist, db_path=tmp_path / 'cache.db')  # outdated entries are removed on start
+    assert new_cache.get(b'cracked', '') is not None
+    new_cache.store(b'not_cracked', '', CrackingResult(False, None, None, 'log'))
+    assert cache.get(b'not_cracked', '') is not None
+
+
+def test_crack_hash_uses_cache(cache):
+    with mock.patch.object(password_file_analyzer, '_run_john', return_value=CrackingResult(True, 'secret', None, 'log')) as run_john:
+        for _ in range(2):
+            result_entry = {}
+            assert crack_hash(b'user:$1$hash', result_entry, cache=cache) is True
+            assert result_entry == {'log': 'log', 'password': 'secret'}
+        assert run_john.call_count == 1
+
+        assert crack_hash(b'other_user:$1$hash', {}, cache=cache) is True  # the user name is not part of the key
+        assert run_john.call_count == 1
+
+
+def test_crack_hash_failed_run_is_not_cached(cache):
+    with mock.patch.object(password_file_analyzer, '_run_john', return_value=CrackingResult(False, None, JOHN_FAILED_ERROR, 'error')):
+        result_entry = {}
+        assert crack_hash(b'user:$1$hash', result_entry, cache=cache) is False
+        assert result_entry['ERROR'] == JOHN_FAILED_ERROR
+    assert cache.get(b'$1$hash', '') is None
+
+
+def test_crack_hash_not_cracked_is_cached(cache):
+    with mock.patch.object(password_file_analyzer, '_run_john', return_value=CrackingResult(False, None, None, 'log')):
+        assert crack_hash(b'user:$1$hash', {}, cache=cache) is False
+    assert cache.get(b'$1$hash', '') == CrackingResult(False, None, None, 'log')
+
+
+@pytest.mark.parametrize('output, john_succeeded, expected', [
+    (['user:123456', '', '1 password hash cracked, 0 left'], True, CrackingResult(True, '123456', None, 'log')),
+    (['user:123456', '', '1 password hash cracked, 0 left'], False, CrackingResult(True, '123456', None, 'log')),
+    (['0 password hashes cracked, 1 left'], True, CrackingResult(False, None, None, 'log')),
+    (['0 password hashes cracked, 1 left'], False, CrackingResult(False, None, JOHN_FAILED_ERROR, 'log')),
+    (['0 password hashes cracked, 0 left'], True, CrackingResult(False, None, 'hash type is not supported', 'log')),
+    (['/bin/sh: 1: /opt/john: not found'], False, CrackingResult(False, None, JOHN_FAILED_ERROR, 'log')),
+    ([''], True, CrackingResult(False, None, JOHN_FAILED_ERROR, 'log')),
+])
+def test_parse_john_output(output, john_succeeded, expected):
+    assert _parse_john_output(output, 'log', john_succeeded) == expected
+
+
+def test_cracking_cache_database_is_created_on_first_use(tmp_path, wordlist):
+    cache = CrackingCache(wordlist, db_path=tmp_path / 'cache.db')
+    assert not (tmp_path / 'cache.db').exists()
+    assert cache.get(b'$1$hash', '') is None
+    assert (tmp_path / 'cache.db').exists()
@@ -1,15 +1,20 @@
+import os
 from itertools import combinations
-from typing import Dict, List, Set, Tuple
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Set, Tuple
 
 import networkx
-import ssdeep
 
 from compare.PluginBase import CompareBasePlugin
 from helperFunctions.compare_sets import iter_element_and_rest, remove_duplicates_from_list
 from helperFunctions.data_conversion import convert_uid_list_to_compare_id
+from helperFunctions.ssdeep_similarity import find_similar_hashes
 from objects.file import FileObject
 
 
+MIN_FILES_PER_PROCESS = 500
+
+
 class ComparePlugin(CompareBasePlugin):
     '''
     Compares file coverage
@@ -21,6 +26,7 @@ class ComparePlugin(CompareBasePlugin):
     def __init__(self, plugin_administrator, config=None, db_interface=None, plugin_path=__file__):
         super().__init__(plugin_administrator, config=config, db_interface=db_interface, plugin_path=plugin_path)
         self.ssdeep_ignore_threshold = self.config.getint('ExpertSettings', 'ssdeep_ignore')
+        self.processes = self.config.getint('ExpertSettings', 'ssdeep_compare_processes', fallback=os.cpu_count())
 
     def compare_function(self, fo_list):
         compare_result = dict()
@@ -78,26 +84,33 @@ class ComparePlugin(CompareBasePlugin):
     # ---- SSDEEP similarity ---- #
 
     def _get_similar_files(self, fo_list: List[FileObject], exclusive_files: Dict[str, List[str]]) -> Tuple[List[list], dict]:
+        ssdeep_hashes = self.database.get_ssdeep_hashes({
+            uid for fo in fo_list for uid in [*exclusive_files[fo.uid], *fo.files_included]
+        })
         similar_files = []
         similarity = {}
         for parent_one, parent_two in combinations(fo_list, 2):
-            for file_one in exclusive_files[parent_one.uid]:
-                for similar_file_pair, value in self._find_similar_file_for(file_one, parent_one.uid, parent_two):
-                    similar_files.append(similar_file_pair)
-                    similarity[convert_uid_list_to_compare_id(similar_file_pair)] = value
+            hashes_one = _get_hashes(exclusive_files[parent_one.uid], ssdeep_hashes)
+            hashes_two = _get_hashes(parent_two.files_included, ssdeep_hashes)
+            for file_one, file_two, value in self._find_similar_files(hashes_one, hashes_two):
+                similar_file_pair = (self._get_similar_file_id(file_one, parent_one.uid), self._get_similar_file_id(file_two, parent_two.uid))
+                similar_files.append(similar_file_pair)
+                similarity[convert_uid_list_to_compare_id(similar_file_pair)] = value
         similarity_sets = generate_similarity_sets(remove_duplicates_from_list(similar_files))
         return similarity_sets, similarity
 
-    def _find_similar_file_for(self, file_uid: str, parent_uid: str, comparison_fo: FileObject):
-        hash_one = self.database.get_ssdeep_hash(file_uid)
-        if hash_one:
-            id1 = self._get_similar_file_id(file_uid, parent_uid)
-            for potential_match in comparison_fo.files_included:
-                id2 = self._get_similar_file_id(potential_match, comparison_fo.uid)
-                hash_two = self.database.get_ssdeep_hash(potential_match)
-                ssdeep_similarity = ssdeep.compare(hash_one, hash_two)
-                if hash_two and ssdeep_similarity > self.ssdeep_ignore_threshold:
-                    yield (id1, id2), ssdeep_similarity
+    def _find_similar_files(self, hashes_one: Dict[str, str], hashes_two: Dict[str, str]) -> List[Tuple[str, str, int]]:
+        '''
+        Find all pairs of files of `hashes_one` and `hashes_two` whose ssdeep similarity exceeds the ignore threshold.
+        Large inputs are split between multiple processes.
+        '''
+        processes = min(self.processes, len(hashes_one) // MIN_FILES_PER_PROCESS)
+        if processes <= 1 or not hashes_two:
+            return find_similar_hashes(hashes_one, hashes_two, self.ssdeep_ignore_threshold)
+        chunks = _split_dict(hashes_one, processes * 4)
+        with get_context('spawn').Pool(processes) as pool:
+            results = pool.starmap(find_similar_hashes, [(chunk, hashes_two, self.ssdeep_ignore_threshold) for chunk in chunks])
+        return [match for result in results for match in result]
 
     def combine_similarity_results(self, similar_files: List[List[str]], fo_list: List[FileObject], similarity: dict):
         result_dict = {}
@@ -138,20 +151,21 @@ class ComparePlugin(CompareBasePlugin):
 
     def _get_non_zero_common_files(self, files_in_all, not_in_all):
         non_zero_files = dict()
+        entropies = self.database.get_entropies({
+            uid for uid_list in [files_in_all['all'], *not_in_all.values()] for uid in uid_list
+        }) if files_in_all['all'] or not_in_all else {}
         if files_in_all['all']:
-            self._evaluate_entropy_for_list_of_uids(files_in_all['all'], non_zero_files, 'all')
+            self._evaluate_entropy_for_list_of_uids(files_in_all['all'], non_zero_files, 'all', entropies)
 
         if not_in_all:
             for firmware_uid in not_in_all.keys():
-                self._evaluate_entropy_for_list_of_uids(not_in_all[firmware_uid], non_zero_files, firmware_uid)
+                self._evaluate_entropy_for_list_of_uids(not_in_all[firmware_uid], non_zero_files, firmware_uid, entropies)
 
         return non_zero_files
 
-    def _evaluate_entropy_for_list_of_uids(self, list_of_uids, new_result, firmware_uid):
-        non_zero_file_ids = list()
-        for uid in list_of_uids:
-            if self.database.get_entropy(uid) > 0.1:
-                non_zero_file_ids.append(uid)
+    @staticmethod
+    def _evaluate_entropy_for_list_of_uids(list_of_uids, new_result, firmware_uid, entropies: Dict[str, float]):
+        non_zero_file_ids = [uid for uid in list_of_uids if entropies.get(uid, 0.0) > 0.1]
         if non_zero_file_ids:
             new_result[firmware_uid] = non_zero_file_ids
 
@@ -161,3 +175,13 @@ def generate_similarity_sets(list_of_pairs: List[Tuple[str, str]]) -> List[List[
     for file1, file2 in list_of_pairs:
         graph.add_edge(file1, file2)
     return [sorted(c) for c in networkx.algorithms.clique.find_cliques(graph)]
+
+
+def _get_hashes(uids: Iterable[str], ssdeep_hashes: Dict[str, str]) -> Dict[str, str]:
+    return {uid: ssdeep_hashes[uid] for uid in uids if ssdeep_hashes.get(uid)}
+
+
+def _split_dict(input_dict: dict, number_of_chunks: int) -> List[dict]:
+    items = list(input_dict.items())
+    chunk_size = -(-len(items) // number_of_chunks)
+    return [dict(items[index:index + chunk_size]) for index in range(0, len(items), chunk_size)]
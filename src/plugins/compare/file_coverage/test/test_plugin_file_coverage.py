@@ -1,6 +1,11 @@
 # pylint: disable=protected-access,no-member
+from configparser import ConfigParser
+from unittest.mock import MagicMock
+
 import pytest
+import ssdeep
 
+from helperFunctions.plugin import import_plugins
 from plugins.compare.file_coverage.code.file_coverage import ComparePlugin, generate_similarity_sets
 from test.unit.compare.compare_plugin_test_class import ComparePluginTest
 
@@ -9,11 +14,11 @@ class DbMock:  # pylint: disable=unused-argument,no-self-use
     def __init__(self, config):
         pass
 
-    def get_entropy(self, uid):
-        return 0.2
+    def get_entropies(self, uids):
+        return {uid: 0.2 for uid in uids}
 
-    def get_ssdeep_hash(self, uid):
-        return '42'
+    def get_ssdeep_hashes(self, uids):
+        return {uid: '42' for uid in uids}
 
 
 class TestComparePluginFileCoverage(ComparePluginTest):
@@ -94,3 +99,17 @@ def test_get_similarity_value(similar_files, similarity_dict, expected_output):
 ])
 def test_generate_similarity_sets(test_input, expected_output):
     assert generate_similarity_sets(test_input) == expected_output
+
+
+def test_find_similar_files_in_multiple_processes():
+    plugin_source = import_plugins('compare.plugins', 'plugins/compare')  # must be kept alive while the plugin is used
+    plugin_module = plugin_source.load_plugin('file_coverage')
+    config = ConfigParser()
+    config.read_dict({'ExpertSettings': {'ssdeep_ignore': '1', 'ssdeep_compare_processes': '2'}})
+    plugin = plugin_module.ComparePlugin(MagicMock(), config=config, db_interface=DbMock(None), plugin_path=None)
+    hashes_one = {f'one_{index}': ssdeep.hash(bytes(range(256)) * 50 + str(index).encode() * 100) for index in range(2 * plugin_module.MIN_FILES_PER_PROCESS)}
+    hashes_two = {'two': ssdeep.hash(bytes(range(256)) * 50)}
+
+    result = plugin._find_similar_files(hashes_one, hashes_two)
+    assert result, 'test data should contain similar files'
+    assert sorted(result) == sorted(plugin_module.find_similar_hashes(hashes_one, hashes_two, 1))
@@ -1,18 +1,34 @@
 import logging
 from contextlib import suppress
-from multiprocessing import Queue, Value
+from functools import partial
+from multiprocessing import Manager, Value
 from queue import Empty
 from time import sleep
+from uuid import uuid4
 
+from helperFunctions.fair_share_queue import FairShareQueue
 from helperFunctions.logging import TerminalColors, color_string
 from helperFunctions.process import check_worker_exceptions, new_worker_was_started, start_single_worker
 from storage.db_interface_common import MongoInterfaceCommon
+from objects.file import FileObject
 from unpacker.unpack import Unpacker
 
+PARENT_RUNNING, PARENT_FAILED = 'running', 'failed'
+PARENT_WAIT_INTERVAL = 0.1  # seconds
+
 
 class UnpackingScheduler:
     '''
     This scheduler performs unpacking on firmware objects
+
+    The files of different firmware submissions are unpacked round-robin (see `helperFunctions.fair_share_queue`).
+
+    In streaming mode (option `streaming` in section `unpack`), extracted files are scheduled as soon as they are stored
+    while the extraction of their parent is still running. A file is passed to `post_unpack` only after its parent was
+    passed to it, though (the analysis status relies on this order). To ensure this, each unpacking of a parent gets a
+    token which is stored in `unfinished_parents` until the parent is passed on (or its unpacking failed). Virtual paths
+    of a file that were found after the file was scheduled are stored in `late_virtual_paths` by the unpacking of its
+    parent and added to the file before it is passed on.
     '''
 
     def __init__(self, config=None, post_unpack=None, analysis_workload=None, db_interface=None):
@@ -20,11 +36,15 @@ class UnpackingScheduler:
         self.stop_condition = Value('i', 0)
         self.throttle_condition = Value('i', 0)
         self.get_analysis_workload = analysis_workload
-        self.in_queue = Queue()
+        self.in_queue = FairShareQueue()
         self.work_load_counter = 25
         self.workers = []
         self.post_unpack = post_unpack
         self.db_interface = MongoInterfaceCommon(config) if not db_interface else db_interface
+        self.streaming = self.config.getboolean('unpack', 'streaming', fallback=False)
+        self.manager = Manager() if self.streaming else None
+        self.unfinished_parents = self.manager.dict() if self.streaming else None
+        self.late_virtual_paths = self.manager.dict() if self.streaming else None
         self.drop_cached_locks()
         self.start_unpack_workers()
         self.work_load_process = self.start_work_load_monitor()
@@ -40,7 +60,12 @@ class UnpackingScheduler:
         self.in_queue.put(fo)
 
     def get_scheduled_workload(self):
-        return {'unpacking_queue': self.in_queue.qsize()}
+        return {
+            'unpacking_queue': self.in_queue.qsize(),
+            'unpacking_queue_per_firmware': {
+                root_uid or 'other': depth for root_uid, depth in self.in_queue.get_depth_per_firmware().items()
+            },
+        }
 
     def shutdown(self):
         '''
@@ -52,6 +77,8 @@ class UnpackingScheduler:
             worker.join()
         self.work_load_process.join()
         self.in_queue.close()
+        if self.manager is not None:
+            self.manager.shutdown()
         logging.info('Unpacker Module offline')
 
 # ---- internal functions ----
@@ -67,11 +94,61 @@ class UnpackingScheduler:
         while self.stop_condition.value == 0:
             with suppress(Empty):
                 fo = self.in_queue.get(timeout=float(self.config['ExpertSettings']['block_delay']))
+                if self.streaming:
+                    self._unpack_streamed(unpacker, fo, worker_id)
+                    continue
                 extracted_objects = unpacker.unpack(fo)
                 logging.debug(f'[worker {worker_id}] unpacking of {fo.uid} complete: {len(extracted_objects)} files extracted')
                 self.post_unpack(fo)
                 self.schedule_extracted_files(extracted_objects)
 
+    def _unpack_streamed(self, unpacker: Unpacker, fo: FileObject, worker_id: int):
+        token = uuid4().hex
+        self.unfinished_parents[token] = PARENT_RUNNING
+        try:
+            extracted_objects = unpacker.unpack(fo, on_file_ready=partial(self._schedule_streamed_file, token=token))
+        except Exception:
+            self.unfinished_parents[token] = PARENT_FAILED
+            raise
+        for uid, virtual_paths in fo.temporary_data.pop('late_virtual_paths', {}).items():
+            self.late_virtual_paths[f'{token}/{uid}'] = virtual_paths
+        logging.debug(f'[worker {worker_id}] unpacking of {fo.uid} complete: {len(extracted_objects)} files extracted')
+        parent_passed_on = self._wait_for_parent(fo)
+        self._add_late_virtual_paths(fo)
+        if parent_passed_on:
+            self.post_unpack(fo)
+            self.unfinished_parents.pop(token, None)
+        else:
+            logging.warning(f'[worker {worker_id}] unpacking of parent failed: {fo.uid} is not analyzed')
+            self.unfinished_parents[token] = PARENT_FAILED
+
+    def _schedule_streamed_file(self, file_object: FileObject, token: str):
+        file_object.temporary_data['parent_unpacking_token'] = token
+        self._add_object_to_unpack_queue(file_object)
+
+    def _add_late_virtual_paths(self, fo: FileObject):
+        # the late virtual paths are complete once the unpacking of the parent is finished (see `_wait_for_parent`)
+        token = fo.temporary_data.get('parent_unpacking_token')
+        late_virtual_paths = self.late_virtual_paths.pop(f'{token}/{fo.uid}', None) if token else None
+        if late_virtual_paths:
+            fo.virtual_file_path[fo.get_root_uid()].extend(late_virtual_paths)
+
+    def _wait_for_parent(self, fo: FileObject) -> bool:
+        '''
+        Wait until the parent of a streamed file was passed on.
+
+        :return: `False` if the unpacking of the parent failed (or the scheduler is shut down) and `True` otherwise.
+        '''
+        token = fo.temporary_data.get('parent_unpacking_token')
+        while self.stop_condition.value == 0:
+            state = self.unfinished_parents.get(token) if token else None
+            if state is None:
+                return True
+            if state == PARENT_FAILED:
+                return False
+            sleep(PARENT_WAIT_INTERVAL)
+        return False
+
     def schedule_extracted_files(self, object_list):
         for item in object_list:
             self._add_object_to_unpack_queue(item)
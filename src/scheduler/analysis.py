@@ -10,11 +10,14 @@ from typing import List, Optional, Tuple
 from analysis.PluginBase import AnalysisBasePlugin
 from helperFunctions.compare_sets import substring_is_in_list
 from helperFunctions.config import read_list_from_config
+from helperFunctions.fair_share_queue import HIGH_PRIORITY, FairShareQueue
 from helperFunctions.logging import TerminalColors, color_string
 from helperFunctions.plugin import import_plugins
 from helperFunctions.process import ExceptionSafeProcess, check_worker_exceptions
 from objects.file import FileObject
+from objects.firmware import Firmware
 from scheduler.analysis_status import AnalysisStatus
+from scheduler.analysis_version_cache import DEFAULT_MAX_SIZE, AnalysisVersion, AnalysisVersionCache
 from scheduler.task_scheduler import MANDATORY_PLUGINS, AnalysisTaskScheduler
 from storage.db_interface_backend import BackEndDbInterface
 
@@ -51,7 +54,9 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
     * Plugins can have dependencies, these have to be present before the depending plugin can be run
     * The order of execution is shuffled (dependency preserving) to balance execution of the plugins
 
-    After scheduling, for each task a set of checks is run to decide if a task might be skipped: class::
+    After scheduling, for each task a set of checks is run to decide if a task might be skipped (for the check whether
+    an analysis is present and up to date, the versions of the stored results of file objects are cached, see
+    `scheduler.analysis_version_cache`): class::
 
         ┌─┬──────────────┐ No                                   ┌────────┐
         │0│Plugin exists?├──────────────────────────────────────►        │
@@ -73,7 +78,9 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
 
     Running the analysis tasks is achieved through (multiprocessing.Queue)s. Each plugin has an in-queue, triggered
     by the scheduler using the `add_job` function, and an out-queue that is processed by the result collector. The
-    actual analysis process is out of scope. Database interaction happens before (pre_analysis) and after
+    actual analysis process is out of scope. The in-queues of the plugins and the queue of the task runner are fair
+    between firmware submissions: their files are served round-robin. Single file updates (2.) are served before all
+    other files. Database interaction happens before (pre_analysis) and after
     (post_analysis) the running of a task, to store intermediate results for live updates, and final results.
 
     :param config: The ConfigParser object shared by all backend entities.
@@ -87,10 +94,15 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         self.analysis_plugins = {}
         self._load_plugins()
         self.stop_condition = Value('i', 0)
-        self.process_queue = Queue()
+        self.process_queue = FairShareQueue()
+        self._completed_firmwares = Queue()  # task runner: flush, then pass on to the result collector
+        self._summary_cache_updates = Queue()  # result collector: flush, then rebuild the summary cache
 
         self.status = AnalysisStatus()
         self.task_scheduler = AnalysisTaskScheduler(self.analysis_plugins)
+        self.version_cache = AnalysisVersionCache(
+            max_size=self.config.getint('ExpertSettings', 'analysis_version_cache_size', fallback=DEFAULT_MAX_SIZE)
+        )
 
         self.db_backend_service = db_interface if db_interface else BackEndDbInterface(config=config)
         self.pre_analysis = pre_analysis if pre_analysis else self.db_backend_service.add_object
@@ -115,6 +127,9 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         if getattr(self.db_backend_service, 'shutdown', False):
             self.db_backend_service.shutdown()
         self.process_queue.close()
+        self._completed_firmwares.close()
+        self._summary_cache_updates.close()
+        self.version_cache.shutdown()
         logging.info('Analysis System offline')
 
     def update_analysis_of_object_and_children(self, fo: FileObject):
@@ -125,6 +140,8 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         :param fo: The root file that is to be analyzed
         '''
         included_files = self.db_backend_service.get_list_of_all_included_files(fo)
+        for root_uid in ({fo.uid} if isinstance(fo, Firmware) else {*fo.virtual_file_path, *fo.parent_firmware_uids}):
+            self.db_backend_service.delete_summary_cache(root_uid)  # rebuilt when the analysis is completed
         self.pre_analysis(fo)
         self.status.add_update_to_current_analyses(fo, included_files)
         for child_uid in included_files:
@@ -141,6 +158,9 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
 
         :param fo: The firmware that is to be analyzed
         '''
+        if isinstance(fo, Firmware):  # the stored list of included files and summaries may be outdated after unpacking it again
+            self.db_backend_service.delete_list_of_included_files(fo.uid)
+            self.db_backend_service.delete_summary_cache(fo.uid)
         self.status.add_to_current_analyses(fo)
         self.task_scheduler.schedule_analysis_tasks(fo, fo.scheduled_analysis, mandatory=True)
         self._check_further_process_or_complete(fo)
@@ -152,9 +172,18 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
 
         :param fo: The file that is to be analyzed
         '''
+        fo.temporary_data[HIGH_PRIORITY] = True
         self.task_scheduler.schedule_analysis_tasks(fo, fo.scheduled_analysis)
         self._check_further_process_or_complete(fo)
 
+    def drop_cached_analysis_versions(self, deleted_file: dict):
+        '''
+        This function is used to remove a file that was deleted from the database from the analysis version cache.
+
+        :param deleted_file: The (former) database entry of the file.
+        '''
+        self.version_cache.invalidate(deleted_file['_id'])
+
     def _get_list_of_available_plugins(self) -> List[str]:
         plugin_list = list(self.analysis_plugins.keys())
         plugin_list.sort(key=str.lower)
@@ -252,16 +281,28 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         self.schedule_process.start()
 
     def _task_runner(self):
+        self._warm_up_version_cache()
         while self.stop_condition.value == 0:
             try:
                 task = self.process_queue.get(timeout=float(self.config['ExpertSettings']['block_delay']))
             except Empty:
-                pass
+                self._flush_analysis_results(only_if_due=True)
+                self.version_cache.apply_updates()
             else:
                 self._process_next_analysis_task(task)
+            self._pass_on_completed_firmwares()
+        self._flush_analysis_results()
+
+    def _warm_up_version_cache(self):
+        if getattr(self.db_backend_service, 'iterate_stored_analysis_versions', None):
+            self.version_cache.warm_up(self.db_backend_service.iterate_stored_analysis_versions(
+                list(self.analysis_plugins), limit=self.version_cache.max_size
+            ))
+            logging.info(f'Analysis version cache: {self.version_cache.get_statistics()["size"]} files loaded')
 
     def _process_next_analysis_task(self, fw_object: FileObject):
         self.pre_analysis(fw_object)
+        self._update_version_cache(fw_object)
         analysis_to_do = fw_object.scheduled_analysis.pop()
         if analysis_to_do not in self.analysis_plugins:
             logging.error(f'Plugin \'{analysis_to_do}\' not available')
@@ -270,7 +311,7 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
             self._start_or_skip_analysis(analysis_to_do, fw_object)
 
     def _start_or_skip_analysis(self, analysis_to_do: str, file_object: FileObject):
-        if not self._is_forced_update(file_object) and self._analysis_is_already_in_db_and_up_to_date(analysis_to_do, file_object.uid):
+        if not self._is_forced_update(file_object) and self._analysis_is_already_up_to_date(analysis_to_do, file_object):
             logging.debug(f'skipping analysis "{analysis_to_do}" for {file_object.uid} (analysis already in DB)')
             if analysis_to_do in self.task_scheduler.get_cumulative_remaining_dependencies(file_object.scheduled_analysis):
                 self._add_completed_analysis_results_to_file_object(analysis_to_do, file_object)
@@ -294,6 +335,28 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
 
     # ---- 2. Analysis present and plugin version unchanged ----
 
+    def _update_version_cache(self, file_object: FileObject):
+        # results of the plugins that ran on this object were already written (or buffered) when it is passed back to the
+        # runner. Buffered results are not dropped: if they can't be written, the flush raises and the scheduler stops
+        self.version_cache.apply_updates()
+        if not isinstance(file_object, Firmware):
+            self.version_cache.update(file_object.uid, file_object.processed_analysis)
+
+    def _analysis_is_already_up_to_date(self, analysis_to_do: str, file_object: FileObject) -> bool:
+        if isinstance(file_object, Firmware):  # firmware files are not cached, as they may be deleted and uploaded again
+            return self._analysis_is_already_in_db_and_up_to_date(analysis_to_do, file_object.uid)
+        plugin = self.analysis_plugins[analysis_to_do]
+        cached_versions = self.version_cache.get(file_object.uid, [analysis_to_do, *plugin.DEPENDENCIES])
+        if cached_versions is None:
+            return self._analysis_is_already_in_db_and_up_to_date(analysis_to_do, file_object.uid)
+        return self._cached_analysis_is_up_to_date(plugin, *cached_versions)
+
+    def _cached_analysis_is_up_to_date(self, analysis_plugin: AnalysisBasePlugin, version: AnalysisVersion, *dependency_versions: AnalysisVersion) -> bool:
+        return (
+            self._plugin_versions_are_up_to_date(version.plugin_version, version.system_version, analysis_plugin)
+            and all(version.analysis_date >= dependency.analysis_date for dependency in dependency_versions)
+        )
+
     def _analysis_is_already_in_db_and_up_to_date(self, analysis_to_do: str, uid: str):
         db_entry = self.db_backend_service.get_specific_fields_of_db_entry(
             uid,
@@ -317,20 +380,23 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         return self._analysis_is_up_to_date(db_entry['processed_analysis'][analysis_to_do], self.analysis_plugins[analysis_to_do], uid)
 
     def _analysis_is_up_to_date(self, analysis_db_entry: dict, analysis_plugin: AnalysisBasePlugin, uid):
-        old_plugin_version = analysis_db_entry['plugin_version']
-        old_system_version = analysis_db_entry.get('system_version', None)
+        if not self._plugin_versions_are_up_to_date(analysis_db_entry['plugin_version'], analysis_db_entry.get('system_version', None), analysis_plugin):
+            return False
+        return self._dependencies_are_up_to_date(analysis_plugin, uid)
+
+    @staticmethod
+    def _plugin_versions_are_up_to_date(old_plugin_version: str, old_system_version: Optional[str], analysis_plugin: AnalysisBasePlugin) -> bool:
         current_plugin_version = analysis_plugin.VERSION
         current_system_version = getattr(analysis_plugin, 'SYSTEM_VERSION', None)
         try:
-            if LooseVersion(old_plugin_version) < LooseVersion(current_plugin_version) or \
-                    LooseVersion(old_system_version or '0') < LooseVersion(current_system_version or '0'):
-                return False
+            return not (
+                LooseVersion(old_plugin_version) < LooseVersion(current_plugin_version)
+                or LooseVersion(old_system_version or '0') < LooseVersion(current_system_version or '0')
+            )
         except TypeError:
             logging.error(f'plug-in or system version of "{analysis_plugin.NAME}" plug-in is or was invalid!')
             return False
 
-        return self._dependencies_are_up_to_date(analysis_plugin, uid)
-
     def _dependencies_are_up_to_date(self, analysis_plugin: AnalysisBasePlugin, uid):
         for dependency in analysis_plugin.DEPENDENCIES:
             self_date = _get_analysis_date(analysis_plugin.NAME, uid, self.db_backend_service)
@@ -416,16 +482,48 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
 
                         self.post_analysis(fw)
                     self._check_further_process_or_complete(fw)
+            self._update_summary_caches()
             if nop:
+                self._flush_analysis_results(only_if_due=True)
                 sleep(float(self.config['ExpertSettings']['block_delay']))
+        self._flush_analysis_results()
+
+    def _flush_analysis_results(self, only_if_due: bool = False):
+        # analysis results may be buffered by the DB interface (separately in each process)
+        if getattr(self.db_backend_service, 'flush_analysis_results', None):
+            self.db_backend_service.flush_analysis_results(only_if_due=only_if_due)
 
     def _check_further_process_or_complete(self, fw_object):
         if not fw_object.scheduled_analysis:
             logging.info(f'Analysis Completed:\n{fw_object}')
-            self.status.remove_from_current_analyses(fw_object)
+            if not isinstance(fw_object, Firmware):  # the object is not passed back to the task runner
+                self.version_cache.send_update(fw_object.uid, fw_object.processed_analysis)
+            for firmware_uid in self.status.remove_from_current_analyses(fw_object):
+                self.db_backend_service.store_list_of_included_files(firmware_uid)
+                self._completed_firmwares.put(firmware_uid)
         else:
             self.process_queue.put(fw_object)
 
+    def _pass_on_completed_firmwares(self):
+        '''
+        The summary cache of a completed firmware may only be built once the results of all its files are stored. Both
+        the task runner and the result collector buffer results (each in its own process), so completed firmwares are
+        passed from the task runner to the result collector, which both flush their buffers first. If the cache is not
+        built (e.g. because of a shutdown), it is built the next time it is needed.
+        '''
+        completed_firmwares = _get_all_from_queue(self._completed_firmwares)
+        if completed_firmwares:
+            self._flush_analysis_results()
+            for firmware_uid in completed_firmwares:
+                self._summary_cache_updates.put(firmware_uid)
+
+    def _update_summary_caches(self):
+        completed_firmwares = _get_all_from_queue(self._summary_cache_updates)
+        if completed_firmwares:
+            self._flush_analysis_results()
+            for firmware_uid in completed_firmwares:
+                self.db_backend_service.update_summary_cache(firmware_uid)
+
     # ---- miscellaneous functions ----
 
     def get_combined_analysis_workload(self):
@@ -436,8 +534,11 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         Get the current workload of this scheduler. The workload is represented through
         - the general in-queue,
         - the currently running analyses in each plugin and the plugin in-queues,
-        - the progress for each currently analyzed firmware and
-        - recently finished analyses.
+        - the number of queued tasks of each firmware (in all queues) and of single file updates,
+        - the hit rate of the analysis version cache,
+        - the progress for each currently analyzed firmware,
+        - recently finished analyses and
+        - the statistics of the (buffered) database writer (if available).
 
          The result has the form:
 
@@ -446,6 +547,9 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
             {
                 'analysis_main_scheduler': int(),
                 'plugins': dict(),
+                'queue_depth_per_firmware': dict(),
+                'high_priority_queue': int(),
+                'version_cache': dict(),
                 'current_analyses': dict(),
                 'recently_finished_analyses': dict(),
             }
@@ -456,14 +560,22 @@ class AnalysisScheduler:  # pylint: disable=too-many-instance-attributes
         workload = {
             'analysis_main_scheduler': self.process_queue.qsize(),
             'plugins': {},
+            'queue_depth_per_firmware': {},
+            'high_priority_queue': self.process_queue.get_high_priority_depth(),
+            'version_cache': self.version_cache.get_statistics(),
             'current_analyses': self.status.get_current_analyses_stats(),
             'recently_finished_analyses': dict(self.status.recently_finished),
         }
+        if getattr(self.db_backend_service, 'get_analysis_writer_statistics', None):
+            workload['database_writer'] = self.db_backend_service.get_analysis_writer_statistics()
+        _add_queue_depth_per_firmware(workload['queue_depth_per_firmware'], self.process_queue)
         for plugin_name, plugin in self.analysis_plugins.items():
             workload['plugins'][plugin_name] = {
                 'queue': plugin.in_queue.qsize(),
                 'active': (sum(plugin.active[i].value for i in range(plugin.thread_count))),
             }
+            _add_queue_depth_per_firmware(workload['queue_depth_per_firmware'], plugin.in_queue)
+            workload['high_priority_queue'] += plugin.in_queue.get_high_priority_depth()
         return workload
 
     @staticmethod
@@ -491,3 +603,18 @@ def _get_analysis_date(plugin_name: str, uid: str, backend_db_interface):
     if plugin_name not in fo.processed_analysis:
         return float('inf')
     return fo.processed_analysis[plugin_name]['analysis_date']
+
+
+def _get_all_from_queue(queue: Queue) -> list:
+    items = []
+    while True:
+        try:
+            items.append(queue.get_nowait())
+        except Empty:
+            return items
+
+
+def _add_queue_depth_per_firmware(depth_per_firmware: dict, queue: FairShareQueue):
+    for root_uid, depth in queue.get_depth_per_firmware().items():
+        key = root_uid or 'other'
+        depth_per_firmware[key] = depth_per_firmware.get(key, 0) + depth
@@ -67,7 +67,13 @@ class AnalysisStatus:
             'hid': fw_object.get_hid(),
         }
 
-    def remove_from_current_analyses(self, fw_object: Union[Firmware, FileObject]):
+    def remove_from_current_analyses(self, fw_object: Union[Firmware, FileObject]) -> List[str]:
+        '''
+        Mark the analysis of `fw_object` as completed.
+
+        :return: The UIDs of the firmware whose analysis is completed with it.
+        '''
+        completed = []
         try:
             self.currently_running_lock.acquire()
             for parent in self._find_currently_analyzed_parents(fw_object):
@@ -81,11 +87,13 @@ class AnalysisStatus:
                 if len(updated_dict['files_to_unpack']) == len(updated_dict['files_to_analyze']) == 0:
                     self.recently_finished[parent] = self._init_recently_finished(updated_dict)
                     self.currently_running.pop(parent)
+                    completed.append(parent)
                     logging.info(f'Analysis of firmware {parent} completed')
                 else:
                     self.currently_running[parent] = updated_dict
         finally:
             self.currently_running_lock.release()
+        return completed
 
     @staticmethod
     def _init_recently_finished(analysis_data: dict) -> dict:
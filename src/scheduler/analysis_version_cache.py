@@ -0,0 +1,173 @@
+'''
+In-memory cache of the versions of stored analysis results.
+
+The analysis scheduler skips analyses whose stored result is up to date (i.e. plugin and system version did not change
+and the result is newer than the results of the plugin's dependencies). The cache contains the plugin version, system
+version and analysis date of stored results, so that this decision does not need any database queries for files that
+were analyzed before (e.g. the same busybox or libc in many firmware images).
+
+The cache is local to the process that uses it (the task runner of the analysis scheduler). Other processes send
+updates and invalidations through a queue (`send_update` and `invalidate`), which is applied by the owning process with
+`apply_updates`. The statistics are shared between processes.
+
+To keep the cache small, the versions of a file are stored as packed (version ID, analysis date) pairs. The version ID
+refers to the plugin name, plugin version and system version, which are only stored once (there are only few distinct
+combinations). With 25 plugins an entry needs about 0.5 KB (including the UID).
+'''
+from multiprocessing import Queue, Value
+from queue import Empty
+from struct import Struct
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_MAX_SIZE = 200000  # files
+_PACKED_VERSION = Struct('=Id')  # version ID, analysis date
+
+
+class AnalysisVersion(NamedTuple):
+    plugin_version: str
+    system_version: Optional[str]
+    analysis_date: float
+
+
+def get_analysis_version(result: dict) -> Optional[AnalysisVersion]:
+    '''
+    Get the version information of an analysis result.
+
+    :param result: The analysis result of a plugin.
+    :return: The version information or `None` if the result failed or the version fields are missing or sanitized.
+    '''
+    if not isinstance(result, dict) or 'failed' in result or result.get('file_system_flag'):
+        return None
+    if 'plugin_version' not in result or 'analysis_date' not in result:
+        return None
+    return AnalysisVersion(result['plugin_version'], result.get('system_version'), result['analysis_date'])
+
+
+def _get_analysis_versions(processed_analysis: dict) -> Dict[str, Optional[AnalysisVersion]]:
+    return {plugin: get_analysis_version(result) for plugin, result in processed_analysis.items()}
+
+
+class AnalysisVersionCache:
+    '''
+    Cache of `AnalysisVersion`s by UID and plugin. If more than `max_size` files are cached, the oldest entries are
+    dropped.
+    '''
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = {}  # type: Dict[str, bytes]
+        self._versions = []  # type: List[Tuple[str, str, Optional[str]]]
+        self._version_ids = {}  # type: Dict[Tuple[str, str, Optional[str]], int]
+        self._updates = Queue()
+        self._hits = Value('Q', 0, lock=False)
+        self._misses = Value('Q', 0, lock=False)
+        self._size = Value('Q', 0, lock=False)
+
+    def get(self, uid: str, plugins: List[str]) -> Optional[List[AnalysisVersion]]:
+        '''
+        Get the versions of the results of `plugins` for a file. Counts as a hit if all of them are cached.
+
+        :param uid: The UID of the file.
+        :param plugins: The names of the plugins.
+        :return: The versions (in the order of `plugins`) or `None` if any of them is not cached.
+        '''
+        entry = self._unpack(self._entries.get(uid, b''))
+        if not entry or any(plugin not in entry for plugin in plugins):
+            self._misses.value += 1
+            return None
+        self._hits.value += 1
+        return [entry[plugin] for plugin in plugins]
+
+    def update(self, uid: str, processed_analysis: dict):
+        '''
+        Update the cache with stored analysis results. Failed results are removed from the cache.
+
+        :param uid: The UID of the file.
+        :param processed_analysis: Analysis results of the file (by plugin name).
+        '''
+        self._set_versions(uid, _get_analysis_versions(processed_analysis))
+
+    def remove(self, uid: str):
+        self._entries.pop(uid, None)
+        self._size.value = len(self._entries)
+
+    def warm_up(self, stored_results: Iterable[Tuple[str, dict]]):
+        '''
+        Fill the cache with stored analysis results (e.g. from a database projection) until it is full.
+
+        :param stored_results: Tuples of UID and analysis results.
+        '''
+        for uid, processed_analysis in stored_results:
+            if len(self._entries) >= self.max_size:
+                break
+            self.update(uid, processed_analysis)
+
+    def send_update(self, uid: str, processed_analysis: dict):
+        '''
+        Like `update`, but can be called from any process. Updates are applied by `apply_updates`.
+        '''
+        self._updates.put((uid, _get_analysis_versions(processed_analysis)))
+
+    def invalidate(self, uid: str):
+        '''
+        Like `remove`, but can be called from any process. Invalidations are applied by `apply_updates`.
+        '''
+        self._updates.put((uid, None))
+
+    def apply_updates(self):
+        while True:
+            try:
+                uid, versions = self._updates.get_nowait()
+            except Empty:
+                break
+            if versions is None:
+                self.remove(uid)
+            else:
+                self._set_versions(uid, versions)
+
+    def get_statistics(self) -> dict:
+        lookups = self._hits.value + self._misses.value
+        return {
+            'hits': self._hits.value,
+            'misses': self._misses.value,
+            'hit_rate': round(self._hits.value / lookups, 3) if lookups else 0.0,
+            'size': self._size.value,
+        }
+
+    def shutdown(self):
+        self._updates.close()
+
+    def _set_versions(self, uid: str, versions: Dict[str, Optional[AnalysisVersion]]):
+        entry = self._unpack(self._entries.get(uid, b''))
+        for plugin, version in versions.items():
+            if version is None:
+                entry.pop(plugin, None)
+            else:
+                entry[plugin] = version
+        if not entry:
+            self._entries.pop(uid, None)
+        else:
+            if uid not in self._entries and len(self._entries) >= self.max_size:
+                del self._entries[next(iter(self._entries))]
+            self._entries[uid] = self._pack(entry)
+        self._size.value = len(self._entries)
+
+    def _pack(self, entry: Dict[str, AnalysisVersion]) -> bytes:
+        return b''.join(
+            _PACKED_VERSION.pack(self._get_version_id(plugin, version), version.analysis_date)
+            for plugin, version in entry.items()
+        )
+
+    def _unpack(self, packed_entry: bytes) -> Dict[str, AnalysisVersion]:
+        entry = {}
+        for version_id, analysis_date in _PACKED_VERSION.iter_unpack(packed_entry):
+            plugin, plugin_version, system_version = self._versions[version_id]
+            entry[plugin] = AnalysisVersion(plugin_version, system_version, analysis_date)
+        return entry
+
+    def _get_version_id(self, plugin: str, version: AnalysisVersion) -> int:
+        key = (plugin, version.plugin_version, version.system_version)
+        if key not in self._version_ids:
+            self._version_ids[key] = len(self._versions)
+            self._versions.append(key)
+        return self._version_ids[key]
@@ -72,7 +72,8 @@ class FactBackend(FactBase):
         while self.run:
             self.work_load_stat.update(
                 unpacking_workload=self.unpacking_service.get_scheduled_workload(),
-                analysis_workload=self.analysis_service.get_scheduled_workload()
+                analysis_workload=self.analysis_service.get_scheduled_workload(),
+                intercom_workload=self.intercom.get_task_latency_statistics()
             )
             if self._exception_occurred():
                 break
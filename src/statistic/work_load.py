@@ -27,7 +27,7 @@ class WorkLoadStatistic:
         self.db.update_statistic(self.component, {'status': 'offline', 'last_update': time()})
         self.db.shutdown()
 
-    def update(self, unpacking_workload=None, analysis_workload=None, compare_workload=None):
+    def update(self, unpacking_workload=None, analysis_workload=None, compare_workload=None, intercom_workload=None):
         stats = {
             'name': self.component,
             'status': 'online',
@@ -41,6 +41,8 @@ class WorkLoadStatistic:
             stats['analysis'] = analysis_workload
         if compare_workload:
             stats['compare'] = compare_workload
+        if intercom_workload:
+            stats['intercom'] = intercom_workload
         self.db.update_statistic(self.component, stats)
 
     def _get_system_information(self):
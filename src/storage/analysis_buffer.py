@@ -0,0 +1,124 @@
+import logging
+from multiprocessing import Value
+from time import sleep, time
+from typing import Callable, Dict, Tuple
+
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+MAX_WRITE_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 1.0  # seconds (multiplied by the number of failed attempts)
+
+
+class AnalysisResultBuffer:
+    '''
+    Write-behind buffer for analysis results. Instead of sending one update per plugin result to the database,
+    ``$set`` updates are collected and merged per object and written with a single (unordered) ``bulk_write`` per
+    collection once ``batch_size`` objects are buffered or the oldest buffered update is older than ``max_delay``
+    seconds. The buffer is local to the process that adds the updates, so each process must flush its own buffer
+    (especially before it terminates). The flush statistics are shared between processes.
+
+    Failed writes are retried (``MAX_WRITE_ATTEMPTS`` times). If they still fail, the updates stay in the buffer and the
+    error is raised, so that the results are not dropped silently.
+
+    :param batch_size: The number of buffered objects that triggers a flush.
+    :param max_delay: The maximum time in seconds an update may stay in the buffer.
+    '''
+
+    def __init__(self, batch_size: int = 100, max_delay: float = 1.0):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._updates: Dict[Tuple[str, str], dict] = {}
+        self._oldest_update_time = None
+        self._flush_count = Value('i', 0)
+        self._flushed_updates = Value('i', 0)
+        self._total_flush_latency = Value('d', 0.0)
+        self._last_flush_latency = Value('d', 0.0)
+        self._last_batch_size = Value('i', 0)
+
+    def __len__(self):
+        return len(self._updates)
+
+    def add(self, collection_name: str, uid: str, update: dict):
+        '''
+        Add a ``$set`` update for the object with UID ``uid``. It is merged with other buffered updates of the object.
+
+        :param collection_name: The name of the collection the object is stored in.
+        :param uid: The UID of the object.
+        :param update: The ``$set`` update dict (e.g. ``{'processed_analysis.foo': {...}}``).
+        '''
+        if not self._updates:
+            self._oldest_update_time = time()
+        self._updates.setdefault((collection_name, uid), {}).update(update)
+
+    def flush_is_due(self) -> bool:
+        if not self._updates:
+            return False
+        return len(self._updates) >= self.batch_size or time() - self._oldest_update_time >= self.max_delay
+
+    def flush(self, get_collection: Callable[[str], Collection]):
+        '''
+        Write all buffered updates to the database.
+
+        :param get_collection: A function that returns the collection for a collection name.
+        :raises PyMongoError: If the updates could not be written. The failed updates are kept in the buffer.
+        '''
+        if not self._updates:
+            return
+        start = time()
+        updates_by_collection = {}
+        for (collection_name, uid), update in self._updates.items():
+            updates_by_collection.setdefault(collection_name, {})[uid] = update
+        batch_size, oldest_update_time = len(self._updates), self._oldest_update_time
+        self._updates = {}
+        self._oldest_update_time = None
+        failed_updates, error = {}, None
+        for collection_name, updates in updates_by_collection.items():
+            try:
+                _write_updates(get_collection(collection_name), updates)
+            except PyMongoError as write_error:
+                failed_updates.update({(collection_name, uid): update for uid, update in updates.items()})
+                error = write_error
+        self._update_statistics(batch_size, time() - start)
+        if error is not None:
+            self._updates = {**failed_updates, **self._updates}
+            self._oldest_update_time = oldest_update_time
+            raise error
+
+    def _update_statistics(self, batch_size: int, latency: float):
+        with self._flush_count.get_lock():
+            self._flush_count.value += 1
+            self._flushed_updates.value += batch_size
+            self._total_flush_latency.value += latency
+            self._last_flush_latency.value = latency
+            self._last_batch_size.value = batch_size
+
+    def get_statistics(self) -> dict:
+        '''
+        Get statistics of all flushes so far (from all processes).
+
+        :return: A dict with the number of flushes, the average and last batch size and flush latency (in seconds).
+        '''
+        with self._flush_count.get_lock():
+            flush_count = self._flush_count.value
+            return {
+                'flushes': flush_count,
+                'average_batch_size': self._flushed_updates.value / flush_count if flush_count else 0,
+                'last_batch_size': self._last_batch_size.value,
+                'average_flush_latency': self._total_flush_latency.value / flush_count if flush_count else 0,
+                'last_flush_latency': self._last_flush_latency.value,
+            }
+
+
+def _write_updates(collection: Collection, updates: Dict[str, dict]):
+    requests = [UpdateOne({'_id': uid}, {'$set': update}) for uid, update in updates.items()]
+    for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+        try:
+            collection.bulk_write(requests, ordered=False)
+            return
+        except PyMongoError as error:  # the updates are idempotent, so they can simply be written again
+            logging.error(f'Bulk update of {len(requests)} analysis results failed (attempt {attempt}/{MAX_WRITE_ATTEMPTS}): {error}')
+            if attempt == MAX_WRITE_ATTEMPTS:
+                raise
+            sleep(WRITE_RETRY_DELAY * attempt)
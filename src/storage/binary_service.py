@@ -27,6 +27,16 @@ class BinaryService:
         binary = get_binary_from_file(self.fs_organizer.generate_path_from_uid(uid))
         return binary, file_name
 
+    def get_binary_path_and_file_name(self, uid: str) -> Tuple[Optional[Path], Optional[str]]:
+        '''
+        Like `get_binary_and_file_name` but returns the path of the binary instead of its contents (so that it can
+        be read in chunks).
+        '''
+        file_name = self._get_file_name_from_db(uid)
+        if file_name is None:
+            return None, None
+        return Path(self.fs_organizer.generate_path_from_uid(uid)), file_name
+
     def read_partial_binary(self, uid: str, offset: int, length: int) -> bytes:
         file_name = self._get_file_name_from_db(uid)
         if file_name is None:
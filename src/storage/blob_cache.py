@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+
+class LruBlobCache:
+    '''
+    A small thread-safe in-process LRU cache for binary blobs (e.g. the content of sanitized analysis results).
+    Entries are evicted (least recently used first) once the total size of all cached blobs exceeds ``max_size``.
+    Only immutable content should be cached (e.g. content-addressed blobs).
+
+    :param max_size: The maximum total size of all cached blobs in bytes.
+    :param max_entry_size: Blobs larger than this are not cached at all (defaults to 1/4 of ``max_size``).
+    '''
+
+    def __init__(self, max_size: int, max_entry_size: Optional[int] = None):
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size if max_entry_size is not None else max_size // 4
+        self.current_size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def put(self, key: str, content: bytes):
+        if len(content) > self.max_entry_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_size -= len(self._entries.pop(key))
+            self._entries[key] = content
+            self.current_size += len(content)
+            while self.current_size > self.max_size:
+                _, evicted_content = self._entries.popitem(last=False)
+                self.current_size -= len(evicted_content)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_size = 0
@@ -1,7 +1,8 @@
 import logging
+from time import time
 
 from intercom.front_end_binding import InterComFrontEndBinding
-from storage.db_interface_common import MongoInterfaceCommon
+from storage.db_interface_common import CONTENT_ADDRESSED_PREFIX, MongoInterfaceCommon, get_sanitize_reference
 
 
 class AdminDbInterface(MongoInterfaceCommon):
@@ -41,6 +42,9 @@ class AdminDbInterface(MongoInterfaceCommon):
             if delete_root_file:
                 self.intercom.delete_file(fw)
             self._delete_swapped_analysis_entries(fw)
+            self._remove_from_tlsh_index(uid)
+            self.included_files.delete_one({'_id': uid})
+            self.summary_cache.delete_many({'firmware': uid})
             self.firmwares.delete_one({'_id': uid})
         else:
             logging.error('Firmware not found in Database: {}'.format(uid))
@@ -58,6 +62,9 @@ class AdminDbInterface(MongoInterfaceCommon):
         for analysis_key in fo_entry['processed_analysis'][key].keys():
             if analysis_key != 'file_system_flag' and isinstance(fo_entry['processed_analysis'][key][analysis_key], str):
                 sanitize_id = fo_entry['processed_analysis'][key][analysis_key]
+                if sanitize_id.startswith(CONTENT_ADDRESSED_PREFIX):  # content may still be referenced by other files
+                    self._remove_sanitize_db_reference(get_sanitize_reference(key, analysis_key, fo_entry['_id']))
+                    continue
                 for entry in self.sanitize_fs.find({'filename': sanitize_id}):  # could be multiple
                     self.sanitize_fs.delete(entry._id)  # pylint: disable=protected-access
 
@@ -91,4 +98,9 @@ class AdminDbInterface(MongoInterfaceCommon):
 
     def _delete_file_object(self, fo_entry):
         self.intercom.delete_file(fo_entry)
+        self._remove_from_tlsh_index(fo_entry['_id'])
         self.file_objects.delete_one({'_id': fo_entry['_id']})
+
+    def _remove_from_tlsh_index(self, uid):
+        # the entry is kept (without hash) so that the in-memory indexes of the tlsh plugin are updated as well
+        self.tlsh_index.update_one({'_id': uid}, {'$set': {'tlsh': None, 'last_update': time()}})
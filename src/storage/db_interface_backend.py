@@ -1,6 +1,8 @@
 import logging
 from time import time
+from typing import Dict, Iterator, List, Tuple
 
+from common_helper_mongo.aggregate import get_list_of_all_values
 from pymongo.errors import PyMongoError
 
 from helperFunctions.data_conversion import convert_str_to_time
@@ -8,12 +10,33 @@ from helperFunctions.merge_generators import merge_lists
 from helperFunctions.object_storage import update_included_files, update_virtual_file_path
 from objects.file import FileObject
 from objects.firmware import Firmware
-from storage.db_interface_common import MongoInterfaceCommon
+from storage.analysis_buffer import AnalysisResultBuffer
+from storage.db_interface_common import MongoInterfaceCommon, get_summary_cache_id
+from storage.sanitize_codec import ZstdMsgpackCodec, decode_sanitized_content, get_codec
+
+MAX_INCLUDED_FILES_SIZE = 15 * 1024 ** 2  # MongoDB documents are limited to 16 MiB
+ANALYSIS_VERSION_FIELDS = ['plugin_version', 'system_version', 'analysis_date', 'failed', 'file_system_flag']
 
 
 class BackEndDbInterface(MongoInterfaceCommon):
 
+    def __init__(self, config=None):
+        super().__init__(config=config)
+        self.sanitize_references.create_index('references')
+        self.tlsh_index.create_index('last_update')
+        self.summary_cache.create_index('firmware')
+        self.analysis_buffer = AnalysisResultBuffer(
+            batch_size=self.config.getint('ExpertSettings', 'db_write_batch_size', fallback=1),
+            max_delay=self.config.getfloat('ExpertSettings', 'db_write_max_delay', fallback=1.0),
+        )
+        self.included_files_codec = get_codec(ZstdMsgpackCodec.NAME)
+
+    def shutdown(self):
+        self.flush_analysis_results()
+        super().shutdown()
+
     def add_object(self, fo_fw):
+        updated_plugins = list(_get_unsaved_analyses(fo_fw)) if isinstance(fo_fw, FileObject) else []
         if isinstance(fo_fw, Firmware):
             self.add_firmware(fo_fw)
         elif isinstance(fo_fw, FileObject):
@@ -21,11 +44,12 @@ class BackEndDbInterface(MongoInterfaceCommon):
         else:
             logging.error('invalid object type: {} -> {}'.format(type(fo_fw), fo_fw))
             return
+        self._update_tlsh_index(fo_fw, updated_plugins)
         self.release_unpacking_lock(fo_fw.uid)
 
     def update_object(self, new_object: FileObject, old_db_entry: dict):
         update_dictionary = {
-            'processed_analysis': self._update_processed_analysis(new_object, old_db_entry),
+            **self._get_processed_analysis_update(new_object),
             'files_included': update_included_files(new_object, old_db_entry),
             'virtual_file_path': update_virtual_file_path(new_object, old_db_entry),
         }
@@ -49,12 +73,16 @@ class BackEndDbInterface(MongoInterfaceCommon):
             collection = self.file_objects
 
         collection.update_one({'_id': new_object.uid}, {'$set': update_dictionary})
+        _mark_analyses_as_stored(new_object, new_object.processed_analysis)
 
-    def _update_processed_analysis(self, new_object: FileObject, old_object: dict) -> dict:
-        old_pa = self.retrieve_analysis(old_object['processed_analysis'])
-        for key in new_object.processed_analysis.keys():
-            old_pa[key] = new_object.processed_analysis[key]
-        return self.sanitize_analysis(analysis_dict=old_pa, uid=new_object.uid)
+    def _get_processed_analysis_update(self, new_object: FileObject) -> dict:
+        # only new results are set (and sanitized): the stored entry may be outdated (e.g. if buffered results were
+        # written in the meantime), so the stored results must not be overwritten with it
+        processed_analysis = self.sanitize_analysis(analysis_dict=_get_unsaved_analyses(new_object), uid=new_object.uid)
+        return {
+            'processed_analysis.{}'.format(analysis_system): result
+            for analysis_system, result in processed_analysis.items()
+        }
 
     def add_firmware(self, firmware: Firmware):
         old_db_entry = self.firmwares.find_one({'_id': firmware.uid})
@@ -69,6 +97,7 @@ class BackEndDbInterface(MongoInterfaceCommon):
             entry = self.build_firmware_dict(firmware)
             try:
                 self.firmwares.insert_one(entry)
+                _mark_analyses_as_stored(firmware, firmware.processed_analysis)
                 logging.debug('firmware added to db: {}'.format(firmware.uid))
             except PyMongoError:
                 logging.error('Could not add firmware:', exc_info=True)
@@ -112,6 +141,7 @@ class BackEndDbInterface(MongoInterfaceCommon):
             entry = self.build_file_object_dict(file_object)
             try:
                 self.file_objects.insert_one(entry)
+                _mark_analyses_as_stored(file_object, file_object.processed_analysis)
                 logging.debug('file added to db: {}'.format(file_object.uid))
             except PyMongoError:
                 logging.error('Could not update firmware:', exc_info=True)
@@ -139,24 +169,136 @@ class BackEndDbInterface(MongoInterfaceCommon):
 
     def _convert_to_firmware(self, entry, analysis_filter=None):
         firmware = super()._convert_to_firmware(entry, analysis_filter=None)
-        firmware.file_path = entry['file_path']
-        firmware.create_binary_from_path()
+        firmware.set_binary_path(entry['file_path'])
+        firmware.md5 = entry.get('md5')
         return firmware
 
     def _convert_to_file_object(self, entry, analysis_filter=None):
         file_object = super()._convert_to_file_object(entry, analysis_filter=None)
-        file_object.file_path = entry['file_path']
-        file_object.create_binary_from_path()
+        file_object.set_binary_path(entry['file_path'])
         return file_object
 
     def add_analysis(self, file_object: FileObject):
         if isinstance(file_object, (Firmware, FileObject)):
-            processed_analysis = self.sanitize_analysis(file_object.processed_analysis, file_object.uid)
-            for analysis_system in processed_analysis:
-                self._update_analysis(file_object, analysis_system, processed_analysis[analysis_system])
+            processed_analysis = self.sanitize_analysis(_get_unsaved_analyses(file_object), file_object.uid)
+            if self.analysis_buffer.batch_size > 1:
+                self._buffer_analysis(file_object, processed_analysis)
+            else:
+                for analysis_system in processed_analysis:
+                    self._update_analysis(file_object, analysis_system, processed_analysis[analysis_system])
+            self._update_tlsh_index(file_object, processed_analysis)
+            self._update_cached_summaries(file_object, processed_analysis)
+            # buffered results count as stored: they stay buffered until they are written (or the flush raises an error)
+            _mark_analyses_as_stored(file_object, processed_analysis)
         else:
             raise RuntimeError('Trying to add from type \'{}\' to database. Only allowed for \'Firmware\' and \'FileObject\'')
 
+    def iterate_stored_analysis_versions(self, plugins: List[str], limit: int = 0) -> Iterator[Tuple[str, dict]]:
+        '''
+        Iterate over the version fields (plugin version, system version, analysis date and failure) of the stored
+        analysis results of all file objects (used to warm up the analysis version cache of the analysis scheduler).
+
+        :param plugins: The plugins whose results are included.
+        :param limit: The maximum number of file objects (0 = no limit).
+        :return: An iterator of tuples of UID and (partial) analysis results.
+        '''
+        projection = {f'processed_analysis.{plugin}.{field}': 1 for plugin in plugins for field in ANALYSIS_VERSION_FIELDS}
+        for entry in self.file_objects.find({}, projection, limit=limit):
+            yield entry['_id'], entry.get('processed_analysis', {})
+
+    def _update_tlsh_index(self, file_object: FileObject, updated_plugins):
+        '''
+        Add the TLSH hash of `file_object` to the TLSH index (used by the tlsh plugin) if its file_hashes result was
+        updated.
+        '''
+        if 'file_hashes' in updated_plugins:
+            tlsh_hash = file_object.processed_analysis['file_hashes'].get('tlsh')
+            if tlsh_hash:
+                self.tlsh_index.update_one(
+                    {'_id': file_object.uid}, {'$set': {'tlsh': tlsh_hash, 'last_update': time()}}, upsert=True
+                )
+
+    def store_list_of_included_files(self, firmware_uid: str):
+        '''
+        Store the sorted list of all files included in a firmware, which is used instead of searching the virtual file
+        paths of all files (see `get_list_of_all_included_files`). Should be called once all included files are stored
+        (i.e. when the analysis of the firmware is completed).
+        '''
+        if not self.is_firmware(firmware_uid):
+            return
+        included_files = sorted(get_list_of_all_values(
+            self.file_objects, '$_id', match={f'virtual_file_path.{firmware_uid}': {'$exists': 'true'}}
+        ))
+        encoded_list = self.included_files_codec.encode(included_files)
+        if len(encoded_list) > MAX_INCLUDED_FILES_SIZE:
+            logging.warning(f'list of included files of {firmware_uid} is too large to be stored')
+            self.delete_list_of_included_files(firmware_uid)
+            return
+        self.included_files.replace_one(
+            {'_id': firmware_uid}, {'_id': firmware_uid, 'files': encoded_list, 'count': len(included_files)}, upsert=True
+        )
+
+    def delete_list_of_included_files(self, firmware_uid: str):
+        self.included_files.delete_one({'_id': firmware_uid})
+
+    def update_summary_cache(self, firmware_uid: str):
+        '''
+        Build the cached summaries of all plugins of a firmware. Should be called once all analysis results are stored
+        (i.e. when the analysis of the firmware is completed).
+        '''
+        self.flush_analysis_results()
+        firmware = self.get_firmware(firmware_uid)
+        if firmware is None:
+            return
+        self.get_list_of_all_included_files(firmware)
+        for plugin, result in firmware.processed_analysis.items():
+            if 'summary' in result:
+                self._store_summary_in_cache(firmware_uid, plugin, self._build_summary_of_firmware(firmware, plugin))
+
+    def delete_summary_cache(self, firmware_uid: str):
+        self.summary_cache.delete_many({'firmware': firmware_uid})
+
+    def _update_cached_summaries(self, file_object: FileObject, updated_plugins):
+        '''
+        Update the cached summaries of the firmware containing `file_object` (if there are any) with the summaries of
+        its updated analysis results. If a cached summary was changed concurrently, it is deleted (and rebuilt when it
+        is needed the next time).
+        '''
+        root_uids = {file_object.uid} if isinstance(file_object, Firmware) else {*file_object.virtual_file_path, *file_object.parent_firmware_uids}
+        for plugin in updated_plugins:
+            if 'summary' not in file_object.processed_analysis[plugin]:
+                continue
+            for root_uid in root_uids:
+                cache_entry = self.summary_cache.find_one({'_id': get_summary_cache_id(root_uid, plugin)})
+                if cache_entry is None:
+                    continue
+                summary = _replace_summary_entries_of_file(
+                    decode_sanitized_content(cache_entry['summary']), file_object.uid, file_object.processed_analysis[plugin]['summary']
+                )
+                if not self._store_summary_in_cache(root_uid, plugin, summary, version=cache_entry['version']):
+                    self.summary_cache.delete_one({'_id': cache_entry['_id']})
+
+    def _buffer_analysis(self, file_object: FileObject, processed_analysis: dict):
+        collection = self.firmwares if isinstance(file_object, Firmware) else self.file_objects
+        self.analysis_buffer.add(collection.name, file_object.uid, {
+            'processed_analysis.{}'.format(analysis_system): result
+            for analysis_system, result in processed_analysis.items()
+        })
+        if self.analysis_buffer.flush_is_due():
+            self.flush_analysis_results()
+
+    def flush_analysis_results(self, only_if_due: bool = False):
+        '''
+        Write buffered analysis results to the database. The buffer is local to the calling process.
+
+        :param only_if_due: Only flush if the size or time threshold of the buffer is reached.
+        '''
+        if not only_if_due or self.analysis_buffer.flush_is_due():
+            self.analysis_buffer.flush(lambda collection_name: self.main[collection_name])
+
+    def get_analysis_writer_statistics(self) -> dict:
+        return self.analysis_buffer.get_statistics()
+
     def _update_analysis(self, file_object: FileObject, analysis_system: str, result: dict):
         try:
             collection = self.firmwares if isinstance(file_object, Firmware) else self.file_objects
@@ -170,3 +312,35 @@ class BackEndDbInterface(MongoInterfaceCommon):
         except Exception as exception:
             logging.error('Update of analysis failed badly ({})'.format(exception))
             raise exception
+
+
+def _replace_summary_entries_of_file(summary: Dict[str, List[str]], uid: str, file_summary: List[str]) -> Dict[str, List[str]]:
+    for entry in list(summary):
+        if uid in summary[entry] and entry not in file_summary:
+            summary[entry].remove(uid)
+            if not summary[entry]:
+                del summary[entry]
+    for entry in file_summary:
+        if uid not in summary.setdefault(entry, []):
+            summary[entry].append(uid)
+    return summary
+
+
+def _get_unsaved_analyses(file_object: FileObject) -> dict:
+    '''
+    Get the analysis results of `file_object` that were added or changed since it was last written to the database
+    (results are considered changed if their analysis date differs from the stored one).
+    '''
+    stored_dates = getattr(file_object, 'stored_analysis_dates', {})  # for backwards compatibility
+    return {
+        plugin: result
+        for plugin, result in file_object.processed_analysis.items()
+        if plugin not in stored_dates or stored_dates[plugin] != result.get('analysis_date')
+    }
+
+
+def _mark_analyses_as_stored(file_object: FileObject, analyses: dict):
+    if not hasattr(file_object, 'stored_analysis_dates'):
+        file_object.stored_analysis_dates = {}
+    for plugin in analyses:
+        file_object.stored_analysis_dates[plugin] = file_object.processed_analysis[plugin].get('analysis_date')
@@ -1,7 +1,7 @@
 import json
 import logging
 import pickle
-from hashlib import md5
+from hashlib import sha256
 from typing import Dict, Iterable, List, Optional, Set
 
 import gridfs
@@ -11,7 +11,9 @@ from common_helper_mongo.aggregate import get_all_value_combinations_of_fields,
 from helperFunctions.data_conversion import convert_time_to_str, get_dict_size
 from objects.file import FileObject
 from objects.firmware import Firmware
+from storage.blob_cache import LruBlobCache
 from storage.mongo_interface import MongoInterface
+from storage.sanitize_codec import PickleCodec, decode_sanitized_content, get_codec
 
 PLUGINS_WITH_TAG_PROPAGATION = [  # FIXME This should be inferred in a sensible way. This is not possible yet.
     'crypto_material', 'cve_lookup', 'known_vulnerabilities', 'qemu_exec', 'software_components',
@@ -19,6 +21,11 @@ PLUGINS_WITH_TAG_PROPAGATION = [  # FIXME This should be inferred in a sensible
 ]
 
 FIELDS_SAVED_FROM_SANITIZATION = ['summary', 'tags']
+MAX_UID_QUERY_SIZE = 100000  # larger lists of included files are not used in `$in` queries
+MAX_CACHED_CONTENT_SIZE = 15 * 1024 ** 2  # MongoDB documents are limited to 16 MiB
+
+CONTENT_ADDRESSED_PREFIX = 'sha256:'
+SANITIZE_CACHE = LruBlobCache(max_size=64 * 1024 * 1024)
 
 
 class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance-attributes
@@ -30,11 +37,16 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
         self.file_objects = self.main.file_objects
         self.search_query_cache = self.main.search_query_cache
         self.locks = self.main.locks
+        self.tlsh_index = self.main.tlsh_index
+        self.included_files = self.main.included_files
+        self.summary_cache = self.main.summary_cache
         # sanitize stuff
         self.report_threshold = int(self.config['data_storage']['report_threshold'])
         sanitize_db = self.config['data_storage'].get('sanitize_database', 'faf_sanitize')
         self.sanitize_storage = self.client[sanitize_db]
         self.sanitize_fs = gridfs.GridFS(self.sanitize_storage)
+        self.sanitize_references = self.sanitize_storage.references
+        self.sanitize_codec = get_codec(self.config['data_storage'].get('sanitize_codec', PickleCodec.NAME))
 
     def exists(self, uid):
         return self.is_firmware(uid) or self.is_file_object(uid)
@@ -68,8 +80,12 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
         if fo is None:
             raise Exception(f'UID not found: {uid}')
         fo.list_of_all_included_files = self.get_list_of_all_included_files(fo)
+        cached_summaries = self.get_cached_summaries(fo.uid) if isinstance(fo, Firmware) else {}
         for analysis in fo.processed_analysis:
-            fo.processed_analysis[analysis]['summary'] = self.get_summary(fo, analysis)
+            if analysis in cached_summaries:
+                fo.processed_analysis[analysis]['summary'] = cached_summaries[analysis]
+            else:
+                fo.processed_analysis[analysis]['summary'] = self.get_summary(fo, analysis)
         return fo
 
     def get_firmware(self, uid: str, analysis_filter: Optional[List[str]] = None) -> Optional[Firmware]:
@@ -182,7 +198,7 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
                     sanitized_dict[key] = self._retrieve_binaries(sanitized_dict, key)
                 else:
                     sanitized_dict[key].pop('file_system_flag')
-            except (KeyError, IndexError, AttributeError, TypeError, pickle.PickleError):
+            except (KeyError, IndexError, AttributeError, TypeError, ValueError, pickle.PickleError):
                 logging.error('Could not retrieve information:', exc_info=True)
         return sanitized_dict
 
@@ -190,22 +206,49 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
         tmp_dict = {}
         for analysis_key in analysis_dict[key].keys():
             if analysis_key not in FIELDS_SAVED_FROM_SANITIZATION:
-                file_name = f'{get_safe_name(key)}_{get_safe_name(analysis_key)}_{uid}'
-                self._store_in_sanitize_db(pickle.dumps(analysis_dict[key][analysis_key]), file_name)
-                tmp_dict[analysis_key] = file_name
+                reference = get_sanitize_reference(key, analysis_key, uid)
+                tmp_dict[analysis_key] = self._store_in_sanitize_db(self.sanitize_codec.encode(analysis_dict[key][analysis_key]), reference)
             else:
                 tmp_dict[analysis_key] = analysis_dict[key][analysis_key]
         return tmp_dict
 
-    def _store_in_sanitize_db(self, content: bytes, file_name: str):
-        if self.sanitize_fs.exists({'filename': file_name}):
-            md5_hash = md5(content).hexdigest()
-            if self.sanitize_fs.exists({'md5': md5_hash}):
-                return  # there is already an up to date entry -> do nothing
-            for old_entry in self.sanitize_fs.find({'filename': file_name}):  # delete old entries first
-                logging.debug(f'deleting old sanitize db entry of {file_name} with id {old_entry._id}')  # pylint: disable=protected-access
-                self.sanitize_fs.delete(old_entry._id)  # pylint: disable=protected-access
-        self.sanitize_fs.put(content, filename=file_name)
+    def _store_in_sanitize_db(self, content: bytes, reference: str) -> str:
+        '''
+        Sanitized results are stored content-addressed (i.e. named after the hash of the content), so identical results
+        of different files are only stored once. For each stored content, the references (`<plugin>_<key>_<uid>`) to it
+        are kept in the `references` collection and the content is deleted once it is no longer referenced.
+
+        :param content: The (serialized) content.
+        :param reference: The reference to the content (stays the same when a result is updated).
+        :return: The name of the stored content.
+        '''
+        file_name = f'{CONTENT_ADDRESSED_PREFIX}{sha256(content).hexdigest()}'
+        # the reference is added first: an entry is only deleted together with its (empty) reference document
+        update_result = self.sanitize_references.update_one({'_id': file_name}, {'$addToSet': {'references': reference}}, upsert=True)
+        if update_result.upserted_id is not None or not self.sanitize_fs.exists({'filename': file_name}):
+            self.sanitize_fs.put(content, filename=file_name)
+        self._remove_sanitize_db_reference(reference, keep=file_name)
+        for old_entry in self.sanitize_fs.find({'filename': reference}):  # entries stored before content addressing
+            self.sanitize_fs.delete(old_entry._id)  # pylint: disable=protected-access
+        return file_name
+
+    def _remove_sanitize_db_reference(self, reference: str, keep: Optional[str] = None):
+        '''
+        Remove the reference from the content it points to (unless it is `keep`) and delete the content if it is no
+        longer referenced. The content is only deleted if the (empty) reference document could be deleted, and only the
+        versions of it that were stored before: if the content is referenced again concurrently, the reference document
+        is created again and the content is stored again (see `_store_in_sanitize_db`).
+        '''
+        previous_entry = self.sanitize_references.find_one_and_update(
+            {'references': reference, '_id': {'$ne': keep}}, {'$pull': {'references': reference}}
+        )
+        if previous_entry is None:
+            return
+        stored_versions = [entry._id for entry in self.sanitize_fs.find({'filename': previous_entry['_id']})]  # pylint: disable=protected-access
+        if self.sanitize_references.delete_one({'_id': previous_entry['_id'], 'references': {'$size': 0}}).deleted_count:
+            logging.debug(f'deleting unreferenced sanitize db entry {previous_entry["_id"]}')
+            for file_id in stored_versions:
+                self.sanitize_fs.delete(file_id)
 
     def _retrieve_binaries(self, sanitized_dict, key):
         tmp_dict = {}
@@ -214,15 +257,29 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
                 tmp_dict[analysis_key] = sanitized_dict[key][analysis_key]
             else:
                 logging.debug(f'Retrieving {analysis_key}')
-                tmp = self.sanitize_fs.get_last_version(sanitized_dict[key][analysis_key])
-                if tmp is not None:
-                    report = pickle.loads(tmp.read())
+                content = self._get_content_from_sanitize_db(sanitized_dict[key][analysis_key])
+                if content is not None:
+                    report = decode_sanitized_content(content)
                 else:
                     logging.error(f'sanitized file not found: {sanitized_dict[key][analysis_key]}')
                     report = {}
                 tmp_dict[analysis_key] = report
         return tmp_dict
 
+    def _get_content_from_sanitize_db(self, file_name: str) -> Optional[bytes]:
+        content_addressed = file_name.startswith(CONTENT_ADDRESSED_PREFIX)  # only immutable entries may be cached
+        if content_addressed:
+            content = SANITIZE_CACHE.get(file_name)
+            if content is not None:
+                return content
+        tmp = self.sanitize_fs.get_last_version(file_name)
+        if tmp is None:
+            return None
+        content = tmp.read()
+        if content_addressed:
+            SANITIZE_CACHE.put(file_name, content)
+        return content
+
     def get_specific_fields_of_db_entry(self, uid, field_dict):
         return self.file_objects.find_one(uid, field_dict) or self.firmwares.find_one(uid, field_dict)
 
@@ -230,25 +287,40 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
 
     def get_list_of_all_included_files(self, fo):
         if isinstance(fo, Firmware):
-            fo.list_of_all_included_files = get_list_of_all_values(
-                self.file_objects, '$_id', match={f'virtual_file_path.{fo.uid}': {'$exists': 'true'}})
+            fo.list_of_all_included_files = self.get_materialized_included_files(fo.uid)
+            if fo.list_of_all_included_files is None:
+                fo.list_of_all_included_files = get_list_of_all_values(
+                    self.file_objects, '$_id', match={f'virtual_file_path.{fo.uid}': {'$exists': 'true'}})
         if fo.list_of_all_included_files is None:
             fo.list_of_all_included_files = list(self.get_set_of_all_included_files(fo))
         fo.list_of_all_included_files.sort()
         return fo.list_of_all_included_files
 
+    def get_materialized_included_files(self, firmware_uid: str) -> Optional[List[str]]:
+        '''
+        Get the sorted UIDs of all files included in a firmware from the list that is stored when its analysis is
+        completed.
+
+        :param firmware_uid: The UID of the firmware.
+        :return: The list of UIDs or `None` if there is no stored list (e.g. because the firmware is being analyzed).
+        '''
+        entry = self.included_files.find_one({'_id': firmware_uid}, {'files': 1})
+        return decode_sanitized_content(entry['files']) if entry is not None else None
+
     def get_set_of_all_included_files(self, fo):
         '''
         return a set of all included files uids
         the set includes fo uid as well
         '''
-        if fo is not None:
-            files = {fo.uid}
-            included_files = self.get_objects_by_uid_list(fo.files_included, analysis_filter=[])
-            for item in included_files:
-                files.update(self.get_set_of_all_included_files(item))
-            return files
-        return set()
+        if fo is None:
+            return set()
+        files = {fo.uid}
+        uids_to_query = set(fo.files_included) - files
+        while uids_to_query:  # one query per level of the file tree
+            entries = list(self.file_objects.find({'_id': {'$in': list(uids_to_query)}}, {'files_included': 1}))
+            files.update(entry['_id'] for entry in entries)
+            uids_to_query = {uid for entry in entries for uid in entry['files_included']} - files
+        return files
 
     def get_uids_of_all_included_files(self, uid: str) -> Set[str]:
         return {
@@ -264,13 +336,61 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
             return None
         if not isinstance(fo, Firmware):
             return self._collect_summary(fo.list_of_all_included_files, selected_analysis)
+        summary = self.get_cached_summaries(fo.uid, plugin=selected_analysis).get(selected_analysis)
+        if summary is None:
+            summary = self._build_summary_of_firmware(fo, selected_analysis)
+            if not self.READ_ONLY:
+                self._store_summary_in_cache(fo.uid, selected_analysis, summary)
+        return summary
+
+    def _build_summary_of_firmware(self, firmware: Firmware, selected_analysis: str) -> dict:
         summary = get_all_value_combinations_of_fields(
             self.file_objects, f'$processed_analysis.{selected_analysis}.summary', '$_id',
-            unwind=True, match={f'virtual_file_path.{fo.uid}': {'$exists': 'true'}})
-        fo_summary = self._get_summary_of_one(fo, selected_analysis)
+            unwind=True, match=self._get_included_files_query(firmware))
+        fo_summary = self._get_summary_of_one(firmware, selected_analysis)
         self._update_summary(summary, fo_summary)
         return summary
 
+    def get_cached_summaries(self, firmware_uid: str, plugin: Optional[str] = None) -> Dict[str, dict]:
+        '''
+        Get the cached summaries (summary entry -> list of UIDs) of a firmware.
+
+        :param firmware_uid: The UID of the firmware.
+        :param plugin: Only get the summary of this plugin (default: all cached summaries).
+        :return: A dictionary with the plugin names as keys and the summaries as values.
+        '''
+        query = {'firmware': firmware_uid} if plugin is None else {'_id': get_summary_cache_id(firmware_uid, plugin)}
+        return {
+            entry['plugin']: decode_sanitized_content(entry['summary'])
+            for entry in self.summary_cache.find(query, {'plugin': 1, 'summary': 1})
+        }
+
+    def _store_summary_in_cache(self, firmware_uid: str, plugin: str, summary: dict, version: Optional[int] = None) -> bool:
+        '''
+        Store (or replace) a cached summary. If `version` is set, the entry is only replaced if it was not changed in
+        the meantime.
+
+        :return: `True` if the summary was stored.
+        '''
+        encoded_summary = self.sanitize_codec.encode(summary)
+        if len(encoded_summary) > MAX_CACHED_CONTENT_SIZE:
+            logging.debug(f'summary of {plugin} for {firmware_uid} is too large to be cached')
+            return False
+        cache_id = get_summary_cache_id(firmware_uid, plugin)
+        entry = {'firmware': firmware_uid, 'plugin': plugin, 'summary': encoded_summary, 'version': (version or 0) + 1}
+        if version is None:
+            self.summary_cache.replace_one({'_id': cache_id}, entry, upsert=True)
+            return True
+        return self.summary_cache.replace_one({'_id': cache_id, 'version': version}, entry).modified_count == 1
+
+    def _get_included_files_query(self, firmware: Firmware) -> dict:
+        included_files = firmware.list_of_all_included_files
+        if included_files is None:
+            included_files = self.get_materialized_included_files(firmware.uid)
+        if included_files is not None and len(included_files) <= MAX_UID_QUERY_SIZE:
+            return {'_id': {'$in': included_files}}  # uses the index instead of scanning the whole collection
+        return {f'virtual_file_path.{firmware.uid}': {'$exists': 'true'}}
+
     @staticmethod
     def _get_summary_of_one(file_object, selected_analysis):
         summary = {}
@@ -356,6 +476,10 @@ class MongoInterfaceCommon(MongoInterface):  # pylint: disable=too-many-instance
         return self.get_objects_by_uid_list(uids, analysis_filter=PLUGINS_WITH_TAG_PROPAGATION)
 
 
+def get_sanitize_reference(plugin: str, analysis_key: str, uid: str) -> str:
+    return f'{get_safe_name(plugin)}_{get_safe_name(analysis_key)}_{uid}'
+
+
 def is_not_sanitized(field, analysis_result):
     # As of now, all _saved_ fields are dictionaries, so the str check ensures it's not a reference to gridFS
     return field in FIELDS_SAVED_FROM_SANITIZATION and not isinstance(analysis_result[field], str)
@@ -369,3 +493,7 @@ def append_unique_tag(unique_tags: Dict[str, dict], tag: dict, plugin_name: str,
             unique_tags[plugin_name][tag_type] = tag
     else:
         unique_tags[plugin_name] = {tag_type: tag}
+
+
+def get_summary_cache_id(firmware_uid: str, plugin: str) -> str:
+    return f'{firmware_uid}:{plugin}'
@@ -1,7 +1,7 @@
 import logging
 from contextlib import suppress
 from time import time
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from pymongo.errors import PyMongoError
 
@@ -90,13 +90,25 @@ class CompareDbInterface(MongoInterfaceCommon):
         db_entries = self.compare_results.find({'submission_date': {'$gt': 1}}, {'_id': 1})
         return len([1 for entry in db_entries if not self.check_objects_exist(entry['_id'], raise_exc=False)])
 
-    def get_ssdeep_hash(self, uid):
-        file_object_entry = self.file_objects.find_one({'_id': uid}, {'processed_analysis.file_hashes.ssdeep': 1})
-        return file_object_entry['processed_analysis']['file_hashes']['ssdeep'] if 'file_hashes' in file_object_entry['processed_analysis'] else None
-
-    def get_entropy(self, uid):
-        file_object_entry = self.file_objects.find_one({'_id': uid}, {'processed_analysis.unpacker.entropy': 1})
-        return file_object_entry['processed_analysis']['unpacker']['entropy'] if 'unpacker' in file_object_entry['processed_analysis'] and 'entropy' in file_object_entry['processed_analysis']['unpacker'] else 0.0
+    def get_ssdeep_hashes(self, uids: Iterable[str]) -> Dict[str, str]:
+        '''
+        Get the ssdeep hashes of multiple files with a single query. Files without ssdeep hash are omitted.
+        '''
+        query = self.file_objects.find(
+            {'_id': {'$in': list(uids)}, 'processed_analysis.file_hashes.ssdeep': {'$exists': True}},
+            {'processed_analysis.file_hashes.ssdeep': 1}
+        )
+        return {entry['_id']: entry['processed_analysis']['file_hashes']['ssdeep'] for entry in query}
+
+    def get_entropies(self, uids: Iterable[str]) -> Dict[str, float]:
+        '''
+        Get the entropy of multiple files with a single query. Files without entropy are omitted.
+        '''
+        query = self.file_objects.find(
+            {'_id': {'$in': list(uids)}, 'processed_analysis.unpacker.entropy': {'$exists': True}},
+            {'processed_analysis.unpacker.entropy': 1}
+        )
+        return {entry['_id']: entry['processed_analysis']['unpacker']['entropy'] for entry in query}
 
     def get_exclusive_files(self, compare_id: str, root_uid: str) -> List[str]:
         if compare_id is None or root_uid is None:
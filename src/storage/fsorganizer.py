@@ -3,6 +3,8 @@ from pathlib import Path
 
 from common_helper_files import delete_file, write_binary_to_file
 
+from helperFunctions.fileSystem import link_or_copy_file
+
 
 class FSOrganizer:
     '''
@@ -13,14 +15,24 @@ class FSOrganizer:
         self.data_storage_path = Path(self.config['data_storage']['firmware_file_storage_directory']).absolute()
         self.data_storage_path.parent.mkdir(parents=True, exist_ok=True)
 
-    def store_file(self, file_object):
-        if file_object.binary is None:
-            logging.error('Cannot store binary! No binary data specified')
-        else:
-            destination_path = self.generate_path(file_object)
+    def store_file(self, file_object, move: bool = False):
+        '''
+        Store the binary of a file object. If the binary was not loaded yet, the local file is moved (if `move` is set)
+        or linked into the storage (see `link_or_copy_file`) instead of writing the binary.
+
+        :param file_object: The file object to store.
+        :param move: Whether the local file of the file object may be moved (e.g. a temporary file).
+        '''
+        destination_path = self.generate_path(file_object)
+        if file_object.binary_is_loaded:
             write_binary_to_file(file_object.binary, destination_path, overwrite=False)
-            file_object.file_path = destination_path
-            file_object.create_binary_from_path()
+        elif file_object.file_path is not None and Path(file_object.file_path).is_file():
+            link_or_copy_file(file_object.file_path, destination_path, move=move)
+        else:
+            logging.error('Cannot store binary! No binary data specified')
+            return
+        file_object.file_path = destination_path
+        file_object.create_binary_from_path()
 
     def delete_file(self, uid):
         local_file_path = self.generate_path_from_uid(uid)
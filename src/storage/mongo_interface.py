@@ -1,4 +1,7 @@
+import os
 import warnings
+from threading import Lock
+from typing import Callable, Dict, Hashable
 
 from pymongo import MongoClient, errors
 
@@ -7,11 +10,62 @@ from helperFunctions.process import complete_shutdown
 warnings.filterwarnings('ignore', module='pymongo.topology')
 
 
+class MongoClientPool:
+    '''
+    Process-wide pool of (authenticated) mongo clients. `MongoClient` is thread-safe and maintains its own connection
+    pool, so all interfaces with the same key can share one client instead of connecting and authenticating again for
+    every `ConnectTo` block. Clients must not be used across `fork()`: a forked child process starts with an empty pool.
+    This means that analysis plugins only benefit from the pool if they use persistent workers (see
+    `AnalysisBasePlugin`): otherwise each file is analyzed in a new forked process, which creates its own client.
+    '''
+
+    def __init__(self):
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # the clients of the parent process are dropped without closing them (this would affect the parent)
+        self._clients = {}  # type: Dict[Hashable, MongoClient]
+        self._lock = Lock()
+        self._pid = os.getpid()
+
+    def get_client(self, key: Hashable, create_client: Callable[[], MongoClient]) -> MongoClient:
+        '''
+        Get the client for `key` or create (and store) a new client with `create_client` if there is none yet.
+
+        :param key: The key of the client.
+        :param create_client: A function returning a new (authenticated) client.
+        :return: The shared client.
+        '''
+        if self._pid != os.getpid():  # e.g. forked by a WSGI server without running the fork hooks
+            self._reset()
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = create_client()
+            return self._clients[key]
+
+    def close_all(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+CLIENT_POOL = MongoClientPool()
+
+
 class MongoInterface(object):
     '''
     This is the mongo interface base class handling:
     - load config
     - setup connection including authentication
+
+    Interfaces are lightweight views over a client shared by all interfaces of the same class and access rights (see
+    `MongoClientPool`), so they can be created for each access.
     '''
 
     READ_ONLY = False
@@ -20,22 +74,29 @@ class MongoInterface(object):
         self.config = config
         mongo_server = self.config['data_storage']['mongo_server']
         mongo_port = self.config['data_storage']['mongo_port']
-        self.client = MongoClient('mongodb://{}:{}'.format(mongo_server, mongo_port), connect=False)
-        self._authenticate()
+        pool_key = (type(self), self.READ_ONLY, mongo_server, mongo_port, self._get_credentials()[0])
+        self.client = CLIENT_POOL.get_client(pool_key, lambda: self._create_client(mongo_server, mongo_port))
         self._setup_database_mapping()
 
     def shutdown(self):
-        self.client.close()
+        pass  # the client is shared and stays open until the process exits
 
     def _setup_database_mapping(self):
         pass
 
-    def _authenticate(self):
+    def _create_client(self, mongo_server: str, mongo_port: str) -> MongoClient:
+        client = MongoClient('mongodb://{}:{}'.format(mongo_server, mongo_port), connect=False)
+        self._authenticate(client)
+        return client
+
+    def _get_credentials(self):
         if self.READ_ONLY:
-            user, pw = self.config['data_storage']['db_readonly_user'], self.config['data_storage']['db_readonly_pw']
-        else:
-            user, pw = self.config['data_storage']['db_admin_user'], self.config['data_storage']['db_admin_pw']
+            return self.config['data_storage']['db_readonly_user'], self.config['data_storage']['db_readonly_pw']
+        return self.config['data_storage']['db_admin_user'], self.config['data_storage']['db_admin_pw']
+
+    def _authenticate(self, client: MongoClient):
+        user, pw = self._get_credentials()
         try:
-            self.client.admin.authenticate(user, pw, mechanism='SCRAM-SHA-1')
+            client.admin.authenticate(user, pw, mechanism='SCRAM-SHA-1')
         except errors.OperationFailure as e:  # Authentication not successful
             complete_shutdown('Error: Authentication not successful: {}'.format(e))
@@ -0,0 +1,131 @@
+'''
+Codecs for analysis results that are moved out of the main database into the sanitize GridFS ("sanitized" results).
+
+Every codec except pickle prefixes its output with a magic header, so the codec of a stored result can be determined
+when it is read (entries without header were written with pickle before the codec became configurable).
+'''
+import logging
+import pickle
+from typing import Any
+
+import msgpack
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TUPLE_EXT_TYPE = 1
+
+
+class SanitizeCodec:
+    NAME = None
+    MAGIC = b''
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, content: bytes) -> Any:
+        raise NotImplementedError
+
+
+class PickleCodec(SanitizeCodec):
+    NAME = 'pickle'
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value)
+
+    def decode(self, content: bytes) -> Any:
+        return pickle.loads(content)
+
+
+class MsgpackCodec(SanitizeCodec):
+    '''
+    Values that cannot be represented in msgpack (e.g. sets or integers with more than 64 bits) are stored with pickle
+    instead, so encoding never fails for values that could be stored before.
+    '''
+    NAME = 'msgpack'
+    MAGIC = b'FACT\x00mp\x00'
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            return self.MAGIC + self._compress(_pack(value))
+        except (TypeError, ValueError, OverflowError):
+            logging.debug('result can not be encoded with msgpack: falling back to pickle')
+            return PickleCodec().encode(value)
+
+    def decode(self, content: bytes) -> Any:
+        return msgpack.unpackb(self._decompress(content[len(self.MAGIC):]), **UNPACK_OPTIONS)
+
+    def _compress(self, content: bytes) -> bytes:  # pylint: disable=no-self-use
+        return content
+
+    def _decompress(self, content: bytes) -> bytes:  # pylint: disable=no-self-use
+        return content
+
+
+class ZstdMsgpackCodec(MsgpackCodec):
+    NAME = 'msgpack+zstd'
+    MAGIC = b'FACT\x00mz\x00'
+
+    def __init__(self, level: int = 3):
+        self.level = level
+
+    def _compress(self, content: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(content)
+
+    def _decompress(self, content: bytes) -> bytes:
+        try:
+            return zstandard.ZstdDecompressor().decompress(content)
+        except zstandard.ZstdError as error:
+            raise ValueError(f'invalid zstd content: {error}') from error
+
+
+CODECS = {codec.NAME: codec for codec in [PickleCodec, MsgpackCodec, ZstdMsgpackCodec]}
+MAGIC_LENGTH = len(MsgpackCodec.MAGIC)
+
+
+def get_codec(name: str) -> SanitizeCodec:
+    '''
+    Get the codec for the name configured in `[data_storage] sanitize_codec`.
+    '''
+    if name not in CODECS:
+        raise ValueError(f'unknown sanitize codec {name} (available: {", ".join(CODECS)})')
+    if name == ZstdMsgpackCodec.NAME and zstandard is None:
+        logging.warning('zstandard is not installed: content is stored without compression')
+        name = MsgpackCodec.NAME
+    return CODECS[name]()
+
+
+def get_codec_for_content(header: bytes) -> SanitizeCodec:
+    for codec in [MsgpackCodec, ZstdMsgpackCodec]:
+        if header.startswith(codec.MAGIC):
+            return codec()
+    return PickleCodec()
+
+
+def decode_sanitized_content(content: bytes) -> Any:
+    return get_codec_for_content(content[:MAGIC_LENGTH]).decode(content)
+
+
+def _pack(value: Any) -> bytes:
+    # strict types: tuples are not converted to lists but stored as extension type (see _pack_default)
+    return msgpack.packb(value, use_bin_type=True, strict_types=True, default=_pack_default)
+
+
+def _pack_default(value: Any):
+    if isinstance(value, tuple):
+        return msgpack.ExtType(TUPLE_EXT_TYPE, _pack(list(value)))
+    for base_type in [dict, list, str, bytes, int, float]:  # subclasses (e.g. OrderedDict) are stored as base type
+        if isinstance(value, base_type):
+            return base_type(value)
+    raise TypeError(f'can not serialize {type(value)}')
+
+
+def _unpack_ext(code: int, data: bytes):
+    if code == TUPLE_EXT_TYPE:
+        return tuple(msgpack.unpackb(data, **UNPACK_OPTIONS))
+    return msgpack.ExtType(code, data)
+
+
+UNPACK_OPTIONS = dict(raw=False, strict_map_key=False, ext_hook=_unpack_ext)
@@ -0,0 +1,116 @@
+'''
+Index for TLSH similarity queries ("all files within distance <= x").
+
+The distance of two TLSH hashes (`tlsh.diff`) is the sum of a header distance (file length, quartile ratios and
+checksum) and a body distance. Metric trees do not work well here: the distance is not a metric and the body distance
+of unrelated files alone is already close to the usual thresholds. The header distance, however, grows by 12 per step
+for length and quartile ratio differences, so it exceeds the threshold for most pairs of files (e.g. whenever the file
+sizes differ by more than a factor of ~3). Hashes are therefore bucketed by their header fields and only buckets whose
+header distance is within the threshold are compared. Since the header distance is a lower bound of the full distance,
+the results are exact.
+'''
+from typing import Dict, Tuple
+
+import tlsh
+
+HEADER_LENGTH = 6  # checksum, length and quartile ratios (2 hex digits each)
+HEADER_STEP_PENALTY = 12  # see `tlsh.diff`: larger header differences are multiplied by this factor
+
+
+def get_tlsh_header(tlsh_hash: str) -> Tuple[int, int, int]:
+    '''
+    Get the length value and the two quartile ratios from the header of a TLSH hash.
+
+    :param tlsh_hash: A TLSH hash (with or without version prefix).
+    :return: A tuple of (length value, q1 ratio, q2 ratio).
+    '''
+    if tlsh_hash.startswith('T1'):
+        tlsh_hash = tlsh_hash[2:]
+    if len(tlsh_hash) < HEADER_LENGTH:
+        raise ValueError(f'invalid TLSH hash: {tlsh_hash}')
+    # the bytes of the header are stored with swapped nibbles
+    return int(tlsh_hash[3] + tlsh_hash[2], 16), int(tlsh_hash[4], 16), int(tlsh_hash[5], 16)
+
+
+def _parse_hash(tlsh_hash: str) -> tlsh.Tlsh:
+    # comparing parsed hashes is several times faster than comparing hash strings with `tlsh.diff`
+    parsed_hash = tlsh.Tlsh()  # pylint: disable=c-extension-no-member
+    parsed_hash.fromTlshStr(tlsh_hash)
+    return parsed_hash
+
+
+def _mod_diff(first: int, second: int, modulus: int) -> int:
+    difference = abs(first - second)
+    return min(difference, modulus - difference)
+
+
+def _length_distance(first: int, second: int) -> int:
+    difference = _mod_diff(first, second, 256)
+    return difference if difference <= 1 else difference * HEADER_STEP_PENALTY
+
+
+def _ratio_distance(first: int, second: int) -> int:
+    difference = _mod_diff(first, second, 16)
+    return difference if difference <= 1 else (difference - 1) * HEADER_STEP_PENALTY
+
+
+class TlshIndex:
+    '''
+    In-memory TLSH index. Entries are bucketed by length value and quartile ratios of their hash.
+    '''
+
+    def __init__(self):
+        self._buckets = {}  # type: Dict[int, Dict[Tuple[int, int], Dict[str, tlsh.Tlsh]]]
+        self._headers = {}  # type: Dict[str, Tuple[int, int, int]]
+
+    def __len__(self):
+        return len(self._headers)
+
+    def __contains__(self, uid: str):
+        return uid in self._headers
+
+    def add(self, uid: str, tlsh_hash: str):
+        self.remove(uid)
+        header = get_tlsh_header(tlsh_hash)
+        self._buckets.setdefault(header[0], {}).setdefault(header[1:], {})[uid] = _parse_hash(tlsh_hash)
+        self._headers[uid] = header
+
+    def remove(self, uid: str):
+        header = self._headers.pop(uid, None)
+        if header is not None:
+            ratio_buckets = self._buckets[header[0]]
+            del ratio_buckets[header[1:]][uid]
+            if not ratio_buckets[header[1:]]:
+                del ratio_buckets[header[1:]]
+            if not ratio_buckets:
+                del self._buckets[header[0]]
+
+    def query(self, tlsh_hash: str, max_distance: int = 150) -> Dict[str, int]:
+        '''
+        Find all entries with a TLSH distance of at most `max_distance` to `tlsh_hash`.
+
+        :param tlsh_hash: The TLSH hash to compare.
+        :param max_distance: The maximum distance of the results.
+        :return: A dictionary of matching UIDs and their distance.
+        '''
+        result = {}
+        compare = _parse_hash(tlsh_hash).diff
+        for bucket in self._iterate_candidate_buckets(get_tlsh_header(tlsh_hash), max_distance):
+            for uid, distance in zip(bucket, map(compare, bucket.values())):
+                if distance <= max_distance:
+                    result[uid] = distance
+        return result
+
+    def _iterate_candidate_buckets(self, header: Tuple[int, int, int], max_distance: int):
+        length, q1_ratio, q2_ratio = header
+        max_length_difference = min(127, max(1, max_distance // HEADER_STEP_PENALTY))
+        for length_difference in range(-max_length_difference, max_length_difference + 1):
+            other_length = (length + length_difference) % 256
+            if other_length not in self._buckets:
+                continue
+            remaining_distance = max_distance - _length_distance(length, other_length)
+            if remaining_distance < 0:
+                continue
+            for (other_q1_ratio, other_q2_ratio), bucket in self._buckets[other_length].items():
+                if _ratio_distance(q1_ratio, other_q1_ratio) + _ratio_distance(q2_ratio, other_q2_ratio) <= remaining_distance:
+                    yield bucket
@@ -0,0 +1,58 @@
+'''
+Compare the throughput (files/sec) of the default analysis execution mode (one process + Manager per file) with
+persistent analysis worker processes.
+
+Usage (from the src directory): python3 -m test.benchmark.benchmark_analysis_workers [--files N] [--threads N]
+'''
+import argparse
+import os
+from configparser import ConfigParser
+from time import time
+
+from analysis.PluginBase import AnalysisBasePlugin
+from objects.file import FileObject
+
+
+class _PluginAdministratorMock:
+    def register_plugin(self, name, plugin_instance):
+        pass
+
+
+def _get_config(threads: int, persistent: bool) -> ConfigParser:
+    config = ConfigParser()
+    config.add_section('base')
+    config.set('base', 'threads', str(threads))
+    config.set('base', 'persistent_workers', str(persistent).lower())
+    config.add_section('ExpertSettings')
+    config.set('ExpertSettings', 'block_delay', '0.01')
+    return config
+
+
+def run_benchmark(file_objects, threads: int, persistent: bool) -> float:
+    plugin = AnalysisBasePlugin(_PluginAdministratorMock(), config=_get_config(threads, persistent))
+    try:
+        start = time()
+        for file_object in file_objects:
+            plugin.in_queue.put(file_object)
+        for _ in file_objects:
+            plugin.out_queue.get(timeout=60)
+        return len(file_objects) / (time() - start)
+    finally:
+        plugin.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=500, help='number of files to analyze')
+    parser.add_argument('--threads', type=int, default=2, help='number of analysis workers')
+    parser.add_argument('--size', type=int, default=64 * 1024, help='size of each file in bytes')
+    args = parser.parse_args()
+
+    file_objects = [FileObject(binary=os.urandom(args.size)) for _ in range(args.files)]
+    for label, persistent in [('process per file', False), ('persistent workers', True)]:
+        files_per_second = run_benchmark(file_objects, args.threads, persistent)
+        print(f'{label:>20}: {files_per_second:8.1f} files/sec')
+
+
+if __name__ == '__main__':
+    main()
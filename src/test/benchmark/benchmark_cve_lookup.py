@@ -0,0 +1,117 @@
+'''
+Compare the vulnerability lookup of the cve_lookup plugin with in-memory CPE index and result cache with the former
+lookup (a CPE table scan for every software component).
+
+The database is generated: the CPE table contains `--cpe-entries` entries of random products (and the products in
+COMPONENTS), the CVE table contains entries for 10 % of them and the summary table for 1 %. The looked up components
+are drawn from COMPONENTS with a skewed distribution (a few components like BusyBox or OpenSSL occur in almost every
+firmware).
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_cve_lookup [--cpe-entries 500000] [--lookups 10000] [--no-uncached]
+'''
+import argparse
+import random
+import string
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import time
+
+from plugins.analysis.cve_lookup.code import cve_lookup
+from plugins.analysis.cve_lookup.internal.database_interface import (
+    CPE_DB_FIELDS, CVE_DB_FIELDS, QUERIES, DatabaseInterface
+)
+
+COMPONENTS = [
+    'BusyBox 1.24.1', 'BusyBox 1.19.4', 'BusyBox 1.30.1', 'OpenSSL 1.0.2k', 'OpenSSL 1.0.1e', 'OpenSSL 1.1.1d',
+    'Dropbear SSH 2017.75', 'Dropbear SSH 2019.78', 'Dnsmasq 2.40', 'Dnsmasq 2.78', 'Linux Kernel 2.6.36',
+    'Linux Kernel 3.10.14', 'Linux Kernel 4.4.60', 'GNU C Library 2.19', 'uClibc 0.9.33', 'lighttpd 1.4.35',
+    'OpenSSH 7.4', 'zlib 1.2.8', 'curl 7.64.0', 'hostapd 2.6', 'wpa_supplicant 2.6', 'Samba 3.0.37', 'jQuery 1.8.3',
+    'SQLite 3.8.10', 'libpng 1.6.34', 'Netatalk 3.1.7', 'MiniUPnP 1.9', 'Boa 0.94.13', 'ProFTPD 1.3.5',
+]
+
+
+def _random_name(length: int = 8) -> str:
+    return ''.join(random.choices(string.ascii_lowercase, k=length))
+
+
+def _escape(version: str) -> str:
+    return version.replace('.', '\\.')
+
+
+def _cpe_row(vendor: str, product: str, version: str) -> tuple:
+    return (f'cpe:2.3:a:{vendor}:{product}:{version}', 'a', vendor, product, version) + ('ANY',) * (len(CPE_DB_FIELDS) - 5)
+
+
+def _cve_row(cve_id: str, vendor: str, product: str, version: str) -> tuple:
+    row = (cve_id, 2020, f'cpe:2.3:a:{vendor}:{product}:{version}', '9.8', 'N/A', 'a', vendor, product, version)
+    return row + ('ANY',) * 7 + ('',) * (len(CVE_DB_FIELDS) - 16)
+
+
+def generate_database(db_path: str, cpe_entries: int, cve_ratio: float = 0.1):
+    random.seed(cpe_entries)
+    cpe_rows, cve_rows, summary_rows = [], [], []
+    for component in COMPONENTS:
+        name, version = component.rsplit(' ', 1)
+        product = name.lower().replace(' ', '_')
+        for minor in range(30):
+            cpe_rows.append(_cpe_row(product.split('_')[0], product, _escape(f'{version}.{minor}')))
+        cpe_rows.append(_cpe_row(product.split('_')[0], product, _escape(version)))
+    while len(cpe_rows) < cpe_entries:
+        vendor, product = _random_name(), _random_name()
+        for _ in range(random.randint(1, 50)):
+            cpe_rows.append(_cpe_row(vendor, product, _escape('.'.join(str(random.randrange(20)) for _ in range(3)))))
+    for index, (_, _, vendor, product, version, *_) in enumerate(random.sample(cpe_rows, int(len(cpe_rows) * cve_ratio))):
+        cve_id = f'CVE-2020-{index:06d}'
+        cve_rows.append(_cve_row(cve_id, vendor, product, version))
+        if index % 10 == 0:
+            summary_rows.append((cve_id, 2020, f'A vulnerability in {vendor} {product.replace("_", " ")} allows attackers to ...', '5.0', 'N/A'))
+
+    with DatabaseInterface(db_path) as db:
+        for table, rows, create_query, insert_query in [
+            ('cpe_table', cpe_rows, 'create_cpe_table', 'insert_cpe'),
+            ('cve_table', cve_rows, 'create_cve_table', 'insert_cve'),
+            ('summary_table', summary_rows, 'create_summary_table', 'insert_summary'),
+        ]:
+            db.execute_query(QUERIES[create_query].format(table))
+            db.insert_rows(QUERIES[insert_query].format(table), rows)
+
+
+def get_lookups(count: int) -> list:
+    weights = [1 / (rank + 1) for rank in range(len(COMPONENTS))]
+    return [component.rsplit(' ', 1) for component in random.choices(COMPONENTS, weights=weights, k=count)]
+
+
+def benchmark(cpe_entries: int, lookup_count: int, compare_uncached: bool):
+    with TemporaryDirectory() as tmp_dir:
+        db_path = str(Path(tmp_dir) / 'cve_cpe.db')
+        generate_database(db_path, cpe_entries)
+        lookups = get_lookups(lookup_count)
+
+        vulnerability_lookup = cve_lookup.VulnerabilityLookup(db_path=db_path)
+        start = time()
+        cached_results = [vulnerability_lookup.look_up(product, version) for product, version in lookups]
+        cached_duration = time() - start
+        print(f'CPE entries: {cpe_entries}, lookups: {lookup_count}')
+        print(f'index and cache: {cached_duration:.2f}s ({vulnerability_lookup.get_cache_info()})')
+
+        if compare_uncached:
+            sample = lookups[:max(lookup_count // 100, 1)]
+            start = time()
+            results = [cve_lookup.look_up_vulnerabilities(product, version, db_path=db_path) for product, version in sample]
+            duration = (time() - start) / len(sample) * lookup_count
+            assert results == cached_results[:len(sample)]
+            print(f'table scan:      {duration:.2f}s (extrapolated from {len(sample)} lookups)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cpe-entries', type=int, default=500000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--no-uncached', action='store_true', help='skip the lookup without index and cache')
+    args = parser.parse_args()
+    benchmark(args.cpe_entries, args.lookups, not args.no_uncached)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+'''
+Compare the latency of a frontend page render and of a per-file analysis plugin run with pooled mongo clients (shared
+authenticated clients per interface class, see `storage.mongo_interface.MongoClientPool`) and without (a new client and
+authentication for every `ConnectTo` block, the former behavior).
+
+A temporary mongo server with test databases is started (like in the integration tests).
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_database_connections [--runs 50] [--files 100]
+'''
+import argparse
+from contextlib import contextmanager
+from tempfile import TemporaryDirectory
+from time import time
+
+from plugins.analysis.tlsh.code.tlsh import AnalysisPlugin as TlshPlugin
+from storage import mongo_interface
+from storage.db_interface_backend import BackEndDbInterface
+from storage.MongoMgr import MongoMgr
+from test.common_helper import (  # pylint: disable=wrong-import-order
+    clean_test_database, create_test_file_object, create_test_firmware, get_config_for_testing, get_database_names
+)
+from web_interface.frontend_main import WebFrontEnd
+
+TLSH_HASH = '9A355C07B5A614FDC5A2847046EF92B7693174A642327DBF3C88D6303F42E746B1ABE1'
+
+
+class _PluginAdministratorMock:
+    def register_plugin(self, name, plugin_instance):
+        pass
+
+
+@contextmanager
+def unpooled_clients():
+    original_get_client = mongo_interface.CLIENT_POOL.get_client
+    original_shutdown = mongo_interface.MongoInterface.shutdown
+    mongo_interface.CLIENT_POOL.get_client = lambda key, create_client: create_client()
+    mongo_interface.MongoInterface.shutdown = lambda self: self.client.close()
+    try:
+        yield
+    finally:
+        mongo_interface.CLIENT_POOL.get_client = original_get_client
+        mongo_interface.MongoInterface.shutdown = original_shutdown
+
+
+def add_test_data(config, file_count: int) -> str:
+    firmware = create_test_firmware()
+    backend = BackEndDbInterface(config=config)
+    backend.add_firmware(firmware)
+    for index in range(file_count):
+        file_object = create_test_file_object()
+        file_object.uid = f'{index:064x}_{index}'
+        file_object.parent_firmware_uids = {firmware.uid}
+        file_object.virtual_file_path = {firmware.uid: [f'{firmware.uid}|/file_{index}']}
+        file_object.processed_analysis['file_hashes'] = {'tlsh': TLSH_HASH}
+        backend.add_file_object(file_object)
+    backend.shutdown()
+    return firmware.uid
+
+
+def measure(function, runs: int) -> float:
+    function()  # warm up (e.g. the pooled clients are created by the first call)
+    start = time()
+    for _ in range(runs):
+        function()
+    return (time() - start) / runs
+
+
+def benchmark(config, firmware_uid: str, runs: int):
+    test_client = WebFrontEnd(config=config).app.test_client()
+    plugin = TlshPlugin(_PluginAdministratorMock(), config, offline_testing=True)
+    file_object = create_test_file_object()
+    file_object.processed_analysis['file_hashes'] = {'tlsh': TLSH_HASH}
+
+    cases = [
+        ('home page', lambda: test_client.get('/')),
+        ('analysis page', lambda: test_client.get(f'/analysis/{firmware_uid}')),
+        ('tlsh plugin run', lambda: plugin.process_object(file_object)),
+    ]
+    for name, function in cases:
+        with unpooled_clients():
+            unpooled_time = measure(function, runs)
+        pooled_time = measure(function, runs)
+        print(f'{name:>16}: unpooled {unpooled_time * 1000:8.2f}ms | pooled {pooled_time * 1000:8.2f}ms (x{unpooled_time / pooled_time:.1f})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--files', type=int, default=100, help='number of included files of the test firmware')
+    args = parser.parse_args()
+
+    tmp_dir = TemporaryDirectory(prefix='fact_benchmark_')
+    config = get_config_for_testing(tmp_dir)
+    mongo_server = MongoMgr(config=config)
+    try:
+        benchmark(config, add_test_data(config, args.files), args.runs)
+    finally:
+        clean_test_database(config, get_database_names(config))
+        mongo_interface.CLIENT_POOL.close_all()
+        mongo_server.shutdown()
+        tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Compare the throughput (items/sec) of the fair share queue with ``multiprocessing.Queue``: the scheduler process puts
+file objects (with some analysis results) into the queue and a number of worker processes take them out.
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_fair_share_queue [--items N] [--workers N] [--size N] [--firmware N]
+'''
+import argparse
+import os
+from multiprocessing import Process, Queue
+from time import time
+
+from helperFunctions.fair_share_queue import FairShareQueue
+from objects.file import FileObject
+
+
+def _consume(queue, done_queue, count: int):
+    for _ in range(count):
+        queue.get(timeout=60)
+    done_queue.put(count)
+
+
+def run_benchmark(queue_class, file_objects, workers: int) -> float:
+    queue, done_queue = queue_class(), Queue()
+    items_per_worker = len(file_objects) // workers
+    processes = [Process(target=_consume, args=(queue, done_queue, items_per_worker)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    start = time()
+    for file_object in file_objects[:items_per_worker * workers]:
+        queue.put(file_object)
+    for _ in processes:
+        done_queue.get(timeout=600)
+    duration = time() - start
+    for process in processes:
+        process.join()
+    queue.close()
+    return items_per_worker * workers / duration
+
+
+def _get_file_objects(count: int, size: int, firmware_count: int):
+    file_objects = []
+    for index in range(count):
+        file_object = FileObject(binary=os.urandom(16))
+        file_object.root_uid = f'firmware_{index % firmware_count}'
+        file_object.processed_analysis = {f'plugin_{i}': {'result': 'x' * (size // 10)} for i in range(10)}
+        file_object.binary = None
+        file_objects.append(file_object)
+    return file_objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=4000, help='number of queued file objects')
+    parser.add_argument('--workers', type=int, default=4, help='number of consuming processes')
+    parser.add_argument('--size', type=int, default=2000, help='size of the analysis results of each file in bytes')
+    parser.add_argument('--firmware', type=int, default=3, help='number of firmware the files belong to')
+    args = parser.parse_args()
+
+    file_objects = _get_file_objects(args.items, args.size, args.firmware)
+    for label, queue_class in [('multiprocessing.Queue', Queue), ('FairShareQueue', FairShareQueue)]:
+        items_per_second = run_benchmark(queue_class, file_objects, args.workers)
+        print(f'{label:>21}: {items_per_second:8.1f} items/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+'''
+Compare the former regex scans of the printable_strings and users_and_passwords plugins (reading the whole file and
+running one full pass per regex) with the chunked pattern scanner over a memory map of the file.
+
+The test image is generated: a filesystem-like mix of incompressible data, zero padding, text (scripts and
+configuration files), binaries with embedded strings and a few password files.
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_pattern_scanner [--size 128] [--image PATH]
+'''
+import argparse
+import os
+import random
+import re
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import time
+
+from analysis.pattern_scanner import PatternScanner
+from plugins.analysis.users_and_passwords.code.password_file_analyzer import (
+    ENTRY_PREFIX_REGEX, HTPASSWD_REGEXES, MOSQUITTO_REGEXES, UNIX_REGEXES
+)
+
+PASSWORD_REGEXES = UNIX_REGEXES + HTPASSWD_REGEXES + MOSQUITTO_REGEXES
+STRING_REGEXES = [b'[\x09-\x0d\x20-\x7e]{8,}', b'(?:[\x09-\x0d\x20-\x7e]\x00){8,}']
+BLOCK_SIZE = 64 * 1024
+
+TEXT = b'#!/bin/sh\n# start the web server\nif [ -x /usr/sbin/httpd ]; then\n    /usr/sbin/httpd -f /etc/httpd.conf\nfi\n'
+PASSWORD_FILE = (
+    b'root:$1$Fr4gM3nt$5Dm0sXkZbZqZ3F1Q0vQ2v1:17000:0:99999:7:::\n'
+    b'daemon:*:17000:0:99999:7:::\nadmin:x:1000:1000:admin:/home/admin:/bin/sh\n'
+    b'webuser:$apr1$nMebU24m$ofpVAehRJU5Jq8KUcsVYj1\n'
+)
+
+
+def _binary_block() -> bytes:
+    data = bytearray(os.urandom(BLOCK_SIZE))
+    for _ in range(50):
+        position = random.randrange(BLOCK_SIZE)
+        data[position:position + 20] = random.choice([b'error: invalid argument\x00', 'config_version'.encode('utf-16-le')])
+    return bytes(data[:BLOCK_SIZE])
+
+
+def generate_image(path: Path, size: int):
+    random.seed(size)
+    generators = [
+        (lambda: os.urandom(BLOCK_SIZE), 5),
+        (lambda: bytes(BLOCK_SIZE), 2),
+        (lambda: (TEXT * (BLOCK_SIZE // len(TEXT) + 1))[:BLOCK_SIZE], 1),
+        (_binary_block, 2),
+    ]
+    with path.open('wb') as fp:
+        for index in range(size // BLOCK_SIZE):
+            fp.write(random.choices([generator for generator, _ in generators], weights=[weight for _, weight in generators])[0]())
+            if index % 256 == 0:
+                fp.write(PASSWORD_FILE)
+
+
+def scan_with_full_passes(path: Path):
+    binary = path.read_bytes()
+    strings = [[(match.start(), match.group()) for match in re.finditer(regex, binary)] for regex in STRING_REGEXES]
+    passwords = [re.findall(regex, binary) for regex in PASSWORD_REGEXES]
+    return strings, passwords
+
+
+def scan_with_scanners(path: Path):
+    strings_scanner, password_scanner = PatternScanner(), PatternScanner()
+    for regex in STRING_REGEXES:
+        strings_scanner.add_pattern(regex.decode('latin-1'), regex)
+    for regex in PASSWORD_REGEXES:
+        password_scanner.add_pattern(regex.decode(), regex, prefix=ENTRY_PREFIX_REGEX)
+    with path.open('rb') as fp, mmap(fp.fileno(), 0, access=ACCESS_READ) as binary:
+        string_matches = strings_scanner.scan(binary)
+        password_matches = password_scanner.scan(binary)
+    strings = [string_matches[regex.decode('latin-1')] for regex in STRING_REGEXES]
+    passwords = [[entry for _, entry in password_matches[regex.decode()]] for regex in PASSWORD_REGEXES]
+    return strings, passwords
+
+
+def benchmark(path: Path):
+    print(f'image: {path} ({path.stat().st_size / 1024 ** 2:.0f} MiB)')
+    results = []
+    for label, function in [('full passes over bytes', scan_with_full_passes), ('chunked scanner over mmap', scan_with_scanners)]:
+        start = time()
+        results.append(function(path))
+        print(f'{label:>26}: {time() - start:6.2f}s')
+    assert results[0] == results[1], 'results differ'
+    strings, passwords = results[0]
+    print(f'{sum(len(matches) for matches in strings)} strings and {sum(len(matches) for matches in passwords)} password entries found')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=128, help='size of the generated image in MiB')
+    parser.add_argument('--image', type=Path, help='use an existing image instead of generating one')
+    args = parser.parse_args()
+
+    if args.image:
+        benchmark(args.image)
+        return
+    with TemporaryDirectory() as tmp_dir:
+        image = Path(tmp_dir) / 'image.bin'
+        generate_image(image, args.size * 1024 ** 2)
+        benchmark(image)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+Compare the codecs of the sanitize database (store time, retrieve time and size).
+
+Real plugin outputs can be exported with the REST API (`/rest/file_object/<uid>`) and passed as JSON files; without
+input files, generated results that resemble the outputs of the printable_strings and software_components plugins
+are used.
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_sanitize_codec [--repeat 5] [exported_file_object.json ...]
+'''
+import argparse
+import json
+import random
+import string
+from pathlib import Path
+from time import time
+
+from storage.sanitize_codec import CODECS, decode_sanitized_content, get_codec
+
+
+def load_results(json_files):
+    results = []
+    for json_file in json_files:
+        content = json.loads(Path(json_file).read_text())
+        processed_analysis = content.get('file_object', content).get('analysis', content.get('processed_analysis', {}))
+        for analysis in processed_analysis.values():
+            results.extend(value for key, value in analysis.items() if key not in ['summary', 'tags'])
+    return results
+
+
+def generate_results(count: int):
+    random.seed(1234)
+    results = []
+    for _ in range(count):
+        results.append([  # printable strings
+            ''.join(random.choices(string.ascii_letters + string.digits + ' ._-/', k=random.randint(8, 80)))
+            for _ in range(random.randint(1000, 20000))
+        ])
+        results.append({  # yara matches
+            f'rule_{index}': {
+                'rule': f'rule_{index}', 'matches': True, 'meta': {'description': 'test rule', 'open_source': True},
+                'strings': [(random.randint(0, 2 ** 20), '$a', b'OpenSSL 1.0.2%c' % random.choice(b'abcdefg')) for _ in range(20)],
+            }
+            for index in range(50)
+        })
+    return results
+
+
+def benchmark_codec(codec_name: str, results: list, repeat: int):
+    codec = get_codec(codec_name)
+    start = time()
+    for _ in range(repeat):
+        encoded = [codec.encode(result) for result in results]
+    store_time = (time() - start) / repeat
+    start = time()
+    for _ in range(repeat):
+        for content in encoded:
+            decode_sanitized_content(content)
+    retrieve_time = (time() - start) / repeat
+    size = sum(len(content) for content in encoded)
+    print(f'{codec_name:>13}: store {store_time:7.3f}s | retrieve {retrieve_time:7.3f}s | size {size / 2 ** 20:8.2f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('json_files', nargs='*', help='file objects exported with the REST API')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--generated', type=int, default=20, help='number of generated results per type if no files are given')
+    args = parser.parse_args()
+
+    results = load_results(args.json_files) if args.json_files else generate_results(args.generated)
+    print(f'benchmarking {len(results)} results')
+    for codec_name in CODECS:
+        benchmark_codec(codec_name, results, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+'''
+Compare TLSH similarity queries of the TLSH index with a full scan over all hashes (the former behavior of the tlsh
+plugin, without the database overhead).
+
+The corpora are generated: file sizes are log-uniformly distributed between 64 B and 64 MiB, the hash bodies are random
+and a part of the hashes are slightly modified copies of others (i.e. there are clusters of similar files).
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_tlsh_index [--sizes 10000 100000 1000000] [--queries 100] [--no-full-scan]
+'''
+import argparse
+import random
+from math import log
+from time import time
+
+import tlsh
+
+from storage.tlsh_index import TlshIndex
+
+MAX_DISTANCE = 150
+
+
+def _get_length_value(length: int) -> int:  # see tlsh_util.cpp
+    if length <= 656:
+        return int(log(length) / log(1.5)) & 0xFF
+    if length <= 3199:
+        return int(log(length) / log(1.3) - 8.72777) & 0xFF
+    return int(log(length) / log(1.1) - 62.5472) & 0xFF
+
+
+def _to_hash(checksum: int, length_value: int, q1_ratio: int, q2_ratio: int, body: list) -> str:
+    body_bytes = bytes(body[index] | body[index + 1] << 2 | body[index + 2] << 4 | body[index + 3] << 6 for index in range(0, 128, 4))
+    swapped_length = ((length_value & 0xF) << 4) | (length_value >> 4)
+    return f'T1{checksum:02X}{swapped_length:02X}{q1_ratio:X}{q2_ratio:X}{body_bytes.hex().upper()}'
+
+
+def _random_entry():
+    body = [value for value in range(4) for _ in range(32)]  # quartiles: every value occurs equally often
+    random.shuffle(body)
+    length_value = _get_length_value(int(2 ** random.uniform(6, 26)))
+    return [random.randrange(256), length_value, random.randrange(16), random.randrange(16), body]
+
+
+def _mutate(entry):
+    checksum, length_value, q1_ratio, q2_ratio, body = entry
+    body = list(body)
+    for _ in range(random.randint(1, 40)):
+        body[random.randrange(128)] = random.randrange(4)
+    return [
+        random.choice([checksum, random.randrange(256)]), (length_value + random.randint(-1, 1)) % 256,
+        (q1_ratio + random.randint(-1, 1)) % 16, (q2_ratio + random.randint(-1, 1)) % 16, body
+    ]
+
+
+def generate_corpus(size: int, cluster_ratio: float = 0.3) -> dict:
+    random.seed(size)
+    entries = []
+    for _ in range(size):
+        if entries and random.random() < cluster_ratio:
+            entries.append(_mutate(random.choice(entries)))
+        else:
+            entries.append(_random_entry())
+    return {f'uid_{index}': _to_hash(*entry) for index, entry in enumerate(entries)}
+
+
+def full_scan(corpus: dict, tlsh_hash: str) -> dict:
+    result = {}
+    for uid, other_hash in corpus.items():
+        distance = tlsh.diff(tlsh_hash, other_hash)  # pylint: disable=c-extension-no-member
+        if distance <= MAX_DISTANCE:
+            result[uid] = distance
+    return result
+
+
+def benchmark(size: int, query_count: int, compare_full_scan: bool):
+    corpus = generate_corpus(size)
+    queries = random.sample(list(corpus.values()), query_count)
+
+    start = time()
+    index = TlshIndex()
+    for uid, tlsh_hash in corpus.items():
+        index.add(uid, tlsh_hash)
+    build_time = time() - start
+
+    start = time()
+    results = [index.query(tlsh_hash, MAX_DISTANCE) for tlsh_hash in queries]
+    index_time = (time() - start) / query_count
+    matches = sum(len(result) for result in results) / query_count
+    print(f'{size:>8} hashes: build {build_time:6.2f}s | index query {index_time * 1000:8.2f}ms | {matches:.1f} matches per query', end='')
+
+    if compare_full_scan:
+        start = time()
+        full_scan_results = [full_scan(corpus, tlsh_hash) for tlsh_hash in queries]
+        full_scan_time = (time() - start) / query_count
+        assert full_scan_results == results, 'index results differ from full scan'
+        print(f' | full scan {full_scan_time * 1000:8.2f}ms (x{full_scan_time / index_time:.1f})', end='')
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--no-full-scan', action='store_true', help='skip the (slow) comparison with a full scan')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        benchmark(size, args.queries, not args.no_full_scan)
+
+
+if __name__ == '__main__':
+    main()
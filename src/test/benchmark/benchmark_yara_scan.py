@@ -0,0 +1,67 @@
+'''
+Compare scanning a corpus of ELF files with the yara CLI (one process per file, as it was done before) to scanning
+them in-process with cached rules loaded by yara-python.
+
+Usage (from the src directory):
+python3 -m test.benchmark.benchmark_yara_scan [--corpus /usr/bin] [--signatures analysis/signatures/software_components.yc]
+'''
+import argparse
+import subprocess
+from pathlib import Path
+from shutil import which
+from time import time
+
+import yara
+
+from analysis.YaraPluginBase import _convert_yara_matches
+
+ELF_MAGIC = b'\x7fELF'
+
+
+def get_elf_corpus(directory: Path, max_files: int):
+    corpus = []
+    for path in sorted(directory.iterdir()):
+        if path.is_file() and not path.is_symlink():
+            with path.open('rb') as file:
+                if file.read(4) == ELF_MAGIC:
+                    corpus.append(path)
+        if len(corpus) >= max_files:
+            break
+    return corpus
+
+
+def scan_with_cli(signature_path: Path, corpus):
+    compiled_flag = ['-C'] if signature_path.read_bytes().startswith(b'YARA') else []
+    for path in corpus:
+        subprocess.run(['yara', *compiled_flag, '--print-meta', '--print-strings', str(signature_path), str(path)], stdout=subprocess.PIPE, check=False)
+
+
+def scan_in_process(signature_path: Path, corpus):
+    rules = yara.load(str(signature_path)) if signature_path.read_bytes().startswith(b'YARA') else yara.compile(filepath=str(signature_path))
+    for path in corpus:
+        _convert_yara_matches(rules.match(filepath=str(path)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', type=Path, default=Path('/usr/bin'), help='directory containing ELF files')
+    parser.add_argument('--max-files', type=int, default=200, help='maximum number of files to scan')
+    parser.add_argument('--signatures', type=Path, default=Path('analysis/signatures/software_components.yc'))
+    args = parser.parse_args()
+
+    corpus = get_elf_corpus(args.corpus, args.max_files)
+    print(f'scanning {len(corpus)} ELF files with {args.signatures}')
+    scanners = [('yara-python (cached rules)', scan_in_process)]
+    if which('yara'):
+        scanners.insert(0, ('yara CLI (process per file)', scan_with_cli))
+    else:
+        print('yara CLI not found: skipping CLI benchmark')
+    for label, scanner in scanners:
+        start = time()
+        scanner(args.signatures, corpus)
+        duration = time() - start
+        print(f'{label:>28}: {duration:7.2f}s ({len(corpus) / duration:8.1f} files/sec)')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ import os
 from base64 import standard_b64encode
 from configparser import ConfigParser
 from copy import deepcopy
+from io import BytesIO
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import Optional, Union
@@ -142,6 +143,14 @@ class MockFileObject:
         self.file_path = file_path
         self.processed_analysis = {'file_type': {'mime': 'application/x-executable'}}
 
+    @property
+    def mapped_binary(self):
+        return self.binary
+
+
+class BinaryStreamMock(BytesIO):
+    metadata = None
+
 
 class DatabaseMock:  # pylint: disable=too-many-public-methods
     fw_uid = TEST_FW.uid
@@ -158,6 +167,18 @@ class DatabaseMock:  # pylint: disable=too-many-public-methods
     def update_view(self, file_name, content):
         pass
 
+    def store_list_of_included_files(self, firmware_uid):
+        pass
+
+    def delete_list_of_included_files(self, firmware_uid):
+        pass
+
+    def update_summary_cache(self, firmware_uid):
+        pass
+
+    def delete_summary_cache(self, firmware_uid):
+        pass
+
     def get_meta_list(self, firmware_list=None):
         fw_entry = ('test_uid', 'test firmware', 'unpacker')
         fo_entry = ('test_fo_uid', 'test file object', 'unpacker')
@@ -331,12 +352,23 @@ class DatabaseMock:  # pylint: disable=too-many-public-methods
             return TEST_TEXT_FILE.binary, TEST_TEXT_FILE.file_name
         return None
 
+    def open_binary_stream(self, uid):
+        result = self.get_binary_and_filename(uid)
+        if result is None:
+            return None
+        stream = BinaryStreamMock(result[0])
+        stream.metadata = {'file_name': result[1]}
+        return stream
+
+    def delete_binary_stream(self, stream):
+        pass
+
     def get_repacked_binary_and_file_name(self, uid):
         if uid == TEST_FW.uid:
             return TEST_FW.binary, '{}.tar.gz'.format(TEST_FW.file_name)
         return None, None
 
-    def add_binary_search_request(self, yara_rule_binary, firmware_uid=None):
+    def add_binary_search_request(self, yara_rule_binary, firmware_uid=None, mime_types=None):
         if yara_rule_binary == b'invalid_rule':
             return 'error: invalid rule'
         return 'some_id'
@@ -346,6 +378,11 @@ class DatabaseMock:  # pylint: disable=too-many-public-methods
             return {'test_rule': ['test_uid']}, b'some yara rule'
         return None, None
 
+    def get_partial_binary_search_result(self, uid):
+        if uid == 'running_id':
+            return {'test_rule': ['test_uid']}, {'scanned_files': 5, 'total_files': 10}
+        return None, None
+
     def get_statistic(self, identifier):
         if identifier == 'general':
             return {
@@ -424,7 +461,10 @@ class DatabaseMock:  # pylint: disable=too-many-public-methods
         self.locks = []
 
     def get_specific_fields_of_db_entry(self, uid, field_dict):
-        return None  # TODO
+        for test_object in [TEST_FW, TEST_FW_2, TEST_TEXT_FILE]:
+            if uid == test_object.uid:
+                return {'_id': uid, **{field: getattr(test_object, field) for field in field_dict if hasattr(test_object, field)}}
+        return None
 
     def get_summary(self, fo, selected_analysis):
         if fo.uid == TEST_FW.uid and selected_analysis == 'foobar':
@@ -33,6 +33,18 @@ class MockDbInterface:
     def get_specific_fields_of_db_entry(self, uid, field_dict):
         pass
 
+    def store_list_of_included_files(self, firmware_uid):
+        pass
+
+    def delete_list_of_included_files(self, firmware_uid):
+        pass
+
+    def update_summary_cache(self, firmware_uid):
+        pass
+
+    def delete_summary_cache(self, firmware_uid):
+        pass
+
 
 def initialize_config(tmp_dir):
     config = get_config_for_testing(temp_dir=tmp_dir)
@@ -1,10 +1,14 @@
 import gc
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Queue, Value
 from tempfile import TemporaryDirectory
+from threading import BoundedSemaphore, Event
 from time import sleep
 
 import pytest
+from pymongo.errors import PyMongoError
 
+from intercom import back_end_binding
 from intercom.back_end_binding import InterComBackEndBinding
 from storage.MongoMgr import MongoMgr
 from test.common_helper import get_config_for_testing  # pylint: disable=wrong-import-order
@@ -27,10 +31,11 @@ class ServiceMock:
 
 class CommunicationBackendMock:
 
+    CONNECTION_TYPE = 'test'
     counter = Value('i', 0)
 
     def __init__(self, config=None):
-        pass
+        self.last_task_latency = 0.5
 
     def get_next_task(self):
         self.counter.value += 1
@@ -54,6 +59,9 @@ class AnalysisServiceMock:
     def update_analysis_of_single_object(self, fw):
         pass
 
+    def drop_cached_analysis_versions(self, deleted_file):
+        pass
+
 
 @pytest.fixture(name='intercom')
 def get_intercom_for_testing():
@@ -78,12 +86,84 @@ def get_intercom_for_testing():
 def test_backend_worker(intercom):
     test_queue = Queue()
     service = ServiceMock(test_queue)
-    intercom._start_listener(CommunicationBackendMock, service.add_task)  # pylint: disable=protected-access
+    intercom._start_listener_process([(CommunicationBackendMock, service.add_task)])  # pylint: disable=protected-access
     result = test_queue.get(timeout=5)
     assert result == 'test_task', 'task not received correctly'
+    assert intercom.get_task_latency_statistics() == {'test': {'tasks': 1, 'average_latency': 0.5, 'last_latency': 0.5}}
 
 
 def test_all_listeners_started(intercom):
     intercom.start_listeners()
     sleep(2)
-    assert len(intercom.process_list) == NUMBER_OF_LISTENERS, 'Not all listeners started'
+    assert len(intercom.process_list) == 1, 'all listeners should run in one process'
+    assert len(intercom.task_statistics) == NUMBER_OF_LISTENERS, 'Not all listeners started'
+
+
+class NotificationInterfaceMock:
+    attempts = 0
+
+    def __init__(self, config=None):
+        pass
+
+    def create_notification_collection(self):
+        NotificationInterfaceMock.attempts += 1
+        if NotificationInterfaceMock.attempts == 1:
+            raise PyMongoError('connection lost')
+
+    @staticmethod
+    def tail_notifications():
+        yield {'connection_type': 'test', 'task_id': 'some_id'}
+        while True:
+            yield None
+
+    def shutdown(self):
+        pass
+
+
+def test_dispatch_notifications_retries_after_error(monkeypatch):
+    monkeypatch.setattr(back_end_binding, 'InterComMongoInterface', NotificationInterfaceMock)
+    monkeypatch.setattr(NotificationInterfaceMock, 'attempts', 0)
+    with TemporaryDirectory(prefix='fact_test_') as tmp_dir:
+        intercom = InterComBackEndBinding(config=get_config_for_testing(tmp_dir), testing=True)
+    intercom.poll_delay = 0.1
+    wake_up_event = Event()
+    stop_dispatching = Event()
+    monkeypatch.setattr(wake_up_event, 'set', lambda: stop_dispatching.set() if NotificationInterfaceMock.attempts > 1 else None)
+    dispatch_thread = ThreadPoolExecutor(max_workers=1)
+    dispatch_thread.submit(intercom._dispatch_notifications, {'test': wake_up_event})  # pylint: disable=protected-access
+    try:
+        assert stop_dispatching.wait(timeout=5), 'notifications should be tailed again after an error'
+        assert NotificationInterfaceMock.attempts == 2
+    finally:
+        intercom.stop_condition.value = 1
+        dispatch_thread.shutdown()
+
+
+class ListenerMock:
+    CONNECTION_TYPE = 'test'
+    last_task_latency = None
+
+    def __init__(self, number_of_tasks):
+        self.tasks = list(range(number_of_tasks))
+
+    def get_next_task(self):
+        return self.tasks.pop(0) if self.tasks else None
+
+
+def test_process_all_tasks_does_not_block_on_task_function():
+    with TemporaryDirectory(prefix='fact_test_') as tmp_dir:
+        intercom = InterComBackEndBinding(config=get_config_for_testing(tmp_dir), testing=True)
+    finish_tasks, received_tasks = Event(), []
+
+    def _slow_function(task):
+        received_tasks.append(task)
+        finish_tasks.wait(timeout=5)
+
+    listener = ListenerMock(number_of_tasks=3)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        intercom._process_all_tasks(listener, _slow_function, executor, BoundedSemaphore(4))  # pylint: disable=protected-access
+        assert listener.tasks == [], 'tasks should be fetched while the functions are running'
+        sleep(0.1)
+        assert len(received_tasks) == 2, 'the number of task functions running at once should be limited'
+        finish_tasks.set()
+    assert sorted(received_tasks) == [0, 1, 2]
@@ -2,6 +2,7 @@ import gc
 import pickle
 import unittest
 from tempfile import TemporaryDirectory
+from time import time
 
 from intercom.common_mongo_binding import InterComListener
 from storage.MongoMgr import MongoMgr
@@ -25,6 +26,7 @@ class TestInterComListener(unittest.TestCase):
     def tearDown(self):
         for item in self.generic_listener.connections.keys():
             self.generic_listener.client.drop_database(self.generic_listener.connections[item]['name'])
+        self.generic_listener.client.drop_database(self.generic_listener.notifications.database.name)
         self.generic_listener.shutdown()
         gc.collect()
 
@@ -37,6 +39,7 @@ class TestInterComListener(unittest.TestCase):
         self.generic_listener.connections[self.generic_listener.CONNECTION_TYPE]['fs'].put(pickle.dumps(binary))
         task = self.generic_listener.get_next_task()
         self.assertEqual(task, binary)
+        self.assertGreaterEqual(self.generic_listener.last_task_latency, 0)
         another_task = self.generic_listener.get_next_task()
         self.assertIsNone(another_task, 'task not deleted')
 
@@ -46,3 +49,12 @@ class TestInterComListener(unittest.TestCase):
     def test_big_file(self):
         large_test_data = b'\x00' * (BSON_MAX_FILE_SIZE + 1024)
         self.check_file(large_test_data)
+
+    def test_wait_for_notification(self):
+        self.generic_listener.create_notification_collection()
+        self.generic_listener.put_task('test', pickle.dumps('task'), task_id='task_id')
+        self.assertTrue(self.generic_listener.wait_for_notification('test', 'task_id', timeout=time() + 5))
+        start = time()
+        self.assertFalse(self.generic_listener.wait_for_notification('test', 'other_id', timeout=time() + 1))
+        self.assertGreaterEqual(time() - start, 1)
+        self.assertEqual(self.generic_listener.get_next_task(), 'task')
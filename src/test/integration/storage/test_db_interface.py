@@ -3,6 +3,7 @@ import gc
 import json
 import pickle
 import unittest
+from hashlib import sha256
 from os import path
 from tempfile import TemporaryDirectory
 from typing import Set
@@ -10,8 +11,9 @@ from typing import Set
 from objects.file import FileObject
 from objects.firmware import Firmware
 from storage.db_interface_backend import BackEndDbInterface
-from storage.db_interface_common import MongoInterfaceCommon
+from storage.db_interface_common import CONTENT_ADDRESSED_PREFIX, MongoInterfaceCommon
 from storage.MongoMgr import MongoMgr
+from storage.sanitize_codec import get_codec
 from test.common_helper import create_test_file_object, create_test_firmware, get_config_for_testing, get_test_data_dir
 
 TESTS_DIR = get_test_data_dir()
@@ -117,28 +119,31 @@ class TestMongoInterface(unittest.TestCase):
 
         self.test_firmware.processed_analysis = long_dict
         sanitized_dict = self.db_interface.sanitize_analysis(self.test_firmware.processed_analysis, self.test_firmware.uid)
-        self.assertIn('stub_plugin_result_{}'.format(self.test_firmware.uid), self.db_interface.sanitize_fs.list(), 'sanitized file not stored')
-        self.assertNotIn('summary_result_{}'.format(self.test_firmware.uid), self.db_interface.sanitize_fs.list(), 'summary is erroneously stored')
+        self.assertIn(sanitized_dict['stub_plugin']['result'], self.db_interface.sanitize_fs.list(), 'sanitized file not stored')
+        self.assertTrue(sanitized_dict['stub_plugin']['result'].startswith(CONTENT_ADDRESSED_PREFIX), 'file should be content-addressed')
+        self.assertEqual(len(self.db_interface.sanitize_fs.list()), 2, 'summary is erroneously stored')
         self.assertIn('file_system_flag', sanitized_dict['stub_plugin'].keys())
         self.assertTrue(sanitized_dict['stub_plugin']['file_system_flag'])
         self.assertEqual(type(sanitized_dict['stub_plugin']['summary']), list)
 
     def test_sanitize_db_duplicates(self):
         long_dict = {'stub_plugin': {'result': 10000000000, 'misc': 'Bananarama', 'summary': []}}
-        gridfs_file_name = 'stub_plugin_result_{}'.format(self.test_firmware.uid)
 
-        self.test_firmware.processed_analysis = long_dict
-        assert self.db_interface.sanitize_fs.find({'filename': gridfs_file_name}).count() == 0
-        self.db_interface.sanitize_analysis(self.test_firmware.processed_analysis, self.test_firmware.uid)
-        assert self.db_interface.sanitize_fs.find({'filename': gridfs_file_name}).count() == 1
-        self.db_interface.sanitize_analysis(self.test_firmware.processed_analysis, self.test_firmware.uid)
-        assert self.db_interface.sanitize_fs.find({'filename': gridfs_file_name}).count() == 1, 'duplicate entry was created'
-        md5 = self.db_interface.sanitize_fs.find_one({'filename': gridfs_file_name}).md5
+        sanitized_dict = self.db_interface.sanitize_analysis(long_dict, 'uid_1')
+        file_name = sanitized_dict['stub_plugin']['result']
+        assert self.db_interface.sanitize_fs.find({'filename': file_name}).count() == 1
+        self.db_interface.sanitize_analysis(long_dict, 'uid_1')
+        self.db_interface.sanitize_analysis(long_dict, 'uid_2')
+        assert self.db_interface.sanitize_fs.find({'filename': file_name}).count() == 1, 'duplicate entry was created'
+        assert self.db_interface.sanitize_references.find_one(file_name)['references'] == ['stub_plugin_result_uid_1', 'stub_plugin_result_uid_2']
 
         long_dict['stub_plugin']['result'] += 1  # new analysis result
-        self.db_interface.sanitize_analysis(self.test_firmware.processed_analysis, self.test_firmware.uid)
-        assert self.db_interface.sanitize_fs.find({'filename': gridfs_file_name}).count() == 1, 'duplicate entry was created'
-        assert self.db_interface.sanitize_fs.find_one({'filename': gridfs_file_name}).md5 != md5, 'hash of new file did not change'
+        new_file_name = self.db_interface.sanitize_analysis(long_dict, 'uid_1')['stub_plugin']['result']
+        assert new_file_name != file_name, 'name of new file did not change'
+        assert self.db_interface.sanitize_fs.find({'filename': file_name}).count() == 1, 'entry is still referenced by uid_2'
+        self.db_interface.sanitize_analysis(long_dict, 'uid_2')
+        assert self.db_interface.sanitize_fs.find({'filename': file_name}).count() == 0, 'unreferenced entry was not deleted'
+        assert self.db_interface.sanitize_references.find_one(file_name) is None
 
     def test_retrieve_analysis(self):
         self.db_interface.sanitize_fs.put(pickle.dumps('This is a test!'), filename='test_file_path')
@@ -186,11 +191,19 @@ class TestMongoInterface(unittest.TestCase):
     def test_sanitize_extract_and_retrieve_binary(self):
         test_data = {'dummy': {'test_key': 'test_value'}}
         test_data['dummy'] = self.db_interface._extract_binaries(test_data, 'dummy', 'uid')
-        self.assertEqual(self.db_interface.sanitize_fs.list(), ['dummy_test_key_uid'], 'file not written')
-        self.assertEqual(test_data['dummy']['test_key'], 'dummy_test_key_uid', 'new file path not set')
+        file_name = f'{CONTENT_ADDRESSED_PREFIX}{sha256(pickle.dumps("test_value")).hexdigest()}'
+        self.assertEqual(self.db_interface.sanitize_fs.list(), [file_name], 'file not written')
+        self.assertEqual(test_data['dummy']['test_key'], file_name, 'new file path not set')
         test_data['dummy'] = self.db_interface._retrieve_binaries(test_data, 'dummy')
         self.assertEqual(test_data['dummy']['test_key'], 'test_value', 'value not recoverd')
 
+    def test_sanitize_with_msgpack(self):
+        self.db_interface.sanitize_codec = get_codec('msgpack+zstd')
+        test_list = [f'string {index}' for index in range(1000)]
+        test_data = {'dummy': {'strings': test_list}}
+        sanitized = self.db_interface._extract_binaries(test_data, 'dummy', 'uid')
+        self.assertEqual(self.db_interface._retrieve_binaries({'dummy': sanitized}, 'dummy')['strings'], test_list)
+
     def test_get_firmware_number(self):
         result = self.db_interface.get_firmware_number()
         self.assertEqual(result, 0)
@@ -397,6 +410,37 @@ class TestSummary(unittest.TestCase):
         self.assertIn(self.test_fo.uid, result_sum['file exclusive sum b'], 'origin of file exclusive missing')
         self.assertNotIn(self.test_fw.uid, result_sum['file exclusive sum b'], 'parent as origin but should not be')
 
+    def test_stored_list_of_included_files(self):
+        self.create_and_add_test_fimrware_and_file_object()
+        assert self.db_interface.get_materialized_included_files(self.test_fw.uid) is None
+        assert self.db_interface.get_list_of_all_included_files(self.test_fw) == [self.test_fo.uid]
+
+        self.db_interface_backend.store_list_of_included_files(self.test_fw.uid)
+        assert self.db_interface.get_materialized_included_files(self.test_fw.uid) == [self.test_fo.uid]
+        self.test_fw.list_of_all_included_files = None
+        assert self.db_interface.get_list_of_all_included_files(self.test_fw) == [self.test_fo.uid]
+        assert self.test_fo.uid in self.db_interface.get_summary(self.test_fw, 'dummy')['sum a']
+
+        self.db_interface_backend.delete_list_of_included_files(self.test_fw.uid)
+        assert self.db_interface.get_materialized_included_files(self.test_fw.uid) is None
+
+    def test_summary_cache(self):
+        self.create_and_add_test_fimrware_and_file_object()
+        self.db_interface_backend.update_summary_cache(self.test_fw.uid)
+        cached_summaries = self.db_interface.get_cached_summaries(self.test_fw.uid)
+        assert cached_summaries['dummy'] == self.db_interface._build_summary_of_firmware(self.test_fw, 'dummy')
+        assert self.db_interface.get_summary(self.test_fw, 'dummy') == cached_summaries['dummy']
+
+        self.test_fo.processed_analysis['dummy'] = {'summary': ['new entry'], 'analysis_date': 1.0}
+        self.db_interface_backend.add_analysis(self.test_fo)
+        updated_summary = self.db_interface.get_cached_summaries(self.test_fw.uid, plugin='dummy')['dummy']
+        assert updated_summary['new entry'] == [self.test_fo.uid]
+        assert updated_summary['sum a'] == [self.test_fw.uid]
+        assert 'file exclusive sum b' not in updated_summary
+
+        self.db_interface_backend.delete_summary_cache(self.test_fw.uid)
+        assert self.db_interface.get_cached_summaries(self.test_fw.uid) == {}
+
     def test_collect_summary(self):
         self.create_and_add_test_fimrware_and_file_object()
         fo_list = [self.test_fo.uid]
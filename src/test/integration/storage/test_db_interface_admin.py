@@ -83,10 +83,11 @@ class TestStorageDbInterfaceAdmin(unittest.TestCase):
         self.test_firmware.processed_analysis = {'test_plugin': {'result': 10000000000, 'misc': 'delete_swap_test'}}
         self.db_backend_interface.add_firmware(self.test_firmware)
         self.admin_interface.client.drop_database(self.config.get('data_storage', 'sanitize_database'))
-        self.admin_interface.sanitize_analysis(self.test_firmware.processed_analysis, self.uid)
-        self.assertIn('test_plugin_result_{}'.format(self.test_firmware.uid), self.admin_interface.sanitize_fs.list())
+        sanitized_analysis = self.admin_interface.sanitize_analysis(self.test_firmware.processed_analysis, self.uid)
+        file_name = sanitized_analysis['test_plugin']['result']
+        self.assertIn(file_name, self.admin_interface.sanitize_fs.list())
         self.admin_interface._delete_swapped_analysis_entries(self.admin_interface.firmwares.find_one(self.uid))
-        self.assertNotIn('test_plugin_result_{}'.format(self.test_firmware.uid), self.admin_interface.sanitize_fs.list())
+        self.assertNotIn(file_name, self.admin_interface.sanitize_fs.list())
 
     def test_delete_file_object(self):
         self.db_backend_interface.add_file_object(self.child_fo)
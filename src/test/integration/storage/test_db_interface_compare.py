@@ -9,7 +9,7 @@ from storage.db_interface_backend import BackEndDbInterface
 from storage.db_interface_common import MongoInterfaceCommon
 from storage.db_interface_compare import CompareDbInterface, FactCompareException
 from storage.MongoMgr import MongoMgr
-from test.common_helper import create_test_firmware, get_config_for_testing
+from test.common_helper import create_test_file_object, create_test_firmware, get_config_for_testing
 
 
 class TestCompare:
@@ -137,3 +137,16 @@ class TestCompare:
         self.db_interface_compare.add_compare_result(compare_dict)
         exclusive_files = self.db_interface_compare.get_exclusive_files(self.compare_id, root_uid)
         assert exclusive_files == expected_result
+
+    def test_get_ssdeep_hashes_and_entropies(self):
+        file_one, file_two, file_three = create_test_file_object(), create_test_file_object(), create_test_file_object()
+        file_two.set_binary(b'second file')
+        file_three.set_binary(b'third file')
+        file_one.processed_analysis.update({'file_hashes': {'ssdeep': '3:abc:def'}, 'unpacker': {'entropy': 0.5}})
+        file_two.processed_analysis.update({'file_hashes': {'ssdeep': '3:ghi:jkl'}, 'unpacker': {}})
+        for file_object in [file_one, file_two, file_three]:
+            self.db_interface_backend.add_file_object(file_object)
+
+        uids = [file_one.uid, file_two.uid, file_three.uid, 'unknown_uid']
+        assert self.db_interface_compare.get_ssdeep_hashes(uids) == {file_one.uid: '3:abc:def', file_two.uid: '3:ghi:jkl'}
+        assert self.db_interface_compare.get_entropies(uids) == {file_one.uid: 0.5}
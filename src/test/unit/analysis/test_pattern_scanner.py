@@ -0,0 +1,81 @@
+import random
+import re
+from mmap import ACCESS_READ, mmap
+
+import pytest
+
+from analysis.pattern_scanner import PatternScanner
+
+USER_NAME = br'[a-zA-Z][a-zA-Z0-9_-]{2,15}:'
+PATTERNS = {
+    'unix': USER_NAME + br'[^:]?:\d+:\d*:[^:]*:[^:]*:[^\n ]*',
+    'md5': USER_NAME + br'\$1\$[a-zA-Z0-9\./+]+\$[a-zA-Z0-9\./+]{16,128}',
+}
+STRING_PATTERNS = {
+    'utf-8': b'[\x09-\x0d\x20-\x7e]{8,}',
+    'utf-16': b'(?:[\x09-\x0d\x20-\x7e]\x00){8,}',
+}
+
+
+def _get_scanner(chunk_size, overlap):
+    scanner = PatternScanner(chunk_size=chunk_size, overlap=overlap)
+    for name, pattern in PATTERNS.items():
+        scanner.add_pattern(name, pattern, prefix=USER_NAME)
+    for name, pattern in STRING_PATTERNS.items():
+        scanner.add_pattern(name, pattern)
+    return scanner
+
+
+def _random_data(size):
+    entries = [b'root:x:0:0:root:/root:/bin/sh\n', b'user:$1$salt$' + b'A' * 22 + b'\n', 'wide string'.encode('utf-16-le')]
+    data = bytearray(random.choices(b'ab1:$\n .\x00\xff', k=size))
+    for _ in range(size // 100):
+        position = random.randrange(size)
+        data[position:position] = random.choice(entries)
+    return bytes(data)
+
+
+@pytest.mark.parametrize('chunk_size, overlap', [(7, 100), (64, 200), (1000, 100), (2 ** 20, 4096)])
+def test_results_equal_finditer(chunk_size, overlap):
+    random.seed(chunk_size)
+    scanner = _get_scanner(chunk_size, overlap)
+    for size in [0, 1, 50, 3000]:
+        data = _random_data(size)
+        result = scanner.scan(data)
+        for name, pattern in {**PATTERNS, **STRING_PATTERNS}.items():
+            assert result[name] == [(match.start(), match.group()) for match in re.finditer(pattern, data)]
+
+
+def test_match_longer_than_overlap():
+    scanner = _get_scanner(chunk_size=10, overlap=10)
+    data = b'\xff' * 5 + b'x' * 100 + b'\xff'
+    assert scanner.scan(data)['utf-8'] == [(5, b'x' * 100)]
+
+
+@pytest.mark.parametrize('chunk_size', [16, 1000])
+def test_match_of_group_longer_than_overlap(chunk_size):
+    data = b'\xff' * 10 + b'root:x:0:0:' + b'a' * 300 + b':/root:/bin/sh\n'
+    assert _get_scanner(chunk_size=chunk_size, overlap=20).scan(data)['unix'] == [(10, data[10:-1])]
+
+
+def test_pattern_without_prefix_needs_more_than_overlap():
+    scanner = PatternScanner(chunk_size=16, overlap=8)
+    scanner.add_pattern('foo', b'start[^!]*end')
+    data = b'start' + b'x' * 100 + b'end start!end'
+    assert scanner.scan(data)['foo'] == [(match.start(), match.group()) for match in re.finditer(b'start[^!]*end', data)]
+
+
+def test_scan_memory_map(tmp_path):
+    test_file = tmp_path / 'test'
+    test_file.write_bytes(b'\xff' * 10 + b'root:x:0:0:root:/root:/bin/sh\n')
+    with test_file.open('rb') as fp, mmap(fp.fileno(), 0, access=ACCESS_READ) as memory_map:
+        result = _get_scanner(chunk_size=16, overlap=64).scan(memory_map)
+    assert result['unix'] == [(10, b'root:x:0:0:root:/root:/bin/sh')]
+    assert result['md5'] == []
+
+
+def test_duplicate_name():
+    scanner = PatternScanner()
+    scanner.add_pattern('foo', b'foo')
+    with pytest.raises(ValueError):
+        scanner.add_pattern('foo', b'bar')
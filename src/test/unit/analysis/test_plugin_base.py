@@ -66,6 +66,68 @@ class TestPluginBaseCore(TestPluginBase):
         self.assertTrue(child_object.uid in root_object.files_included, 'child object not in processed file')
 
 
+class TestPluginBasePersistentWorkers(TestPluginBase):
+
+    def setUp(self):
+        config = self.set_up_base_config()
+        config.set('base', 'persistent_workers', 'true')
+        self.base_plugin = AnalysisBasePlugin(self, config)
+
+    def test_object_processing_persistent_worker(self):
+        for content in [b'first_file', b'second_file']:
+            file_object = FileObject(binary=content)
+            self.base_plugin.in_queue.put(file_object)
+            processed_object = self.base_plugin.out_queue.get(timeout=5)
+            assert processed_object.uid == file_object.uid
+            assert processed_object.processed_analysis['base']['plugin_version'] == 'not set'
+
+
+class TestPluginBaseBatchProcessing(TestPluginBase):
+
+    def setUp(self):
+        config = self.set_up_base_config()
+        config.set('base', 'threads', '1')
+        config.set('base', 'batch_size', '4')
+        self.base_plugin = AnalysisBasePlugin(self, config, offline_testing=True)
+
+    def test_get_additional_tasks_for_batch(self):
+        for index in range(5):
+            self.base_plugin.in_queue.put(FileObject(binary=str(index).encode()))
+        sleep(0.1)
+        assert len(self.base_plugin._get_additional_tasks_for_batch()) == 3
+        assert len(self.base_plugin._get_additional_tasks_for_batch()) == 2
+        assert self.base_plugin._get_additional_tasks_for_batch() == []
+
+    def test_worker_processing_batch(self):
+        tasks = [FileObject(binary=str(index).encode()) for index in range(3)]
+        self.base_plugin.worker_processing_batch(0, tasks)
+        results = [self.base_plugin.out_queue.get(timeout=5) for _ in tasks]
+        assert [fo.uid for fo in results] == [fo.uid for fo in tasks]
+        assert all(fo.processed_analysis['base']['plugin_version'] == 'not set' for fo in results)
+
+    def test_worker_processing_batch_fallback(self):
+        def _failing_batch(*_):
+            raise RuntimeError('batch failed')
+        self.base_plugin.process_objects = _failing_batch
+        tasks = [FileObject(binary=str(index).encode()) for index in range(2)]
+        self.base_plugin.worker_processing_batch(0, tasks)
+        results = [self.base_plugin.out_queue.get(timeout=5) for _ in tasks]
+        assert all('analysis_date' in fo.processed_analysis['base'] for fo in results), 'fallback to single analysis failed'
+
+    def test_worker_processing_batch_timeout_per_file(self):
+        def _slow_on_second_file(file_object):
+            if file_object.binary == b'slow':
+                sleep(5)
+            return file_object
+        self.base_plugin.process_object = _slow_on_second_file
+        self.base_plugin.timeout = 1
+        tasks = [FileObject(binary=content) for content in [b'first', b'slow', b'third', b'fourth']]
+        self.base_plugin.worker_processing_batch(0, tasks)
+        results = {fo.uid: fo for fo in (self.base_plugin.out_queue.get(timeout=5) for _ in tasks)}
+        assert [uid for uid, fo in results.items() if fo.analysis_exception] == [tasks[1].uid], 'only the slow file should fail'
+        assert all('analysis_date' in results[fo.uid].processed_analysis['base'] for fo in tasks if fo is not tasks[1])
+
+
 class TestPluginBaseAddJob(TestPluginBase):
 
     def test_analysis_depth_not_reached_yet(self):
@@ -159,5 +221,16 @@ class TestPluginTimeout(TestPluginBase):
         self.p_base.shutdown()
         self.assertNotIn('summary', fo_out.processed_analysis['dummy_plugin_for_testing_only'])
 
+    def test_timeout_persistent_worker(self):
+        self.config.add_section('dummy_plugin_for_testing_only')
+        self.config.set('dummy_plugin_for_testing_only', 'persistent_workers', 'true')
+        self.p_base = DummyPlugin(self, self.config, timeout=0)
+        fo_in = FileObject(binary=b'test', scheduled_analysis=[])
+        self.p_base.add_job(fo_in)
+        fo_out = self.p_base.out_queue.get(timeout=5)
+        self.p_base.shutdown()
+        self.assertNotIn('summary', fo_out.processed_analysis['dummy_plugin_for_testing_only'])
+        self.assertEqual(fo_out.analysis_exception[0], 'dummy_plugin_for_testing_only')
+
     def register_plugin(self, name, plugin_object):
         pass
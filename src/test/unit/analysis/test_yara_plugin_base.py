@@ -1,19 +1,15 @@
 # pylint: disable=wrong-import-order
 
-import logging
 import os
-from pathlib import Path
 
-import pytest
+import yara
 
-from analysis.YaraPluginBase import YaraBasePlugin, _parse_meta_data, _split_output_in_rules_and_matches
+from analysis.YaraPluginBase import YaraBasePlugin, _convert_yara_matches, _escape_matched_data, _get_hex_strings
 from helperFunctions.fileSystem import get_src_dir
 from objects.file import FileObject
 from test.common_helper import get_test_data_dir
 from test.unit.analysis.analysis_plugin_test_class import AnalysisPluginTest
 
-YARA_TEST_OUTPUT = Path(get_test_data_dir(), 'yara_matches').read_text()
-
 
 class TestAnalysisYaraBasePlugin(AnalysisPluginTest):
 
@@ -45,29 +41,55 @@ class TestAnalysisYaraBasePlugin(AnalysisPluginTest):
         self.assertEqual(len(processed_file.processed_analysis[self.PLUGIN_NAME]), 1, 'result present but should not')
         self.assertEqual(processed_file.processed_analysis[self.PLUGIN_NAME]['summary'], [], 'summary not empty')
 
+    def test_process_objects(self):
+        test_files = [
+            FileObject(file_path=os.path.join(get_test_data_dir(), file_name))
+            for file_name in ['yara_test_file', 'zero_byte']
+        ]
+        processed_files = self.analysis_plugin.process_objects(test_files)
+        match_result, empty_result = [fo.processed_analysis[self.PLUGIN_NAME] for fo in processed_files]
+        assert match_result['summary'] == ['testRule']
+        assert match_result['testRule']['strings'], 'matched strings missing'
+        assert empty_result == {'summary': []}
+
+    def test_rules_are_cached(self):
+        rules = self.analysis_plugin._get_rules()  # pylint: disable=protected-access
+        assert self.analysis_plugin._get_rules() is rules, 'rules should not be reloaded'  # pylint: disable=protected-access
+        self.analysis_plugin._rules_mtime -= 1  # pylint: disable=protected-access
+        assert self.analysis_plugin._get_rules() is not rules, 'rules should be reloaded after the signature file changed'  # pylint: disable=protected-access
+
+
+def test_convert_yara_matches():
+    rules = yara.compile(source='rule r_foo { meta: description = "foo [bar]" version = 1 test = true strings: $a = "foo" condition: $a }')
+    matches = _convert_yara_matches(rules.match(data=b'foo bar foo'))
+
+    assert list(matches) == ['r_foo']
+    assert matches['r_foo']['rule'] == 'r_foo'
+    assert matches['r_foo']['strings'] == [(0, '$a', b'foo'), (8, '$a', b'foo')]
+    assert matches['r_foo']['meta'] == {'description': 'foo [bar]', 'version': '1', 'test': True}
 
-def test_parse_yara_output():
-    matches = YaraBasePlugin._parse_yara_output(YARA_TEST_OUTPUT)  # pylint: disable=protected-access
 
-    assert isinstance(matches, dict), 'matches should be dict'
-    assert 'PgpPublicKeyBlock' in matches.keys(), 'Pgp block should have been matched'
-    assert matches['PgpPublicKeyBlock']['strings'][0][0] == 0, 'first block should start at 0x0'
-    assert 'r_libjpeg8_8d12b1_0' in matches
-    assert matches['r_libjpeg8_8d12b1_0']['meta']['description'] == 'foo [bar]'
-    assert len(matches) == 7, 'not all matches found'
+def test_convert_yara_matches_hex_strings():
+    rules = yara.compile(source='rule r_hex { strings: $a = { 66 6F 00 } $b = "o\\x00b" condition: all of them }')
+    matches = _convert_yara_matches(rules.match(data=b'fo\x00bar'), {('r_hex', '$a')})
+
+    assert matches['r_hex']['strings'] == [(0, '$a', b'66 6F 00'), (1, '$b', b'o\\x00b')]
+
+
+def test_get_hex_strings(tmp_path):
+    (tmp_path / 'foo.yara').write_text(
+        'rule r_foo {\n strings:\n  $a = { 31 32 }\n  $b = "foo"\n condition:\n  any of them\n}\n'
+        'private rule r_bar { strings: $a = "{" $c={ 00 ?? } condition: any of them }\n'
+    )
+    assert _get_hex_strings(tmp_path) == {('r_foo', '$a'), ('r_bar', '$c')}
+    assert _get_hex_strings(tmp_path / 'missing') == set()
 
 
 def test_get_signature_file_name():
     assert YaraBasePlugin._get_signature_file_name('/foo/bar/plugin_name/code/test.py') == 'plugin_name.yc'  # pylint: disable=protected-access
 
 
-def test_parse_meta_data_error(caplog):
-    with caplog.at_level(logging.WARNING):
-        _parse_meta_data('illegal,meta,entry')
-        assert 'Malformed meta' in caplog.messages[0]
-
 
-def test_split_output_uneven():
-    uneven_yara_output = 'rule1 [meta=0,data=1] /path\n0x0:$a1: AA BB \nrule2 [meta=0,data=1] /path\n'
-    with pytest.raises(ValueError):
-        _split_output_in_rules_and_matches(uneven_yara_output)
+def test_escape_matched_data():
+    assert _escape_matched_data(b'foo bar') == b'foo bar'
+    assert _escape_matched_data(b'a\x00b\n') == b'a\\x00b\\x0A'
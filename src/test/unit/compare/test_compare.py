@@ -31,8 +31,11 @@ class MockDbInterface:
             return None
         return self.fo
 
-    def get_ssdeep_hash(self, uid):
-        return ''
+    def get_ssdeep_hashes(self, uids):
+        return {uid: '' for uid in uids}
+
+    def get_entropies(self, uids):
+        return {}
 
     def get_complete_object_including_all_summaries(self, uid):
         return self.get_object(uid)
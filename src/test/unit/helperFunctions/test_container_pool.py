@@ -0,0 +1,210 @@
+# pylint: disable=redefined-outer-name,protected-access
+import os
+from multiprocessing import Process
+from pathlib import Path
+from threading import Event, Thread
+from time import sleep
+
+import pytest
+from docker.errors import APIError
+from requests.exceptions import ReadTimeout
+
+from helperFunctions.container_pool import CONTAINER_JOB_DIR, ContainerPool, _ContainerPoolState
+
+
+class FakeContainerBackend:
+    '''
+    Container backend without docker: the "containers" are IDs and jobs are run by `handler`, which gets the command
+    and the working directory of the job on the host.
+    '''
+
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda command, workdir: (0, ' '.join(command), ''))
+        self.started = []
+        self.stopped = []
+        self.jobs = []  # container ID, command and working directory of each job
+        self._host_dirs = {}
+        self._stop_events = {}
+
+    def start(self, image, mounts=None, **_):
+        container_id = f'{image}-{len(self.started)}'
+        self.started.append(container_id)
+        self._host_dirs[container_id] = {mount['Target']: mount['Source'] for mount in mounts or []}
+        self._stop_events[container_id] = Event()
+        return container_id
+
+    def get_entrypoint(self, _):  # pylint: disable=no-self-use
+        return ['entrypoint']
+
+    def exec(self, container_id, command, workdir, combine_stderr_stdout):
+        if container_id in self.stopped:
+            raise APIError(f'container {container_id} is not running')
+        self.jobs.append((container_id, command, workdir))
+        host_dir = self._host_dirs[container_id][CONTAINER_JOB_DIR]
+        host_workdir = Path(host_dir) / Path(workdir).relative_to(CONTAINER_JOB_DIR)
+        exit_code, stdout, stderr = self.handler(command, host_workdir)
+        if self._stop_events[container_id].is_set():
+            raise APIError(f'container {container_id} was stopped')
+        return exit_code, stdout, None if combine_stderr_stdout else stderr
+
+    def stop(self, container_id):
+        self.stopped.append(container_id)
+        self._stop_events[container_id].set()
+
+    def wait_for_stop(self, container_id, timeout=10):
+        return self._stop_events[container_id].wait(timeout)
+
+
+@pytest.fixture
+def backend():
+    return FakeContainerBackend()
+
+
+@pytest.fixture
+def pool(backend, tmp_path):
+    container_pool = ContainerPool('image', size=2, max_jobs=3, base_dir=str(tmp_path), backend=backend)
+    yield container_pool
+    container_pool.shutdown()
+
+
+def test_run_reuses_container(pool, backend):
+    first = pool.run(['--json', 'input'])
+    second = pool.run('--json input')
+
+    assert first.args == ['entrypoint', '--json', 'input']
+    assert first.returncode == 0
+    assert first.stdout == second.stdout == 'entrypoint --json input'
+    assert first.stderr == ''
+    assert backend.started == ['image-0']
+    assert [container_id for container_id, _, _ in backend.jobs] == ['image-0', 'image-0']
+    assert backend.jobs[0][2] != backend.jobs[1][2], 'every job needs a fresh working directory'
+    assert all(workdir.startswith(f'{CONTAINER_JOB_DIR}/') for _, _, workdir in backend.jobs)
+
+
+def test_run_input_files(pool, backend, tmp_path):
+    input_file = tmp_path / 'script.js'
+    input_file.write_text('var x = 5')
+    workdirs = []
+
+    def handler(command, workdir):
+        workdirs.append(workdir)
+        return 0, (workdir / command[-1]).read_text(), ''
+
+    backend.handler = handler
+    result = pool.run(['input.js'], input_files={'input.js': str(input_file), 'config/rc.js': str(input_file)})
+
+    assert result.stdout == 'var x = 5'
+    assert workdirs[0].parent == pool.host_dir
+    assert not workdirs[0].exists(), 'working directory should be removed after the job'
+
+
+@pytest.mark.parametrize('path', ['/etc/passwd', '../input.js', 'a/../../input.js'])
+def test_run_input_files_outside_of_working_directory(pool, backend, tmp_path, path):
+    with pytest.raises(ValueError):
+        pool.run(['input.js'], input_files={path: str(tmp_path)})
+    assert backend.started == []
+
+
+def test_combine_stderr_stdout(pool):
+    assert pool.run(['foo'], combine_stderr_stdout=True).stderr is None
+
+
+def test_container_is_replaced_after_max_jobs(pool, backend):
+    for _ in range(4):
+        pool.run(['foo'])
+
+    assert backend.started == ['image-0', 'image-1']
+    assert backend.stopped == ['image-0']
+    assert [container_id for container_id, _, _ in backend.jobs] == ['image-0'] * 3 + ['image-1']
+
+
+def test_container_is_replaced_after_failure(pool, backend):
+    def handler(command, _):
+        if command[-1] == 'fail':
+            raise APIError('exec failed')
+        return 0, '', ''
+
+    backend.handler = handler
+    pool.run(['foo'])
+    with pytest.raises(APIError):
+        pool.run(['fail'])
+    pool.run(['foo'])
+
+    assert backend.started == ['image-0', 'image-1']
+    assert backend.stopped == ['image-0']
+
+
+def test_start_failure(pool, backend):
+    def start_failing(*_, **__):
+        raise APIError('could not start container')
+
+    backend.start = start_failing
+    with pytest.raises(APIError):
+        pool.run(['foo'])
+    with pytest.raises(APIError):  # the slot of the failed container is released
+        pool.run(['foo'])
+
+
+def test_timeout(pool, backend):
+    def handler(*_):
+        backend.wait_for_stop('image-0')
+        return 0, '', ''
+
+    backend.handler = handler
+
+    with pytest.raises(ReadTimeout):
+        pool.run(['foo'], timeout=0.1)
+    assert backend.stopped == ['image-0']
+
+    backend.handler = lambda command, _: (0, 'done', '')
+    assert pool.run(['foo']).stdout == 'done'
+    assert backend.started == ['image-0', 'image-1']
+
+
+def test_pool_size_is_not_exceeded(pool, backend):
+    running, finish = [], Event()
+
+    def handler(command, _):
+        running.append(command)
+        finish.wait(10)
+        return 0, '', ''
+
+    backend.handler = handler
+    threads = [Thread(target=pool.run, args=(['foo'],)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    sleep(0.5)
+    assert len(running) == 2
+    assert len(backend.started) == 2
+
+    finish.set()
+    for thread in threads:
+        thread.join()
+    assert len(running) == 3
+    assert len(backend.started) == 2
+
+
+def test_shutdown(pool, backend):
+    pool.run(['foo'])
+    assert pool.host_dir.is_dir()
+
+    pool.shutdown()
+    assert backend.stopped == ['image-0']
+    assert not pool.host_dir.exists()
+
+
+def test_containers_of_dead_processes_are_reclaimed():
+    process = Process(target=lambda: None)
+    process.start()
+    process.join()
+
+    state = _ContainerPoolState(size=1)
+    dead_lease, _, _, _ = state.acquire(process.pid)
+    state.set_container(dead_lease, 'container-0')
+
+    lease, container_id, job_count, orphans = state.acquire(os.getpid())
+    assert (container_id, job_count, orphans) == (None, 0, ['container-0'])
+
+    state.set_container(lease, 'container-1')
+    state.release(lease, 1)
+    assert state.acquire(os.getpid())[1:] == ('container-1', 1, [])
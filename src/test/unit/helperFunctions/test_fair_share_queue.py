@@ -0,0 +1,114 @@
+from multiprocessing import Process, Queue
+from queue import Empty
+
+import pytest
+
+from helperFunctions.fair_share_queue import HIGH_PRIORITY, FairShareQueue
+
+
+class MockTask:
+    def __init__(self, name, root_uid=None, high_priority=False):
+        self.name = name
+        self.root_uid = root_uid
+        self.temporary_data = {HIGH_PRIORITY: True} if high_priority else {}
+
+    def get_root_uid(self):
+        return self.root_uid
+
+
+def _get_all(queue):
+    result = []
+    while not queue.empty():
+        result.append(queue.get(timeout=1).name)
+    return result
+
+
+def test_round_robin_between_firmware():
+    queue = FairShareQueue()
+    for index in range(3):
+        queue.put(MockTask(f'big_{index}', root_uid='big'))
+    queue.put(MockTask('small_0', root_uid='small'))
+    queue.put(MockTask('small_1', root_uid='small'))
+
+    assert queue.qsize() == 5
+    assert queue.get_depth_per_firmware() == {'big': 3, 'small': 2}
+    assert _get_all(queue) == ['big_0', 'small_0', 'big_1', 'small_1', 'big_2']
+
+
+def test_high_priority_lane():
+    queue = FairShareQueue()
+    queue.put(MockTask('normal', root_uid='fw'))
+    queue.put(MockTask('update', root_uid='fw', high_priority=True))
+    queue.put('no file object')
+
+    assert queue.get_high_priority_depth() == 1
+    assert queue.get_depth_per_firmware() == {'fw': 1, None: 1}
+    assert queue.get(timeout=1).name == 'update'
+
+
+def test_get_from_empty_queue():
+    queue = FairShareQueue()
+    with pytest.raises(Empty):
+        queue.get_nowait()
+    with pytest.raises(Empty):
+        queue.get(timeout=0.1)
+
+
+def _put_tasks(queue):
+    for index in range(2):
+        queue.put(MockTask(f'child_{index}', root_uid='child'))
+
+
+def test_shared_between_processes():
+    queue = FairShareQueue()
+    queue.put(MockTask('parent', root_uid='parent'))
+    process = Process(target=_put_tasks, args=(queue,))
+    process.start()
+    process.join()
+
+    assert queue.qsize() == 3
+    assert _get_all(queue) == ['parent', 'child_0', 'child_1']
+
+
+def _get_tasks(queue, result_queue):
+    for _ in range(2):
+        result_queue.put(queue.get(timeout=5).name)
+
+
+def test_get_in_other_process():
+    queue, result_queue = FairShareQueue(), Queue()
+    process = Process(target=_get_tasks, args=(queue, result_queue))
+    process.start()
+    queue.put(MockTask('big_0', root_uid='big'))
+    queue.put(MockTask('big_1', root_uid='big'))
+    process.join()
+
+    assert [result_queue.get(timeout=1) for _ in range(2)] == ['big_0', 'big_1']
+    assert queue.empty()
+
+
+def test_no_item_lost_after_timeout():
+    queue = FairShareQueue()
+    for _ in range(3):
+        with pytest.raises(Empty):
+            queue.get(timeout=0.01)
+    queue.put(MockTask('first', root_uid='fw'))
+    queue.put(MockTask('update', root_uid='fw', high_priority=True))
+
+    assert _get_all(queue) == ['update', 'first']
+
+
+def _get_depth(queue, result_queue):
+    try:
+        queue.get_depth_per_firmware()
+    except RuntimeError:
+        result_queue.put('error')
+
+
+def test_depth_only_available_in_owner_process():
+    queue, result_queue = FairShareQueue(), Queue()
+    process = Process(target=_get_depth, args=(queue, result_queue))
+    process.start()
+    process.join()
+
+    assert result_queue.get(timeout=1) == 'error'
@@ -5,7 +5,9 @@ from pathlib import Path
 
 import pytest
 
-from helperFunctions.fileSystem import file_is_empty, get_relative_object_path, get_src_dir, get_template_dir
+from helperFunctions.fileSystem import (
+    file_is_empty, get_relative_object_path, get_src_dir, get_template_dir, link_or_copy_file
+)
 from test.common_helper import get_test_data_dir
 
 TEST_DATA_DIR = Path(get_test_data_dir())
@@ -50,3 +52,39 @@ def test_file_is_zero():
 
 def test_file_is_zero_broken_link():
     assert not file_is_empty(TEST_DATA_DIR / 'broken_link'), 'Broken link is not empty'
+
+
+@pytest.mark.parametrize('move', [False, True])
+def test_link_or_copy_file(tmp_path, move):
+    source = tmp_path / 'source'
+    source.write_bytes(b'content')
+    destination = tmp_path / 'sub_dir' / 'destination'
+    link_or_copy_file(source, destination, move=move)
+    assert destination.read_bytes() == b'content'
+    assert source.exists() is not move
+
+
+def test_link_or_copy_file_without_hardlink(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'content')
+    link_or_copy_file(source, tmp_path / 'destination', hardlink=False)
+    (tmp_path / 'destination').write_bytes(b'changed')
+    assert source.read_bytes() == b'content'
+    assert source.stat().st_nlink == 1
+
+
+def test_link_or_copy_file_symlink(tmp_path):
+    source = tmp_path / 'source'
+    source.write_bytes(b'content')
+    (tmp_path / 'link').symlink_to(source)
+    link_or_copy_file(tmp_path / 'link', tmp_path / 'destination', move=True)
+    assert not (tmp_path / 'destination').is_symlink()
+    assert (tmp_path / 'destination').read_bytes() == b'content'
+    assert source.exists() and (tmp_path / 'link').is_symlink()
+
+
+def test_link_or_copy_file_does_not_overwrite(tmp_path):
+    (tmp_path / 'source').write_bytes(b'new content')
+    (tmp_path / 'destination').write_bytes(b'content')
+    link_or_copy_file(tmp_path / 'source', tmp_path / 'destination')
+    assert (tmp_path / 'destination').read_bytes() == b'content'
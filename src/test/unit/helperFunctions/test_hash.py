@@ -1,11 +1,12 @@
 # pylint: disable=wrong-import-order
 
 import os
+from mmap import ACCESS_READ, mmap
 from pathlib import Path
 
 from helperFunctions.hash import (
-    _suppress_stdout, get_imphash, get_md5, get_sha256, get_ssdeep, get_ssdeep_comparison, get_tlsh,
-    normalize_lief_items
+    _suppress_stdout, get_hash_of_file, get_imphash, get_md5, get_sha256, get_ssdeep, get_ssdeep_comparison,
+    get_tlsh, normalize_lief_items
 )
 from test.common_helper import create_test_file_object, get_test_data_dir
 
@@ -19,6 +20,13 @@ def test_get_sha256():
     assert get_sha256(TEST_STRING) == TEST_SHA256, 'not correct from string'
 
 
+def test_get_hash_of_file(tmp_path):
+    test_file = tmp_path / 'test_file'
+    test_file.write_text(TEST_STRING)
+    assert get_hash_of_file('sha256', str(test_file), chunk_size=4) == TEST_SHA256
+    assert get_hash_of_file('md5', str(test_file)) == TEST_MD5
+
+
 def test_get_md5():
     assert get_md5(TEST_STRING) == TEST_MD5, 'not correct from string'
 
@@ -87,3 +95,15 @@ def test_suppress_stdout(capsys):
 def test_get_tlsh():
     assert get_tlsh(b'foobar') == ''  # make sure the result is not 'TNULL'
     assert get_tlsh(os.urandom(2**7)) != ''  # the new tlsh version should work for smaller inputs
+
+
+def test_hashes_of_memory_map(tmp_path):
+    binary = os.urandom(2 * 1024 ** 2 + 42)
+    test_file = tmp_path / 'test_file'
+    test_file.write_bytes(binary)
+    with test_file.open('rb') as fp:
+        memory_map = mmap(fp.fileno(), 0, access=ACCESS_READ)
+        assert get_sha256(memory_map) == get_sha256(binary)
+        assert get_ssdeep(memory_map) == get_ssdeep(binary)
+        assert get_tlsh(memory_map) == get_tlsh(binary)
+        memory_map.close()
@@ -3,7 +3,9 @@ from time import sleep
 
 import pytest
 
-from helperFunctions.process import ExceptionSafeProcess, check_worker_exceptions, new_worker_was_started
+from helperFunctions.process import (
+    ExceptionSafeProcess, PersistentWorkerProcess, WorkerTaskException, check_worker_exceptions, new_worker_was_started
+)
 from test.common_helper import get_config_for_testing
 
 
@@ -67,3 +69,55 @@ def test_new_worker_was_started():
 
     assert new_worker_was_started(old, new)
     assert not new_worker_was_started(old, old)
+
+
+def _square_or_fail(value):
+    if value == 'sleep':
+        sleep(5)
+    if value == 'fail':
+        raise RuntimeError('now that\'s annoying')
+    return value * value
+
+
+def test_persistent_worker_process():
+    worker = PersistentWorkerProcess(_square_or_fail)
+    try:
+        pid = worker.process.pid
+        assert worker.run_task(3, timeout=5) == 9
+        assert worker.run_task(4, timeout=5) == 16
+        assert worker.process.pid == pid, 'worker should be reused'
+
+        with pytest.raises(WorkerTaskException) as exception_info:
+            worker.run_task('fail', timeout=5)
+        assert 'now that\'s annoying' in exception_info.value.stack_trace
+        assert worker.process.pid == pid, 'worker should survive exceptions'
+
+        with pytest.raises(TimeoutError):
+            worker.run_task('sleep', timeout=0.1)
+        assert worker.process.pid != pid, 'worker should be replaced after timeout'
+        assert worker.run_task(5, timeout=5) == 25
+    finally:
+        worker.shutdown()
+    assert not worker.process.is_alive()
+
+
+def _square_all(values):
+    return (_square_or_fail(value) for value in values)
+
+
+def test_persistent_worker_process_iterate_results():
+    worker = PersistentWorkerProcess(_square_all)
+    try:
+        assert list(worker.iterate_results([2, 3], timeout=5)) == [4, 9]
+
+        results = []
+        with pytest.raises(TimeoutError):
+            results.extend(worker.iterate_results([2, 'sleep', 3], timeout=1))
+        assert results == [4], 'results before the timeout should be received'
+
+        with pytest.raises(WorkerTaskException):
+            results.extend(worker.iterate_results([3, 'fail'], timeout=5))
+        assert results == [4, 9]
+        assert list(worker.iterate_results([4], timeout=5)) == [16], 'worker should still accept tasks'
+    finally:
+        worker.shutdown()
@@ -0,0 +1,29 @@
+# pylint: disable=protected-access
+import pytest
+import ssdeep
+
+from helperFunctions.ssdeep_similarity import _get_n_grams, find_similar_hashes
+
+
+@pytest.mark.parametrize('ssdeep_hash, expected_output', [
+    ('invalid', set()),
+    ('3:abcdef:abc', set()),
+    ('3:abcdefg:abcdefgh', {(3, 'abcdefg'), (6, 'abcdefg'), (6, 'bcdefgh')}),
+    ('3:aaaaaaaab:', set()),
+    ('3:aaaaaaaabcde:', {(3, 'aaabcde')}),
+])
+def test_get_n_grams(ssdeep_hash, expected_output):
+    assert _get_n_grams(ssdeep_hash) == expected_output
+
+
+def test_find_similar_hashes():
+    data = bytes(range(256)) * 100
+    hashes_one = {'one_a': ssdeep.hash(data), 'one_b': ssdeep.hash(b'unrelated' * 1000)}
+    hashes_two = {'two_a': ssdeep.hash(data[:-100] + b'changed'), 'two_b': ssdeep.hash(bytes(reversed(data)))}
+    expected = [
+        (uid_one, uid_two, ssdeep.compare(hash_one, hash_two))
+        for uid_one, hash_one in hashes_one.items() for uid_two, hash_two in hashes_two.items()
+        if ssdeep.compare(hash_one, hash_two) > 1
+    ]
+    assert expected, 'test data should contain similar files'
+    assert sorted(find_similar_hashes(hashes_one, hashes_two, 1)) == sorted(expected)
@@ -1,6 +1,7 @@
 import unittest
 
-from helperFunctions.uid import create_uid, is_list_of_uids, is_uid
+from helperFunctions.uid import create_uid, create_uid_from_file, is_list_of_uids, is_uid
+from test.common_helper import get_test_data_dir
 
 
 class TestHelperFunctionsUID(unittest.TestCase):
@@ -11,6 +12,11 @@ class TestHelperFunctionsUID(unittest.TestCase):
         result = create_uid('test')
         self.assertEqual(result, self.test_uid, 'uid not correct')
 
+    def test_create_uid_from_file(self):
+        file_path = '{}/test_data_file.bin'.format(get_test_data_dir())
+        with open(file_path, 'rb') as fp:
+            self.assertEqual(create_uid_from_file(file_path), create_uid(fp.read()), 'uid not correct')
+
     def test_is_uid(self):
         self.assertFalse(is_uid(None))
         self.assertFalse(is_uid('blah'))
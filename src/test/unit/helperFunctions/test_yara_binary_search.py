@@ -1,8 +1,9 @@
 import unittest
 from os import path
-from subprocess import CalledProcessError
 from unittest.mock import patch
 
+import yara
+
 from helperFunctions import yara_binary_search
 from test.common_helper import get_config_for_testing, get_test_data_dir
 
@@ -30,20 +31,18 @@ def mock_connect_to_enter(_, config=None):
     return yara_binary_search.YaraBinarySearchScannerDbInterface(config)
 
 
-def mock_check_output(call, shell=True, stderr=None):
-    raise CalledProcessError(1, call, b'', stderr)
-
-
 class TestHelperFunctionsYaraBinarySearch(unittest.TestCase):
 
     def setUp(self):
         yara_binary_search.YaraBinarySearchScannerDbInterface.__bases__ = (MockCommonDbInterface,)
         yara_binary_search.ConnectTo.__enter__ = mock_connect_to_enter
         yara_binary_search.ConnectTo.__exit__ = lambda _, __, ___, ____: None
+        yara_binary_search.RESULT_CACHE.clear()
         self.yara_rule = b'rule test_rule {strings: $a = "test1234" condition: $a}'
-        test_path = path.join(get_test_data_dir(), TEST_FILE_1)
-        test_config = {'data_storage': {'firmware_file_storage_directory': test_path}}
-        self.yara_binary_scanner = yara_binary_search.YaraBinarySearchScanner(test_config)
+        self.test_config = get_config_for_testing()
+        self.test_config.set('data_storage', 'firmware_file_storage_directory', path.join(get_test_data_dir(), TEST_FILE_1))
+        self.test_config.set('ExpertSettings', 'binary_search_processes', '2')
+        self.yara_binary_scanner = yara_binary_search.YaraBinarySearchScanner(self.test_config)
 
     def test_get_binary_search_result(self):
         result = self.yara_binary_scanner.get_binary_search_result((self.yara_rule, None))
@@ -62,34 +61,44 @@ class TestHelperFunctionsYaraBinarySearch(unittest.TestCase):
         assert isinstance(result, str)
         assert 'There seems to be an error in the rule file' in result
 
-    @patch('helperFunctions.yara_binary_search.execute_shell_command', side_effect=mock_check_output)
+    @patch('helperFunctions.yara_binary_search.YaraBinarySearchScanner._scan_files', side_effect=yara.Error('foo'))
     def test_get_binary_search_yara_error(self, _):
         result = self.yara_binary_scanner.get_binary_search_result((self.yara_rule, None))
         assert isinstance(result, str)
         assert 'Error when calling YARA' in result
 
+    def test_result_is_cached(self):
+        result = self.yara_binary_scanner.get_binary_search_result((self.yara_rule, None))
+        with patch.object(self.yara_binary_scanner, '_scan_files') as scan_mock:
+            assert self.yara_binary_scanner.get_binary_search_result((self.yara_rule, None)) == result
+            assert not scan_mock.called, 'cached result should be used'
+            assert all(isinstance(file_paths_digest, str) for file_paths_digest, _ in yara_binary_search.RESULT_CACHE.values())
+
+            with patch.object(self.yara_binary_scanner, '_get_file_paths', return_value=['new_file']):
+                self.yara_binary_scanner.get_binary_search_result((self.yara_rule, None))
+            assert scan_mock.called, 'cache should not be used if the scanned files changed'
+
+    def test_max_file_size(self):
+        self.yara_binary_scanner.max_file_size = 1
+        assert self.yara_binary_scanner.get_binary_search_result((self.yara_rule, None)) == {}
+
+    def test_progress_callback(self):
+        progress = []
+        with patch('helperFunctions.yara_binary_search.PROGRESS_INTERVAL', -1):
+            self.yara_binary_scanner.get_binary_search_result(
+                (self.yara_rule, None), progress_callback=lambda result, scanned, total: progress.append((scanned, total))
+            )
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+
     def test_eliminate_duplicates(self):
         test_dict = {1: [1, 2, 3, 3], 2: [1, 1, 2, 3]}
         self.yara_binary_scanner._eliminate_duplicates(test_dict)
         self.assertEqual(test_dict, {1: [1, 2, 3], 2: [1, 2, 3]})
 
-    def test_parse_raw_result(self):
-        raw_result = 'rule_1 match_1\nrule_1 match_2\nrule_2 match_1'
-        result = self.yara_binary_scanner._parse_raw_result(raw_result)
-        self.assertEqual(result, {'rule_1': ['match_1', 'match_2'], 'rule_2': ['match_1']})
-
-    def test_execute_yara_search(self):
-        test_rule_path = path.join(get_test_data_dir(), 'yara_binary_search_test_rule')
-        result = self.yara_binary_scanner._execute_yara_search(test_rule_path)
-        self.assertTrue('test_rule' in result)
-
-    def test_execute_yara_search_for_single_file(self):
-        test_rule_path = path.join(get_test_data_dir(), 'yara_binary_search_test_rule')
-        result = self.yara_binary_scanner._execute_yara_search(
-            test_rule_path,
-            target_path=path.join(get_test_data_dir(), TEST_FILE_1, TEST_FILE_1)
-        )
-        self.assertTrue('test_rule' in result)
+    def test_scan_files(self):
+        file_paths = [path.join(get_test_data_dir(), TEST_FILE_1, TEST_FILE_1), path.join(get_test_data_dir(), TEST_FILE_1, 'bi', TEST_FILE_2)]
+        result = self.yara_binary_scanner._scan_files(self.yara_rule, file_paths, None)
+        self.assertEqual(result, {'test_rule': [TEST_FILE_1]})
 
 
 class TestYaraBinarySearchScannerDbInterface(unittest.TestCase):
@@ -1,3 +1,6 @@
+import pickle
+from mmap import mmap
+
 from common_helper_files import get_binary_from_file
 
 from objects.file import FileObject
@@ -15,6 +18,42 @@ class TestObjectsFile:  # pylint: disable=no-self-use
         assert test_object.file_name == 'test_data_file.bin', 'correct file name'
         assert test_object.file_path == file_path, 'correct file path'
 
+    def test_binary_is_loaded_lazily(self):
+        test_object = FileObject(file_path='{}/test_data_file.bin'.format(get_test_data_dir()))
+        assert test_object.uid == '268d870ffa2b21784e4dc955d8e8b8eb5f3bcddd6720a1e6d31d2cf84bd1bff8_19'
+        assert not test_object.binary_is_loaded
+        assert test_object.binary == b'test string in file'
+        assert test_object.binary_is_loaded
+
+    def test_mapped_binary(self):
+        test_object = FileObject(file_path='{}/test_data_file.bin'.format(get_test_data_dir()))
+        assert isinstance(test_object.mapped_binary, mmap)
+        assert test_object.mapped_binary[:4] == b'test'
+        assert not test_object.binary_is_loaded
+
+        in_memory_object = FileObject(binary=b'abc')
+        assert in_memory_object.mapped_binary == b'abc'
+
+    def test_pickle_file_object_with_local_file(self):
+        test_object = FileObject(file_path='{}/test_data_file.bin'.format(get_test_data_dir()))
+        assert test_object.binary is not None and test_object.mapped_binary is not None
+        unpickled_object = pickle.loads(pickle.dumps(test_object))
+        assert not unpickled_object.binary_is_loaded, 'binary should not be pickled'
+        assert unpickled_object.uid == test_object.uid
+        assert unpickled_object.binary == b'test string in file'
+
+        in_memory_object = pickle.loads(pickle.dumps(FileObject(binary=b'abc')))
+        assert in_memory_object.binary == b'abc'
+
+    def test_set_binary_path(self):
+        test_object = FileObject()
+        test_object.uid = '268d870ffa2b21784e4dc955d8e8b8eb5f3bcddd6720a1e6d31d2cf84bd1bff8_19'
+        test_object.set_binary_path('{}/test_data_file.bin'.format(get_test_data_dir()))
+        assert test_object.sha256 == '268d870ffa2b21784e4dc955d8e8b8eb5f3bcddd6720a1e6d31d2cf84bd1bff8'
+        assert test_object.file_name == 'test_data_file.bin'
+        assert not test_object.binary_is_loaded
+        assert test_object.binary == b'test string in file'
+
     def test_file_object_init_raw(self):
         test_object = FileObject()
         assert test_object.binary is None, 'correct binary'
@@ -2,13 +2,17 @@
 import gc
 import os
 from multiprocessing import Queue
+from queue import Queue as ThreadQueue
 from time import sleep
 from unittest import TestCase, mock
 
 import pytest
 
+from helperFunctions.fair_share_queue import HIGH_PRIORITY, FairShareQueue
 from objects.firmware import Firmware
 from scheduler.analysis import MANDATORY_PLUGINS, AnalysisScheduler
+from scheduler.analysis_status import AnalysisStatus
+from scheduler.analysis_version_cache import AnalysisVersionCache
 from test.common_helper import DatabaseMock, MockFileObject, fake_exit, get_config_for_testing, get_test_data_dir
 from test.mock import mock_patch, mock_spy
 
@@ -359,3 +363,89 @@ def test_combined_analysis_workload(monkeypatch):
         sleep(0.1)  # let the queue finish internally to not cause "Broken pipe"
         scheduler.process_queue.close()
         dummy_plugin.in_queue.close()
+
+
+def test_scheduled_workload_per_firmware(monkeypatch):
+    monkeypatch.setattr(AnalysisScheduler, '__init__', lambda *_: None)
+    scheduler = AnalysisScheduler()
+    scheduler.status = AnalysisStatus()
+    scheduler.version_cache = AnalysisVersionCache()
+    scheduler.db_backend_service = None
+    scheduler.process_queue = FairShareQueue()
+    dummy_plugin = PluginMock([])
+    dummy_plugin.in_queue, dummy_plugin.active, dummy_plugin.thread_count = FairShareQueue(), [], 0  # pylint: disable=attribute-defined-outside-init
+    scheduler.analysis_plugins = {'dummy_plugin': dummy_plugin}
+
+    scheduler.process_queue.put(MockFileObject())
+    for _ in range(2):
+        dummy_plugin.in_queue.put(Firmware(binary=b'foo'))
+    single_file_update = Firmware(binary=b'bar')
+    single_file_update.temporary_data[HIGH_PRIORITY] = True
+    dummy_plugin.in_queue.put(single_file_update)
+
+    workload = scheduler.get_scheduled_workload()
+    assert workload['queue_depth_per_firmware'] == {'other': 1, Firmware(binary=b'foo').uid: 2}
+    assert workload['high_priority_queue'] == 1
+    assert workload['version_cache'] == {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0}
+    assert workload['plugins']['dummy_plugin']['queue'] == 3
+
+
+class VersionPluginMock:
+    NAME = 'plugin_root'
+    VERSION = '1.0'
+    DEPENDENCIES = ['plugin_dep']
+
+
+@pytest.mark.parametrize('root_version, root_date, dep_date, expected', [
+    ('1.0', 20, 10, True),
+    ('1.0', 10, 20, False),
+    ('0.9', 20, 10, False),
+])
+def test_analysis_is_up_to_date_in_cache(root_version, root_date, dep_date, expected, monkeypatch):
+    monkeypatch.setattr(AnalysisScheduler, '__init__', lambda *_: None)
+    scheduler = AnalysisScheduler()
+    scheduler.analysis_plugins = {'plugin_root': VersionPluginMock()}
+    scheduler.db_backend_service = None  # no database queries are needed
+    scheduler.version_cache = AnalysisVersionCache()
+    file_object = MockFileObject()
+    file_object.uid = 'some_uid'
+    scheduler.version_cache.update(file_object.uid, {
+        'plugin_root': {'plugin_version': root_version, 'analysis_date': root_date},
+        'plugin_dep': {'plugin_version': '1.0', 'analysis_date': dep_date},
+    })
+
+    assert scheduler._analysis_is_already_up_to_date('plugin_root', file_object) == expected
+    assert scheduler.version_cache.get_statistics()['hits'] == 1
+
+
+class SummaryCacheBackendMock:
+    def __init__(self):
+        self.calls = []
+
+    def store_list_of_included_files(self, firmware_uid):
+        self.calls.append(('included_files', firmware_uid))
+
+    def flush_analysis_results(self, only_if_due=False):
+        self.calls.append(('flush', None))
+
+    def update_summary_cache(self, firmware_uid):
+        self.calls.append(('summary_cache', firmware_uid))
+
+
+def test_summary_cache_is_updated_after_both_processes_flushed(monkeypatch):
+    monkeypatch.setattr(AnalysisScheduler, '__init__', lambda *_: None)
+    scheduler = AnalysisScheduler()
+    scheduler.db_backend_service = SummaryCacheBackendMock()
+    scheduler._completed_firmwares, scheduler._summary_cache_updates = ThreadQueue(), ThreadQueue()
+    scheduler.status = mock.MagicMock(remove_from_current_analyses=lambda _: ['fw_uid'])
+    scheduler.version_cache = mock.MagicMock()
+    file_object = MockFileObject()
+    file_object.uid, file_object.scheduled_analysis = 'fo_uid', []
+
+    scheduler._check_further_process_or_complete(file_object)  # result collector
+    scheduler._update_summary_caches()
+    assert scheduler.db_backend_service.calls == [('included_files', 'fw_uid')]
+
+    scheduler._pass_on_completed_firmwares()  # task runner
+    scheduler._update_summary_caches()  # result collector
+    assert scheduler.db_backend_service.calls[1:] == [('flush', None), ('flush', None), ('summary_cache', 'fw_uid')]
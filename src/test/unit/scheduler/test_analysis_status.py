@@ -86,7 +86,7 @@ class TestAnalysisStatus:
         fo = FileObject(binary=b'foo')
         fo.parent_firmware_uids = {'parent_uid'}
         fo.uid = 'foo'
-        self.status.remove_from_current_analyses(fo)
+        assert self.status.remove_from_current_analyses(fo) == ['parent_uid']
         assert self.status.currently_running == {}
         assert 'parent_uid' in self.status.recently_finished
         assert self.status.recently_finished['parent_uid']['total_files_count'] == 2
@@ -96,7 +96,7 @@ class TestAnalysisStatus:
         fo = FileObject(binary=b'foo')
         fo.parent_firmware_uids = {'parent_uid'}
         fo.uid = 'foo'
-        self.status.remove_from_current_analyses(fo)
+        assert self.status.remove_from_current_analyses(fo) == []
         result = self.status.currently_running
         assert 'parent_uid' in result
         assert result['parent_uid']['files_to_analyze'] == []
@@ -0,0 +1,68 @@
+from multiprocessing import Process
+from time import sleep
+
+from scheduler.analysis_version_cache import AnalysisVersion, AnalysisVersionCache, get_analysis_version
+
+RESULT = {'plugin_version': '1.0', 'system_version': None, 'analysis_date': 10.0, 'summary': []}
+
+
+def test_get_analysis_version():
+    assert get_analysis_version(RESULT) == AnalysisVersion('1.0', None, 10.0)
+    assert get_analysis_version({'failed': 'reason', 'plugin_version': '1.0', 'analysis_date': 1}) is None
+    assert get_analysis_version({**RESULT, 'file_system_flag': True}) is None  # sanitized fields
+    assert get_analysis_version({'skipped': 'blacklisted file type'}) is None
+
+
+def test_get_and_update():
+    cache = AnalysisVersionCache()
+    cache.update('uid', {'foo': RESULT, 'bar': {**RESULT, 'analysis_date': 20.0}})
+    assert cache.get('uid', ['foo', 'bar']) == [AnalysisVersion('1.0', None, 10.0), AnalysisVersion('1.0', None, 20.0)]
+    assert cache.get('uid', ['foo', 'missing']) is None
+    assert cache.get('unknown', ['foo']) is None
+
+    cache.update('uid', {'foo': {'failed': 'reason'}})
+    assert cache.get('uid', ['foo']) is None
+    assert cache.get_statistics() == {'hits': 1, 'misses': 3, 'hit_rate': 0.25, 'size': 1}
+
+    cache.update('uid', {'bar': {'failed': 'reason'}})
+    assert cache.get_statistics()['size'] == 0
+
+
+def test_max_size():
+    cache = AnalysisVersionCache(max_size=2)
+    cache.warm_up((f'uid_{index}', {'foo': RESULT}) for index in range(5))
+    assert cache.get_statistics()['size'] == 2
+
+    cache.update('uid_5', {'foo': RESULT})
+    assert cache.get('uid_0', ['foo']) is None
+    assert cache.get('uid_5', ['foo']) is not None
+
+
+def test_versions_are_stored_once():
+    cache = AnalysisVersionCache()
+    for index in range(3):
+        cache.update(f'uid_{index}', {'foo': {**RESULT, 'analysis_date': float(index)}, 'bar': RESULT})
+    cache.update('uid_0', {'foo': {**RESULT, 'plugin_version': '1.1'}})
+
+    assert len(cache._versions) == 3  # pylint: disable=protected-access
+    assert cache.get('uid_0', ['foo', 'bar']) == [AnalysisVersion('1.1', None, 10.0), AnalysisVersion('1.0', None, 10.0)]
+    assert cache.get('uid_2', ['foo']) == [AnalysisVersion('1.0', None, 2.0)]
+
+
+def _send_updates(cache):
+    cache.send_update('uid_1', {'foo': RESULT})
+    cache.invalidate('uid_0')
+
+
+def test_updates_from_other_processes():
+    cache = AnalysisVersionCache()
+    cache.update('uid_0', {'foo': RESULT})
+    process = Process(target=_send_updates, args=(cache,))
+    process.start()
+    process.join()
+    sleep(0.1)  # the queue is written by a background thread
+
+    cache.apply_updates()
+    assert cache.get('uid_0', ['foo']) is None
+    assert cache.get('uid_1', ['foo']) is not None
+    cache.shutdown()
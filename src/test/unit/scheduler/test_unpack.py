@@ -1,11 +1,12 @@
 import gc
 from configparser import ConfigParser
-from multiprocessing import Event, Queue
+from multiprocessing import Event, Queue, Value
 from tempfile import TemporaryDirectory
 from time import sleep
 from unittest import TestCase
 from unittest.mock import patch
 
+from objects.file import FileObject
 from objects.firmware import Firmware
 from scheduler.Unpacking import UnpackingScheduler
 from test.common_helper import DatabaseMock, create_docker_mount_base_dir, get_test_data_dir
@@ -53,6 +54,17 @@ class TestUnpackScheduler(TestCase):
             else:
                 self.assertEqual(item.uid, 'faa11db49f32a90b51dfc3f0254f9fd7a7b46d0b570abd47e1943b86d554447a_28', 'none container file not rescheduled')
 
+    def test_unpack_streamed(self):
+        self.config.set('unpack', 'streaming', 'true')
+        self._start_scheduler()
+        test_fw = Firmware(file_path=f'{get_test_data_dir()}/container/test_zip.tar.gz')
+        self.scheduler.add_task(test_fw)
+        outer_container = self.tmp_queue.get(timeout=10)
+        assert outer_container.uid == test_fw.uid, 'parent must be passed on before its children'
+        assert len(outer_container.files_included) == 2
+        included_files = [self.tmp_queue.get(timeout=10), self.tmp_queue.get(timeout=10)]
+        assert {item.uid for item in included_files} == outer_container.files_included
+
     def test_get_combined_analysis_workload(self):
         self._start_scheduler()
         result = self.scheduler._get_combined_analysis_workload()  # pylint: disable=protected-access
@@ -81,3 +93,34 @@ class TestUnpackScheduler(TestCase):
         self.sleep_event.set()
 
         sleep(seconds)
+
+
+class UnpackerMock:
+    def __init__(self, late_virtual_paths):
+        self.late_virtual_paths = late_virtual_paths
+
+    def unpack(self, fo, on_file_ready):
+        child = FileObject(binary=b'child')
+        child.virtual_file_path = {fo.uid: [f'{fo.uid}|{fo.uid}|/a']}
+        on_file_ready(child)
+        if self.late_virtual_paths:
+            fo.temporary_data['late_virtual_paths'] = {child.uid: self.late_virtual_paths}
+        return [child]
+
+
+def test_late_virtual_paths_are_added_to_the_scheduled_file(monkeypatch):
+    monkeypatch.setattr(UnpackingScheduler, '__init__', lambda *_: None)
+    scheduler = UnpackingScheduler()
+    scheduler.stop_condition = Value('i', 0)
+    scheduler.unfinished_parents, scheduler.late_virtual_paths = {}, {}
+    scheduled, passed_on = [], []
+    scheduler._add_object_to_unpack_queue = scheduled.append  # pylint: disable=protected-access
+    scheduler.post_unpack = passed_on.append
+    test_fw = Firmware(binary=b'parent')
+
+    scheduler._unpack_streamed(UnpackerMock([f'{test_fw.uid}|{test_fw.uid}|/a_copy']), test_fw, 0)  # pylint: disable=protected-access
+    scheduler._unpack_streamed(UnpackerMock([]), scheduled[0], 0)  # pylint: disable=protected-access
+
+    assert [item.uid for item in passed_on] == [test_fw.uid, scheduled[0].uid]
+    assert passed_on[1].virtual_file_path == {test_fw.uid: [f'{test_fw.uid}|{test_fw.uid}|/a', f'{test_fw.uid}|{test_fw.uid}|/a_copy']}
+    assert scheduler.late_virtual_paths == {} and scheduler.unfinished_parents == {}
@@ -0,0 +1,97 @@
+# pylint: disable=protected-access
+from time import sleep
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from storage.analysis_buffer import AnalysisResultBuffer
+
+
+class CollectionMock:
+    def __init__(self, name, fail=0):
+        self.name = name
+        self.fail = fail  # number of failing writes
+        self.requests = []
+
+    def bulk_write(self, requests, ordered=True):
+        assert not ordered
+        if self.fail:
+            self.fail -= 1
+            raise PyMongoError('failed')
+        self.requests.extend(requests)
+
+
+def test_updates_are_merged():
+    buffer = AnalysisResultBuffer(batch_size=10)
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.foo': {'a': 1}})
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.bar': {'b': 2}})
+    buffer.add('file_objects', 'uid_2', {'processed_analysis.foo': {'c': 3}})
+    buffer.add('firmwares', 'uid_1', {'processed_analysis.foo': {'d': 4}})
+    assert len(buffer) == 3
+    assert buffer._updates[('file_objects', 'uid_1')] == {'processed_analysis.foo': {'a': 1}, 'processed_analysis.bar': {'b': 2}}
+
+
+def test_flush_is_due():
+    buffer = AnalysisResultBuffer(batch_size=2, max_delay=0.1)
+    assert not buffer.flush_is_due()
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.foo': {}})
+    assert not buffer.flush_is_due()
+    buffer.add('file_objects', 'uid_2', {'processed_analysis.foo': {}})
+    assert buffer.flush_is_due(), 'size threshold reached'
+
+    buffer = AnalysisResultBuffer(batch_size=2, max_delay=0.1)
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.foo': {}})
+    sleep(0.15)
+    assert buffer.flush_is_due(), 'time threshold reached'
+
+
+def test_flush():
+    collections = {'file_objects': CollectionMock('file_objects'), 'firmwares': CollectionMock('firmwares')}
+    buffer = AnalysisResultBuffer(batch_size=10)
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.foo': {'a': 1}})
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.bar': {'b': 2}})
+    buffer.add('firmwares', 'uid_2', {'processed_analysis.foo': {'c': 3}})
+    buffer.flush(collections.get)
+
+    assert len(buffer) == 0
+    assert len(collections['file_objects'].requests) == 1, 'updates of the same object should be merged'
+    assert collections['file_objects'].requests[0]._doc == {'$set': {'processed_analysis.foo': {'a': 1}, 'processed_analysis.bar': {'b': 2}}}
+    assert len(collections['firmwares'].requests) == 1
+
+    statistics = buffer.get_statistics()
+    assert statistics['flushes'] == 1
+    assert statistics['last_batch_size'] == 2
+    assert statistics['average_flush_latency'] >= 0
+
+
+def test_flush_empty_buffer():
+    buffer = AnalysisResultBuffer()
+    buffer.flush(lambda _: None)
+    assert buffer.get_statistics()['flushes'] == 0
+
+
+def test_flush_error_is_retried(caplog, monkeypatch):
+    monkeypatch.setattr('storage.analysis_buffer.WRITE_RETRY_DELAY', 0)
+    collection = CollectionMock('file_objects', fail=2)
+    buffer = AnalysisResultBuffer()
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.foo': {}})
+    buffer.flush(lambda _: collection)
+    assert 'Bulk update of 1 analysis results failed (attempt 1/3)' in caplog.messages[0]
+    assert len(collection.requests) == 1
+    assert len(buffer) == 0
+
+
+def test_flush_error(monkeypatch):
+    monkeypatch.setattr('storage.analysis_buffer.WRITE_RETRY_DELAY', 0)
+    collections = {'file_objects': CollectionMock('file_objects', fail=3), 'firmwares': CollectionMock('firmwares')}
+    buffer = AnalysisResultBuffer()
+    buffer.add('file_objects', 'uid_1', {'processed_analysis.foo': {'a': 1}})
+    buffer.add('firmwares', 'uid_2', {'processed_analysis.foo': {'b': 2}})
+    with pytest.raises(PyMongoError):
+        buffer.flush(collections.get)
+    assert len(collections['firmwares'].requests) == 1
+    assert buffer._updates == {('file_objects', 'uid_1'): {'processed_analysis.foo': {'a': 1}}}, 'failed updates must be kept'
+
+    buffer.flush(collections.get)
+    assert len(collections['file_objects'].requests) == 1
+    assert len(buffer) == 0
@@ -0,0 +1,41 @@
+from storage.blob_cache import LruBlobCache
+
+
+def test_get_and_put():
+    cache = LruBlobCache(max_size=100)
+    assert cache.get('foo') is None
+    cache.put('foo', b'bar')
+    assert cache.get('foo') == b'bar'
+    assert cache.current_size == 3
+
+    cache.put('foo', b'foobar')
+    assert cache.get('foo') == b'foobar'
+    assert cache.current_size == 6
+    assert len(cache) == 1
+
+
+def test_lru_eviction():
+    cache = LruBlobCache(max_size=10, max_entry_size=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    assert cache.get('a') == b'1234'  # 'a' is now the most recently used entry
+    cache.put('c', b'1234')
+    assert cache.get('b') is None, 'least recently used entry should be evicted'
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.current_size == 8
+
+
+def test_large_entries_are_not_cached():
+    cache = LruBlobCache(max_size=100)
+    cache.put('large', b'x' * 26)
+    assert cache.get('large') is None
+    assert cache.current_size == 0
+
+
+def test_clear():
+    cache = LruBlobCache(max_size=100)
+    cache.put('foo', b'bar')
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.current_size == 0
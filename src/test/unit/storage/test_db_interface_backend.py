@@ -0,0 +1,143 @@
+# pylint: disable=protected-access
+from types import SimpleNamespace
+
+import pytest
+
+from objects.file import FileObject
+from storage.analysis_buffer import AnalysisResultBuffer
+from storage.db_interface_backend import BackEndDbInterface, _get_unsaved_analyses, _replace_summary_entries_of_file
+from storage.sanitize_codec import PickleCodec, get_codec
+
+PLUGIN_COUNT = 10
+
+
+class GridFsMock:
+    def __init__(self):
+        self.put_count = 0
+
+    @staticmethod
+    def exists(*_, **__):
+        return False
+
+    def put(self, *_, **__):
+        self.put_count += 1
+
+    @staticmethod
+    def find(*_, **__):
+        return []
+
+
+class CollectionMock:
+    name = 'file_objects'
+
+    def __init__(self):
+        self.updates = []
+
+    def update_one(self, query, update, **_):
+        self.updates.append((query, update))
+        return SimpleNamespace(upserted_id=None)
+
+    @staticmethod
+    def find_one_and_update(*_, **__):
+        return None
+
+
+class BackendDbInterfaceMock(BackEndDbInterface):
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self.report_threshold = 0  # store all results in GridFS
+        self.sanitize_codec = get_codec(PickleCodec.NAME)
+        self.sanitize_fs = GridFsMock()
+        self.file_objects = CollectionMock()
+        self.firmwares = CollectionMock()
+        self.sanitize_references = CollectionMock()
+        self.tlsh_index = CollectionMock()
+        self.analysis_buffer = AnalysisResultBuffer(batch_size=1)
+
+
+@pytest.fixture
+def backend_db():
+    return BackendDbInterfaceMock()
+
+
+def _add_result(file_object, plugin_index):
+    file_object.processed_analysis[f'plugin_{plugin_index}'] = {
+        'result': f'result of plugin {plugin_index}', 'summary': [], 'analysis_date': float(plugin_index), 'plugin_version': '1.0'
+    }
+
+
+def test_add_analysis_gridfs_writes_are_linear(backend_db):
+    file_object = FileObject(binary=b'test file')
+    for index in range(PLUGIN_COUNT):
+        _add_result(file_object, index)
+        backend_db.add_analysis(file_object)
+
+    keys_per_result = 3  # result, analysis_date and plugin_version (the summary is not moved to GridFS)
+    assert backend_db.sanitize_fs.put_count == PLUGIN_COUNT * keys_per_result, 'results should only be written once'
+    assert len(backend_db.file_objects.updates) == PLUGIN_COUNT
+
+
+def test_add_analysis_changed_result_is_written_again(backend_db):
+    file_object = FileObject(binary=b'test file')
+    _add_result(file_object, 1)
+    backend_db.add_analysis(file_object)
+    backend_db.add_analysis(file_object)
+    assert len(backend_db.file_objects.updates) == 1, 'unchanged result should not be written again'
+
+    file_object.processed_analysis['plugin_1']['analysis_date'] = 42.0
+    backend_db.add_analysis(file_object)
+    assert len(backend_db.file_objects.updates) == 2
+
+
+def test_update_object_only_sets_new_results(backend_db):
+    file_object = FileObject(binary=b'test file')
+    _add_result(file_object, 1)
+    _add_result(file_object, 2)
+    file_object.stored_analysis_dates = {'plugin_1': 1.0}
+    old_db_entry = {
+        'processed_analysis': {'plugin_1': {}, 'outdated': {}}, 'files_included': [], 'virtual_file_path': {},
+        'parent_firmware_uids': [], 'parents': []
+    }
+    backend_db.update_object(file_object, old_db_entry)
+
+    query, update = backend_db.file_objects.updates[0]
+    assert query == {'_id': file_object.uid}
+    assert 'processed_analysis' not in update['$set']
+    assert [key for key in update['$set'] if key.startswith('processed_analysis')] == ['processed_analysis.plugin_2']
+
+
+def test_get_unsaved_analyses():
+    file_object = FileObject(binary=b'test file')
+    file_object.processed_analysis = {
+        'unchanged': {'analysis_date': 1.0},
+        'changed': {'analysis_date': 3.0},
+        'new': {'analysis_date': 4.0},
+        'no_date': {},
+    }
+    file_object.stored_analysis_dates = {'unchanged': 1.0, 'changed': 2.0, 'no_date': None}
+    assert set(_get_unsaved_analyses(file_object)) == {'changed', 'new'}
+
+
+def test_add_analysis_updates_tlsh_index(backend_db):
+    file_object = FileObject(binary=b'test file')
+    _add_result(file_object, 1)
+    backend_db.add_analysis(file_object)
+    assert backend_db.tlsh_index.updates == []
+
+    file_object.processed_analysis['file_hashes'] = {'tlsh': 'T1ABCD', 'analysis_date': 1.0}
+    backend_db.add_analysis(file_object)
+    backend_db.add_analysis(file_object)
+    assert len(backend_db.tlsh_index.updates) == 1
+    query, update = backend_db.tlsh_index.updates[0]
+    assert query == {'_id': file_object.uid}
+    assert update['$set']['tlsh'] == 'T1ABCD'
+
+
+@pytest.mark.parametrize('summary, file_summary, expected', [
+    ({}, ['a'], {'a': ['uid']}),
+    ({'a': ['other']}, ['a', 'b'], {'a': ['other', 'uid'], 'b': ['uid']}),
+    ({'a': ['other', 'uid'], 'b': ['uid']}, ['a'], {'a': ['other', 'uid']}),
+    ({'a': ['other', 'uid']}, [], {'a': ['other']}),
+    ({'a': ['uid']}, ['a'], {'a': ['uid']}),
+])
+def test_replace_summary_entries_of_file(summary, file_summary, expected):
+    assert _replace_summary_entries_of_file(summary, 'uid', file_summary) == expected
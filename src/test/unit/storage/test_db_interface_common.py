@@ -1,3 +1,5 @@
+from types import SimpleNamespace
+
 import pytest
 
 from test.common_helper import CommonDbInterfaceMock
@@ -43,3 +45,78 @@ def test_convert_to_firmware(input_data, expected):
     test_interface = CommonDbInterfaceMock()
     result = test_interface._convert_to_firmware(input_data, analysis_filter=None)
     assert result.part == expected
+
+
+class ReferencesMock:
+    def __init__(self):
+        self.documents = {}
+        self.on_delete = None  # called after a document was deleted (to simulate a concurrent store)
+
+    def update_one(self, query, update, upsert=False):
+        upserted = query['_id'] not in self.documents
+        references = self.documents.setdefault(query['_id'], [])
+        if update['$addToSet']['references'] not in references:
+            references.append(update['$addToSet']['references'])
+        return SimpleNamespace(upserted_id=query['_id'] if upserted and upsert else None)
+
+    def find_one_and_update(self, query, update):
+        for file_name, references in self.documents.items():
+            if query['references'] in references and file_name != query['_id']['$ne']:
+                references.remove(update['$pull']['references'])
+                return {'_id': file_name}
+        return None
+
+    def delete_one(self, query):
+        if self.documents.get(query['_id']) != []:
+            return SimpleNamespace(deleted_count=0)
+        del self.documents[query['_id']]
+        if self.on_delete:
+            self.on_delete()
+        return SimpleNamespace(deleted_count=1)
+
+
+class SanitizeFsMock:
+    def __init__(self):
+        self.files = {}  # ID -> file name
+
+    def exists(self, query):
+        return query['filename'] in self.files.values()
+
+    def put(self, _, filename):
+        self.files[len(self.files)] = filename
+
+    def find(self, query):
+        return [SimpleNamespace(_id=file_id) for file_id, file_name in self.files.items() if file_name == query['filename']]
+
+    def delete(self, file_id):
+        del self.files[file_id]
+
+
+@pytest.fixture
+def sanitize_db():
+    interface = CommonDbInterfaceMock()
+    interface.sanitize_references = ReferencesMock()
+    interface.sanitize_fs = SanitizeFsMock()
+    return interface
+
+
+def test_store_in_sanitize_db(sanitize_db):
+    file_name = sanitize_db._store_in_sanitize_db(b'content', 'plugin_key_uid_1')
+    assert sanitize_db._store_in_sanitize_db(b'content', 'plugin_key_uid_2') == file_name
+    assert list(sanitize_db.sanitize_fs.files.values()) == [file_name], 'content should only be stored once'
+    assert sanitize_db.sanitize_references.documents == {file_name: ['plugin_key_uid_1', 'plugin_key_uid_2']}
+
+    sanitize_db._store_in_sanitize_db(b'new content', 'plugin_key_uid_1')
+    sanitize_db._store_in_sanitize_db(b'new content', 'plugin_key_uid_2')
+    assert file_name not in sanitize_db.sanitize_references.documents
+    assert file_name not in sanitize_db.sanitize_fs.files.values(), 'unreferenced content should be deleted'
+
+
+def test_store_in_sanitize_db_during_deletion(sanitize_db):
+    file_name = sanitize_db._store_in_sanitize_db(b'content', 'plugin_key_uid_1')
+    # the content is referenced again after its reference document was deleted but before the content is deleted
+    sanitize_db.sanitize_references.on_delete = lambda: sanitize_db._store_in_sanitize_db(b'content', 'plugin_key_uid_2')
+    sanitize_db._remove_sanitize_db_reference('plugin_key_uid_1')
+
+    assert sanitize_db.sanitize_references.documents == {file_name: ['plugin_key_uid_2']}
+    assert sanitize_db.sanitize_fs.exists({'filename': file_name}), 'referenced content must not be deleted'
@@ -44,3 +44,16 @@ class TestFsOrganizer(unittest.TestCase):
 
         self.fs_organzier.delete_file(file_object.uid)
         self.assertFalse(os.path.exists(file_object.file_path), 'file not deleted')
+
+    def test_store_file_without_loading_binary(self):
+        with TemporaryDirectory(prefix='fact_tests_') as tmp_dir:
+            local_path = os.path.join(tmp_dir, 'test_file')
+            with open(local_path, 'wb') as fp:
+                fp.write(b'abcde')
+            file_object = FileObject(file_path=local_path)
+
+            self.fs_organzier.store_file(file_object, move=True)
+            self.assertFalse(file_object.binary_is_loaded, 'binary should not be loaded')
+            self.assertFalse(os.path.exists(local_path), 'file not moved')
+            self.assertEqual(file_object.file_path, self.fs_organzier.generate_path(file_object), 'wrong file path set in file object')
+            self.assertEqual(file_object.binary, b'abcde', 'binary not loaded from the stored file')
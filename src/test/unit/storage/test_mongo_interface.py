@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from storage import mongo_interface
+from storage.mongo_interface import MongoClientPool, MongoInterface
+
+
+class ClientMock:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ReadOnlyInterface(MongoInterface):
+    READ_ONLY = True
+
+
+@pytest.fixture
+def client_pool(monkeypatch):
+    pool = MongoClientPool()
+    monkeypatch.setattr(mongo_interface, 'CLIENT_POOL', pool)
+    monkeypatch.setattr(MongoInterface, '_authenticate', lambda self, client: None)
+    yield pool
+    pool.close_all()
+
+
+def _get_config(server='localhost'):
+    return {'data_storage': {
+        'mongo_server': server, 'mongo_port': '27018', 'db_admin_user': 'admin', 'db_admin_pw': 'pw',
+        'db_readonly_user': 'reader', 'db_readonly_pw': 'pw'
+    }}
+
+
+def test_get_client():
+    pool = MongoClientPool()
+    client = pool.get_client('key', ClientMock)
+    assert pool.get_client('key', ClientMock) is client
+    assert pool.get_client('other key', ClientMock) is not client
+    assert len(pool) == 2
+
+    pool.close_all()
+    assert client.closed
+    assert len(pool) == 0
+    assert pool.get_client('key', ClientMock) is not client
+
+
+def test_forked_process_gets_new_clients(monkeypatch):
+    pool = MongoClientPool()
+    client = pool.get_client('key', ClientMock)
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert pool.get_client('key', ClientMock) is not client
+    assert not client.closed, 'clients of the parent process must not be closed'
+
+
+def test_interfaces_share_client(client_pool):
+    interface = MongoInterface(_get_config())
+    assert MongoInterface(_get_config()).client is interface.client
+    assert ReadOnlyInterface(_get_config()).client is not interface.client
+    assert MongoInterface(_get_config(server='other_server')).client is not interface.client
+    assert len(client_pool) == 3
+
+    interface.shutdown()
+    assert MongoInterface(_get_config()).client is interface.client
@@ -0,0 +1,51 @@
+import pickle
+from collections import OrderedDict
+
+import pytest
+
+from storage.sanitize_codec import CODECS, MsgpackCodec, PickleCodec, ZstdMsgpackCodec, decode_sanitized_content, get_codec
+
+TEST_RESULT = {
+    'strings': [(8, '$a', b'\x00foo'), (16, '$b', b'bar')],
+    'meta': OrderedDict(description='test', score=1.5, flag=True),
+    1234: ['integer', 'keys', None],
+}
+
+
+@pytest.mark.parametrize('codec_name', list(CODECS))
+def test_encode_decode(codec_name):
+    encoded = get_codec(codec_name).encode(TEST_RESULT)
+    assert decode_sanitized_content(encoded) == TEST_RESULT
+
+
+def test_tuples_are_preserved():
+    decoded = decode_sanitized_content(MsgpackCodec().encode([(1, (2, 3))]))
+    assert decoded == [(1, (2, 3))]
+    assert isinstance(decoded[0][1], tuple)
+
+
+@pytest.mark.parametrize('value', [{1, 2}, 2 ** 70, 'surrogate \udcff'])
+def test_fallback_to_pickle(value):
+    encoded = ZstdMsgpackCodec().encode(value)
+    assert encoded == pickle.dumps(value)
+    assert decode_sanitized_content(encoded) == value
+
+
+def test_legacy_pickle_entries():
+    assert decode_sanitized_content(pickle.dumps(TEST_RESULT)) == TEST_RESULT
+
+
+def test_compression():
+    test_list = ['the same string'] * 10000
+    assert len(ZstdMsgpackCodec().encode(test_list)) < len(MsgpackCodec().encode(test_list)) / 10
+
+
+def test_invalid_content():
+    with pytest.raises(ValueError):
+        decode_sanitized_content(ZstdMsgpackCodec.MAGIC + b'not zstd')
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec('foobar')
+    assert isinstance(get_codec(PickleCodec.NAME), PickleCodec)
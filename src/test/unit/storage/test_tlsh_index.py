@@ -0,0 +1,55 @@
+import random
+
+import pytest
+import tlsh
+
+from storage.tlsh_index import TlshIndex, get_tlsh_header
+
+HASH_0 = '9A355C07B5A614FDC5A2847046EF92B7693174A642327DBF3C88D6303F42E746B1ABE1'
+HASH_1 = '0CC34B06B1B258BCC16689308A67D671AB747E5053223B3E3684F7342F56E6F1F0DAB1'
+
+
+def _random_hash(length_value):
+    body = ''.join(random.choices('0123456789ABCDEF', k=64))
+    swapped_length = f'{length_value:02X}'[::-1]
+    return f'T1{random.randrange(256):02X}{swapped_length}{random.randrange(16):X}{random.randrange(16):X}{body}'
+
+
+@pytest.mark.parametrize('tlsh_hash, expected', [
+    ('T1C2A1AF462D23215FC9458F1CD97B4221B7E887C4C18EE5C2D1940CDD1CA71A51E6FF61', (0x1A, 10, 15)),
+    (HASH_1, (0x3C, 4, 11)),
+])
+def test_get_tlsh_header(tlsh_hash, expected):
+    assert get_tlsh_header(tlsh_hash) == expected
+
+
+def test_invalid_hash():
+    with pytest.raises(ValueError):
+        TlshIndex().add('uid', 'T1AB')
+
+
+def test_add_and_remove():
+    index = TlshIndex()
+    index.add('uid_0', HASH_0)
+    index.add('uid_1', HASH_1)
+    index.add('uid_1', HASH_1)
+    assert len(index) == 2
+    assert index.query(HASH_1) == {'uid_1': 0}
+
+    index.remove('uid_1')
+    index.remove('unknown')
+    assert 'uid_1' not in index
+    assert index.query(HASH_1) == {}
+
+
+def test_query_is_exact():
+    random.seed(42)
+    hashes = {f'uid_{index}': _random_hash(random.choice([0, 1, 2, 20, 30, 254, 255])) for index in range(2000)}
+    index = TlshIndex()
+    for uid, tlsh_hash in hashes.items():
+        index.add(uid, tlsh_hash)
+
+    for query_hash in random.sample(list(hashes.values()), 50):
+        for max_distance in [150, 250]:
+            expected = {uid: tlsh.diff(query_hash, other) for uid, other in hashes.items() if tlsh.diff(query_hash, other) <= max_distance}
+            assert index.query(query_hash, max_distance) == expected
@@ -2,11 +2,14 @@
 
 import gc
 import grp
+import json
 import os
 import unittest
 from configparser import ConfigParser
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import mock
 
 from objects.file import FileObject
 from test.common_helper import DatabaseMock, create_test_file_object, get_test_data_dir
@@ -95,3 +98,46 @@ class TestUnpackerCoreMain(TestUnpackerBase):
         self.unpacker.unpack(test_file)
         assert 'unpacker' in test_file.processed_analysis
         assert 'maximum unpacking depth was reached' in test_file.processed_analysis['unpacker']['info']
+
+
+class TestUnpackerStreaming(TestUnpackerBase):
+
+    def setUp(self):
+        super().setUp()
+        self.passed_on = []
+        self.first_file_passed_on = Event()
+
+    def _on_file_ready(self, file_object):
+        self.passed_on.append(file_object)
+        self.first_file_passed_on.set()
+
+    def _extract_files(self, _, tmp_dir):
+        self.unpacker._initialize_shared_folder(tmp_dir)  # pylint: disable=protected-access
+        files_dir = Path(tmp_dir, 'files')
+        Path(files_dir, 'a').write_bytes(b'first file')
+        assert self.first_file_passed_on.wait(timeout=5), 'file was not passed on during extraction'
+        Path(files_dir, 'b').write_bytes(b'second file')
+        Path(files_dir, 'a_copy').write_bytes(b'first file')
+        Path(files_dir, 'empty').write_bytes(b'')
+        Path(tmp_dir, 'reports', 'meta.json').write_text(json.dumps({'plugin_used': 'mock', 'number_of_unpacked_files': 3}))
+        return [path for path in files_dir.iterdir()]
+
+    @mock.patch('unpacker.unpack.STREAMING_POLL_INTERVAL', 0.01)
+    @mock.patch('unpacker.unpack.STREAMING_SETTLE_TIME', 0)
+    def test_unpack_streamed(self):
+        with mock.patch.object(self.unpacker, 'extract_files_from_file', self._extract_files):
+            extracted_files = self.unpacker.unpack(self.test_fo, on_file_ready=self._on_file_ready)
+
+        assert len(extracted_files) == 2
+        assert self.test_fo.files_included == {item.uid for item in extracted_files}
+        assert self.test_fo.processed_analysis['unpacker']['plugin_used'] == 'mock'
+        assert len(self.passed_on) == 2, 'files must be passed on only once'
+        first_file = self.passed_on[0]
+        assert first_file.virtual_file_path[self.test_fo.uid][0].endswith('|/a')
+        assert first_file.depth == self.test_fo.depth + 1
+        late_virtual_paths = self.test_fo.temporary_data['late_virtual_paths']
+        assert list(late_virtual_paths) == [first_file.uid]
+        assert late_virtual_paths[first_file.uid][0].endswith('|/a_copy')
+        for item in extracted_files:
+            assert Path(self.unpacker.file_storage_system.generate_path(item)).is_file()
+            assert self.unpacker.db_interface.check_unpacking_lock(item.uid)
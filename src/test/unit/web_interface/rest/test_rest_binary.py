@@ -35,3 +35,13 @@ def test_bad_tar_flag(test_app):
     result = decode_response(test_app.get('/rest/binary/{}?tar=True'.format(TEST_FW.uid)))
     assert result['status'] == 1
     assert 'tar must be true or false' in result['error_message']
+
+
+def test_successful_raw_download(test_app):
+    response = test_app.get('/rest/binary/{}?raw=true'.format(TEST_FW.uid))
+    assert response.data == TEST_FW.binary
+    assert response.mimetype == 'application/octet-stream'
+
+    response = test_app.get('/rest/binary/{}?raw=true'.format(TEST_FW.uid), headers={'Range': 'bytes=0-3'})
+    assert response.status_code == 206
+    assert response.data == TEST_FW.binary[:4]
@@ -59,3 +59,8 @@ class TestAppBinarySearch(WebInterfaceTest):
             follow_redirects=True
         )
         assert b'test_uid' in rv.data
+
+    def test_app_binary_search_partial_result(self):
+        rv = self.test_client.get('/database/binary_search_results?request_id=running_id')
+        assert b'5 of 10 files scanned' in rv.data
+        assert b'test_uid' in rv.data
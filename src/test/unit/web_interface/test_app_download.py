@@ -1,3 +1,6 @@
+from pathlib import Path
+
+from storage.fsorganizer import FSOrganizer
 from test.common_helper import TEST_FW
 from test.unit.web_interface.base import WebInterfaceTest
 
@@ -21,3 +24,23 @@ class TestAppDownload(WebInterfaceTest):
         rv = self.test_client.get('/tar-download/{}'.format(TEST_FW.uid))
         assert TEST_FW.binary in rv.data
         assert 'attachment; filename=test.zip' in rv.headers['Content-Disposition']
+
+    def test_app_download_raw_range(self):
+        rv = self.test_client.get('/download/{}'.format(TEST_FW.uid), headers={'Range': 'bytes=2-5'})
+        assert rv.status_code == 206
+        assert rv.data == TEST_FW.binary[2:6]
+        assert rv.headers['Content-Range'] == 'bytes 2-5/{}'.format(len(TEST_FW.binary))
+
+    def test_app_download_raw_from_local_storage(self):
+        local_path = Path(FSOrganizer(config=self.config).generate_path_from_uid(TEST_FW.uid))
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        local_path.write_bytes(b'local file content')
+        try:
+            rv = self.test_client.get('/download/{}'.format(TEST_FW.uid))
+            assert rv.data == b'local file content'
+            assert 'attachment; filename=test.zip' in rv.headers['Content-Disposition']
+            rv = self.test_client.get('/download/{}'.format(TEST_FW.uid), headers={'Range': 'bytes=6-9'})
+            assert rv.status_code == 206
+            assert rv.data == b'file'
+        finally:
+            local_path.unlink()
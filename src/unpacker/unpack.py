@@ -1,9 +1,13 @@
 import json
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import List
+from threading import Lock
+from time import sleep, time
+from typing import Callable, Dict, Iterable, List, Optional, Set
 
+from common_helper_files import safe_rglob
 from fact_helper_file import get_file_type_from_path
 
 from helperFunctions.fileSystem import file_is_empty, get_relative_object_path
@@ -13,6 +17,9 @@ from objects.file import FileObject
 from storage.fsorganizer import FSOrganizer
 from unpacker.unpack_base import UnpackBase
 
+STREAMING_POLL_INTERVAL = 0.5  # seconds
+STREAMING_SETTLE_TIME = 2  # seconds; extracted files that were not modified for this long are considered complete
+
 
 class Unpacker(UnpackBase):
     def __init__(self, config=None, worker_id=None, db_interface=None):
@@ -20,9 +27,16 @@ class Unpacker(UnpackBase):
         self.file_storage_system = FSOrganizer(config=self.config)
         self.db_interface = db_interface
 
-    def unpack(self, current_fo: FileObject):
+    def unpack(self, current_fo: FileObject, on_file_ready: Optional[Callable[[FileObject], None]] = None):
         '''
         Recursively extract all objects included in current_fo and add them to current_fo.files_included
+
+        :param current_fo: The file that is extracted.
+        :param on_file_ready: Optional callback for streaming: If it is set, extracted files are hashed and stored by
+            a thread pool while the extraction is still running and each file is passed to the callback as soon as it
+            is stored (see `_ExtractedFileStream`). Virtual paths of files that were found after the file was passed on
+            are stored in `current_fo.temporary_data['late_virtual_paths']` (UID -> list of virtual paths).
+        :return: The extracted files.
         '''
 
         logging.debug('[worker {}] Extracting {}: Depth: {}'.format(self.worker_id, current_fo.uid, current_fo.depth))
@@ -36,11 +50,13 @@ class Unpacker(UnpackBase):
 
         file_path = self._generate_local_file_path(current_fo)
 
-        extracted_files = self.extract_files_from_file(file_path, tmp_dir.name)
-
-        extracted_file_objects = self.generate_and_store_file_objects(extracted_files, Path(tmp_dir.name) / 'files', current_fo)
-        extracted_file_objects = self.remove_duplicates(extracted_file_objects, current_fo)
-        self.add_included_files_to_object(extracted_file_objects, current_fo)
+        if on_file_ready is None:
+            extracted_files = self.extract_files_from_file(file_path, tmp_dir.name)
+            extracted_file_objects = self.generate_and_store_file_objects(extracted_files, Path(tmp_dir.name) / 'files', current_fo, move=True)
+            extracted_file_objects = self.remove_duplicates(extracted_file_objects, current_fo)
+            self.add_included_files_to_object(extracted_file_objects, current_fo)
+        else:
+            extracted_file_objects = self._extract_and_stream_files(file_path, tmp_dir.name, current_fo, on_file_ready)
 
         # set meta data
         current_fo.processed_analysis['unpacker'] = json.loads(Path(tmp_dir.name, 'reports', 'meta.json').read_text())
@@ -68,24 +84,47 @@ class Unpacker(UnpackBase):
         for item in included_file_objects:
             root_file_object.add_included_file(item)
 
-    def generate_and_store_file_objects(self, file_paths: List[Path], extraction_dir: Path, parent: FileObject):
+    def _extract_and_stream_files(self, file_path: str, tmp_dir: str, parent: FileObject, on_file_ready: Callable[[FileObject], None]) -> List[FileObject]:
+        stream = _ExtractedFileStream(self, parent, self.get_extracted_files_dir(tmp_dir), on_file_ready)
+        threads = self.config.getint('unpack', 'streaming_threads', fallback=4)
+        with ThreadPoolExecutor(max_workers=threads + 1) as executor:
+            extraction = executor.submit(self.extract_files_from_file, file_path, tmp_dir)
+            pending = set()
+            while not extraction.done():
+                sleep(STREAMING_POLL_INTERVAL)
+                pending.update(executor.submit(stream.store_file, path) for path in stream.get_completed_files())
+                pending = stream.pass_on_stored_files(pending)
+            extracted_files = extraction.result()
+            pending.update(executor.submit(stream.store_file, path) for path in stream.get_remaining_files(extracted_files))
+            wait(pending)
+            stream.pass_on_stored_files(pending)
+        if stream.late_virtual_paths:
+            parent.temporary_data['late_virtual_paths'] = stream.late_virtual_paths
+        return stream.get_passed_on_files()
+
+    def generate_and_store_file_objects(self, file_paths: List[Path], extraction_dir: Path, parent: FileObject, move: bool = False):
         extracted_files = {}
+        parent_type = get_file_type_from_path(parent.file_path)['mime']
         for item in file_paths:
             if not file_is_empty(item):
                 current_file = FileObject(file_path=str(item))
-                base = get_base_of_virtual_path(parent.get_virtual_file_paths()[parent.get_root_uid()][0])
-                current_virtual_path = join_virtual_path(base, parent.uid, get_relative_object_path(item, extraction_dir))
-                current_file.temporary_data['parent_fo_type'] = get_file_type_from_path(parent.file_path)['mime']
+                current_virtual_path = self.get_virtual_path(item, extraction_dir, parent)
+                current_file.temporary_data['parent_fo_type'] = parent_type
                 if current_file.uid in extracted_files:  # the same file is extracted multiple times from one archive
                     extracted_files[current_file.uid].virtual_file_path[parent.get_root_uid()].append(current_virtual_path)
                 else:
                     self.db_interface.set_unpacking_lock(current_file.uid)
-                    self.file_storage_system.store_file(current_file)
+                    self.file_storage_system.store_file(current_file, move=move)
                     current_file.virtual_file_path = {parent.get_root_uid(): [current_virtual_path]}
                     current_file.parent_firmware_uids.add(parent.get_root_uid())
                     extracted_files[current_file.uid] = current_file
         return extracted_files
 
+    @staticmethod
+    def get_virtual_path(file_path: Path, extraction_dir: Path, parent: FileObject) -> str:
+        base = get_base_of_virtual_path(parent.get_virtual_file_paths()[parent.get_root_uid()][0])
+        return join_virtual_path(base, parent.uid, get_relative_object_path(file_path, extraction_dir))
+
     @staticmethod
     def remove_duplicates(extracted_fo_dict, parent_fo):
         if parent_fo.uid in extracted_fo_dict:
@@ -97,3 +136,103 @@ class Unpacker(UnpackBase):
             local_path = self.file_storage_system.generate_path(file_object.uid)
             return local_path
         return file_object.file_path
+
+
+class _ExtractedFileStream:
+    '''
+    Files extracted by a running extraction. New files in the extraction directory are considered complete if they were
+    not changed for `STREAMING_SETTLE_TIME`. They are hashed and stored in worker threads (`store_file`) and passed on
+    in the main thread (`pass_on_stored_files`). Files that are extracted more than once get all virtual file paths as
+    long as they were not passed on yet. Virtual paths found later are collected in `late_virtual_paths` and have to be
+    added to the passed on file by the caller before it is stored.
+    '''
+
+    def __init__(self, unpacker: Unpacker, parent: FileObject, extraction_dir: Path, on_file_ready: Callable[[FileObject], None]):
+        self.unpacker = unpacker
+        self.parent = parent
+        self.root_uid = parent.get_root_uid()
+        self.parent_type = get_file_type_from_path(parent.file_path)['mime']
+        self.extraction_dir = extraction_dir
+        self.on_file_ready = on_file_ready
+        self.file_objects = {}  # type: Dict[str, FileObject]
+        self.passed_on = set()  # type: Set[str]
+        self.late_virtual_paths = {}  # type: Dict[str, List[str]]
+        self.last_stat = {}  # type: Dict[Path, tuple]
+        self.submitted = {}  # type: Dict[Path, tuple]
+        self.lock = Lock()
+
+    def get_completed_files(self) -> List[Path]:
+        completed = []
+        if not self.extraction_dir.is_dir():  # the extraction was not started yet
+            return completed
+        for path in safe_rglob(self.extraction_dir):
+            stat = self._get_stat(path)
+            if stat is None or path in self.submitted:
+                continue
+            if self.last_stat.get(path) == stat and time() - stat[2] / 1e9 >= STREAMING_SETTLE_TIME:
+                self.submitted[path] = stat
+                completed.append(path)
+            self.last_stat[path] = stat
+        return completed
+
+    def get_remaining_files(self, extracted_files: Iterable[Path]) -> List[Path]:
+        remaining = []
+        for path in extracted_files:
+            stat = self._get_stat(path)
+            if path in self.submitted:
+                if stat is None or stat == self.submitted[path]:  # unchanged or already moved to the file storage
+                    continue
+                logging.warning(f'[worker {self.unpacker.worker_id}] {path} was modified after it was passed on')
+            remaining.append(path)
+        return remaining
+
+    @staticmethod
+    def _get_stat(path: Path) -> Optional[tuple]:
+        try:
+            stat = path.lstat()
+        except OSError:  # e.g. a temporary file that was removed by the extractor
+            return None
+        # the ctime is used for the settle time since extractors may set the mtime to the one stored in the archive
+        return None if path.is_dir() else (stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+
+    def store_file(self, path: Path) -> Optional[FileObject]:
+        if file_is_empty(path):
+            return None
+        file_object = FileObject(file_path=str(path))
+        virtual_path = self.unpacker.get_virtual_path(path, self.extraction_dir, self.parent)
+        with self.lock:
+            if file_object.uid == self.parent.uid:
+                return None
+            if file_object.uid in self.passed_on:
+                self.late_virtual_paths.setdefault(file_object.uid, []).append(virtual_path)
+                return None
+            if file_object.uid in self.file_objects:  # the same file is extracted multiple times from one archive
+                self.file_objects[file_object.uid].virtual_file_path[self.root_uid].append(virtual_path)
+                return None
+            file_object.temporary_data['parent_fo_type'] = self.parent_type
+            file_object.virtual_file_path = {self.root_uid: [virtual_path]}
+            file_object.parent_firmware_uids.add(self.root_uid)
+            self.file_objects[file_object.uid] = file_object
+        self.unpacker.db_interface.set_unpacking_lock(file_object.uid)
+        self.unpacker.file_storage_system.store_file(file_object, move=True)
+        return file_object
+
+    def pass_on_stored_files(self, pending: set) -> set:
+        '''
+        Pass on the files of all finished `store_file` calls.
+
+        :param pending: The futures of the `store_file` calls.
+        :return: The futures that are not finished yet.
+        '''
+        done, not_done = wait(pending, timeout=0, return_when=FIRST_COMPLETED)
+        for future in done:
+            file_object = future.result()
+            if file_object is not None:
+                with self.lock:
+                    self.passed_on.add(file_object.uid)
+                self.parent.add_included_file(file_object)
+                self.on_file_ready(file_object)
+        return not_done
+
+    def get_passed_on_files(self) -> List[FileObject]:
+        return [self.file_objects[uid] for uid in self.passed_on]
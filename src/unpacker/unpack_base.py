@@ -1,5 +1,4 @@
 import logging
-import shutil
 from os import getgid, getuid, makedirs
 from pathlib import Path
 from subprocess import CalledProcessError
@@ -8,6 +7,7 @@ from common_helper_files import safe_rglob
 from docker.types import Mount
 
 from helperFunctions.docker import run_docker_container
+from helperFunctions.fileSystem import link_or_copy_file
 
 
 class UnpackBase:
@@ -21,7 +21,8 @@ class UnpackBase:
 
     def extract_files_from_file(self, file_path, tmp_dir):
         self._initialize_shared_folder(tmp_dir)
-        shutil.copy2(file_path, str(Path(tmp_dir, 'input', Path(file_path).name)))
+        # the input is writable for the (privileged) extractor, so it must not be a hardlink to the stored file
+        link_or_copy_file(file_path, Path(tmp_dir, 'input', Path(file_path).name), hardlink=False)
 
         result = run_docker_container(
             'fkiecad/fact_extractor',
@@ -0,0 +1,86 @@
+'''
+Access to the stored binaries from the frontend.
+
+If the binary storage of the backend is available (i.e. frontend and backend run on the same system or share the
+storage), binaries are read directly from disk. Otherwise, they are requested from the backend through the InterCom
+and streamed from the response. In both cases, only small chunks of a binary are held in memory at once and HTTP range
+requests are supported.
+'''
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Optional
+
+from flask import Response, request, send_file
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import wrap_file
+
+from helperFunctions.database import ConnectTo
+from intercom.front_end_binding import InterComFrontEndBinding
+from storage.db_interface_frontend import FrontEndDbInterface
+from storage.fsorganizer import FSOrganizer
+
+CHUNK_SIZE = 255 * 1024  # GridFS chunk size
+
+
+def get_binary_download_response(uid: str, config) -> Optional[Response]:
+    '''
+    Get a (streamed) response for the download of a binary.
+
+    :param uid: The UID of the file.
+    :param config: The FACT configuration.
+    :return: The response or `None` if the backend did not respond in time.
+    '''
+    local_path = _get_local_path(uid, config)
+    if local_path is not None:
+        with ConnectTo(FrontEndDbInterface, config) as db:
+            entry = db.get_specific_fields_of_db_entry(uid, {'file_name': 1})
+        if entry is not None:
+            return send_file(
+                local_path, mimetype='application/octet-stream', as_attachment=True, download_name=entry['file_name'],
+                conditional=True
+            )
+    return _get_streamed_response_from_backend(uid, config)
+
+
+def read_partial_binary(uid: str, offset: int, length: int, config) -> Optional[bytes]:
+    local_path = _get_local_path(uid, config)
+    if local_path is not None:
+        with local_path.open('rb') as fp:
+            fp.seek(offset)
+            return fp.read(length)
+    with ConnectTo(InterComFrontEndBinding, config) as intercom:
+        return intercom.peek_in_binary(uid, offset, length)
+
+
+def _get_local_path(uid: str, config) -> Optional[Path]:
+    local_path = Path(FSOrganizer(config=config).generate_path_from_uid(uid))
+    return local_path if local_path.is_file() else None
+
+
+def _get_streamed_response_from_backend(uid: str, config) -> Optional[Response]:
+    connection = ExitStack()  # the connection must stay open until the response is sent completely
+    intercom = connection.enter_context(ConnectTo(InterComFrontEndBinding, config))
+    stream = intercom.open_binary_stream(uid)
+    if stream is None:
+        connection.close()
+        return None
+
+    def _close_stream():
+        intercom.delete_binary_stream(stream)
+        connection.close()
+
+    if stream.metadata['file_name'] is None:  # not found by the backend
+        _close_stream()
+        return None
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(0)
+    response = Response(wrap_file(request.environ, stream, buffer_size=CHUNK_SIZE), mimetype='application/octet-stream', direct_passthrough=True)
+    response.headers['Content-Disposition'] = f'attachment; filename={stream.metadata["file_name"]}'
+    try:
+        response.make_conditional(request, accept_ranges=True, complete_length=size)
+    except HTTPException:  # e.g. unsatisfiable range
+        _close_stream()
+        raise
+    response.call_on_close(_close_stream)
+    return response
@@ -225,11 +225,13 @@ class DatabaseRoutes(ComponentBase):
     @roles_accepted(*PRIVILEGES['pattern_search'])
     @AppRoute('/database/binary_search_results', GET)
     def get_binary_search_results(self):
-        firmware_dict, error, yara_rules = None, None, None
+        firmware_dict, error, yara_rules, partial_result, progress = None, None, None, None, None
         if request.args.get('request_id'):
             request_id = request.args.get('request_id')
             with ConnectTo(InterComFrontEndBinding, self._config) as connection:
                 result, yara_rules = connection.get_binary_search_result(request_id)
+                if result is None:
+                    partial_result, progress = connection.get_partial_binary_search_result(request_id)
             if isinstance(result, str):
                 error = result
             elif result is not None:
@@ -242,7 +244,8 @@ class DatabaseRoutes(ComponentBase):
             request_id = None
         return render_template(
             'database/database_binary_search_results.html',
-            result=firmware_dict, error=error, request_id=request_id, yara_rules=yara_rules
+            result=firmware_dict, error=error, request_id=request_id, yara_rules=yara_rules,
+            partial_result=partial_result, progress=progress
         )
 
     def _store_binary_search_query(self, binary_search_results: list, yara_rules: str) -> str:
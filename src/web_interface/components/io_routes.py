@@ -15,6 +15,7 @@ from helperFunctions.pdf import build_pdf_report
 from intercom.front_end_binding import InterComFrontEndBinding
 from storage.db_interface_compare import CompareDbInterface, FactCompareException
 from storage.db_interface_frontend import FrontEndDbInterface
+from web_interface.binary_access import get_binary_download_response
 from web_interface.components.component_base import GET, POST, AppRoute, ComponentBase
 from web_interface.security.decorator import roles_accepted
 from web_interface.security.privileges import PRIVILEGES
@@ -70,11 +71,11 @@ class IORoutes(ComponentBase):
             object_exists = sc.exists(uid)
         if not object_exists:
             return render_template('uid_not_found.html', uid=uid)
+        if not packed:
+            response = get_binary_download_response(uid, self._config)
+            return response if response is not None else render_template('error.html', message='timeout')
         with ConnectTo(InterComFrontEndBinding, self._config) as sc:
-            if packed:
-                result = sc.get_repacked_binary_and_file_name(uid)
-            else:
-                result = sc.get_binary_and_filename(uid)
+            result = sc.get_repacked_binary_and_file_name(uid)
         if result is None:
             return render_template('error.html', message='timeout')
         binary, file_name = result
@@ -7,6 +7,7 @@ from helperFunctions.database import ConnectTo
 from helperFunctions.hash import get_sha256
 from intercom.front_end_binding import InterComFrontEndBinding
 from storage.db_interface_frontend import FrontEndDbInterface
+from web_interface.binary_access import get_binary_download_response
 from web_interface.rest.helper import error_message, get_boolean_from_request, success_message
 from web_interface.rest.rest_resource_base import RestResourceBase
 from web_interface.security.decorator import roles_accepted
@@ -21,7 +22,11 @@ api = Namespace('rest/binary', description='Request the binary of a given firmwa
         'description': 'Request a binary by providing the uid of the corresponding object',
         'params': {
             'uid': 'Firmware UID',
-            'tar': {'description': 'Get tar.gz packed contents of target', 'in': 'query', 'type': 'boolean', 'default': 'false'}
+            'tar': {'description': 'Get tar.gz packed contents of target', 'in': 'query', 'type': 'boolean', 'default': 'false'},
+            'raw': {
+                'description': 'Get the binary itself instead of a JSON response (supports HTTP range requests, ignored with tar)',
+                'in': 'query', 'type': 'boolean', 'default': 'false'
+            },
         }
     }
 )
@@ -36,6 +41,8 @@ class RestBinary(RestResourceBase):
         The uid of the file_object in question has to be given in the url
         Alternatively the tar parameter can be used to get the target archive as its content repacked into a .tar.gz.
         The return format will be {"binary": b64_encoded_binary_or_tar_gz, "file_name": file_name}
+        With the raw parameter, the binary is streamed as application/octet-stream instead. This is recommended for
+        large files and also allows to download parts of the file with HTTP range requests.
         '''
         with ConnectTo(FrontEndDbInterface, self.config) as db_service:
             existence = db_service.exists(uid)
@@ -45,8 +52,15 @@ class RestBinary(RestResourceBase):
 
         try:
             tar_flag = get_boolean_from_request(request.args, 'tar')
+            raw_flag = get_boolean_from_request(request.args, 'raw')
         except ValueError as value_error:
-            return error_message(str(value_error), self.URL, request_data=dict(uid=uid, tar=request.args.get('tar')))
+            return error_message(str(value_error), self.URL, request_data=dict(uid=uid, tar=request.args.get('tar'), raw=request.args.get('raw')))
+
+        if raw_flag and not tar_flag:
+            response = get_binary_download_response(uid, self.config)
+            if response is None:
+                return error_message('timeout', self.URL, request_data={'uid': uid, 'raw': raw_flag})
+            return response
 
         with ConnectTo(InterComFrontEndBinding, self.config) as intercom:
             if not tar_flag:
@@ -14,7 +14,8 @@ api = Namespace('rest/binary_search', description='Initiate a binary search on t
 
 binary_search_model = api.model('Binary Search', {
     'rule_file': fields.String(description='YARA rules', required=True),
-    'uid': fields.String(description='Firmware UID (optional)')
+    'uid': fields.String(description='Firmware UID (optional)'),
+    'mime_types': fields.List(fields.String, description='Only search files with these MIME types (optional)')
 }, description='Expected value')
 
 
@@ -28,6 +29,7 @@ class RestBinarySearchPost(RestResourceBase):
         '''
         Start a binary search
         The parameter `uid` is optional and can be specified if the user wants to search the files of a single firmware
+        The parameter `mime_types` is optional and restricts the search to files with these MIME types
         `rule_file` can be something like `rule rule_name {strings: $a = \"foobar\" condition: $a}`
         '''
         payload_data = self.validate_payload_data(binary_search_model)
@@ -40,7 +42,9 @@ class RestBinarySearchPost(RestResourceBase):
             )
 
         with ConnectTo(InterComFrontEndBinding, self.config) as intercom:
-            search_id = intercom.add_binary_search_request(payload_data['rule_file'].encode(), payload_data['uid'])
+            search_id = intercom.add_binary_search_request(
+                payload_data['rule_file'].encode(), payload_data['uid'], mime_types=payload_data.get('mime_types')
+            )
 
         return success_message(
             {'message': 'Started binary search. Please use GET and the search_id to get the results'},